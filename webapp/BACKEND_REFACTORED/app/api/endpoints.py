@@ -1,17 +1,33 @@
 
 from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, Query, Depends
 from fastapi.responses import JSONResponse, StreamingResponse
+from datetime import datetime
 from typing import List, Optional
 import logging
 
 from app.db.repository import DniRepository
 from app.services.excel_service import ExcelService
 from app.services.retry_service import RetryService
+from app.services.ingest_service import ingest_service
 from app.workers.orchestrator import Orchestrator
 from app.workers.loops import sunedu_worker_loop, minedu_worker_loop
-from app.core.config import Estado
+from app.core.config import (
+    Estado, MAX_WORKERS_PER_SOURCE, DEFAULT_SUNEDU_WORKERS, DEFAULT_MINEDU_WORKERS, PIPELINE_MODE,
+    MONITOR_MODE, REGISTROS_LIMITE_MAX,
+)
 from app.core.session_manager import session_manager
 from app.api.dependencies import get_session_id
+from app.services.result_cache import result_cache
+from app.workers.browser_pool import browser_pool, usa_navegador
+from app.workers.profile_pool import profile_pool
+from app.workers.lease_reaper import lease_reaper
+from app.db.writer import db_writer
+from app.core.metrics import metrics
+from app.services.ocr_service import ocr_service
+from app.services.captcha_preprocess import get_solve_stats
+from app.services.pacing import pacing
+from app.services.circuit_breaker import circuit_breakers
+from app.scrapers import cdp_monitor, asset_cache
 
 log = logging.getLogger("API")
 
@@ -20,42 +36,47 @@ repo = DniRepository()
 retry_service = RetryService()
 
 @router.post("/upload")
-async def upload_file(
+def upload_file(
     file: UploadFile = File(...),
     session_id: str = Depends(get_session_id),
+    bulk: bool = Query(False, description="Ingesta en segundo plano (archivos grandes); progreso en /upload/progress"),
 ):
     if not file.filename.endswith(('.xlsx', '.xls', '.csv', '.txt')):
         raise HTTPException(400, "Formato no soportado")
-    
+
+    if bulk:
+        ingesta = ingest_service.iniciar(file.file, file.filename, session_id)
+        return {"message": "Ingesta iniciada", "ingesta": ingesta.to_dict()}
+
     try:
-        content = file.file
-        result = ExcelService.parse_uploaded_file(content, file.filename)
-        valid_dnis = result["valid"]
-        invalid_dnis = result["invalid"]
-        
-        if not valid_dnis and not invalid_dnis:
-            raise HTTPException(400, "No se encontraron DNIs en el archivo")
-        
-        lote = None
-        if valid_dnis:
-            lote = repo.crear_lote(session_id, file.filename, valid_dnis)
-        
-        return {
-            "message": "Archivo procesado",
-            "lote_id": lote.id if lote else None,
-            "total_dnis": len(valid_dnis),
-            "invalid_dnis": invalid_dnis,
-            "total_invalid": len(invalid_dnis)
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
+        ingesta = ingest_service.ingerir(file.file, file.filename, session_id)
+    except ValueError as e:
         raise HTTPException(500, str(e))
 
+    if ingesta.validos == 0 and ingesta.invalidos == 0:
+        raise HTTPException(400, "No se encontraron DNIs en el archivo")
+
+    return {
+        "message": "Archivo procesado",
+        "lote_id": ingesta.lote_id,
+        "total_dnis": ingesta.insertados,
+        "invalid_dnis": ingesta.invalidos_muestra,
+        "total_invalid": ingesta.invalidos,
+    }
+
+@router.get("/upload/progress")
+def upload_progress(session_id: str = Depends(get_session_id)):
+    """Progreso de la última ingesta de la sesión (leídos, insertados, filas/s)."""
+    ingesta = ingest_service.progreso(session_id)
+    if ingesta is None:
+        raise HTTPException(404, "Sin ingestas en esta sesión")
+    return ingesta.to_dict()
+
 @router.get("/status")
 def get_status(session_id: str = Depends(get_session_id)):
+    # Una lectura de session_counters (O(estados)), no un GROUP BY + dos COUNT por poll
     counts = repo.obtener_conteos(session_id)
-    total = repo.obtener_total(session_id)
+    total = sum(counts.values())
     
     # Calculate derived metrics
     pendientes = counts.get(Estado.PENDIENTE, 0)
@@ -101,7 +122,7 @@ def get_status(session_id: str = Depends(get_session_id)):
         }
     }
 
-    retryables = repo.contar_retryables(session_id)
+    retryables = sum(counts.get(e, 0) for e in Estado.REINTENTABLES)
     
     # Worker status es POR SESION
     session_running = session_manager.session_has_running_workers(session_id)
@@ -121,18 +142,41 @@ def get_status(session_id: str = Depends(get_session_id)):
         "workers": {
             "sunedu": {"running": session_running}, 
             "minedu": {"running": session_running}
-        }
+        },
+        "cache": result_cache.get_stats(),
     }
 
+@router.get("/status/verify")
+def verify_status(
+    reparar: bool = Query(False, description="Reconstruir los contadores si difieren"),
+    session_id: str = Depends(get_session_id),
+):
+    """Compara los contadores de /status con los registros de la sesión (y opcionalmente los reconstruye)."""
+    resultado = repo.verificar_contadores(session_id, reparar=reparar)
+    if not resultado["consistente"]:
+        log.warning(f"[{session_id[:8]}] Contadores desfasados: {len(resultado['diferencias'])} diferencias "
+                    f"(reparado={resultado['reparado']})")
+    return resultado
+
 @router.get("/registros")
 def get_registros(
-    estado: Optional[str] = None,
+    estado: Optional[List[str]] = Query(None, description="Uno o más estados (?estado=A&estado=B)"),
     lote_id: Optional[int] = None,
-    limit: int = 200,
-    offset: int = 0,
+    limit: int = Query(200, ge=1, le=REGISTROS_LIMITE_MAX),
+    after_id: Optional[int] = Query(None, description="Cursor: next_cursor de la página anterior"),
+    dni_prefix: Optional[str] = Query(None, pattern=r"^\d{1,15}$"),
+    updated_since: Optional[datetime] = Query(None, description="Solo registros actualizados desde (ISO 8601, UTC)"),
     session_id: str = Depends(get_session_id),
 ):
-    data = repo.obtener_registros(session_id, estado, lote_id, limit, offset)
+    """Página keyset de registros: {"items", "next_cursor", "total"}."""
+    return repo.obtener_pagina(session_id, estado, lote_id, limit, after_id, dni_prefix, updated_since)
+
+@router.get("/registros/{registro_id}/payload")
+def get_registro_payload(registro_id: int, session_id: str = Depends(get_session_id)):
+    """Payload JSON completo de SUNEDU/MINEDU de un registro (el listado solo trae los campos de display)."""
+    data = repo.obtener_payload(session_id, registro_id)
+    if data is None:
+        raise HTTPException(404, "Registro no encontrado")
     return data
 
 @router.get("/lotes")
@@ -142,13 +186,20 @@ def get_lotes(session_id: str = Depends(get_session_id)):
 # --- Worker Control ---
 
 @router.post("/workers/start")
-def start_workers(session_id: str = Depends(get_session_id)):
-    # Recuperar DNIs atascados de esta sesión antes de iniciar
-    recovered = repo.recuperar_procesando(session_id)
+def start_workers(
+    sunedu: int = Query(DEFAULT_SUNEDU_WORKERS, ge=1, le=MAX_WORKERS_PER_SOURCE),
+    minedu: int = Query(DEFAULT_MINEDU_WORKERS, ge=1, le=MAX_WORKERS_PER_SOURCE),
+    session_id: str = Depends(get_session_id),
+):
+    # Recuperar DNIs de esta sesión con lease vencido (los que un worker vivo renueva no se tocan)
+    recovered = lease_reaper.barrer(session_id)
     total_rec = recovered.get("sunedu_recuperados", 0) + recovered.get("minedu_recuperados", 0)
-    if total_rec > 0:
-        log.warning(f"[{session_id[:8]}] Recuperados {total_rec} DNIs atascados: {recovered}")
     
+    if PIPELINE_MODE == "fanout":
+        preparados = repo.preparar_fanout(session_id)
+        if preparados:
+            log.info(f"[{session_id[:8]}] {preparados} registros preparados para modo fanout")
+
     # Verificar si ya tiene workers
     if session_manager.session_has_running_workers(session_id):
         orch = session_manager.get_orchestrator(session_id)
@@ -156,8 +207,9 @@ def start_workers(session_id: str = Depends(get_session_id)):
             orch.resume_workers()
         return {"message": "Workers reanudados", "recovered": total_rec}
     
-    # Verificar capacidad global
-    if not session_manager.can_start_workers(2):
+    # Verificar capacidad global (cuentan solo los workers con Chrome: MINEDU HTTP no ocupa navegador)
+    num_workers = sum(n for fuente, n in (("sunedu", sunedu), ("minedu", minedu)) if usa_navegador(fuente))
+    if not session_manager.can_start_workers(num_workers):
         stats = session_manager.get_stats()
         raise HTTPException(
             503,
@@ -169,14 +221,18 @@ def start_workers(session_id: str = Depends(get_session_id)):
     orch = Orchestrator(session_id)
     session_manager.set_orchestrator(session_id, orch)
     
-    # Start threads
-    targets = [sunedu_worker_loop, minedu_worker_loop]
+    # Start threads (N navegadores por fuente comparten la cola de la sesión)
+    targets = [sunedu_worker_loop] * sunedu + [minedu_worker_loop] * minedu
     orch.start_workers(targets)
     
     # Registrar workers globalmente
-    session_manager.register_workers(session_id, 2)
+    session_manager.register_workers(session_id, num_workers, {"sunedu": sunedu, "minedu": minedu})
     
-    return {"message": "Workers iniciados", "recovered": total_rec}
+    return {
+        "message": "Workers iniciados",
+        "recovered": total_rec,
+        "workers": {"sunedu": sunedu, "minedu": minedu},
+    }
 
 @router.post("/workers/stop")
 def stop_workers(session_id: str = Depends(get_session_id)):
@@ -189,11 +245,22 @@ def stop_workers(session_id: str = Depends(get_session_id)):
 @router.get("/workers/status")
 def worker_status(session_id: str = Depends(get_session_id)):
     orch = session_manager.get_orchestrator(session_id)
+    counts = session_manager.get_worker_counts(session_id)
     return {
         "running": orch.is_running() if orch else False,
         "paused": orch.is_paused() if orch else False,
-        "sunedu": {"running": orch.is_running() if orch else False},
-        "minedu": {"running": orch.is_running() if orch else False},
+        "sunedu": {
+            "running": orch.is_running() if orch else False,
+            "workers": counts.get("sunedu", 0),
+            "alive": orch.alive_count("sunedu_worker_loop") if orch else 0,
+            "circuito": circuit_breakers.get("sunedu").estado,
+        },
+        "minedu": {
+            "running": orch.is_running() if orch else False,
+            "workers": counts.get("minedu", 0),
+            "alive": orch.alive_count("minedu_worker_loop") if orch else 0,
+            "circuito": circuit_breakers.get("minedu").estado,
+        },
     }
 
 @router.post("/retry")
@@ -203,8 +270,12 @@ def retry_failed(session_id: str = Depends(get_session_id)):
 
 @router.post("/recover")
 def recover_stuck(session_id: str = Depends(get_session_id)):
-    """Recupera DNIs atascados en PROCESANDO_* de esta sesión."""
-    result = repo.recuperar_procesando(session_id)
+    """Recupera DNIs atascados en PROCESANDO_* de esta sesión.
+    Con workers corriendo solo los de lease vencido (no se roba trabajo en curso)."""
+    if session_manager.session_has_running_workers(session_id):
+        result = lease_reaper.barrer(session_id)
+    else:
+        result = repo.recuperar_procesando(session_id)
     total = result.get("sunedu_recuperados", 0) + result.get("minedu_recuperados", 0)
     return {"message": f"Recuperados {total} DNIs atascados", "detalle": result}
 
@@ -222,15 +293,13 @@ def limpiar_db(session_id: str = Depends(get_session_id)):
 @router.get("/resultados")
 def exportar_excel(
     lote_id: Optional[int] = Query(None),
+    dni_prefix: Optional[str] = Query(None, pattern=r"^\d{1,15}$"),
+    updated_since: Optional[datetime] = Query(None),
     session_id: str = Depends(get_session_id),
 ):
-    data = repo.obtener_registros(session_id, lote_id=lote_id, limit=100000)
-    if not data:
-        raise HTTPException(404, "No hay datos para exportar")
-    
-    # Flatten/Format for Excel
+    # Flatten/Format for Excel (lectura por páginas keyset: sin el tope de 100000 filas)
     rows = []
-    for r in data:
+    for r in repo.iter_registros(session_id, lote_id=lote_id, dni_prefix=dni_prefix, updated_since=updated_since):
         row = {
             "DNI": r["dni"],
             "Estado": r["estado"],
@@ -245,6 +314,8 @@ def exportar_excel(
             "Minedu_FechaExpedicion": r.get("minedu_fecha", ""),
         }
         rows.append(row)
+    if not rows:
+        raise HTTPException(404, "No hay datos para exportar")
 
     excel_io = ExcelService.generate_excel(rows)
     return StreamingResponse(
@@ -256,4 +327,16 @@ def exportar_excel(
 @router.get("/server/stats")
 def server_stats():
     """Estadísticas globales del servidor (no requiere sesión)."""
-    return session_manager.get_stats()
+    stats = session_manager.get_stats()
+    stats["browser_pool"] = browser_pool.get_stats()
+    stats["profile_pool"] = profile_pool.get_stats()
+    stats["ocr"] = ocr_service.get_stats()
+    stats["captcha"] = get_solve_stats()
+    stats["pacing"] = pacing.get_stats()
+    stats["circuit_breaker"] = circuit_breakers.get_stats()
+    stats["lease_reaper"] = lease_reaper.get_stats()
+    stats["db_writer"] = db_writer.get_stats()
+    stats["monitor"] = {"modo": MONITOR_MODE, **cdp_monitor.get_stats()}
+    stats["red"] = asset_cache.get_stats()
+    stats["metrics"] = metrics.get_stats()
+    return stats
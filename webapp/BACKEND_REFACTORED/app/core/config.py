@@ -10,13 +10,25 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DB_DIR = BASE_DIR / "data"
 DB_DIR.mkdir(parents=True, exist_ok=True)
-DB_PATH = DB_DIR / "registros.db"
+DB_PATH = Path(os.getenv("DB_PATH", str(DB_DIR / "registros.db")))
 
 DATABASE_URL = f"sqlite:///{DB_PATH}"
+# Escritura (INSERT/UPDATE/DELETE) más lenta que esto = seguramente esperó el lock de SQLite
+DB_ESCRITURA_LENTA = 0.1
+# Escritor único (app/db/writer.py): un thread ejecuta todas las escrituras del repositorio
+# agrupadas en lotes con un solo commit (group commit) en vez de una transacción por worker
+DB_WRITER_ENABLED = os.getenv("DB_WRITER_ENABLED", "True").lower() == "true"
+DB_WRITER_MAX_LOTE = int(os.getenv("DB_WRITER_MAX_LOTE", 200))        # Máx operaciones por commit
+DB_WRITER_ESPERA_MS = float(os.getenv("DB_WRITER_ESPERA_MS", 2))      # Espera a que se sumen más operaciones al lote
 
 # --- URLs de consulta ---
-SUNEDU_URL = "https://constanciasweb.sunedu.gob.pe/#/modulos/grados-y-titulos"
-MINEDU_URL = "https://titulosinstitutos.minedu.gob.pe/"
+# Sobrescribibles para apuntar al servidor de fixtures local (benchmarks/fixture_server.py)
+SUNEDU_URL = os.getenv("SUNEDU_URL", "https://constanciasweb.sunedu.gob.pe/#/modulos/grados-y-titulos")
+MINEDU_URL = os.getenv("MINEDU_URL", "https://titulosinstitutos.minedu.gob.pe/")
+# Endpoint XHR/fetch de búsqueda de SUNEDU (regex sobre la URL de la respuesta)
+SUNEDU_API_URL_PATTERN = os.getenv(
+    "SUNEDU_API_URL_PATTERN", r"sunedu\.gob\.pe/.*(grado|titulo|constancia|consulta)"
+)
 
 # --- Estados del pipeline ---
 class Estado:
@@ -31,29 +43,171 @@ class Estado:
     ERROR_MINEDU       = "ERROR_MINEDU"
 
     TERMINALES = {FOUND_SUNEDU, FOUND_MINEDU, NOT_FOUND, ERROR_SUNEDU, ERROR_MINEDU}
+    EN_PROCESO = {PROCESANDO_SUNEDU, PROCESANDO_MINEDU}
+    REINTENTABLES = {NOT_FOUND, ERROR_SUNEDU, ERROR_MINEDU}
+    ACTIVOS = {PENDIENTE, PROCESANDO_SUNEDU, CHECK_MINEDU, PROCESANDO_MINEDU}
+
+# --- Modo del pipeline ---
+# "sequential": PENDIENTE → SUNEDU → CHECK_MINEDU → MINEDU (original)
+# "fanout":     SUNEDU y MINEDU consultan cada DNI a la vez; `estado` se fusiona
+#               desde los sub-estados estado_sunedu / estado_minedu (prioridad SUNEDU)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "sequential")
+
+class SubEstado:
+    """Estado de una fuente dentro de un registro (solo modo fanout)."""
+    PENDIENTE  = "PENDIENTE"
+    PROCESANDO = "PROCESANDO"
+    FOUND      = "FOUND"
+    NOT_FOUND  = "NOT_FOUND"
+    ERROR      = "ERROR"
+    OMITIDO    = "OMITIDO"     # No hizo falta consultarla (SUNEDU ya encontró)
+
+    ABIERTOS = {PENDIENTE, PROCESANDO}
 
 # --- Workers ---
-# Tiempos de espera para simular comportamiento humano
-SUNEDU_SLEEP_MIN = 3.0
-SUNEDU_SLEEP_MAX = 4.2
-SUNEDU_SLEEP_NOT_FOUND = 3.6
-MINEDU_SLEEP_MIN = 1.0
-MINEDU_SLEEP_MAX = 2.0
+# Pausa entre DNIs: ritmo adaptativo AIMD por fuente (app/services/pacing.py).
+# ritmo = DNIs/min por worker → pausa = 60 / ritmo (±15% jitter)
+PACING_ENABLED = os.getenv("PACING_ENABLED", "True").lower() == "true"
+PACING = {
+    # Inicial 10/min = los 6s fijos originales (4s anti-ban + 2s del loop)
+    "sunedu": {"ritmo_inicial": 10.0, "ritmo_min": 1.0, "ritmo_max": 40.0, "paso": 0.5, "factor": 0.5},
+    "minedu": {"ritmo_inicial": 60.0, "ritmo_min": 2.0, "ritmo_max": 200.0, "paso": 2.0, "factor": 0.5},
+}
+# Circuit breaker por fuente (app/services/circuit_breaker.py): tras `umbral` DNIs
+# fallidos seguidos deja de reclamar trabajo `cooldown` s; luego un solo DNI de prueba.
+# Si la prueba falla, el cooldown se duplica hasta `cooldown_max`.
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "True").lower() == "true"
+CIRCUIT_BREAKER = {
+    "sunedu": {"umbral": 3, "cooldown": 60.0, "cooldown_max": 600.0},
+    "minedu": {"umbral": 5, "cooldown": 30.0, "cooldown_max": 300.0},
+}
 WORKER_POLL_INTERVAL = 2
+# Reclamo por lease: cada worker toma hasta CLAIM_BATCH_SIZE DNIs en un solo UPDATE ... RETURNING
+# (registra el dueño por fuente, lease_owner / lease_owner_minedu, + lease_expires_at) y los
+# procesa desde su cola local. Un thread de latido renueva cada LEASE_HEARTBEAT_SEGUNDOS el lease
+# de lo que aún retiene, incluido el DNI en consulta; el reaper (app/workers/lease_reaper.py)
+# reencola cada REAPER_INTERVALO s los leases vencidos. Resultados y latidos solo se aplican si
+# el worker sigue siendo el dueño. CLAIM_LEASE_SEGUNDOS debe cubrir varios latidos.
+CLAIM_BATCH_SIZE = int(os.getenv("CLAIM_BATCH_SIZE", 5))
+CLAIM_LEASE_SEGUNDOS = int(os.getenv("CLAIM_LEASE_SEGUNDOS", 300))
+LEASE_HEARTBEAT_SEGUNDOS = int(os.getenv("LEASE_HEARTBEAT_SEGUNDOS", 60))
+REAPER_INTERVALO = int(os.getenv("REAPER_INTERVALO", 30))
 SUNEDU_MAX_RETRIES = 5
 MINEDU_MAX_RETRIES = 8
 RETRY_EXTRA_SLEEP  = 1.2
+# Resultado SUNEDU: "dom" = sondear la página, "network" = capturar la respuesta del backend vía CDP
+SUNEDU_CAPTURE_MODE = os.getenv("SUNEDU_CAPTURE_MODE", "dom")
+# Esperas MINEDU: "fast" = por condición del DOM con piso humano, "conservative" = sleeps fijos originales
+MINEDU_WAIT_PROFILE = os.getenv("MINEDU_WAIT_PROFILE", "fast")
+# Motor MINEDU: "browser" = Chrome (Botasaurus), "http" = sin navegador (requests + parseo del HTML)
+MINEDU_ENGINE = os.getenv("MINEDU_ENGINE", "browser")
+MINEDU_HTTP_QUERY_PATH = os.getenv("MINEDU_HTTP_QUERY_PATH", "/")  # Solo si el <form> no declara action
+MINEDU_HTTP_TIMEOUT = 20       # Segundos por request
+MINEDU_HTTP_POOL_SIZE = 4      # Conexiones keep-alive por worker
+
+# --- Backend de scraping ---
+# "real" = Chrome / HTTP contra las webs; "simulated" = app/scrapers/simulated.py: sin navegador,
+# resultados y latencias programables, para medir loops + Orchestrator + BD a gran escala
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "real")
+# Por fuente: fracción de DNIs encontrados (determinista por DNI), de consultas con error y
+# latencia por DNI en segundos: "const:s", "uniform:min:max", "lognormal:mediana:sigma", "exp:media"
+SIMULATED = {
+    "sunedu": {
+        "tasa_encontrado": float(os.getenv("SIM_SUNEDU_ENCONTRADO", 0.4)),
+        "tasa_error": float(os.getenv("SIM_SUNEDU_ERROR", 0.01)),
+        "latencia": os.getenv("SIM_SUNEDU_LATENCIA", "lognormal:8:0.4"),
+    },
+    "minedu": {
+        "tasa_encontrado": float(os.getenv("SIM_MINEDU_ENCONTRADO", 0.3)),
+        "tasa_error": float(os.getenv("SIM_MINEDU_ERROR", 0.02)),
+        "latencia": os.getenv("SIM_MINEDU_LATENCIA", "lognormal:3:0.5"),
+    },
+}
+
+# --- OCR compartido (un modelo ddddocr por proceso) ---
+OCR_SERVICE_THREADS = int(os.getenv("OCR_SERVICE_THREADS", 2))    # Threads de inferencia
+OCR_SERVICE_MAX_BATCH = int(os.getenv("OCR_SERVICE_MAX_BATCH", 8))  # Captchas que drena cada thread por vuelta
+OCR_SERVICE_BATCH_WAIT = 0.005  # Segundos que espera a que se junten más captchas
+OCR_SOLVE_TIMEOUT = 10          # Máx espera de un worker por su resultado
+# Captcha MINEDU: variantes preprocesadas + votación, y validación antes de enviar
+CAPTCHA_PREPROCESS = os.getenv("CAPTCHA_PREPROCESS", "True").lower() == "true"
+CAPTCHA_LONGITUD_MIN = int(os.getenv("CAPTCHA_LONGITUD_MIN", 4))
+CAPTCHA_LONGITUD_MAX = int(os.getenv("CAPTCHA_LONGITUD_MAX", 6))
+CAPTCHA_CHARSET = os.getenv("CAPTCHA_CHARSET", "A-Za-z0-9")  # Clase de caracteres (regex) admitida
+# Corpus de captchas (imagen + lectura + veredicto) para benchmarks/ocr_benchmark.py. Vacío = no graba
+CAPTCHA_CORPUS_DIR = os.getenv("CAPTCHA_CORPUS_DIR", "")
 
 # --- Navegador (Botasaurus) ---
 HEADLESS = os.getenv("HEADLESS", "False").lower() == "true"
 BLOCK_IMAGES_SUNEDU = True
 BLOCK_IMAGES_MINEDU = False
 WINDOW_SIZE = (1366, 768)
+# Monitoreo del navegador: "inject" = script espía (parchea fetch/XHR/console; se lee con run_js),
+# "cdp" = eventos CDP nativos en el listener de fondo → ring buffer por worker, sin run_js.
+# Ojo: "cdp" habilita el dominio Runtime, que algunas protecciones anti-bot detectan
+MONITOR_MODE = os.getenv("MONITOR_MODE", "inject")
+MONITOR_BUFFER_SIZE = 300  # Eventos por worker (al llenarse se descartan los más viejos)
+
+# --- Red del navegador: bloqueo de URLs + caché local de assets (CDP) ---
+# Patrones de Network.setBlockedURLs por fuente ('*' = comodín), además de las imágenes si
+# BLOCK_IMAGES_* está activo. Nunca bloquear challenges.cloudflare.com (Turnstile).
+NETWORK_BLOCKING_ENABLED = os.getenv("NETWORK_BLOCKING_ENABLED", "True").lower() == "true"
+_BLOQUEO_COMUN = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*.woff2*", "*.woff*", "*.ttf*", "*.otf*",
+]
+BLOCKED_URLS = {
+    "sunedu": _BLOQUEO_COMUN,
+    "minedu": _BLOQUEO_COMUN,
+}
+# Scripts/CSS inmutables (nombre con hash o Cache-Control immutable / max-age ≥ 1 día) se
+# guardan en disco y se sirven con Fetch.fulfillRequest en las recargas (F5 de reintentos)
+ASSET_CACHE_ENABLED = os.getenv("ASSET_CACHE_ENABLED", "True").lower() == "true"
+ASSET_CACHE_DIR = Path(os.getenv("ASSET_CACHE_DIR", str(DB_DIR / "asset_cache")))
+ASSET_CACHE_MAX_MB = 200         # Al superarse se borran los assets menos usados
+ASSET_CACHE_TTL = 7 * 24 * 3600  # Máx vida de un asset en caché (segundos)
+
+# --- Pool global de navegadores precalentados ---
+BROWSER_POOL_ENABLED = os.getenv("BROWSER_POOL_ENABLED", "True").lower() == "true"
+BROWSER_POOL_MIN_IDLE = int(os.getenv("BROWSER_POOL_MIN_IDLE", 1))        # Chrome listos (por fuente) esperando sesión
+BROWSER_POOL_MAX_SIZE = int(os.getenv("BROWSER_POOL_MAX_SIZE", 6))        # Máx Chrome por fuente (ociosos + prestados)
+BROWSER_POOL_RECYCLE_AFTER = int(os.getenv("BROWSER_POOL_RECYCLE_AFTER", 200))  # Reciclar driver tras N DNIs
+BROWSER_POOL_HEALTH_INTERVAL = 60   # Segundos entre health checks de drivers ociosos
+BROWSER_POOL_ACQUIRE_TIMEOUT = 90   # Máx espera para obtener un driver del pool
+SUNEDU_WARMUP_WAIT = 6              # Carga inicial SUNEDU (igual que la primera carga del scraper)
+MINEDU_WARMUP_WAIT = 2
+
+# --- Perfiles persistentes de Chrome (cookies, clearance de Turnstile, caché HTTP) ---
+# Un user-data-dir por slot y fuente bajo PROFILE_POOL_DIR; cada Chrome toma un slot libre
+# y lo devuelve al cerrarse. Sin slot libre, Chrome usa un perfil temporal (como antes).
+PROFILE_POOL_ENABLED = os.getenv("PROFILE_POOL_ENABLED", "True").lower() == "true"
+PROFILE_POOL_DIR = Path(os.getenv("PROFILE_POOL_DIR", str(DB_DIR / "profiles")))
+PROFILE_POOL_SLOTS = int(os.getenv("PROFILE_POOL_SLOTS", 10))  # Slots por fuente (≥ Chrome simultáneos de la fuente)
+PROFILE_POOL_MAX_MB = 500        # Perfil más pesado que esto → se reconstruye (caché desbordada)
+PROFILE_POOL_MAX_FALLOS = 2      # Chrome caído N veces seguidas con el mismo perfil → se reconstruye
 
 # --- API ---
 API_HOST = os.getenv("HOST", "0.0.0.0")
 API_PORT = int(os.getenv("PORT", 8000))
 
+# --- Ingesta de archivos (app/services/ingest_service.py) ---
+INGEST_CHUNK = int(os.getenv("INGEST_CHUNK", 5000))  # Filas por INSERT executemany (y por commit)
+INGEST_MAX_INVALIDOS = 1000      # DNIs inválidos que se devuelven como muestra (el conteo es completo)
+
+# --- Paginación de registros (keyset por id: ?after_id=<next_cursor>) ---
+REGISTROS_LIMITE_MAX = 1000      # Máx filas por página de /api/registros
+EXPORT_PAGINA = 5000             # Filas por página al leer registros para el Excel
+
 # --- Sesiones ---
-MAX_GLOBAL_WORKERS = 10          # Máx Chrome instances en total (todas las sesiones)
+MAX_GLOBAL_WORKERS = int(os.getenv("MAX_GLOBAL_WORKERS", 10))  # Máx Chrome instances en total (todas las sesiones; MINEDU HTTP no cuenta)
+MAX_WORKERS_PER_SOURCE = int(os.getenv("MAX_WORKERS_PER_SOURCE", 4))  # Máx navegadores por fuente en una sesión
+DEFAULT_SUNEDU_WORKERS = 1       # Navegadores SUNEDU por sesión si no se indica ?sunedu=
+DEFAULT_MINEDU_WORKERS = 1       # Navegadores MINEDU por sesión si no se indica ?minedu=
 SESSION_IDLE_TIMEOUT = 1800      # Segundos antes de limpiar sesión inactiva (30 min)
+
+# --- Caché de resultados (compartido entre sesiones) ---
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "True").lower() == "true"
+RESULT_CACHE_TTL_FOUND = int(os.getenv("RESULT_CACHE_TTL_FOUND", 7 * 24 * 3600))     # TTL de FOUND_SUNEDU / FOUND_MINEDU
+RESULT_CACHE_TTL_NOT_FOUND = int(os.getenv("RESULT_CACHE_TTL_NOT_FOUND", 6 * 3600))  # TTL negativo (NOT_FOUND)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 50000))        # Tope LRU: se expulsa el menos usado
@@ -0,0 +1,71 @@
+"""
+Métricas en memoria del proceso (contadores + distribuciones de latencia).
+Se exponen en /api/server/stats.
+"""
+
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+# Muestras recientes que se conservan por métrica (ventana deslizante)
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", 1000))
+
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+class Metrics:
+    """Registro thread-safe de contadores y observaciones."""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._totals: Dict[str, int] = defaultdict(int)
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self._samples[name].append(value)
+            self._totals[name] += 1
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def summary(self, name: str) -> dict:
+        with self._lock:
+            valores = list(self._samples.get(name, ()))
+            total = self._totals.get(name, 0)
+        if not valores:
+            return {"count": total, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        # 4 decimales: las latencias de BD/cola (*_s) son de milisegundos
+        return {
+            "count": total,
+            "avg": round(sum(valores) / len(valores), 4),
+            "p50": round(_percentil(valores, 0.50), 4),
+            "p95": round(_percentil(valores, 0.95), 4),
+            "max": round(max(valores), 4),
+        }
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            nombres = list(self._samples.keys())
+        return {
+            "counters": counters,
+            "timings": {n: self.summary(n) for n in nombres},
+        }
+
+
+# Singleton global
+metrics = Metrics()
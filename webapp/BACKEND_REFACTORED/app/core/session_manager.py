@@ -21,6 +21,7 @@ class SessionInfo:
         self.orchestrator = None  # Se asigna al hacer start
         self.last_activity = datetime.utcnow()
         self.worker_count = 0  # Cuántos Chrome instances usa esta sesión
+        self.worker_counts: Dict[str, int] = {}  # Desglose por fuente: {"sunedu": N, "minedu": M}
 
     def touch(self):
         self.last_activity = datetime.utcnow()
@@ -70,14 +71,15 @@ class SessionManager:
         with self._global_lock:
             return (self._total_workers + num_workers) <= MAX_GLOBAL_WORKERS
 
-    def register_workers(self, session_id: str, count: int = 2):
-        """Registra que la sesión inició N workers."""
+    def register_workers(self, session_id: str, count: int = 2, por_fuente: Optional[Dict[str, int]] = None):
+        """Registra que la sesión inició N workers (opcionalmente con desglose por fuente)."""
         with self._global_lock:
             info = self._sessions.get(session_id)
             if info:
                 info.worker_count = count
+                info.worker_counts = dict(por_fuente or {})
                 self._total_workers += count
-                log.info(f"[SESSION {session_id[:8]}] +{count} workers (global: {self._total_workers}/{MAX_GLOBAL_WORKERS})")
+                log.info(f"[SESSION {session_id[:8]}] +{count} workers {info.worker_counts or ''} (global: {self._total_workers}/{MAX_GLOBAL_WORKERS})")
 
     def unregister_workers(self, session_id: str):
         """Libera los workers de una sesión."""
@@ -88,6 +90,12 @@ class SessionManager:
                 self._total_workers = max(0, self._total_workers)
                 log.info(f"[SESSION {session_id[:8]}] -{info.worker_count} workers (global: {self._total_workers}/{MAX_GLOBAL_WORKERS})")
                 info.worker_count = 0
+                info.worker_counts = {}
+
+    def get_worker_counts(self, session_id: str) -> Dict[str, int]:
+        """Workers registrados por fuente para la sesión."""
+        info = self._sessions.get(session_id)
+        return dict(info.worker_counts) if info else {}
 
     def get_orchestrator(self, session_id: str):
         """Obtiene el orchestrator de una sesión (puede ser None)."""
@@ -2,7 +2,7 @@
 import json
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, event, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -31,9 +31,23 @@ class Registro(Base):
     session_id       = Column(String(36), nullable=False, index=True)
     dni              = Column(String(15), nullable=False, index=True)
     estado           = Column(String(30), nullable=False, default="PENDIENTE", index=True)
+    estado_sunedu    = Column(String(20), default=None)  # Sub-estados del modo fanout (NULL en secuencial)
+    estado_minedu    = Column(String(20), default=None)
     retry_count      = Column(Integer, default=0)    
+    lease_owner      = Column(String(64), default=None)  # Worker SUNEDU que retiene el registro
+    lease_owner_minedu = Column(String(64), default=None)  # Worker MINEDU (en fanout ambas fuentes a la vez)
+    lease_expires_at = Column(DateTime, default=None)
     payload_sunedu   = Column(Text, default=None)   # JSON serializado
     payload_minedu   = Column(Text, default=None)   # JSON serializado
+    # Campos de display copiados del payload al guardarlo (listado y Excel sin json.loads)
+    sunedu_nombres       = Column(String(255), default=None)
+    sunedu_grado         = Column(String(255), default=None)
+    sunedu_institucion   = Column(String(255), default=None)
+    sunedu_fecha_diploma = Column(String(30), default=None)
+    minedu_nombres       = Column(String(255), default=None)
+    minedu_titulo        = Column(String(255), default=None)
+    minedu_institucion   = Column(String(255), default=None)
+    minedu_fecha         = Column(String(30), default=None)
     error_msg        = Column(Text, default=None)
     created_at       = Column(DateTime, default=datetime.utcnow)
     updated_at       = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -43,9 +57,13 @@ class Registro(Base):
     # ── Helpers para payload JSON ──
     def set_payload_sunedu(self, data: dict):
         self.payload_sunedu = json.dumps(data, ensure_ascii=False)
+        for columna, valor in campos_resultado("sunedu", data).items():
+            setattr(self, columna, valor)
 
     def set_payload_minedu(self, data: dict):
         self.payload_minedu = json.dumps(data, ensure_ascii=False)
+        for columna, valor in campos_resultado("minedu", data).items():
+            setattr(self, columna, valor)
 
     def get_payload_sunedu(self) -> Optional[dict]:
         return json.loads(self.payload_sunedu) if self.payload_sunedu else None
@@ -57,6 +75,86 @@ class Registro(Base):
         return f"<Registro DNI={self.dni} estado={self.estado} session={self.session_id}>"
 
 
+# Columna de display → clave del payload, por fuente
+CAMPOS_RESULTADO = {
+    "sunedu": {
+        "sunedu_nombres": "nombres",
+        "sunedu_grado": "grado_o_titulo",
+        "sunedu_institucion": "institucion",
+        "sunedu_fecha_diploma": "fecha_diploma",
+    },
+    "minedu": {
+        "minedu_nombres": "nombre_completo",
+        "minedu_titulo": "titulo",
+        "minedu_institucion": "institucion",
+        "minedu_fecha": "fecha_expedicion",
+    },
+}
+
+
+def campos_resultado(fuente: str, data) -> dict:
+    """
+    Columnas de display de `fuente` a partir de su payload (dict o lista de
+    resultados: se toma el primero). Sin datos utilizables → todas en None.
+    """
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if not isinstance(data, dict):
+        return {columna: None for columna in CAMPOS_RESULTADO[fuente]}
+    return {
+        columna: "" if data.get(clave) is None else str(data.get(clave))
+        for columna, clave in CAMPOS_RESULTADO[fuente].items()
+    }
+
+
+class ContadorEstado(Base):
+    """
+    Registros por (sesión, lote, estado), mantenido por triggers sobre `registros`
+    en la misma transacción que cada cambio: /status lee O(estados) filas en vez
+    de agrupar todos los registros de la sesión.
+    """
+    __tablename__ = "session_counters"
+
+    session_id = Column(String(36), primary_key=True)
+    lote_id    = Column(Integer, primary_key=True)
+    estado     = Column(String(30), primary_key=True)
+    total      = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ContadorEstado {self.session_id} lote={self.lote_id} {self.estado}={self.total}>"
+
+
 # Índice compuesto para queries por sesión + estado
 Index("ix_registros_session_estado_id", Registro.session_id, Registro.estado, Registro.id)
 Index("ix_lotes_session", Lote.session_id)
+# Páginas keyset de un lote (/api/registros?lote_id=, export) y borrado de lotes
+Index("ix_registros_lote_id", Registro.lote_id, Registro.id)
+# El reaper busca leases vencidos por rango de fecha (O(vencidos), no un scan de PROCESANDO_*)
+Index("ix_registros_lease_expires", Registro.lease_expires_at)
+
+# ── Triggers de session_counters ──
+# Cubren toda transición (ORM, UPDATEs por conjunto, borrados) sin tocar cada método del repositorio.
+_SUMAR = """
+    INSERT INTO session_counters (session_id, lote_id, estado, total)
+    VALUES (NEW.session_id, NEW.lote_id, NEW.estado, 1)
+    ON CONFLICT (session_id, lote_id, estado) DO UPDATE SET total = total + 1;"""
+_RESTAR = """
+    UPDATE session_counters SET total = total - 1
+    WHERE session_id = OLD.session_id AND lote_id = OLD.lote_id AND estado = OLD.estado;"""
+
+TRIGGERS_CONTADORES = {
+    "trg_registros_contador_insert": f"AFTER INSERT ON registros BEGIN {_SUMAR} END",
+    "trg_registros_contador_update": (
+        "AFTER UPDATE OF estado, session_id, lote_id ON registros "
+        "WHEN OLD.estado IS NOT NEW.estado OR OLD.session_id IS NOT NEW.session_id "
+        f"OR OLD.lote_id IS NOT NEW.lote_id BEGIN {_RESTAR} {_SUMAR} END"
+    ),
+    "trg_registros_contador_delete": f"AFTER DELETE ON registros BEGIN {_RESTAR} END",
+}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def crear_triggers_contadores(target, connection, **kw):
+    """create_all (BD nueva o de tests) deja los triggers; init_db los asegura además en _auto_migrate."""
+    for nombre, cuerpo in TRIGGERS_CONTADORES.items():
+        connection.execute(text(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}"))
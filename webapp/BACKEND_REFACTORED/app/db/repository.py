@@ -1,87 +1,418 @@
 
-from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy import func
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Any, Union
+from sqlalchemy import and_, bindparam, case, delete, func, insert, literal, select, union_all, update
 from app.db.session import SessionFactory
-from app.db.models import Lote, Registro
-from app.core.config import Estado
+from app.db.writer import db_writer
+from app.db.models import CAMPOS_RESULTADO, ContadorEstado, Lote, Registro, campos_resultado
+from app.core.config import (
+    Estado, SubEstado, PIPELINE_MODE, CLAIM_BATCH_SIZE, CLAIM_LEASE_SEGUNDOS, INGEST_CHUNK, EXPORT_PAGINA,
+)
+
+# Tope de ids en un IN (...) para no chocar con el límite de parámetros de SQLite
+_IDS_POR_SENTENCIA = 500
+
+# Columnas de display denormalizadas (ver models.CAMPOS_RESULTADO)
+_COLUMNAS_DISPLAY = [c for campos in CAMPOS_RESULTADO.values() for c in campos]
+
+# Proyección del listado: sin los payload JSON (se piden aparte con obtener_payload)
+_COLUMNAS_LISTADO = [
+    Registro.id, Registro.lote_id, Registro.dni, Registro.estado, Registro.retry_count,
+    Registro.error_msg, Registro.created_at, Registro.updated_at,
+    *(getattr(Registro, c) for c in _COLUMNAS_DISPLAY),
+]
+
+# Columna de sub-estado por fuente (modo fanout)
+COLUMNA_FUENTE = {"sunedu": Registro.estado_sunedu, "minedu": Registro.estado_minedu}
+
+# Worker dueño del lease por fuente (en fanout ambas fuentes pueden tener el registro a la vez)
+COLUMNA_LEASE = {"sunedu": Registro.lease_owner, "minedu": Registro.lease_owner_minedu}
+
+# Estado PROCESANDO_* de cada fuente (modo secuencial)
+PROCESANDO_FUENTE = {"sunedu": Estado.PROCESANDO_SUNEDU, "minedu": Estado.PROCESANDO_MINEDU}
+
+
+def fusionar_subestados(sunedu: str, minedu: str) -> str:
+    """
+    Estado del registro a partir de los sub-estados (modo fanout).
+    Prioridad SUNEDU: un hallazgo MINEDU solo es final cuando SUNEDU ya no encontró.
+    """
+    S = SubEstado
+    if sunedu == S.FOUND:
+        return Estado.FOUND_SUNEDU
+    if sunedu in S.ABIERTOS:
+        if sunedu == S.PROCESANDO:
+            return Estado.PROCESANDO_SUNEDU
+        return Estado.PROCESANDO_MINEDU if minedu == S.PROCESANDO else Estado.PENDIENTE
+    # SUNEDU terminó sin hallazgo (NOT_FOUND / ERROR)
+    if minedu == S.FOUND:
+        return Estado.FOUND_MINEDU
+    if minedu == S.PENDIENTE:
+        return Estado.CHECK_MINEDU
+    if minedu == S.PROCESANDO:
+        return Estado.PROCESANDO_MINEDU
+    if minedu == S.ERROR:
+        return Estado.ERROR_MINEDU
+    return Estado.NOT_FOUND if sunedu == S.NOT_FOUND else Estado.ERROR_SUNEDU
+
+
+def _sin_fuente_en_proceso():
+    """Filtro SQL: ninguna fuente trabaja el registro (su lease ya no protege nada)."""
+    return and_(
+        Registro.estado.notin_(Estado.EN_PROCESO),
+        func.coalesce(Registro.estado_sunedu, "") != SubEstado.PROCESANDO,
+        func.coalesce(Registro.estado_minedu, "") != SubEstado.PROCESANDO,
+    )
+
+
+def _en_proceso_sql(fuente: str):
+    """Filtro SQL: `fuente` tiene el registro en proceso (sub-estado en fanout, estado en secuencial)."""
+    return (COLUMNA_FUENTE[fuente] == SubEstado.PROCESANDO) | and_(
+        COLUMNA_FUENTE[fuente].is_(None), Registro.estado == PROCESANDO_FUENTE[fuente]
+    )
+
+
+def _en_proceso(reg: Registro, fuente: str) -> bool:
+    """`_en_proceso_sql` sobre un objeto ya cargado."""
+    sub = reg.estado_sunedu if fuente == "sunedu" else reg.estado_minedu
+    if sub is not None:
+        return sub == SubEstado.PROCESANDO
+    return reg.estado == PROCESANDO_FUENTE[fuente]
+
+
+def _soltar_lease_si_libre(reg: Registro):
+    """Quita el dueño de cada fuente que ya no procesa el registro, y el vencimiento si ninguna lo hace."""
+    en_proceso = False
+    for fuente, columna in COLUMNA_LEASE.items():
+        if _en_proceso(reg, fuente):
+            en_proceso = True
+        else:
+            setattr(reg, columna.key, None)
+    if not en_proceso:
+        reg.lease_expires_at = None
+
+
+def _retiene(reg: Registro, fuente: str, worker_id: Optional[str]) -> bool:
+    """True si `worker_id` sigue siendo el dueño del lease de `fuente` (sin worker_id no se verifica)."""
+    if worker_id is None:
+        return True
+    return _en_proceso(reg, fuente) and getattr(reg, COLUMNA_LEASE[fuente].key) == worker_id
 
 class DniRepository:
     def __init__(self):
         self.session_factory = SessionFactory
+        self.writer = db_writer
 
-    def crear_lote(self, session_id: str, nombre_archivo: str, dnis: List[str]) -> Lote:
-        """Crea un lote con sus registros. Deduplica DNIs dentro del lote."""
+    def _escribir(self, op: Callable[[Any], Any]) -> Any:
+        """
+        Ejecuta la escritura `op(session)` (no hace commit) y retorna su resultado.
+        Con el DbWriter corriendo sobre esta misma BD va por su cola y comparte
+        commit con las de otros workers; si no (tests, scripts, arranque), corre
+        en una transacción propia. Las excepciones de `op` llegan al llamador.
+        """
+        w = self.writer
+        if w is not None and w.session_factory is self.session_factory and w.running and not w.en_writer:
+            future = w.submit(op)
+            if future is not None:
+                return future.result()
         session = self.session_factory()
         try:
-            # Deduplicar conservando orden
-            vistos = set()
-            dnis_unicos = []
-            for d in dnis:
-                d_clean = d.strip()
-                if d_clean and d_clean not in vistos:
-                    vistos.add(d_clean)
-                    dnis_unicos.append(d_clean)
-
-            lote = Lote(
-                session_id=session_id,
-                nombre_archivo=nombre_archivo,
-                total_dnis=len(dnis_unicos),
-            )
-            session.add(lote)
-            session.flush()  # Para obtener lote.id
-
-            for dni in dnis_unicos:
-                reg = Registro(
-                    lote_id=lote.id,
-                    session_id=session_id,
-                    dni=dni,
-                    estado=Estado.PENDIENTE,
-                )
-                session.add(reg)
-
+            resultado = op(session)
             session.commit()
-            session.refresh(lote)
-            return lote
+            return resultado
         except Exception:
             session.rollback()
             raise
         finally:
             session.close()
 
-    def tomar_siguiente(self, session_id: str, estado_origen: str, estado_procesando: str) -> Optional[Dict[str, Any]]:
+    def crear_lote(self, session_id: str, nombre_archivo: str, dnis: List[str]) -> Lote:
+        """Crea un lote con sus registros. Deduplica DNIs dentro del lote."""
+        # Deduplicar conservando orden
+        vistos = set()
+        dnis_unicos = []
+        for d in dnis:
+            d_clean = d.strip()
+            if d_clean and d_clean not in vistos:
+                vistos.add(d_clean)
+                dnis_unicos.append(d_clean)
+
+        lote_id = self.crear_lote_bulk(session_id, nombre_archivo, dnis_unicos)["lote_id"]
+        session = self.session_factory()
+        try:
+            lote = session.get(Lote, lote_id)
+            session.expunge(lote)
+            return lote
+        finally:
+            session.close()
+
+    def crear_lote_bulk(
+        self,
+        session_id: str,
+        nombre_archivo: str,
+        dnis: Iterable[str],
+        progreso: Optional[Callable[[int], None]] = None,
+        chunk: int = INGEST_CHUNK,
+    ) -> Dict[str, int]:
         """
-        Toma atómicamente el siguiente registro de ESTA SESIÓN en `estado_origen`,
-        lo marca como `estado_procesando` y lo retorna como dict.
+        Crea un lote desde un iterable de DNIs YA deduplicados, sin objetos ORM:
+        INSERT executemany (Core) de `chunk` filas, una escritura (commit) por
+        chunk, así el lock de escritura se suelta entre chunks y la memoria no
+        crece con el archivo. `progreso(insertados)` se llama tras cada chunk.
+        Si algo falla, se borra lo insertado. Retorna {"lote_id", "total"}.
         """
-        session = self.session_factory()
+        def _crear(session):
+            lote = Lote(session_id=session_id, nombre_archivo=nombre_archivo, total_dnis=0)
+            session.add(lote)
+            session.flush()
+            return lote.id
+
+        lote_id = None
         try:
-            reg = (
-                session.query(Registro)
-                .filter(Registro.session_id == session_id)
-                .filter(Registro.estado == estado_origen)
-                .order_by(Registro.id.asc())
-                .with_for_update()
-                .first()
+            lote_id = self._escribir(_crear)
+            sub = SubEstado.PENDIENTE if PIPELINE_MODE == "fanout" else None
+            total = 0
+            pendientes: List[str] = []
+            for dni in dnis:
+                pendientes.append(dni)
+                if len(pendientes) >= chunk:
+                    total += self._insertar_registros(lote_id, session_id, pendientes, sub)
+                    pendientes = []
+                    if progreso:
+                        progreso(total)
+            if pendientes:
+                total += self._insertar_registros(lote_id, session_id, pendientes, sub)
+                if progreso:
+                    progreso(total)
+
+            self._escribir(lambda session: session.query(Lote).filter(Lote.id == lote_id).update(
+                {Lote.total_dnis: total}, synchronize_session=False
+            ))
+            return {"lote_id": lote_id, "total": total}
+        except Exception:
+            if lote_id is not None:
+                self.eliminar_lote(lote_id)
+            raise
+
+    def _insertar_registros(self, lote_id: int, session_id: str, dnis: List[str], sub: Optional[str]) -> int:
+        ahora = datetime.utcnow()
+        filas = [
+            {
+                "lote_id": lote_id, "session_id": session_id, "dni": dni,
+                "estado": Estado.PENDIENTE, "estado_sunedu": sub, "estado_minedu": sub,
+                "retry_count": 0, "created_at": ahora, "updated_at": ahora,
+            }
+            for dni in dnis
+        ]
+        self._escribir(lambda session: session.execute(insert(Registro.__table__), filas))
+        return len(dnis)
+
+    def reclamar(self, session_id: str, estado_origen: str, estado_procesando: str,
+                 worker_id: str, n: int = CLAIM_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Reclama atómicamente hasta `n` registros de ESTA SESIÓN en `estado_origen`
+        (los de menor id), los marca `estado_procesando` con el lease del worker
+        y los retorna como dicts, en orden.
+
+        SQLite ignora `FOR UPDATE`, pero un UPDATE toma el lock de escritura antes
+        de evaluar su subconsulta: con un solo `UPDATE ... RETURNING` dos workers
+        nunca reclaman el mismo registro, sin compare-and-set ni reintentos.
+        """
+        siguientes = (
+            select(Registro.id)
+            .where(Registro.session_id == session_id, Registro.estado == estado_origen)
+            .order_by(Registro.id.asc())
+            .limit(n)
+        )
+        fuente = "sunedu" if estado_procesando == Estado.PROCESANDO_SUNEDU else "minedu"
+        valores = {Registro.estado: estado_procesando, **self._lease(worker_id, fuente)}
+        return self._reclamar(siguientes, valores)
+
+    def reclamar_fuente(self, session_id: str, fuente: str, worker_id: str,
+                        n: int = CLAIM_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Modo fanout: reclama hasta `n` registros cuyo sub-estado de `fuente` está
+        PENDIENTE (mismo UPDATE ... RETURNING que `reclamar`) y recalcula el
+        estado fusionado en la misma transacción.
+        """
+        columna = COLUMNA_FUENTE[fuente]
+        siguientes = (
+            select(Registro.id)
+            .where(Registro.session_id == session_id, columna == SubEstado.PENDIENTE)
+            .order_by(Registro.id.asc())
+            .limit(n)
+        )
+        valores = {columna: SubEstado.PROCESANDO, **self._lease(worker_id, fuente)}
+        return self._reclamar(siguientes, valores, fusionar=True)
+
+    @staticmethod
+    def _lease(worker_id: str, fuente: str) -> dict:
+        ahora = datetime.utcnow()
+        return {
+            COLUMNA_LEASE[fuente]: worker_id,
+            Registro.lease_expires_at: ahora + timedelta(seconds=CLAIM_LEASE_SEGUNDOS),
+            Registro.updated_at: ahora,
+        }
+
+    def _reclamar(self, siguientes, valores: dict, fusionar: bool = False) -> List[Dict[str, Any]]:
+        stmt = (
+            update(Registro)
+            .where(Registro.id.in_(siguientes.scalar_subquery()))
+            .values(valores)
+            .returning(Registro.id, Registro.dni, Registro.lote_id, Registro.retry_count,
+                       Registro.estado_sunedu, Registro.estado_minedu)
+            .execution_options(synchronize_session=False)
+        )
+        def _op(session):
+            filas = sorted(session.execute(stmt).all(), key=lambda f: f.id)
+            if fusionar:
+                self._fusionar_filas(session, filas)
+            return [
+                {"id": f.id, "dni": f.dni, "lote_id": f.lote_id, "retry_count": f.retry_count or 0}
+                for f in filas
+            ]
+
+        # Un error (p.ej. "database is locked") sube al worker: no es lo mismo que una cola vacía
+        return self._escribir(_op)
+
+    @staticmethod
+    def _fusionar_filas(session, filas):
+        """Recalcula `estado` de filas (id, estado_sunedu, estado_minedu): un UPDATE por estado resultante."""
+        por_estado = defaultdict(list)
+        for f in filas:
+            por_estado[fusionar_subestados(f.estado_sunedu, f.estado_minedu)].append(f.id)
+        for estado, ids in por_estado.items():
+            session.query(Registro).filter(Registro.id.in_(ids)).update(
+                {Registro.estado: estado}, synchronize_session=False
             )
-            if reg is None:
-                return None
 
-            reg.estado = estado_procesando
-            reg.updated_at = datetime.utcnow()
-            session.commit()
+    def renovar_lease(self, registro_ids: List[int], fuente: str, worker_id: str) -> List[int]:
+        """
+        Latido del worker: extiende el lease de los registros que `worker_id`
+        aún retiene para `fuente`. Retorna los ids que sigue teniendo; los que
+        faltan los reencoló el reaper (lease vencido), quizá ya los reclamó otro
+        worker, y no deben procesarse.
+        """
+        if not registro_ids:
+            return []
+        stmt = (
+            update(Registro)
+            .where(Registro.id.in_(registro_ids))
+            .where(_en_proceso_sql(fuente), COLUMNA_LEASE[fuente] == worker_id)
+            .values({Registro.lease_expires_at: datetime.utcnow() + timedelta(seconds=CLAIM_LEASE_SEGUNDOS)})
+            .returning(Registro.id)
+            .execution_options(synchronize_session=False)
+        )
+        return self._escribir(lambda session: list(session.execute(stmt).scalars()))
+
+    def tomar_siguiente(self, session_id: str, estado_origen: str, estado_procesando: str,
+                        worker_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Reclama un solo registro (`reclamar` con n=1). Retorna None si no hay."""
+        lote = self.reclamar(session_id, estado_origen, estado_procesando, worker_id, n=1)
+        return lote[0] if lote else None
+
+    def tomar_siguiente_fuente(self, session_id: str, fuente: str,
+                               worker_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Modo fanout: reclama un solo registro de `fuente` (`reclamar_fuente` con n=1)."""
+        lote = self.reclamar_fuente(session_id, fuente, worker_id, n=1)
+        return lote[0] if lote else None
+
+    def registrar_subresultado(
+        self,
+        registro_id: int,
+        fuente: str,
+        sub_estado: str,
+        payload: Optional[dict] = None,
+        error_msg: Optional[str] = None,
+        worker_id: Optional[str] = None,
+    ) -> Union[Dict[str, Any], None, bool]:
+        """
+        Modo fanout: guarda el resultado de una fuente y fusiona el estado.
+        Retorna {"estado", "payload_sunedu", "payload_minedu"} si el registro
+        quedó en un estado final, o None si aún espera a la otra fuente. Con
+        `worker_id`, solo escribe si ese worker sigue dueño del lease de
+        `fuente`; si no (el reaper lo reencoló), no toca nada y retorna False.
+        """
+        columna = COLUMNA_FUENTE[fuente]
+        valores = {columna: sub_estado, COLUMNA_LEASE[fuente]: None, Registro.updated_at: datetime.utcnow()}
+        if payload is not None:
+            campo = Registro.payload_sunedu if fuente == "sunedu" else Registro.payload_minedu
+            valores[campo] = json.dumps(payload, ensure_ascii=False)
+            valores.update({getattr(Registro, c): v for c, v in campos_resultado(fuente, payload).items()})
+        if error_msg is not None:
+            valores[Registro.error_msg] = error_msg
+
+        def _op(session):
+            # Escribir primero: toma el lock de escritura antes de leer la otra fuente
+            filtro = session.query(Registro).filter(Registro.id == registro_id)
+            if worker_id is not None:
+                filtro = filtro.filter(columna == SubEstado.PROCESANDO, COLUMNA_LEASE[fuente] == worker_id)
+            if not filtro.update(valores, synchronize_session=False):
+                return False
+            estado = self._fusionar(session, registro_id)
+            if sub_estado == SubEstado.FOUND and fuente == "sunedu":
+                # MINEDU ya no hace falta si aún no empezó
+                session.query(Registro).filter(Registro.id == registro_id).filter(
+                    Registro.estado_minedu == SubEstado.PENDIENTE
+                ).update({Registro.estado_minedu: SubEstado.OMITIDO}, synchronize_session=False)
+            session.query(Registro).filter(Registro.id == registro_id).filter(_sin_fuente_en_proceso()).update(
+                {Registro.lease_expires_at: None}, synchronize_session=False
+            )
 
+            if estado not in Estado.TERMINALES:
+                return None
+            fila = (
+                session.query(Registro.payload_sunedu, Registro.payload_minedu)
+                .filter(Registro.id == registro_id)
+                .first()
+            )
             return {
-                "id": reg.id,
-                "dni": reg.dni,
-                "lote_id": reg.lote_id,
-                "retry_count": reg.retry_count or 0,
+                "estado": estado,
+                "payload_sunedu": json.loads(fila.payload_sunedu) if fila.payload_sunedu else None,
+                "payload_minedu": json.loads(fila.payload_minedu) if fila.payload_minedu else None,
             }
-        except Exception:
-            session.rollback()
+
+        return self._escribir(_op)
+
+    @staticmethod
+    def _fusionar(session, registro_id: int) -> Optional[str]:
+        fila = (
+            session.query(Registro.estado_sunedu, Registro.estado_minedu)
+            .filter(Registro.id == registro_id)
+            .first()
+        )
+        if fila is None:
             return None
-        finally:
-            session.close()
+        estado = fusionar_subestados(fila.estado_sunedu, fila.estado_minedu)
+        session.query(Registro).filter(Registro.id == registro_id).update(
+            {Registro.estado: estado}, synchronize_session=False
+        )
+        return estado
+
+    def preparar_fanout(self, session_id: str) -> int:
+        """
+        Inicializa sub-estados de registros creados en modo secuencial para que
+        los workers fanout los tomen. Retorna cuántos registros se prepararon.
+        """
+        def _op(session):
+            base = (
+                session.query(Registro)
+                .filter(Registro.session_id == session_id)
+                .filter(Registro.estado_sunedu.is_(None))
+            )
+            n = base.filter(Registro.estado == Estado.PENDIENTE).update(
+                {Registro.estado_sunedu: SubEstado.PENDIENTE, Registro.estado_minedu: SubEstado.PENDIENTE},
+                synchronize_session=False,
+            )
+            n += base.filter(Registro.estado == Estado.CHECK_MINEDU).update(
+                {Registro.estado_sunedu: SubEstado.NOT_FOUND, Registro.estado_minedu: SubEstado.PENDIENTE},
+                synchronize_session=False,
+            )
+            return n
+
+        return self._escribir(_op)
 
     def actualizar_resultado(
         self,
@@ -90,13 +421,19 @@ class DniRepository:
         payload_sunedu: Optional[dict] = None,
         payload_minedu: Optional[dict] = None,
         error_msg: Optional[str] = None,
-    ):
-        """Actualiza el estado y payload de un registro."""
-        session = self.session_factory()
-        try:
+        fuente: Optional[str] = None,
+        worker_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Actualiza el estado y payload de un registro. Con `worker_id` (y la
+        `fuente` que lo reclamó) solo escribe si ese worker sigue dueño del
+        lease: un resultado tardío de un registro ya reencolado se descarta.
+        Retorna si se escribió.
+        """
+        def _op(session):
             reg = session.query(Registro).filter(Registro.id == registro_id).first()
-            if reg is None:
-                return
+            if reg is None or not _retiene(reg, fuente, worker_id):
+                return False
 
             reg.estado = nuevo_estado
             reg.updated_at = datetime.utcnow()
@@ -107,88 +444,319 @@ class DniRepository:
                 reg.set_payload_minedu(payload_minedu)
             if error_msg is not None:
                 reg.error_msg = error_msg
+            if nuevo_estado in Estado.TERMINALES:
+                # Modo fanout: un estado final cierra las fuentes que seguían abiertas
+                if reg.estado_sunedu in SubEstado.ABIERTOS:
+                    reg.estado_sunedu = SubEstado.OMITIDO
+                if reg.estado_minedu in SubEstado.ABIERTOS:
+                    reg.estado_minedu = SubEstado.OMITIDO
+            _soltar_lease_si_libre(reg)
+            return True
 
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+        return self._escribir(_op)
+
+    def devolver(self, registro_id: int, fuente: str, worker_id: Optional[str] = None):
+        """
+        Devuelve a la cola un registro reclamado por `fuente` sin consultarlo
+        (p.ej. el circuit breaker abrió): vuelve al estado previo al reclamo.
+        """
+        self.devolver_lote([registro_id], fuente, worker_id)
+
+    def devolver_lote(self, registro_ids: List[int], fuente: str, worker_id: Optional[str] = None) -> int:
+        """
+        `devolver` para varios registros en una transacción (el resto de la cola
+        local de un worker que se detiene). Solo toca los que siguen reclamados
+        por `fuente` (y, con `worker_id`, por ese worker); retorna cuántos
+        volvieron a la cola.
+        """
+        if not registro_ids:
+            return 0
+        columna = "estado_sunedu" if fuente == "sunedu" else "estado_minedu"
+        procesando = Estado.PROCESANDO_SUNEDU if fuente == "sunedu" else Estado.PROCESANDO_MINEDU
+
+        def _op(session):
+            devueltos = 0
+            for reg in session.query(Registro).filter(Registro.id.in_(registro_ids)):
+                if worker_id is not None and getattr(reg, COLUMNA_LEASE[fuente].key) != worker_id:
+                    continue
+                if getattr(reg, columna) == SubEstado.PROCESANDO:
+                    setattr(reg, columna, SubEstado.PENDIENTE)
+                    reg.estado = fusionar_subestados(reg.estado_sunedu, reg.estado_minedu)
+                elif reg.estado == procesando:
+                    reg.estado = Estado.PENDIENTE if fuente == "sunedu" else Estado.CHECK_MINEDU
+                else:
+                    continue
+                _soltar_lease_si_libre(reg)
+                reg.updated_at = datetime.utcnow()
+                devueltos += 1
+            return devueltos
+
+        return self._escribir(_op)
 
-    def obtener_conteos(self, session_id: str) -> Dict[str, int]:
-        """Retorna conteo de registros por estado para esta sesión."""
+    def obtener_conteos(self, session_id: str, lote_id: Optional[int] = None) -> Dict[str, int]:
+        """Retorna conteo de registros por estado para esta sesión (desde session_counters)."""
         session = self.session_factory()
         try:
-            rows = (
-                session.query(Registro.estado, func.count(Registro.id))
-                .filter(Registro.session_id == session_id)
-                .group_by(Registro.estado)
-                .all()
+            q = (
+                session.query(ContadorEstado.estado, func.sum(ContadorEstado.total))
+                .filter(ContadorEstado.session_id == session_id)
             )
-            return {estado: count for estado, count in rows}
+            if lote_id:
+                q = q.filter(ContadorEstado.lote_id == lote_id)
+            rows = q.group_by(ContadorEstado.estado).all()
+            return {estado: count for estado, count in rows if count}
         finally:
             session.close()
 
     def obtener_total(self, session_id: str) -> int:
+        return sum(self.obtener_conteos(session_id).values())
+
+    @staticmethod
+    def _conteos_reales(session_id: Optional[str]):
+        """SELECT (session_id, lote_id, estado, n) agrupado sobre registros."""
+        q = select(Registro.session_id, Registro.lote_id, Registro.estado, func.count(Registro.id).label("n"))
+        if session_id:
+            q = q.where(Registro.session_id == session_id)
+        return q.group_by(Registro.session_id, Registro.lote_id, Registro.estado)
+
+    def verificar_contadores(self, session_id: Optional[str] = None, reparar: bool = False) -> Dict[str, Any]:
+        """
+        Compara session_counters con un GROUP BY sobre registros (de una sesión o
+        de todas) en una sola sentencia, así ambos lados salen del mismo snapshot
+        aunque haya workers escribiendo. Con `reparar` los reconstruye si difieren.
+        """
+        reales = self._conteos_reales(session_id).subquery()
+        contadores = select(ContadorEstado.session_id, ContadorEstado.lote_id, ContadorEstado.estado,
+                            ContadorEstado.total.label("contador"), literal(0).label("real"))
+        if session_id:
+            contadores = contadores.where(ContadorEstado.session_id == session_id)
+        ambos = union_all(
+            contadores,
+            select(reales.c.session_id, reales.c.lote_id, reales.c.estado, literal(0), reales.c.n),
+        ).subquery()
+        stmt = (
+            select(ambos.c.session_id, ambos.c.lote_id, ambos.c.estado,
+                   func.sum(ambos.c.contador).label("contador"), func.sum(ambos.c.real).label("real"))
+            .group_by(ambos.c.session_id, ambos.c.lote_id, ambos.c.estado)
+            .having(func.sum(ambos.c.contador) != func.sum(ambos.c.real))
+            .order_by(ambos.c.session_id, ambos.c.lote_id, ambos.c.estado)
+        )
         session = self.session_factory()
         try:
-            return session.query(Registro).filter(Registro.session_id == session_id).count()
+            diferencias = [dict(f._mapping) for f in session.execute(stmt)]
         finally:
             session.close()
 
+        reparado = bool(diferencias and reparar)
+        if reparado:
+            self.reconstruir_contadores(session_id)
+        return {"consistente": not diferencias, "diferencias": diferencias, "reparado": reparado}
+
+    def reconstruir_contadores(self, session_id: Optional[str] = None) -> int:
+        """
+        Recalcula session_counters desde registros (de una sesión o de todas) en
+        una transacción: el DELETE toma el lock de escritura antes del recuento,
+        así ninguna transición se cuela entre ambos. Retorna filas de contador.
+        """
+        def _op(session):
+            borrar = delete(ContadorEstado)
+            if session_id:
+                borrar = borrar.where(ContadorEstado.session_id == session_id)
+            session.execute(borrar)
+            filas = session.execute(
+                insert(ContadorEstado.__table__).from_select(
+                    ["session_id", "lote_id", "estado", "total"], self._conteos_reales(session_id)
+                )
+            ).rowcount
+            return filas
+
+        return self._escribir(_op)
+
+    @staticmethod
+    def _filtros_registros(
+        session_id: str,
+        estado: Union[str, List[str], None] = None,
+        lote_id: Optional[int] = None,
+        dni_prefix: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+    ) -> list:
+        filtros = [Registro.session_id == session_id]
+        if isinstance(estado, str):
+            filtros.append(Registro.estado == estado)
+        elif estado:
+            filtros.append(Registro.estado.in_(estado))
+        if lote_id:
+            filtros.append(Registro.lote_id == lote_id)
+        if dni_prefix:
+            # Rango en vez de LIKE: usa el índice de dni
+            fin = dni_prefix[:-1] + chr(ord(dni_prefix[-1]) + 1)
+            filtros.extend([Registro.dni >= dni_prefix, Registro.dni < fin])
+        if updated_since is not None:
+            if updated_since.tzinfo is not None:
+                updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+            filtros.append(Registro.updated_at >= updated_since)
+        return filtros
+
     def obtener_registros(
         self,
         session_id: str,
-        estado: Optional[str] = None,
+        estado: Union[str, List[str], None] = None,
         lote_id: Optional[int] = None,
         limit: int = 500,
-        offset: int = 0,
+        after_id: Optional[int] = None,
+        dni_prefix: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        Registros de la sesión en orden de id, desde `after_id` (exclusivo).
+        Paginación por keyset: `WHERE id > after_id ORDER BY id LIMIT n` recorre el
+        índice desde el cursor, así cada página cuesta lo mismo sin importar su
+        profundidad (OFFSET leía y descartaba todas las filas anteriores).
+        """
         session = self.session_factory()
         try:
-            q = session.query(Registro).filter(Registro.session_id == session_id)
-            if estado:
-                q = q.filter(Registro.estado == estado)
-            if lote_id:
-                q = q.filter(Registro.lote_id == lote_id)
-            q = q.order_by(Registro.id.asc()).offset(offset).limit(limit)
-
-            resultados = []
-            for r in q.all():
-                d = {
-                    "id": r.id,
-                    "lote_id": r.lote_id,
-                    "dni": r.dni,
-                    "estado": r.estado,
-                    "retry_count": r.retry_count or 0,
-                    "error_msg": r.error_msg,
-                    "created_at": r.created_at.isoformat() if r.created_at else None,
-                    "updated_at": r.updated_at.isoformat() if r.updated_at else None,
-                }
-                ps = r.get_payload_sunedu()
-                if ps:
-                    if isinstance(ps, list) and len(ps) > 0:
-                        ps = ps[0]
-                    if isinstance(ps, dict):
-                        d["sunedu_nombres"] = ps.get("nombres", "")
-                        d["sunedu_grado"] = ps.get("grado_o_titulo", "")
-                        d["sunedu_institucion"] = ps.get("institucion", "")
-                        d["sunedu_fecha_diploma"] = ps.get("fecha_diploma", "")
-
-                pm = r.get_payload_minedu()
-                if pm:
-                    if isinstance(pm, list) and len(pm) > 0:
-                        pm = pm[0]
-                    if isinstance(pm, dict):
-                        d["minedu_nombres"] = pm.get("nombre_completo", "")
-                        d["minedu_titulo"] = pm.get("titulo", "")
-                        d["minedu_institucion"] = pm.get("institucion", "")
-                        d["minedu_fecha"] = pm.get("fecha_expedicion", "")
-                resultados.append(d)
-            return resultados
+            q = session.query(*_COLUMNAS_LISTADO).filter(
+                *self._filtros_registros(session_id, estado, lote_id, dni_prefix, updated_since)
+            )
+            if after_id:
+                q = q.filter(Registro.id > after_id)
+            q = q.order_by(Registro.id.asc()).limit(limit)
+            return [self._registro_dict(r) for r in q.all()]
+        finally:
+            session.close()
+
+    def obtener_pagina(
+        self,
+        session_id: str,
+        estado: Union[str, List[str], None] = None,
+        lote_id: Optional[int] = None,
+        limit: int = 200,
+        after_id: Optional[int] = None,
+        dni_prefix: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Una página de `obtener_registros` con metadatos:
+        {"items", "next_cursor" (after_id de la página siguiente o None), "total"}.
+        `total` sale de session_counters si solo se filtra por estado/lote; con
+        dni_prefix o updated_since es un COUNT y solo se calcula en la primera
+        página (en las siguientes es None: el cliente conserva el de la primera).
+        """
+        items = self.obtener_registros(session_id, estado, lote_id, limit + 1, after_id, dni_prefix, updated_since)
+        next_cursor = items[limit - 1]["id"] if len(items) > limit else None
+
+        if not dni_prefix and updated_since is None:
+            conteos = self.obtener_conteos(session_id, lote_id)
+            if estado is None:
+                total = sum(conteos.values())
+            else:
+                total = sum(conteos.get(e, 0) for e in ([estado] if isinstance(estado, str) else estado))
+        elif after_id is None:
+            session = self.session_factory()
+            try:
+                total = session.query(func.count(Registro.id)).filter(
+                    *self._filtros_registros(session_id, estado, lote_id, dni_prefix, updated_since)
+                ).scalar()
+            finally:
+                session.close()
+        else:
+            total = None
+        return {"items": items[:limit], "next_cursor": next_cursor, "total": total}
+
+    def iter_registros(self, session_id: str, pagina: int = EXPORT_PAGINA, **filtros) -> Iterator[Dict[str, Any]]:
+        """Todos los registros que cumplen `filtros`, leídos por páginas keyset de `pagina` filas."""
+        after_id = None
+        while True:
+            items = self.obtener_registros(session_id, limit=pagina, after_id=after_id, **filtros)
+            yield from items
+            if len(items) < pagina:
+                return
+            after_id = items[-1]["id"]
+
+    @staticmethod
+    def _registro_dict(r) -> Dict[str, Any]:
+        """Fila de _COLUMNAS_LISTADO → dict (los campos de display solo si la fuente tuvo datos)."""
+        d = {
+            "id": r.id,
+            "lote_id": r.lote_id,
+            "dni": r.dni,
+            "estado": r.estado,
+            "retry_count": r.retry_count or 0,
+            "error_msg": r.error_msg,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+            "updated_at": r.updated_at.isoformat() if r.updated_at else None,
+        }
+        for columna in _COLUMNAS_DISPLAY:
+            valor = getattr(r, columna)
+            if valor is not None:
+                d[columna] = valor
+        return d
+
+    def obtener_payload(self, session_id: str, registro_id: int) -> Optional[Dict[str, Any]]:
+        """Payload JSON completo de un registro de la sesión (bajo demanda, fuera del listado)."""
+        session = self.session_factory()
+        try:
+            reg = (
+                session.query(Registro)
+                .filter(Registro.session_id == session_id, Registro.id == registro_id)
+                .first()
+            )
+            if reg is None:
+                return None
+            return {
+                "id": reg.id,
+                "dni": reg.dni,
+                "estado": reg.estado,
+                "payload_sunedu": reg.get_payload_sunedu(),
+                "payload_minedu": reg.get_payload_minedu(),
+            }
         finally:
             session.close()
 
+    def rellenar_campos_resultado(self, lote: int = _IDS_POR_SENTENCIA) -> int:
+        """
+        Migración: copia los campos de display desde los payload JSON de registros
+        guardados antes de existir las columnas. Recorre por id en lotes de `lote`
+        filas con un UPDATE executemany por lote, sin tocar updated_at. Retorna
+        cuántos registros se rellenaron.
+        """
+        t = Registro.__table__
+        stmt = (
+            update(t)
+            .where(t.c.id == bindparam("b_id"))
+            .values({**{c: bindparam(f"b_{c}") for c in _COLUMNAS_DISPLAY}, "updated_at": bindparam("b_updated_at")})
+        )
+
+        def _op(session, after_id):
+            filas = (
+                session.query(Registro.id, Registro.payload_sunedu, Registro.payload_minedu, Registro.updated_at)
+                .filter(Registro.id > after_id)
+                .filter((Registro.payload_sunedu.isnot(None)) | (Registro.payload_minedu.isnot(None)))
+                .order_by(Registro.id.asc())
+                .limit(lote)
+                .all()
+            )
+            if not filas:
+                return 0, None
+            params = []
+            for f in filas:
+                campos = {
+                    **campos_resultado("sunedu", json.loads(f.payload_sunedu) if f.payload_sunedu else None),
+                    **campos_resultado("minedu", json.loads(f.payload_minedu) if f.payload_minedu else None),
+                }
+                params.append({"b_id": f.id, "b_updated_at": f.updated_at,
+                               **{f"b_{c}": v for c, v in campos.items()}})
+            session.execute(stmt, params)
+            return len(params), filas[-1].id
+
+        # Una escritura (commit) por lote
+        rellenados, after_id = 0, 0
+        while True:
+            n, after_id = self._escribir(lambda session, desde=after_id: _op(session, desde))
+            if after_id is None:
+                return rellenados
+            rellenados += n
+
     def obtener_lotes(self, session_id: str) -> List[Dict[str, Any]]:
         session = self.session_factory()
         try:
@@ -212,97 +780,134 @@ class DniRepository:
 
     def reintentar_no_encontrados(self, session_id: str) -> Dict[str, Any]:
         """Re-encola NOT_FOUND y ERROR_* de esta sesión."""
-        session = self.session_factory()
-        try:
-            estados_retry = [Estado.NOT_FOUND, Estado.ERROR_SUNEDU, Estado.ERROR_MINEDU]
+        def _op(session):
             registros = (
                 session.query(Registro)
                 .filter(Registro.session_id == session_id)
-                .filter(Registro.estado.in_(estados_retry))
+                .filter(Registro.estado.in_(Estado.REINTENTABLES))
                 .all()
             )
             reencolados = 0
+            dnis_no_encontrados = []
             for reg in registros:
+                if reg.estado == Estado.NOT_FOUND:
+                    dnis_no_encontrados.append(reg.dni)
                 reg.estado = Estado.PENDIENTE
+                if reg.estado_sunedu is not None:
+                    reg.estado_sunedu = SubEstado.PENDIENTE
+                    reg.estado_minedu = SubEstado.PENDIENTE
                 reg.retry_count = (reg.retry_count or 0) + 1
                 reg.error_msg = None
                 reg.payload_sunedu = None
                 reg.payload_minedu = None
+                for columna in _COLUMNAS_DISPLAY:
+                    setattr(reg, columna, None)
                 reg.updated_at = datetime.utcnow()
                 reencolados += 1
-            session.commit()
-            return {"reencolados": reencolados}
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+            return {"reencolados": reencolados, "dnis_no_encontrados": dnis_no_encontrados}
+
+        return self._escribir(_op)
 
     def hay_trabajo_pendiente(self, session_id: str) -> bool:
-        session = self.session_factory()
-        try:
-            estados_activos = [
-                Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU,
-                Estado.CHECK_MINEDU, Estado.PROCESANDO_MINEDU,
-            ]
-            count = (
-                session.query(Registro)
-                .filter(Registro.session_id == session_id)
-                .filter(Registro.estado.in_(estados_activos))
-                .count()
-            )
-            return count > 0
-        finally:
-            session.close()
+        conteos = self.obtener_conteos(session_id)
+        return any(conteos.get(e, 0) for e in Estado.ACTIVOS)
 
     def contar_retryables(self, session_id: str) -> int:
-        session = self.session_factory()
-        try:
-            estados_retry = [Estado.NOT_FOUND, Estado.ERROR_SUNEDU, Estado.ERROR_MINEDU]
-            return (
-                session.query(Registro)
-                .filter(Registro.session_id == session_id)
-                .filter(Registro.estado.in_(estados_retry))
-                .count()
-            )
-        finally:
-            session.close()
+        conteos = self.obtener_conteos(session_id)
+        return sum(conteos.get(e, 0) for e in Estado.REINTENTABLES)
 
     def recuperar_procesando(self, session_id: Optional[str] = None) -> Dict[str, int]:
-        """Recupera registros atrapados en estados PROCESANDO_*.
-        Si session_id es None, recupera de TODAS las sesiones (para startup).
+        """Reencola TODO registro en PROCESANDO_* (con o sin lease vigente).
+        Solo es seguro sin workers vivos: al arrancar el servidor (session_id=None →
+        todas las sesiones) o con `/recover` manual. En marcha lo hace el reaper.
         """
-        session = self.session_factory()
-        try:
-            q_sunedu = session.query(Registro).filter(Registro.estado == Estado.PROCESANDO_SUNEDU)
-            q_minedu = session.query(Registro).filter(Registro.estado == Estado.PROCESANDO_MINEDU)
+        filtros = [Registro.session_id == session_id] if session_id else []
+        return self._reencolar(filtros)
 
-            if session_id:
-                q_sunedu = q_sunedu.filter(Registro.session_id == session_id)
-                q_minedu = q_minedu.filter(Registro.session_id == session_id)
+    def recuperar_leases_vencidos(self, session_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Reencola solo los registros cuyo lease venció (su worker murió o se colgó).
+        Usa el índice de lease_expires_at: el costo es O(vencidos), no un scan de
+        PROCESANDO_*, y nunca toca lo que un worker vivo sigue renovando.
+        """
+        filtros = [Registro.lease_expires_at < datetime.utcnow()]
+        if session_id:
+            filtros.append(Registro.session_id == session_id)
+        return self._reencolar(filtros)
 
-            sunedu = q_sunedu.all()
-            for r in sunedu:
-                r.estado = Estado.PENDIENTE
-                r.updated_at = datetime.utcnow()
+    def _reencolar(self, filtros: list) -> Dict[str, int]:
+        """UPDATEs por conjunto: PROCESANDO_* vuelve al estado previo al reclamo, sin lease."""
+        ahora = datetime.utcnow()
+        sin_lease = {Registro.lease_expires_at: None, Registro.updated_at: ahora}
+        def _op(session):
+            def base():
+                return session.query(Registro).filter(*filtros)
 
-            minedu = q_minedu.all()
-            for r in minedu:
-                r.estado = Estado.CHECK_MINEDU
-                r.updated_at = datetime.utcnow()
+            # Modo secuencial (sin sub-estados)
+            sunedu = base().filter(Registro.estado == Estado.PROCESANDO_SUNEDU, Registro.estado_sunedu.is_(None)).update(
+                {Registro.estado: Estado.PENDIENTE, Registro.lease_owner: None, **sin_lease}, synchronize_session=False
+            )
+            minedu = base().filter(Registro.estado == Estado.PROCESANDO_MINEDU, Registro.estado_minedu.is_(None)).update(
+                {Registro.estado: Estado.CHECK_MINEDU, Registro.lease_owner_minedu: None, **sin_lease},
+                synchronize_session=False
+            )
 
-            session.commit()
-            return {"sunedu_recuperados": len(sunedu), "minedu_recuperados": len(minedu)}
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+            # Modo fanout: la fuente que quedó a medias vuelve a PENDIENTE
+            # (o se omite si el registro ya tiene estado final) y se fusiona el estado.
+            # El vencimiento es compartido: se quita al final, si no quedó otra fuente en
+            # proceso (quitarlo antes dejaría fuera del filtro a la segunda fuente)
+            ids = set()
+            for fuente, columna in COLUMNA_FUENTE.items():
+                stmt = (
+                    update(Registro)
+                    .where(*filtros, columna == SubEstado.PROCESANDO)
+                    .values({
+                        columna: case(
+                            (Registro.estado.in_(Estado.TERMINALES), SubEstado.OMITIDO),
+                            else_=SubEstado.PENDIENTE,
+                        ),
+                        COLUMNA_LEASE[fuente]: None,
+                        Registro.updated_at: ahora,
+                    })
+                    .returning(Registro.id)
+                    .execution_options(synchronize_session=False)
+                )
+                recuperados = list(session.execute(stmt).scalars())
+                ids.update(recuperados)
+                if fuente == "sunedu":
+                    sunedu += len(recuperados)
+                else:
+                    minedu += len(recuperados)
+            ids = sorted(ids)
+            for i in range(0, len(ids), _IDS_POR_SENTENCIA):
+                filas = (
+                    session.query(Registro.id, Registro.estado_sunedu, Registro.estado_minedu)
+                    .filter(Registro.id.in_(ids[i:i + _IDS_POR_SENTENCIA]))
+                    .filter(Registro.estado.notin_(Estado.TERMINALES))
+                    .all()
+                )
+                self._fusionar_filas(session, filas)
+                session.query(Registro).filter(Registro.id.in_(ids[i:i + _IDS_POR_SENTENCIA])).filter(
+                    _sin_fuente_en_proceso()
+                ).update({Registro.lease_expires_at: None}, synchronize_session=False)
+
+            return {"sunedu_recuperados": sunedu, "minedu_recuperados": minedu}
+
+        return self._escribir(_op)
+
+    def eliminar_lote(self, lote_id: int):
+        """Borra un lote y sus registros (p.ej. un lote que quedó vacío)."""
+        def _op(session):
+            session.query(Registro).filter(Registro.lote_id == lote_id).delete(synchronize_session=False)
+            session.query(Lote).filter(Lote.id == lote_id).delete(synchronize_session=False)
+            # Los triggers ya los dejaron en 0
+            session.query(ContadorEstado).filter(ContadorEstado.lote_id == lote_id).delete(synchronize_session=False)
+
+        return self._escribir(_op)
 
     def limpiar_todo(self, session_id: str) -> Dict[str, int]:
         """Limpia solo los datos de esta sesión."""
-        session = self.session_factory()
-        try:
+        def _op(session):
             registros_eliminados = (
                 session.query(Registro)
                 .filter(Registro.session_id == session_id)
@@ -313,21 +918,17 @@ class DniRepository:
                 .filter(Lote.session_id == session_id)
                 .delete()
             )
-            session.commit()
+            session.query(ContadorEstado).filter(ContadorEstado.session_id == session_id).delete()
             return {
                 "registros_eliminados": registros_eliminados,
                 "lotes_eliminados": lotes_eliminados,
             }
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+
+        return self._escribir(_op)
 
     def migrate_legacy_records(self):
         """Asigna session_id='legacy' a registros existentes sin session_id."""
-        session = self.session_factory()
-        try:
+        def _op(session):
             # Registros sin session_id (o vacío)
             regs = session.query(Registro).filter(
                 (Registro.session_id == None) | (Registro.session_id == "")
@@ -341,10 +942,6 @@ class DniRepository:
             for l in lotes:
                 l.session_id = "legacy"
 
-            session.commit()
             return {"registros_migrados": len(regs), "lotes_migrados": len(lotes)}
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+
+        return self._escribir(_op)
@@ -1,7 +1,9 @@
 
+import time
 from sqlalchemy import create_engine, event, text, inspect
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
-from app.core.config import DATABASE_URL
+from app.core.config import DATABASE_URL, DB_ESCRITURA_LENTA
+from app.core.metrics import metrics
 
 # Engine con soporte para SQLite WAL (Write-Ahead Logging) para mejor concurrencia
 engine = create_engine(
@@ -18,6 +20,29 @@ def _set_sqlite_pragma(dbapi_conn, connection_record):
     cursor.execute("PRAGMA busy_timeout=5000")
     cursor.close()
 
+
+# Esperas por el lock de escritura: SQLite las absorbe dentro de busy_timeout, así que se
+# miden como duración de cada escritura (el lock se pide en el primer INSERT/UPDATE/DELETE)
+@event.listens_for(engine, "before_cursor_execute")
+def _inicio_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info["t_sentencia"] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _fin_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip()[:6].upper() not in ("INSERT", "UPDATE", "DELETE"):
+        return
+    dt = time.perf_counter() - conn.info.get("t_sentencia", time.perf_counter())
+    metrics.observe("db.escritura_s", dt)
+    if dt >= DB_ESCRITURA_LENTA:
+        metrics.incr("db.escrituras_lentas")
+
+
+@event.listens_for(engine, "handle_error")
+def _error_sentencia(ctx):
+    if "database is locked" in str(ctx.original_exception):
+        metrics.incr("db.bloqueos")
+
 SessionFactory = sessionmaker(bind=engine)
 ScopedSession = scoped_session(SessionFactory)
 
@@ -25,14 +50,53 @@ Base = declarative_base()
 
 def init_db():
     from app.db import models
+    inspector = inspect(engine)
+    tablas = inspector.get_table_names()
+    sin_contadores = "session_counters" not in tablas
+    sin_campos_resultado = "registros" in tablas and "sunedu_nombres" not in [
+        c["name"] for c in inspector.get_columns("registros")
+    ]
     Base.metadata.create_all(engine)
     
     # Auto-migración: agregar session_id si no existe en tablas existentes
     _auto_migrate()
 
+    from app.db.repository import DniRepository
+    if sin_contadores:
+        # BD anterior a session_counters: se cargan una vez desde registros (luego los mantienen los triggers)
+        DniRepository().reconstruir_contadores()
+    if sin_campos_resultado:
+        # Registros anteriores a las columnas de display: se copian una vez desde los payload JSON
+        DniRepository().rellenar_campos_resultado()
+
+
+# Columnas agregadas después de la primera versión: (tabla, columna, DDL)
+_COLUMNAS_NUEVAS = [
+    ("registros", "estado_sunedu", "VARCHAR(20)"),
+    ("registros", "estado_minedu", "VARCHAR(20)"),
+    ("registros", "lease_owner", "VARCHAR(64)"),
+    ("registros", "lease_expires_at", "DATETIME"),
+    ("registros", "lease_owner_minedu", "VARCHAR(64)"),
+    ("registros", "sunedu_nombres", "VARCHAR(255)"),
+    ("registros", "sunedu_grado", "VARCHAR(255)"),
+    ("registros", "sunedu_institucion", "VARCHAR(255)"),
+    ("registros", "sunedu_fecha_diploma", "VARCHAR(30)"),
+    ("registros", "minedu_nombres", "VARCHAR(255)"),
+    ("registros", "minedu_titulo", "VARCHAR(255)"),
+    ("registros", "minedu_institucion", "VARCHAR(255)"),
+    ("registros", "minedu_fecha", "VARCHAR(30)"),
+]
+
+# Índices de columnas nuevas (create_all no los agrega a tablas existentes): (nombre, tabla, columnas)
+_INDICES_NUEVOS = [
+    ("ix_registros_lease_expires", "registros", "lease_expires_at"),
+    ("ix_registros_lote_id", "registros", "lote_id, id"),
+]
+
 
 def _auto_migrate():
-    """Agrega columnas session_id a tablas existentes si faltan."""
+    """Agrega columnas, índices y triggers faltantes (session_id y posteriores) a tablas existentes."""
+    from app.db.models import TRIGGERS_CONTADORES
     inspector = inspect(engine)
     
     for table_name in ["registros", "lotes"]:
@@ -48,3 +112,18 @@ def _auto_migrate():
                     ))
                     conn.commit()
 
+    for table_name, column, ddl in _COLUMNAS_NUEVAS:
+        if table_name in inspector.get_table_names():
+            columns = [c["name"] for c in inspector.get_columns(table_name)]
+            if column not in columns:
+                with engine.connect() as conn:
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column} {ddl}"))
+                    conn.commit()
+
+    with engine.connect() as conn:
+        for nombre, table_name, columnas in _INDICES_NUEVOS:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {table_name} ({columnas})"))
+        # Triggers de session_counters: explícitos, sin depender de que create_all dispare after_create
+        for nombre, cuerpo in TRIGGERS_CONTADORES.items():
+            conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}"))
+        conn.commit()
@@ -0,0 +1,194 @@
+"""
+DbWriter — Un solo thread escribe en SQLite, con group commit.
+
+Cada worker abría su propia transacción de escritura por cambio de estado
+(reclamo, resultado, error) y todas competían por el único lock de escritura
+de SQLite dentro de busy_timeout. Ahora el repositorio encola cada escritura
+como una operación `op(session) -> resultado` (sin commit) y este thread las
+ejecuta por lotes: lo que haya en la cola (hasta DB_WRITER_MAX_LOTE), más lo
+que llegue en DB_WRITER_ESPERA_MS, en UNA transacción con un solo commit.
+Quien encola recibe un Future con su resultado o su excepción.
+
+Si una operación falla, el lote se deshace y se re-ejecuta de a una (cada una
+con su commit): el error le llega solo a quien lo causó.
+"""
+
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+from app.core.config import DB_WRITER_MAX_LOTE, DB_WRITER_ESPERA_MS
+from app.core.metrics import metrics
+from app.db.session import SessionFactory
+
+log = logging.getLogger("WRITER")
+
+
+class _Operacion:
+    __slots__ = ("fn", "future", "encolada")
+
+    def __init__(self, fn: Callable[[Any], Any]):
+        self.fn = fn
+        self.future: Future = Future()
+        self.encolada = time.perf_counter()
+
+
+class DbWriter:
+    """Thread escritor único: cola de operaciones + group commit."""
+
+    def __init__(self, session_factory=SessionFactory, max_lote: int = DB_WRITER_MAX_LOTE,
+                 espera_ms: float = DB_WRITER_ESPERA_MS):
+        self.session_factory = session_factory
+        self.max_lote = max(max_lote, 1)
+        self.espera = espera_ms / 1000
+        self._cola: "queue.Queue[Optional[_Operacion]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._aceptando = False
+        self._lock = threading.Lock()
+        self.stats = {"lotes": 0, "operaciones": 0, "errores": 0, "lotes_divididos": 0, "lote_max": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._aceptando = True
+            self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+            self._thread.start()
+        log.info(f"[WRITER] Iniciado (lote máx {self.max_lote}, espera {self.espera * 1000:.0f} ms)")
+
+    def stop(self, timeout: float = 10):
+        """Deja de aceptar operaciones, ejecuta las ya encoladas y termina."""
+        with self._lock:
+            if not self._aceptando:
+                return
+            self._aceptando = False
+            self._cola.put(None)
+        if self._thread:
+            self._thread.join(timeout)
+        log.info("[WRITER] Detenido")
+
+    @property
+    def running(self) -> bool:
+        return self._aceptando and bool(self._thread and self._thread.is_alive())
+
+    @property
+    def en_writer(self) -> bool:
+        """True si se llama desde el propio thread escritor (encolar ahí sería un deadlock)."""
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn: Callable[[Any], Any]) -> Optional[Future]:
+        """Encola `fn(session)`. Retorna su Future, o None si el writer no acepta operaciones."""
+        op = _Operacion(fn)
+        with self._lock:
+            if not self._aceptando:
+                return None
+            self._cola.put(op)
+        return op.future
+
+    # ── Thread escritor ──
+    def _loop(self):
+        while True:
+            lote, fin = self._tomar_lote()
+            try:
+                if lote:
+                    self._ejecutar_lote(lote)
+            except Exception as e:
+                # Nunca dejar a un llamador esperando un Future sin resolver
+                log.error(f"[WRITER] Error ejecutando lote: {e}")
+                for op in lote:
+                    if not op.future.done():
+                        op.future.set_exception(e)
+            if fin:
+                return
+
+    def _tomar_lote(self):
+        """Bloquea hasta la primera operación y junta las que lleguen en `espera`. Retorna (lote, fin)."""
+        op = self._cola.get()
+        if op is None:
+            return [], True
+        lote = [op]
+        limite = time.perf_counter() + self.espera
+        while len(lote) < self.max_lote:
+            restante = limite - time.perf_counter()
+            try:
+                op = self._cola.get_nowait() if restante <= 0 else self._cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            if op is None:
+                return lote, True
+            lote.append(op)
+        return lote, False
+
+    def _ejecutar_lote(self, lote: List[_Operacion]):
+        metrics.observe("db_writer.lote", len(lote))
+        metrics.observe("db_writer.cola", self._cola.qsize())
+        session = self.session_factory()
+        try:
+            resultados = []
+            for op in lote:
+                resultados.append(op.fn(session))
+                # Las operaciones mezclan ORM y UPDATEs masivos: que la siguiente no lea objetos viejos
+                session.flush()
+                session.expunge_all()
+            t0 = time.perf_counter()
+            session.commit()
+            metrics.observe("db_writer.commit_s", time.perf_counter() - t0)
+        except Exception:
+            session.rollback()
+            # Aislar el error: cada operación en su propia transacción
+            with self._lock:
+                self.stats["lotes_divididos"] += 1
+            for op in lote:
+                self._ejecutar_sola(op)
+            return
+        finally:
+            session.close()
+
+        for op, resultado in zip(lote, resultados):
+            self._resolver(op, resultado=resultado)
+        with self._lock:
+            self.stats["lotes"] += 1
+            self.stats["operaciones"] += len(lote)
+            self.stats["lote_max"] = max(self.stats["lote_max"], len(lote))
+
+    def _ejecutar_sola(self, op: _Operacion):
+        session = self.session_factory()
+        try:
+            resultado = op.fn(session)
+            t0 = time.perf_counter()
+            session.commit()
+            metrics.observe("db_writer.commit_s", time.perf_counter() - t0)
+        except Exception as e:
+            session.rollback()
+            with self._lock:
+                self.stats["errores"] += 1
+            log.error(f"[WRITER] Operación fallida: {e}")
+            self._resolver(op, error=e)
+            return
+        finally:
+            session.close()
+        with self._lock:
+            self.stats["lotes"] += 1
+            self.stats["operaciones"] += 1
+        self._resolver(op, resultado=resultado)
+
+    @staticmethod
+    def _resolver(op: _Operacion, resultado: Any = None, error: Optional[BaseException] = None):
+        metrics.observe("db_writer.espera_s", time.perf_counter() - op.encolada)
+        if error is not None:
+            op.future.set_exception(error)
+        else:
+            op.future.set_result(resultado)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["lote_promedio"] = round(stats["operaciones"] / stats["lotes"], 2) if stats["lotes"] else 0.0
+        return {"running": self.running, "en_cola": self._cola.qsize(), **stats}
+
+
+# Singleton global
+db_writer = DbWriter()
@@ -0,0 +1,325 @@
+"""
+Red del navegador — bloqueo de URLs por fuente + caché local de assets estáticos.
+
+Solo se bloqueaban imágenes (y solo en SUNEDU). Fuentes tipográficas, analytics
+y los bundles de la SPA se descargaban en cada recarga (F5 de los reintentos
+SUNEDU, recarga de MINEDU tras cada error). `optimizar_red(driver, fuente)`:
+
+  1. `Network.setBlockedURLs` con BLOCKED_URLS[fuente] (+ imágenes si
+     BLOCK_IMAGES_* está activo: la llamada reemplaza la lista de Botasaurus).
+  2. `Fetch.enable` para Script/Stylesheet: en `Fetch.requestPaused`, si el
+     asset está en la caché de disco se responde con `Fetch.fulfillRequest`
+     (sin tocar la red); si no, `Fetch.continueRequest` y un thread de fondo lo
+     descarga con requests y lo guarda si es inmutable (nombre con hash o
+     Cache-Control immutable / max-age ≥ 1 día).
+
+Las respuestas a Fetch salen del thread listener sin esperar (ver
+`send_cdp_sin_espera`). Bytes ahorrados por fuente en `get_stats()`.
+"""
+
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from botasaurus.browser import Driver
+
+from app.core.config import (
+    NETWORK_BLOCKING_ENABLED, BLOCKED_URLS,
+    ASSET_CACHE_ENABLED, ASSET_CACHE_DIR, ASSET_CACHE_MAX_MB, ASSET_CACHE_TTL,
+    BLOCK_IMAGES_SUNEDU, BLOCK_IMAGES_MINEDU,
+)
+from app.scrapers.cdp_bridge import send_cdp, send_cdp_sin_espera, on_cdp_event
+from app.scrapers.dom_probe import driver_real
+
+log = logging.getLogger("ASSETS")
+
+# Mismos patrones que Driver(block_images=True): setBlockedURLs los reemplazaría
+_IMAGENES = [".jpg", ".jpeg", ".png", ".webp", ".svg", ".gif", ".pdf", ".zip", ".ico"]
+_BLOQUEA_IMAGENES = {"sunedu": BLOCK_IMAGES_SUNEDU, "minedu": BLOCK_IMAGES_MINEDU}
+# Tipos de recurso que se interceptan (los demás, si llegan, siguen de largo)
+_TIPOS = ("Script", "Stylesheet")
+# app.3f9a1c2e.js, chunk-vendors.3f9a1c2e4b.css, main-AB12CD34.js, ?v=1.2.3
+_HASH_EN_URL = re.compile(r"[.\-_](?=[A-Za-z]*\d)[A-Za-z0-9]{8,32}\.(?:js|css)(?:$|[?#])|[?&](?:v|ver|version|hash)=", re.I)
+_MAX_AGE = re.compile(r"max-age=(\d+)", re.I)
+_UN_DIA = 24 * 3600
+
+
+def _vida_util(url: str, cache_control: str) -> int:
+    """Segundos que el asset puede servirse de caché (0 = no cachear)."""
+    cc = (cache_control or "").lower()
+    if "no-store" in cc or "private" in cc:
+        return 0
+    if "immutable" in cc or _HASH_EN_URL.search(url):
+        return ASSET_CACHE_TTL
+    m = _MAX_AGE.search(cc)
+    if m and int(m.group(1)) >= _UN_DIA:
+        return min(int(m.group(1)), ASSET_CACHE_TTL)
+    return 0
+
+
+class AssetCache:
+    """Caché de assets en disco compartida por todos los navegadores del proceso."""
+
+    def __init__(self, directorio: Path = ASSET_CACHE_DIR, max_mb: float = ASSET_CACHE_MAX_MB,
+                 enabled: bool = ASSET_CACHE_ENABLED):
+        self.dir = Path(directorio)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = enabled
+        self._indice: Optional[Dict[str, dict]] = None
+        self._lock = threading.Lock()
+        self._en_curso: set = set()
+        self._descargas = ThreadPoolExecutor(max_workers=2, thread_name_prefix="asset-cache")
+        self.http = requests.Session()
+
+    @staticmethod
+    def _clave(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _cargar_indice(self) -> Dict[str, dict]:
+        """Índice en memoria: se arma una vez leyendo los `.json` del directorio."""
+        if self._indice is None:
+            self._indice = {}
+            if self.dir.exists():
+                for meta in self.dir.glob("*.json"):
+                    try:
+                        self._indice[meta.stem] = json.loads(meta.read_text(encoding="utf-8"))
+                    except (OSError, ValueError):
+                        continue
+        return self._indice
+
+    def get(self, url: str) -> Optional[Tuple[bytes, dict]]:
+        """(cuerpo, meta) si el asset está vigente en disco."""
+        if not self.enabled:
+            return None
+        clave = self._clave(url)
+        with self._lock:
+            meta = self._cargar_indice().get(clave)
+        if meta is None or meta["expira"] < time.time():
+            return None
+        try:
+            cuerpo = (self.dir / clave).read_bytes()
+        except OSError:
+            with self._lock:
+                self._indice.pop(clave, None)
+            return None
+        meta["usado"] = time.time()
+        return cuerpo, meta
+
+    def guardar(self, url: str, cuerpo: bytes, content_type: str, cache_control: str) -> bool:
+        vida = _vida_util(url, cache_control)
+        if not vida or not cuerpo:
+            return False
+        clave = self._clave(url)
+        ahora = time.time()
+        meta = {"url": url, "content_type": content_type, "bytes": len(cuerpo),
+                "expira": ahora + vida, "usado": ahora}
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            (self.dir / clave).write_bytes(cuerpo)
+            (self.dir / f"{clave}.json").write_text(json.dumps(meta), encoding="utf-8")
+        except OSError as e:
+            log.warning(f"[ASSETS] No se pudo guardar {url[:80]}: {e}")
+            return False
+        with self._lock:
+            self._cargar_indice()[clave] = meta
+        self._recortar()
+        return True
+
+    def descargar_en_fondo(self, url: str, headers: Dict[str, str], stats: "EstadisticasRed"):
+        """Descarga el asset (fuera del navegador) para servirlo en la próxima recarga."""
+        with self._lock:
+            if url in self._en_curso:
+                return
+            self._en_curso.add(url)
+        self._descargas.submit(self._descargar, url, headers, stats)
+
+    def _descargar(self, url: str, headers: Dict[str, str], stats: "EstadisticasRed"):
+        try:
+            resp = self.http.get(url, headers=headers, timeout=20)
+            if resp.status_code == 200 and self.guardar(
+                url, resp.content, resp.headers.get("Content-Type", ""), resp.headers.get("Cache-Control", "")
+            ):
+                stats.sumar("guardados")
+        except requests.RequestException as e:
+            log.debug(f"[ASSETS] Descarga fallida {url[:80]}: {e}")
+        finally:
+            with self._lock:
+                self._en_curso.discard(url)
+
+    def _recortar(self):
+        """Borra los assets menos usados hasta quedar bajo ASSET_CACHE_MAX_MB."""
+        with self._lock:
+            indice = self._cargar_indice()
+            total = sum(m["bytes"] for m in indice.values())
+            if total <= self.max_bytes:
+                return
+            sobran = []
+            for clave, meta in sorted(indice.items(), key=lambda kv: kv[1]["usado"]):
+                if total <= self.max_bytes:
+                    break
+                total -= meta["bytes"]
+                sobran.append(clave)
+            for clave in sobran:
+                indice.pop(clave, None)
+        for clave in sobran:
+            for archivo in (self.dir / clave, self.dir / f"{clave}.json"):
+                archivo.unlink(missing_ok=True)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            indice = self._cargar_indice() if self.enabled else {}
+            return {
+                "enabled": self.enabled,
+                "assets": len(indice),
+                "bytes_en_disco": sum(m["bytes"] for m in indice.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+class EstadisticasRed:
+    """Contadores por fuente (los handlers corren en varios threads listener)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.valores = {"bloqueadas": 0, "servidas_cache": 0, "bytes_ahorrados": 0,
+                        "pasadas_red": 0, "guardados": 0, "errores": 0}
+
+    def sumar(self, clave: str, n: int = 1):
+        with self._lock:
+            self.valores[clave] += n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.valores)
+
+
+class RedNavegador:
+    """Bloqueo + interceptación de assets sobre un driver."""
+
+    def __init__(self, fuente: str, cache: "AssetCache", stats: EstadisticasRed):
+        self.fuente = fuente
+        self.cache = cache
+        self.stats = stats
+        self.driver: Optional[Driver] = None
+
+    def attach(self, driver: Driver) -> bool:
+        self.driver = driver
+        ok = False
+        try:
+            if NETWORK_BLOCKING_ENABLED:
+                patrones = list(BLOCKED_URLS.get(self.fuente, []))
+                if _BLOQUEA_IMAGENES.get(self.fuente):
+                    patrones += _IMAGENES
+                send_cdp(driver, "Network.enable")
+                send_cdp(driver, "Network.setBlockedURLs", {"urls": patrones})
+                on_cdp_event(driver, "Network.loadingFailed", self._on_failed)
+                ok = True
+            if self.cache.enabled and on_cdp_event(driver, "Fetch.requestPaused", self._on_paused):
+                send_cdp(driver, "Fetch.enable", {"patterns": [
+                    {"urlPattern": "*", "resourceType": t, "requestStage": "Request"} for t in _TIPOS
+                ]})
+                ok = True
+        except Exception as e:
+            log.warning(f"[ASSETS] Optimización de red no disponible ({self.fuente.upper()}): {e}")
+            return False
+        if ok:
+            log.info(f"[ASSETS] ✅ Bloqueo de URLs + caché de assets activos en {self.fuente.upper()}")
+        return ok
+
+    # ── Handlers (thread listener: responder sin esperar) ──
+    def _on_failed(self, ev):
+        if ev.blocked_reason is not None:
+            self.stats.sumar("bloqueadas")
+
+    def _on_paused(self, ev):
+        request_id = str(ev.request_id)
+        try:
+            url = ev.request.url
+            if ev.request.method == "GET" and str(getattr(ev.resource_type, "value", ev.resource_type)) in _TIPOS:
+                hit = self.cache.get(url)
+                if hit:
+                    self._servir(request_id, ev, *hit)
+                    return
+                self.cache.descargar_en_fondo(url, _headers_descarga(ev.request.headers), self.stats)
+            self.stats.sumar("pasadas_red")
+            send_cdp_sin_espera(self.driver, "Fetch.continueRequest", {"requestId": request_id})
+        except Exception as e:
+            self.stats.sumar("errores")
+            log.debug(f"[ASSETS] Error interceptando: {e}")
+            send_cdp_sin_espera(self.driver, "Fetch.continueRequest", {"requestId": request_id})
+
+    def _servir(self, request_id: str, ev, cuerpo: bytes, meta: dict):
+        headers = [
+            {"name": "Content-Type", "value": meta.get("content_type") or "application/octet-stream"},
+            {"name": "Cache-Control", "value": "public, max-age=31536000, immutable"},
+        ]
+        origen = _header(ev.request.headers, "Origin")
+        if origen:  # Scripts/CSS con crossorigin: el navegador exige CORS
+            headers += [{"name": "Access-Control-Allow-Origin", "value": origen},
+                        {"name": "Access-Control-Allow-Credentials", "value": "true"}]
+        send_cdp_sin_espera(self.driver, "Fetch.fulfillRequest", {
+            "requestId": request_id,
+            "responseCode": 200,
+            "responseHeaders": headers,
+            "body": base64.b64encode(cuerpo).decode("ascii"),
+        })
+        self.stats.sumar("servidas_cache")
+        self.stats.sumar("bytes_ahorrados", len(cuerpo))
+
+
+def _header(headers: Any, nombre: str) -> str:
+    for k, v in dict(headers or {}).items():
+        if k.lower() == nombre.lower():
+            return str(v)
+    return ""
+
+
+def _headers_descarga(headers: Any) -> Dict[str, str]:
+    """User-Agent/Referer/Accept del navegador (sin cookies: el asset es público)."""
+    return {k: str(v) for k, v in dict(headers or {}).items()
+            if k.lower() in ("user-agent", "referer", "accept", "accept-language")}
+
+
+# Singletons globales
+asset_cache = AssetCache()
+_stats: Dict[str, EstadisticasRed] = {}
+_stats_lock = threading.Lock()
+
+
+def _stats_de(fuente: str) -> EstadisticasRed:
+    with _stats_lock:
+        return _stats.setdefault(fuente, EstadisticasRed())
+
+
+def optimizar_red(driver: Driver, fuente: str) -> bool:
+    """Aplica bloqueo + caché al driver (una sola vez por navegador)."""
+    if not (NETWORK_BLOCKING_ENABLED or asset_cache.enabled):
+        return False
+    real = driver_real(driver)
+    if getattr(real, "_red_scgt", None) is not None:
+        return True
+    red = RedNavegador(fuente, asset_cache, _stats_de(fuente))
+    ok = red.attach(real)
+    try:
+        real._red_scgt = red
+    except AttributeError:
+        pass
+    return ok
+
+
+def get_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        fuentes = {f: s.snapshot() for f, s in _stats.items()}
+    return {
+        "bloqueo": NETWORK_BLOCKING_ENABLED,
+        "cache": asset_cache.get_stats(),
+        "fuentes": fuentes,
+    }
@@ -0,0 +1,79 @@
+"""
+Puente CDP — comandos y eventos Chrome DevTools sobre el driver de Botasaurus.
+
+Soporta los dos tipos de driver que el proyecto ha usado:
+  - Selenium-like: `execute_cdp_cmd(method, params)` (solo comandos, sin eventos)
+  - Botasaurus Driver: `run_cdp_command(...)` y handlers de eventos en el tab
+"""
+
+import logging
+from typing import Any, Callable, Optional
+
+from botasaurus.browser import Driver
+
+log = logging.getLogger("CDP")
+
+
+def selenium_driver(driver: Driver):
+    """Driver Selenium subyacente (si existe)."""
+    return getattr(driver, '_driver', None) or getattr(driver, 'driver', None)
+
+
+def _comando_crudo(method: str, params: dict):
+    """Comando CDP genérico en el formato generador que usa botasaurus_driver."""
+    result = yield {"method": method, "params": params}
+    return result
+
+
+def send_cdp(driver: Driver, method: str, params: Optional[dict] = None) -> Any:
+    """Ejecuta un comando CDP. Lanza RuntimeError si el driver no expone CDP."""
+    params = params or {}
+    sel = selenium_driver(driver)
+    if sel is not None and hasattr(sel, 'execute_cdp_cmd'):
+        return sel.execute_cdp_cmd(method, params)
+    if hasattr(driver, 'run_cdp_command'):
+        return driver.run_cdp_command(_comando_crudo(method, params))
+    raise RuntimeError("El driver no expone CDP")
+
+
+def send_cdp_sin_espera(driver: Driver, method: str, params: Optional[dict] = None) -> bool:
+    """
+    Envía un comando CDP sin esperar la respuesta. Es la única forma segura de
+    responder desde un handler de eventos (thread listener) o desde otro thread:
+    las respuestas comparten una cola y esperar desde dos threads las mezcla.
+    Retorna False si el driver no es Botasaurus.
+    """
+    tab = getattr(driver, '_tab', None)
+    if tab is None or not hasattr(tab, 'send'):
+        return False
+    tab.send(_comando_crudo(method, params or {}), _is_update=True, wait_for_response=False)
+    return True
+
+
+def on_cdp_event(driver: Driver, event_method: str, handler: Callable[[Any], None]) -> bool:
+    """
+    Suscribe `handler` a un evento CDP (ej. 'Network.responseReceived').
+    El handler recibe el evento tipado de botasaurus_driver.cdp y corre en el
+    thread listener del websocket: debe ser rápido y no enviar comandos CDP.
+    Retorna False si el driver no soporta eventos.
+    """
+    tab = getattr(driver, '_tab', None)
+    if tab is None or not hasattr(tab, 'add_handler'):
+        return False
+    try:
+        from botasaurus_driver.cdp.util import _event_parsers
+    except ImportError:
+        return False
+    event_cls = _event_parsers.get(event_method)
+    if event_cls is None:
+        log.warning(f"[CDP] Evento desconocido: {event_method}")
+        return False
+
+    def _safe(event):
+        try:
+            handler(event)
+        except Exception as e:
+            log.debug(f"[CDP] Error en handler {event_method}: {e}")
+
+    tab.add_handler(event_cls, _safe)
+    return True
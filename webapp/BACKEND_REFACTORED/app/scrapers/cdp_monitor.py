@@ -0,0 +1,167 @@
+"""
+Monitoreo del navegador con eventos CDP nativos (MONITOR_MODE="cdp").
+
+Alternativa a MONITOR_INIT_SCRIPT: en vez de parchear fetch/XHR/console en cada
+página y leer `window.__capturedEvents` con run_js, se suscribe a
+  Runtime.consoleAPICalled · Runtime.exceptionThrown · Log.entryAdded
+  Network.requestWillBeSent · Network.responseReceived · Network.loadingFailed
+en el thread listener del websocket de Botasaurus. Los eventos se normalizan al
+mismo formato del script espía y van a un ring buffer acotado por driver (un
+worker a la vez), que el scraper drena sin round trips.
+"""
+
+import threading
+import weakref
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, List
+
+from botasaurus.browser import Driver
+
+from app.core.config import MONITOR_BUFFER_SIZE
+from app.scrapers.cdp_bridge import send_cdp, on_cdp_event
+from app.scrapers.dom_probe import driver_real
+
+log = logging.getLogger("MONITOR")
+
+# requestId → (método, url) para dar contexto a fallos/HTTP 4xx-5xx
+_MAX_REQUESTS = 512
+# Tipos de console de CDP → nivel del script espía
+_NIVELES_CONSOLE = {"warning": "warn", "error": "error", "info": "info", "debug": "debug"}
+
+# Monitores vivos (para estadísticas)
+_monitores: "weakref.WeakSet[CdpMonitor]" = weakref.WeakSet()
+
+
+class CdpMonitor:
+    """Ring buffer de eventos del navegador alimentado por CDP."""
+
+    def __init__(self, capacidad: int = MONITOR_BUFFER_SIZE):
+        self._eventos: deque = deque(maxlen=capacidad)
+        self._requests: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.activo = False
+        self.recibidos = 0
+        self.descartados = 0
+        _monitores.add(self)
+
+    @classmethod
+    def para(cls, driver: Driver) -> "CdpMonitor":
+        """Monitor del driver: se crea y suscribe una sola vez por driver (el pool los reutiliza)."""
+        real = driver_real(driver)
+        monitor = getattr(real, "_monitor_cdp", None)
+        if monitor is None:
+            monitor = cls()
+            monitor.attach(real)
+            try:
+                real._monitor_cdp = monitor
+            except AttributeError:
+                pass
+        else:
+            monitor.drenar()  # Eventos del worker anterior
+        return monitor
+
+    def attach(self, driver: Driver) -> bool:
+        """Registra los handlers y habilita los dominios. False si el driver no emite eventos."""
+        handlers = (
+            ("Runtime.consoleAPICalled", self._on_console),
+            ("Runtime.exceptionThrown", self._on_exception),
+            ("Log.entryAdded", self._on_log),
+            ("Network.requestWillBeSent", self._on_request),
+            ("Network.responseReceived", self._on_response),
+            ("Network.loadingFailed", self._on_failed),
+        )
+        try:
+            ok = all(on_cdp_event(driver, evento, fn) for evento, fn in handlers)
+            if ok:
+                for comando in ("Runtime.enable", "Log.enable", "Network.enable"):
+                    send_cdp(driver, comando)
+        except Exception as e:
+            log.warning(f"[MONITOR] Eventos CDP no disponibles: {e}")
+            ok = False
+        self.activo = bool(ok)
+        if self.activo:
+            log.info("[MONITOR] ✅ Monitoreo por eventos CDP activo (sin script espía)")
+        return self.activo
+
+    # ── Buffer ──
+    def _push(self, evento: Dict[str, Any]):
+        with self._lock:
+            if len(self._eventos) == self._eventos.maxlen:
+                self.descartados += 1
+            self._eventos.append(evento)
+            self.recibidos += 1
+
+    def drenar(self) -> List[Dict[str, Any]]:
+        """Retorna y vacía los eventos acumulados (sin tocar el navegador)."""
+        with self._lock:
+            eventos = list(self._eventos)
+            self._eventos.clear()
+        return eventos
+
+    # ── Handlers (thread listener: rápidos, sin comandos CDP) ──
+    def _on_console(self, ev):
+        partes = [_valor(a) for a in (ev.args or [])]
+        self._push({
+            "type": "CONSOLE",
+            "level": _NIVELES_CONSOLE.get(ev.type_, ev.type_),
+            "message": " ".join(partes)[:400],
+        })
+
+    def _on_exception(self, ev):
+        det = ev.exception_details
+        mensaje = (det.exception.description if det.exception and det.exception.description else det.text) or ""
+        self._push({
+            "type": "JS_ERROR",
+            "message": mensaje[:300],
+            "source": det.url or "",
+            "line": det.line_number,
+        })
+
+    def _on_log(self, ev):
+        entry = ev.entry
+        self._push({
+            "type": "LOG",
+            "level": entry.level,
+            "message": (entry.text or "")[:400],
+            "source": entry.url or "",
+        })
+
+    def _on_request(self, ev):
+        with self._lock:
+            self._requests[str(ev.request_id)] = (ev.request.method, ev.request.url[:200])
+            if len(self._requests) > _MAX_REQUESTS:
+                self._requests.popitem(last=False)
+
+    def _on_response(self, ev):
+        status = ev.response.status
+        if status < 400:
+            return
+        metodo, _ = self._request(ev.request_id)
+        self._push({"type": "HTTP_ERROR", "url": ev.response.url[:200], "status": status, "method": metodo})
+
+    def _on_failed(self, ev):
+        if ev.canceled or ev.blocked_reason is not None:
+            return  # Cancelados o bloqueados a propósito (imágenes, assets)
+        metodo, url = self._request(ev.request_id)
+        self._push({"type": "NETWORK_ERROR", "url": url, "method": metodo, "message": (ev.error_text or "")[:200]})
+
+    def _request(self, request_id) -> tuple:
+        with self._lock:
+            return self._requests.get(str(request_id), ("", ""))
+
+
+def _valor(remote_object) -> str:
+    """Texto de un argumento de console.* (RemoteObject)."""
+    if remote_object.value is not None:
+        return str(remote_object.value)
+    return str(remote_object.description or remote_object.type_)
+
+
+def get_stats() -> Dict[str, Any]:
+    monitores = [m for m in list(_monitores) if m.activo]
+    return {
+        "monitores": len(monitores),
+        "eventos": sum(m.recibidos for m in monitores),
+        "descartados": sum(m.descartados for m in monitores),
+    }
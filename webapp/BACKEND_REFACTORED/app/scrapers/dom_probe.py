@@ -0,0 +1,90 @@
+"""
+DOM probe — Librería JS inyectada una vez por documento + conteo de round trips.
+
+Cada `driver.run_js` es un round trip por CDP con su propio parseo de JS. Antes,
+un DNI hacía decenas (detectar estado, cerrar swal, llenar campos, clicks,
+recoger eventos, sondeo del resultado…). Ahora cada scraper define su librería
+`window.__scgt` (funciones simples + acciones compuestas) que se registra con
+`Page.addScriptToEvaluateOnNewDocument` junto al script monitor, y la llama con
+un solo `run_js` por acción:
+
+    probe = DomProbe(PROBE_SCRIPT)
+    probe.llamar(driver, "buscar", dni)   # llenar DNI + click + estado → 1 round trip
+
+Si el documento no tiene la librería (sin CDP, recarga sin hook), `llamar` la
+inyecta y repite la llamada. Las funciones pueden retornar Promises (run_js las
+espera), así las esperas cortas entre pasos ocurren dentro de la página.
+
+`DriverMedido` envuelve el driver durante un DNI y cuenta sus round trips
+(métricas `<fuente>.round_trips_por_dni`).
+"""
+
+import logging
+from typing import Any, Optional
+
+from botasaurus.browser import Driver
+
+log = logging.getLogger("PROBE")
+
+# Llamada genérica: `args` lo define run_js a partir del dict de argumentos
+_LLAMADA = """
+var p = window.__scgt;
+if (!p) return {__sinProbe: true};
+return p[args.f].apply(p, args.a);
+"""
+
+
+class DomProbe:
+    """Invoca funciones de la librería `window.__scgt` de un scraper."""
+
+    def __init__(self, script: str):
+        self.script = script
+        self.reinyecciones = 0
+
+    def inyectar(self, driver: Driver):
+        """Inyecta la librería en el documento actual."""
+        driver.run_js(self.script)
+
+    def llamar(self, driver: Driver, funcion: str, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Ejecuta `window.__scgt[funcion](*args)` en un round trip.
+        `timeout`: para funciones que esperan dentro de la página (Promise).
+        """
+        extra = {"timeout": timeout} if timeout is not None else {}
+        payload = {"f": funcion, "a": list(args)}
+        resp = driver.run_js(_LLAMADA, payload, **extra)
+        if isinstance(resp, dict) and resp.get("__sinProbe"):
+            self.reinyecciones += 1
+            log.debug(f"[PROBE] Documento sin librería → inyectando ({funcion})")
+            self.inyectar(driver)
+            resp = driver.run_js(_LLAMADA, payload, **extra)
+        return resp
+
+
+class DriverMedido:
+    """Proxy del Driver que cuenta los round trips hacia el navegador."""
+
+    # Métodos del Driver que hablan con Chrome (los de elementos no se cuentan)
+    _METODOS = frozenset({
+        "run_js", "get", "reload", "select", "select_all", "wait_for_element",
+        "run_cdp_command", "get_cookies", "add_cookies",
+    })
+
+    def __init__(self, driver: Driver):
+        self._real = driver
+        self.round_trips = 0
+
+    def __getattr__(self, nombre: str):
+        attr = getattr(self._real, nombre)
+        if nombre not in self._METODOS or not callable(attr):
+            return attr
+
+        def contado(*args, **kwargs):
+            self.round_trips += 1
+            return attr(*args, **kwargs)
+        return contado
+
+
+def driver_real(driver: Driver) -> Driver:
+    """Driver sin el proxy de medición (para guardar estado en el driver mismo)."""
+    return driver._real if isinstance(driver, DriverMedido) else driver
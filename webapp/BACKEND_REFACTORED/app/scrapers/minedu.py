@@ -1,12 +1,20 @@
 
-import time
 import base64
 import logging
 from datetime import datetime
 from typing import Optional, Dict, Any
 
 from botasaurus.browser import Driver
-from app.core.config import MINEDU_URL, MINEDU_MAX_RETRIES
+from app.core.config import MINEDU_URL, MINEDU_MAX_RETRIES, MINEDU_WAIT_PROFILE, MONITOR_MODE
+from app.scrapers.waits import perfil_minedu
+from app.services.ocr_service import ocr_service
+from app.services import captcha_preprocess
+from app.services.captcha_corpus import captcha_corpus
+from app.services.pacing import pacing
+from app.core.metrics import metrics
+from app.scrapers.cdp_bridge import send_cdp
+from app.scrapers.dom_probe import DomProbe, DriverMedido
+from app.scrapers.cdp_monitor import CdpMonitor
 
 log = logging.getLogger("MINEDU")
 
@@ -56,6 +64,159 @@ MONITOR_INIT_SCRIPT = """
 })();
 """
 
+# ═══ DOM probe — Librería `window.__scgt` (una llamada run_js por acción) ═══
+# Mismos selectores y criterios que antes; ver app/scrapers/dom_probe.py
+PROBE_SCRIPT = """
+(function() {
+    if (window.__scgt) return;
+    function captchaSrc() {
+        var img = document.querySelector('#imgCaptcha');
+        return img ? img.src : null;
+    }
+    function errorCaptcha() {
+        var result = { hay_error: false, mensaje: '' };
+        var toast = document.querySelector('.toast-message');
+        if (toast && toast.offsetParent !== null) {
+            result.hay_error = true;
+            result.mensaje = toast.innerText.trim();
+            return result;
+        }
+        var tc = document.querySelector('#toast-container');
+        if (tc) {
+            var tm = tc.querySelector('.toast-message');
+            if (tm) {
+                var txt = tm.innerText.trim();
+                if (txt) { result.hay_error = true; result.mensaje = txt; }
+            }
+        }
+        var val = document.querySelector('span[data-valmsg-for="CaptchaCodeText"]');
+        if (val && val.innerText) { result.hay_error = true; if (!result.mensaje) result.mensaje = val.innerText.trim(); }
+        var alerts = document.querySelectorAll('.alert-danger, .alert-warning');
+        for (var i = 0; i < alerts.length; i++) {
+            var txt = alerts[i].innerText.toLowerCase();
+            if (txt.includes('captcha') || txt.includes('código') || txt.includes('verificación')) {
+                result.hay_error = true;
+                if (!result.mensaje) result.mensaje = alerts[i].innerText.trim();
+            }
+        }
+        return result;
+    }
+    function extraer() {
+        var result = {nombres: '', titulo: '', institucion: '', fecha: '', nivel: '', codigo: ''};
+        var div = document.querySelector('#divResultado');
+        if (!div) return null;
+        var tables = div.querySelectorAll('table.gobpe-res-tabla-cuerpo');
+        for (var t = 0; t < tables.length; t++) {
+            var rows = tables[t].querySelectorAll('tbody tr');
+            for (var i = 0; i < rows.length; i++) {
+                var cells = rows[i].querySelectorAll('td');
+                if (cells.length === 1) continue;
+                if (cells.length >= 3) {
+                    var lines1 = cells[0].innerText.trim().split('\\n');
+                    if (lines1.length > 0) result.nombres = lines1[0].trim();
+
+                    var lines2 = cells[1].innerText.trim().split('\\n');
+                    for (var j = 0; j < lines2.length; j++) {
+                        var line = lines2[j].trim();
+                        if (!line.includes(':') && line.length > 5 && !result.titulo) result.titulo = line;
+                        if (line.includes('Nivel:')) result.nivel = line.replace('Nivel:', '').trim();
+                        if (line.includes('Fecha de emisión:') || line.includes('Fecha emisión:'))
+                            result.fecha = line.split(':')[1].trim();
+                        if (line.includes('Código DRE:')) result.codigo = line.split(':')[1].trim();
+                    }
+
+                    var lines3 = cells[2].innerText.trim().split('\\n');
+                    if (lines3.length > 0) result.institucion = lines3[0].trim();
+
+                    if (result.titulo) break;
+                }
+            }
+            if (result.titulo) break;
+        }
+        return result;
+    }
+    function eventos() {
+        var e = window.__capturedEvents || [];
+        window.__capturedEvents = [];
+        return e;
+    }
+
+    window.__scgt = {
+        // ── Simples ──
+        captchaSrc: captchaSrc,
+        errorCaptcha: errorCaptcha,
+        extraer: extraer,
+        eventos: eventos,
+        formularioListo: function() {
+            var dni = document.querySelector('#DOCU_NUM');
+            var src = captchaSrc();
+            return !!(dni && src && src.indexOf('base64,') !== -1);
+        },
+        clickRefresh: function() {
+            var btn = document.querySelector('#CapImageRefresh');
+            if (btn) btn.dispatchEvent(new MouseEvent('click', {bubbles: true, cancelable: true, view: window}));
+            return !!btn;
+        },
+
+        // ── Compuestas ──
+        // Llenar DNI + limpiar campo captcha + leer captcha → {dni, captchaSrc}
+        preparar: function(dni) {
+            var dniField = document.querySelector('#DOCU_NUM');
+            if (dniField) {
+                dniField.value = dni;
+                dniField.dispatchEvent(new Event('input', { bubbles: true }));
+                dniField.dispatchEvent(new Event('change', { bubbles: true }));
+            }
+            var cap = document.querySelector('#CaptchaCodeText');
+            if (cap) { cap.removeAttribute('disabled'); cap.disabled = false; cap.value = ''; }
+            return {dni: dniField ? dniField.value : null, captchaSrc: captchaSrc()};
+        },
+        // Llenar captcha + click Consultar → {captcha, click}
+        enviar: function(texto) {
+            var cap = document.querySelector('#CaptchaCodeText');
+            if (cap) {
+                cap.removeAttribute('disabled'); cap.disabled = false;
+                cap.value = texto;
+                cap.dispatchEvent(new Event('input', { bubbles: true }));
+                cap.dispatchEvent(new Event('change', { bubbles: true }));
+                cap.dispatchEvent(new Event('keyup', { bubbles: true }));
+            }
+            var r = {captcha: cap ? cap.value : null, click: false};
+            var btn = document.querySelector('#btnConsultar');
+            if (btn) {
+                btn.removeAttribute('disabled');
+                btn.disabled = false;
+                btn.classList.remove('inactivo');
+                btn.click();
+                r.click = true;
+            }
+            return r;
+        },
+        // Estado post-consulta + eventos + datos (si #divResultado tiene contenido)
+        resultado: function() {
+            var err = errorCaptcha();
+            var div = document.querySelector('#divResultado');
+            var html = div ? div.innerHTML : '';
+            return {
+                estado: err.hay_error ? 'error' : (html.length > 50 ? 'resultado' : null),
+                mensaje: err.mensaje,
+                html: html.length,
+                datos: !err.hay_error && html ? extraer() : null,
+                eventos: eventos()
+            };
+        },
+        // Quitar toast/swal antes de refrescar → src actual del captcha
+        limpiarAvisos: function() {
+            var toast = document.querySelector('#toast-container');
+            if (toast) toast.remove();
+            var swal = document.querySelector('.swal2-close');
+            if (swal) swal.click();
+            return captchaSrc();
+        }
+    };
+})();
+"""
+
 class Motivo:
     MINEDU_NO_ENCONTRADO = "No se encontró título en MINEDU"
     MINEDU_CAPTCHA_FALLO = "Falló la verificación del captcha en MINEDU"
@@ -81,205 +242,180 @@ class MineduScraper:
     """Lógica de scraping de MINEDU con resolución de captcha OCR."""
 
     URL = MINEDU_URL
+    MOTOR = "browser"
 
-    def __init__(self):
+    def __init__(self, perfil_espera: Optional[str] = None):
         self._cdp_configured = False
-        try:
-            import ddddocr
-            self.ocr = ddddocr.DdddOcr(show_ad=False)
-        except ImportError:
-            log.error("[MINEDU] ddddocr no instalado. pip install ddddocr")
-            self.ocr = None
+        self._ultimo_captcha = None  # (bytes, lectura) del último captcha resuelto
+        self.intentos = 0            # Intentos usados en el último DNI
+        self.ritmo = pacing.get("minedu")  # Ritmo AIMD compartido (la pausa la hace el loop)
+        self.espera = perfil_minedu(perfil_espera or MINEDU_WAIT_PROFILE)
+        # Modelo ddddocr único del proceso (misma interfaz `classification`)
+        self.ocr = ocr_service if ocr_service.disponible else None
+        # Librería JS por documento: una llamada run_js por acción
+        self._probe = DomProbe(PROBE_SCRIPT)
+        # MONITOR_MODE="cdp": eventos nativos en un ring buffer (sin script espía ni run_js)
+        self._monitor: Optional[CdpMonitor] = None
 
     # ═══ Monitoreo Profesional — CDP Bridge ═══════════════════════════
+    @property
+    def _eventos_por_cdp(self) -> bool:
+        return bool(self._monitor and self._monitor.activo)
+
+    def _scripts_documento(self) -> str:
+        """Script espía (si no hay monitoreo CDP) + librería `__scgt`."""
+        return ("" if self._eventos_por_cdp else MONITOR_INIT_SCRIPT) + PROBE_SCRIPT
+
     def _setup_cdp_monitoring(self, driver: Driver):
+        """Registra monitor + librería `__scgt` para cada documento nuevo (un solo comando CDP)."""
         if self._cdp_configured:
             return
+        if MONITOR_MODE == "cdp" and self._monitor is None:
+            self._monitor = CdpMonitor.para(driver)
         try:
-            selenium_driver = getattr(driver, '_driver', None) or getattr(driver, 'driver', None)
-            if selenium_driver and hasattr(selenium_driver, 'execute_cdp_cmd'):
-                selenium_driver.execute_cdp_cmd(
-                    'Page.addScriptToEvaluateOnNewDocument',
-                    {'source': MONITOR_INIT_SCRIPT}
-                )
-                self._cdp_configured = True
-                log.info("[MONITOR] ✅ CDP monitoring configurado para MINEDU")
-                return
+            send_cdp(driver, 'Page.addScriptToEvaluateOnNewDocument',
+                     {'source': self._scripts_documento()})
+            self._cdp_configured = True
+            log.info("[MONITOR] ✅ CDP monitoring + DOM probe configurados para MINEDU")
+            return
         except Exception as e:
             log.warning(f"[MONITOR] CDP no disponible: {e}")
         self._inject_monitor_fallback(driver)
 
     def _inject_monitor_fallback(self, driver: Driver):
         try:
-            driver.run_js(MONITOR_INIT_SCRIPT)
+            driver.run_js(self._scripts_documento())
         except Exception:
             pass
 
     def _collect_events(self, driver: Driver, context: str = ""):
+        if self._eventos_por_cdp:
+            self._registrar_eventos([], context)  # Solo el ring buffer: sin round trip
+            return
         try:
-            events = driver.run_js("var e = window.__capturedEvents || []; window.__capturedEvents = []; return e;")
-            if not events: return
-            for evt in events:
-                tipo = evt.get('type', 'UNKNOWN')
-                level = evt.get('level', '')
-                if tipo == 'CONSOLE':
-                    msg = f"[BROWSER][CONSOLE.{level.upper()}] {evt.get('message', '')}"
-                elif tipo == 'JS_ERROR':
-                    msg = f"[BROWSER][JS_ERROR] {evt.get('message', '')} @ {evt.get('source', '')}:{evt.get('line', '')}"
-                elif tipo == 'HTTP_ERROR':
-                    msg = f"[BROWSER][HTTP_{evt.get('status', '???')}] {evt.get('method', '')} {evt.get('url', '')}"
-                elif tipo == 'NETWORK_ERROR':
-                    msg = f"[BROWSER][NET_FAIL] {evt.get('method', '')} {evt.get('url', '')} — {evt.get('message', '')}"
-                else:
-                    msg = f"[BROWSER][{tipo}] {evt}"
-                if context: msg = f"[{context}] {msg}"
-                if tipo in ('JS_ERROR', 'NETWORK_ERROR', 'PROMISE_ERROR'):
-                    log.error(msg)
-                elif tipo == 'HTTP_ERROR':
-                    log.warning(msg)
-                else:
-                    log.debug(msg)
+            self._registrar_eventos(self._probe.llamar(driver, "eventos"), context)
         except Exception:
             pass
 
-    def resolver_captcha(self, driver: Driver) -> str:
+    def _registrar_eventos(self, events, context: str = ""):
+        if self._eventos_por_cdp:
+            events = list(events or []) + self._monitor.drenar()
+        for evt in events or []:
+            tipo = evt.get('type', 'UNKNOWN')
+            level = evt.get('level', '')
+            if tipo == 'CONSOLE':
+                msg = f"[BROWSER][CONSOLE.{level.upper()}] {evt.get('message', '')}"
+            elif tipo == 'JS_ERROR':
+                msg = f"[BROWSER][JS_ERROR] {evt.get('message', '')} @ {evt.get('source', '')}:{evt.get('line', '')}"
+            elif tipo == 'HTTP_ERROR':
+                msg = f"[BROWSER][HTTP_{evt.get('status', '???')}] {evt.get('method', '')} {evt.get('url', '')}"
+            elif tipo == 'NETWORK_ERROR':
+                msg = f"[BROWSER][NET_FAIL] {evt.get('method', '')} {evt.get('url', '')} — {evt.get('message', '')}"
+            elif tipo == 'LOG':
+                msg = f"[BROWSER][LOG.{level.upper()}] {evt.get('message', '')} {evt.get('source', '')}".rstrip()
+            else:
+                msg = f"[BROWSER][{tipo}] {evt}"
+            if context: msg = f"[{context}] {msg}"
+            if tipo in ('JS_ERROR', 'NETWORK_ERROR', 'PROMISE_ERROR'):
+                log.error(msg)
+            elif tipo == 'HTTP_ERROR' or (tipo == 'LOG' and level == 'error'):
+                log.warning(msg)
+            else:
+                log.debug(msg)
+
+    def resolver_captcha(self, driver: Driver, src: Optional[str] = None) -> str:
+        """OCR del captcha; `src` si el llamador ya lo leyó (evita otro round trip)."""
         if not self.ocr:
             return ""
         try:
-            b64 = driver.run_js("""
-                var img = document.querySelector('#imgCaptcha');
-                return img ? img.src : null;
-            """)
-            if not b64 or "base64," not in b64:
-                return ""
-            b64 = b64.split("base64,")[1]
-            img_bytes = base64.b64decode(b64)
-            res = self.ocr.classification(img_bytes)
-            log.info(f"[MINEDU][CAPTCHA] OCR: {res}")
-            return res
+            if src is None:
+                src = self._probe.llamar(driver, "captchaSrc")
+            return self._ocr_src(src)
         except Exception as e:
             log.error(f"[MINEDU][CAPTCHA] Error: {e}")
             return ""
 
+    def _ocr_src(self, src: Optional[str]) -> str:
+        """OCR de un `src` data-URI base64 del captcha (común a los motores browser y http)."""
+        if not self.ocr or not src or "base64," not in src:
+            return ""
+        img_bytes = base64.b64decode(src.split("base64,")[1])
+        lectura = captcha_preprocess.resolver(self.ocr, img_bytes)
+        self._ultimo_captcha = (img_bytes, lectura)
+        return lectura
+
+    def _veredicto_captcha(self, aceptado: bool, envio: int):
+        """Veredicto del servidor sobre el último captcha enviado (métricas + corpus)."""
+        captcha_preprocess.registrar_veredicto(aceptado, envio)
+        if self._ultimo_captcha:
+            captcha_corpus.registrar(*self._ultimo_captcha, aceptado, motor=self.MOTOR)
+
     def _detectar_error_captcha(self, driver: Driver) -> dict:
-        return driver.run_js("""
-            var result = { hay_error: false, mensaje: '' };
-            var toast = document.querySelector('.toast-message');
-            if (toast && toast.offsetParent !== null) {
-                result.hay_error = true;
-                result.mensaje = toast.innerText.trim();
-                return result;
-            }
-            var tc = document.querySelector('#toast-container');
-            if (tc) {
-                var tm = tc.querySelector('.toast-message');
-                if (tm) {
-                    var txt = tm.innerText.trim();
-                    if (txt) { result.hay_error = true; result.mensaje = txt; }
-                }
-            }
-            var val = document.querySelector('span[data-valmsg-for="CaptchaCodeText"]');
-            if (val && val.innerText) { result.hay_error = true; if (!result.mensaje) result.mensaje = val.innerText.trim(); }
-            var alerts = document.querySelectorAll('.alert-danger, .alert-warning');
-            for (var i = 0; i < alerts.length; i++) {
-                var txt = alerts[i].innerText.toLowerCase();
-                if (txt.includes('captcha') || txt.includes('código') || txt.includes('verificación')) {
-                    result.hay_error = true;
-                    if (!result.mensaje) result.mensaje = alerts[i].innerText.trim();
-                }
-            }
-            return result;
-        """)
+        return self._probe.llamar(driver, "errorCaptcha")
 
     def _refrescar_captcha(self, driver: Driver) -> bool:
         try:
-            old_src = driver.run_js("""
-                var img = document.querySelector('#imgCaptcha');
-                return img ? img.src : null;
-            """)
-            driver.run_js("""
-                var toast = document.querySelector('#toast-container');
-                if (toast) toast.remove();
-                var swal = document.querySelector('.swal2-close');
-                if (swal) swal.click();
-            """)
-            time.sleep(0.5)
-            driver.run_js("""
-                var btn = document.querySelector('#CapImageRefresh');
-                if (btn) {
-                    var evt = new MouseEvent('click', {bubbles: true, cancelable: true, view: window});
-                    btn.dispatchEvent(evt);
-                }
-            """)
-            for _ in range(10):
-                time.sleep(0.5)
-                new_src = driver.run_js("""
-                    var img = document.querySelector('#imgCaptcha');
-                    return img ? img.src : null;
-                """)
-                if new_src and new_src != old_src:
-                    return True
-            return False
+            old_src = self._probe.llamar(driver, "limpiarAvisos")
+            self.espera.esperar("refresco_previo")
+            self._probe.llamar(driver, "clickRefresh")
+            # Esperar a que la imagen del captcha cambie
+            return bool(self.espera.esperar("refresco", lambda: self._captcha_src_cambio(driver, old_src)))
         except Exception:
             return False
 
+    # ═══ Condiciones de espera ═══════════════════════════════════════
+    def _captcha_src_cambio(self, driver: Driver, old_src: Optional[str]) -> bool:
+        new_src = self._probe.llamar(driver, "captchaSrc")
+        return bool(new_src and new_src != old_src and "base64," in new_src)
+
+    def _formulario_listo(self, driver: Driver) -> bool:
+        """Campo DNI presente e imagen del captcha ya cargada."""
+        return bool(self._probe.llamar(driver, "formularioListo"))
+
+    def _sondear_resultado(self, driver: Driver, dni: str, ultimo: dict) -> Optional[str]:
+        """
+        Una lectura post-consulta (error de captcha + #divResultado + datos + eventos)
+        en un round trip. Guarda la lectura en `ultimo` y retorna 'error' / 'resultado' / None.
+        """
+        lectura = self._probe.llamar(driver, "resultado") or {}
+        self._registrar_eventos(lectura.pop("eventos", None), f"DNI={dni} POST_SEARCH")
+        ultimo.clear()
+        ultimo.update(lectura)
+        return lectura.get("estado")
+
     def _extraer_datos(self, driver: Driver, dni: str) -> Optional[Dict[str, Any]]:
         try:
-            data = driver.run_js("""
-                var result = {nombres: '', titulo: '', institucion: '', fecha: '', nivel: '', codigo: ''};
-                var div = document.querySelector('#divResultado');
-                if (!div) return null;
-                var tables = div.querySelectorAll('table.gobpe-res-tabla-cuerpo');
-                for (var t = 0; t < tables.length; t++) {
-                    var rows = tables[t].querySelectorAll('tbody tr');
-                    for (var i = 0; i < rows.length; i++) {
-                        var cells = rows[i].querySelectorAll('td');
-                        if (cells.length === 1) continue;
-                        if (cells.length >= 3) {
-                            var cell1 = cells[0].innerText.trim();
-                            var lines1 = cell1.split('\\n');
-                            if (lines1.length > 0) result.nombres = lines1[0].trim();
-
-                            var cell2 = cells[1].innerText.trim();
-                            var lines2 = cell2.split('\\n');
-                            for (var j = 0; j < lines2.length; j++) {
-                                var line = lines2[j].trim();
-                                if (!line.includes(':') && line.length > 5 && !result.titulo) result.titulo = line;
-                                if (line.includes('Nivel:')) result.nivel = line.replace('Nivel:', '').trim();
-                                if (line.includes('Fecha de emisión:') || line.includes('Fecha emisión:'))
-                                    result.fecha = line.split(':')[1].trim();
-                                if (line.includes('Código DRE:')) result.codigo = line.split(':')[1].trim();
-                            }
-
-                            var cell3 = cells[2].innerText.trim();
-                            var lines3 = cell3.split('\\n');
-                            if (lines3.length > 0) result.institucion = lines3[0].trim();
-
-                            if (result.titulo) break;
-                        }
-                    }
-                    if (result.titulo) break;
-                }
-                return result;
-            """)
-            if data and data.get("titulo"):
-                return {
-                    "nombre_completo": data.get("nombres", ""),
-                    "titulo": data.get("titulo", ""),
-                    "institucion": data.get("institucion", ""),
-                    "nivel": data.get("nivel", ""),
-                    "fecha_expedicion": data.get("fecha", ""),
-                    "codigo_dre": data.get("codigo", ""),
-                    "fecha_consulta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            return None
+            return self._formatear_datos(self._probe.llamar(driver, "extraer"))
         except Exception as e:
             log.error(f"[MINEDU][EXTRACT] Error: {e}")
             return None
 
+    @staticmethod
+    def _formatear_datos(data: Optional[dict]) -> Optional[Dict[str, Any]]:
+        """Datos crudos de PROBE_SCRIPT.extraer → payload MINEDU (None si no hay título)."""
+        if data and data.get("titulo"):
+            return {
+                "nombre_completo": data.get("nombres", ""),
+                "titulo": data.get("titulo", ""),
+                "institucion": data.get("institucion", ""),
+                "nivel": data.get("nivel", ""),
+                "fecha_expedicion": data.get("fecha", ""),
+                "codigo_dre": data.get("codigo", ""),
+                "fecha_consulta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        return None
+
     # ── MÉTODO PRINCIPAL: procesar un solo DNI (Alias para compatibilidad) ──
     def procesar_dni(self, driver: Driver, dni: str) -> Dict[str, Any]:
-        return self.procesar_un_dni(driver, dni)
+        """Procesa un DNI contando los round trips al navegador (métrica por DNI)."""
+        medido = DriverMedido(driver)
+        self.intentos = 0
+        try:
+            return self.procesar_un_dni(medido, dni)
+        finally:
+            metrics.observe("minedu.round_trips_por_dni", medido.round_trips)
+            metrics.observe("minedu.intentos_por_dni", self.intentos)
+            log.info(f"[PROBE] DNI {dni}: {medido.round_trips} round trips")
 
     def procesar_un_dni(self, driver: Driver, dni: str) -> Dict[str, Any]:
         """
@@ -291,122 +427,83 @@ class MineduScraper:
         """
         need_reload = True
         ultimo_motivo = Motivo.MINEDU_MAX_REINTENTOS
+        envios = 0  # Captchas enviados para este DNI
 
         for intento in range(1, MINEDU_MAX_RETRIES + 1):
+            self.intentos = intento
             log.info(f"[MINEDU] DNI {dni} | Intento {intento}/{MINEDU_MAX_RETRIES}")
             try:
                 if need_reload:
                     driver.get(self.URL)
-                    time.sleep(2)  # carga rápida (Bot: 2s)
+                    self.espera.esperar("carga", lambda: self._formulario_listo(driver))
                     need_reload = False
                     self._setup_cdp_monitoring(driver)
-                    if not self._cdp_configured:
-                        self._inject_monitor_fallback(driver)
-
-                # Ingresar DNI
-                driver.run_js(f"""
-                    var dniField = document.querySelector('#DOCU_NUM');
-                    if (dniField) {{
-                        dniField.value = '{dni}';
-                        dniField.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                        dniField.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                    }}
-                """)
-                time.sleep(0.5)
-
-                # Limpiar campo captcha
-                driver.run_js("""
-                    var cap = document.querySelector('#CaptchaCodeText');
-                    if (cap) { cap.removeAttribute('disabled'); cap.disabled = false; cap.value = ''; }
-                """)
-                time.sleep(0.3)
+
+                # Ingresar DNI + limpiar campo captcha + leer captcha (un round trip)
+                form = self._probe.llamar(driver, "preparar", str(dni)) or {}
+                if form.get("dni") != dni:
+                    log.warning(f"[MINEDU] Campo DNI='{form.get('dni')}' != DNI esperado='{dni}'")
+                self.espera.esperar("dni")
+                self.espera.esperar("limpiar_captcha")
 
                 # Resolver captcha
-                captcha_text = self.resolver_captcha(driver)
+                captcha_text = self.resolver_captcha(driver, form.get("captchaSrc"))
                 if not captcha_text:
                     ultimo_motivo = Motivo.MINEDU_OCR_FALLO
                     if not self._refrescar_captcha(driver):
                         need_reload = True
                         ultimo_motivo = Motivo.MINEDU_REFRESCO_CAPTCHA_FALLO
-                    time.sleep(1)
+                    self.espera.esperar("pausa_error")
                     continue
 
-                time.sleep(0.5)
-
-                # Ingresar captcha
-                driver.run_js(f"""
-                    var cap = document.querySelector('#CaptchaCodeText');
-                    if (cap) {{
-                        cap.removeAttribute('disabled'); cap.disabled = false;
-                        cap.value = '{captcha_text}';
-                        cap.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                        cap.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                        cap.dispatchEvent(new Event('keyup', {{ bubbles: true }}));
-                    }}
-                """)
-                time.sleep(0.5)
-
-                # Click buscar (Logic from minedu_bot.py)
-                clicked = driver.run_js("""
-                    var btn = document.querySelector('#btnConsultar');
-                    if (btn) {
-                        btn.removeAttribute('disabled');
-                        btn.disabled = false;
-                        btn.classList.remove('inactivo');
-                        btn.click();
-                        return true;
-                    }
-                    return false;
-                """)
-                if not clicked:
+                self.espera.esperar("pre_captcha")
+                self.espera.esperar("captcha")
+
+                # Ingresar captcha + click buscar (Logic from minedu_bot.py), un round trip
+                envio = self._probe.llamar(driver, "enviar", captcha_text) or {}
+                if not envio.get("click"):
                     need_reload = True
                     ultimo_motivo = Motivo.MINEDU_BOTON_NO_ENCONTRADO
                     continue
+                envios += 1
 
-                time.sleep(3)  # Espera post-click del Bot
-
-                # Collect browser logs after search
-                self._collect_events(driver, f"DNI={dni} POST_SEARCH")
+                # Espera post-click: toast de error o #divResultado con contenido.
+                # Cada sondeo trae también los eventos y los datos del resultado.
+                lectura: Dict[str, Any] = {}
+                self.espera.esperar("resultado", lambda: self._sondear_resultado(driver, dni, lectura))
 
                 # Error de captcha?
-                error_info = self._detectar_error_captcha(driver)
-                if error_info["hay_error"]:
-                    log.warning(f"[MINEDU] Captcha incorrecto: {error_info['mensaje'][:60]}")
-                    ultimo_motivo = f"{Motivo.MINEDU_CAPTCHA_INCORRECTO}: {error_info['mensaje'][:100]}"
-                    time.sleep(1)
+                if lectura.get("estado") == "error":
+                    mensaje = lectura.get("mensaje") or ""
+                    self._veredicto_captcha(False, envios)
+                    log.warning(f"[MINEDU] Captcha incorrecto: {mensaje[:60]}")
+                    ultimo_motivo = f"{Motivo.MINEDU_CAPTCHA_INCORRECTO}: {mensaje[:100]}"
+                    self.espera.esperar("pausa_error")
                     if not self._refrescar_captcha(driver):
                         need_reload = True
                         ultimo_motivo = Motivo.MINEDU_REFRESCO_CAPTCHA_FALLO
-                    time.sleep(1)
+                    self.espera.esperar("pausa_error")
                     continue
 
-                # Collect logs before checking results
-                self._collect_events(driver, f"DNI={dni} PRE_RESULT")
-
-                # Esperar resultado
-                resultado_html = ""
-                for _ in range(5): # Bot uses 5 check attempts
-                    resultado_html = driver.run_js("""
-                        var div = document.querySelector('#divResultado');
-                        return div ? div.innerHTML : '';
-                    """)
-                    if resultado_html and len(resultado_html) > 50:
-                        break
-                    time.sleep(1)
-
-                if resultado_html:
-                    datos = self._extraer_datos(driver, dni)
+                # Resultado (el sondeo ya leyó #divResultado y extrajo los datos)
+                if lectura.get("html"):
+                    self._veredicto_captcha(True, envios)
+                    if intento == 1:
+                        self.ritmo.exito()
+                    datos = self._formatear_datos(lectura.get("datos"))
                     if datos:
                         return {"encontrado": True, "datos": datos, "motivo": "Encontrado en MINEDU"}
                     return {"encontrado": False, "datos": None, "motivo": Motivo.MINEDU_NO_ENCONTRADO}
                 else:
                     ultimo_motivo = Motivo.MINEDU_TIMEOUT
+                    self.ritmo.penalizar("sin resultado")
 
             except Exception as e:
                 log.error(f"[MINEDU] Error intento {intento}: {e}")
                 self._collect_events(driver, f"DNI={dni} EXCEPTION")
                 need_reload = True
                 ultimo_motivo = f"{Motivo.MINEDU_PAGINA_NO_CARGO}: {str(e)[:200]}"
-                time.sleep(2)
+                self.ritmo.penalizar(f"error: {str(e)[:60]}")
+                self.espera.esperar("pausa_excepcion")
 
         raise RuntimeError(f"{Motivo.MINEDU_MAX_REINTENTOS} ({MINEDU_MAX_RETRIES} intentos) | Último motivo: {ultimo_motivo}")
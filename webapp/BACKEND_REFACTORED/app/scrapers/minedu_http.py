@@ -0,0 +1,316 @@
+"""
+Motor MINEDU sin navegador (MINEDU_ENGINE="http").
+
+La web de MINEDU es un formulario ASP.NET simple: token anti-forgery, captcha
+base64 en `#imgCaptcha`, campos `DOCU_NUM` / `CaptchaCodeText` y `#btnConsultar`.
+Este motor hace lo mismo que el navegador pero con requests:
+  1. GET del formulario (cookies + token + captcha)
+  2. OCR del captcha con el mismo ddddocr de MineduScraper
+  3. POST de la consulta y parseo del HTML de respuesta en el servidor
+Cada worker tiene su propia sesión HTTP (las cookies atan el token al cliente)
+con conexiones keep-alive, así un proceso consulta MINEDU sin Chrome.
+"""
+
+import json
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import (
+    MINEDU_URL, MINEDU_MAX_RETRIES,
+    MINEDU_HTTP_QUERY_PATH, MINEDU_HTTP_TIMEOUT, MINEDU_HTTP_POOL_SIZE,
+)
+from app.scrapers.minedu import MineduScraper, Motivo
+from app.core.metrics import metrics
+
+log = logging.getLogger("MINEDU")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+_PALABRAS_CAPTCHA = ("captcha", "código", "codigo", "verificación", "verificacion")
+# Marcas del parcial de resultados (respuesta XHR sin #divResultado)
+_SELECTOR_TABLA = "table.gobpe-res-tabla-cuerpo"
+_SIN_REGISTROS = re.compile(r"no\s+se\s+encontr\w*\s+(ning[uú]n\s+)?registros?|no\s+existen\s+registros", re.IGNORECASE)
+
+
+class MineduHttpScraper(MineduScraper):
+    """MineduScraper que consulta vía HTTP; `procesar_dni` ignora el driver."""
+
+    MOTOR = "http"
+
+    def __init__(
+        self,
+        base_url: str = MINEDU_URL,
+        query_path: str = MINEDU_HTTP_QUERY_PATH,
+        timeout: float = MINEDU_HTTP_TIMEOUT,
+        perfil_espera: Optional[str] = None,
+    ):
+        super().__init__(perfil_espera)
+        self.base_url = base_url
+        self.query_path = query_path
+        self.timeout = timeout
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=MINEDU_HTTP_POOL_SIZE,
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=(502, 503, 504), allowed_methods=("GET",)),
+        )
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.http.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Language": "es-PE,es;q=0.9",
+        })
+
+    def close(self):
+        self.http.close()
+
+    # ── Formulario ──
+    def _cargar_formulario(self) -> Optional[Dict[str, Any]]:
+        """GET del formulario. Retorna action, campos ocultos, nombres de campos y captcha."""
+        resp = self.http.get(self.base_url, timeout=self.timeout)
+        resp.raise_for_status()
+        soup = BeautifulSoup(resp.text, "html.parser")
+
+        campo_dni = soup.select_one("#DOCU_NUM")
+        img = soup.select_one("#imgCaptcha")
+        if campo_dni is None or img is None:
+            return None
+        form = campo_dni.find_parent("form")
+        contenedor = form or soup
+
+        ocultos = {
+            inp.get("name"): inp.get("value", "")
+            for inp in contenedor.select("input[type=hidden]")
+            if inp.get("name")
+        }
+        campo_captcha = soup.select_one("#CaptchaCodeText")
+        return {
+            "action": urljoin(resp.url, (form.get("action") if form else None) or self.query_path),
+            "ocultos": ocultos,
+            "campo_dni": campo_dni.get("name") or "DOCU_NUM",
+            "campo_captcha": (campo_captcha.get("name") if campo_captcha else None) or "CaptchaCodeText",
+            "captcha_src": img.get("src", ""),
+            "referer": resp.url,
+        }
+
+    def _consultar(self, form: Dict[str, Any], dni: str, captcha_text: str) -> requests.Response:
+        data = dict(form["ocultos"])
+        data[form["campo_dni"]] = dni
+        data[form["campo_captcha"]] = captcha_text
+        resp = self.http.post(
+            form["action"],
+            data=data,
+            headers={"X-Requested-With": "XMLHttpRequest", "Referer": form["referer"]},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp
+
+    # ── Respuesta ──
+    def _interpretar_respuesta(self, resp: requests.Response):
+        """
+        Retorna (estado, valor):
+          ("error", mensaje)      → captcha rechazado
+          ("resultado", datos)    → datos dict o None si la respuesta dice "sin registros"
+          (None, None)            → respuesta no reconocida (se reintenta)
+
+        Cuenta como resultado el contenido de #divResultado, el parcial que un
+        JSON trae para ese div, o el parcial suelto con que la acción MVC
+        responde al POST XHR (la tabla de resultados o el texto "no se
+        encontraron registros", sin el div). Una página de mantenimiento, del
+        WAF o con otro layout no es un "sin registros" que se cachearía como tal.
+        """
+        html = resp.text
+        desde_json = "json" in resp.headers.get("Content-Type", "").lower()
+        if desde_json:
+            try:
+                cuerpo = json.loads(html)
+            except ValueError:
+                return None, None
+            html = _html_en_json(cuerpo)
+            if html is None:
+                mensaje = _mensaje_en_json(cuerpo)
+                if mensaje and any(p in mensaje.lower() for p in _PALABRAS_CAPTCHA):
+                    return "error", mensaje
+                return None, None
+
+        soup = BeautifulSoup(html, "html.parser")
+        error = _error_captcha(soup)
+        if error:
+            return "error", error
+
+        div = soup if desde_json else _contenedor_resultado(soup)
+        if div is None:
+            return None, None
+        return "resultado", extraer_resultado(div)
+
+    # ── Principal ──
+    def procesar_dni(self, driver, dni: str) -> Dict[str, Any]:
+        self.intentos = 0
+        try:
+            return self.procesar_un_dni(driver, dni)
+        finally:
+            metrics.observe("minedu.intentos_por_dni", self.intentos)
+
+    def procesar_un_dni(self, driver, dni: str) -> Dict[str, Any]:
+        """Mismo contrato que MineduScraper.procesar_un_dni (driver no se usa)."""
+        ultimo_motivo = Motivo.MINEDU_MAX_REINTENTOS
+        envios = 0  # Captchas enviados para este DNI
+
+        for intento in range(1, MINEDU_MAX_RETRIES + 1):
+            self.intentos = intento
+            log.info(f"[MINEDU][HTTP] DNI {dni} | Intento {intento}/{MINEDU_MAX_RETRIES}")
+            try:
+                # Cada intento pide formulario nuevo: token y captcha frescos
+                form = self._cargar_formulario()
+                if form is None:
+                    ultimo_motivo = Motivo.MINEDU_PAGINA_NO_CARGO
+                    self.espera.esperar("pausa_excepcion")
+                    continue
+
+                captcha_text = self._ocr_src(form["captcha_src"])
+                if not captcha_text:
+                    ultimo_motivo = Motivo.MINEDU_OCR_FALLO
+                    self.espera.esperar("pausa_error")
+                    continue
+
+                self.espera.esperar("pre_captcha")
+                envios += 1
+                estado, valor = self._interpretar_respuesta(self._consultar(form, dni, captcha_text))
+                if estado is not None:
+                    self._veredicto_captcha(estado == "resultado", envios)
+
+                if estado == "error":
+                    log.warning(f"[MINEDU][HTTP] Captcha incorrecto: {valor[:60]}")
+                    ultimo_motivo = f"{Motivo.MINEDU_CAPTCHA_INCORRECTO}: {valor[:100]}"
+                    self.espera.esperar("pausa_error")
+                    continue
+
+                if estado == "resultado":
+                    if intento == 1:
+                        self.ritmo.exito()
+                    if valor:
+                        return {"encontrado": True, "datos": valor, "motivo": "Encontrado en MINEDU"}
+                    return {"encontrado": False, "datos": None, "motivo": Motivo.MINEDU_NO_ENCONTRADO}
+
+                ultimo_motivo = Motivo.MINEDU_TIMEOUT
+                self.ritmo.penalizar("sin resultado")
+
+            except Exception as e:
+                log.error(f"[MINEDU][HTTP] Error intento {intento}: {e}")
+                ultimo_motivo = f"{Motivo.MINEDU_PAGINA_NO_CARGO}: {str(e)[:200]}"
+                self.ritmo.penalizar(f"error: {str(e)[:60]}")
+                self.espera.esperar("pausa_excepcion")
+
+        raise RuntimeError(f"{Motivo.MINEDU_MAX_REINTENTOS} ({MINEDU_MAX_RETRIES} intentos) | Último motivo: {ultimo_motivo}")
+
+
+# ═══ Parseo del HTML (equivalente a MineduScraper._extraer_datos) ════════
+
+def _texto(nodo) -> str:
+    """Aproxima `innerText`: <br> y bloques generan saltos de línea."""
+    for br in nodo.find_all("br"):
+        br.replace_with("\n")
+    for bloque in nodo.find_all(["p", "div", "li"]):
+        bloque.append("\n")
+    return nodo.get_text()
+
+
+def _lineas(celda) -> list:
+    return [l.strip() for l in _texto(celda).split("\n") if l.strip()]
+
+
+def extraer_resultado(div) -> Optional[Dict[str, Any]]:
+    """Datos del primer título de `table.gobpe-res-tabla-cuerpo`, o None si no hay."""
+    r = {"nombres": "", "titulo": "", "institucion": "", "fecha": "", "nivel": "", "codigo": ""}
+    for tabla in div.select(_SELECTOR_TABLA):
+        for fila in tabla.select("tbody tr") or tabla.select("tr"):
+            celdas = fila.find_all("td")
+            if len(celdas) < 3:
+                continue
+            lineas1 = _lineas(celdas[0])
+            if lineas1:
+                r["nombres"] = lineas1[0]
+            for linea in _lineas(celdas[1]):
+                if ":" not in linea and len(linea) > 5 and not r["titulo"]:
+                    r["titulo"] = linea
+                if "Nivel:" in linea:
+                    r["nivel"] = linea.replace("Nivel:", "").strip()
+                if "Fecha de emisión:" in linea or "Fecha emisión:" in linea:
+                    r["fecha"] = linea.split(":")[1].strip()
+                if "Código DRE:" in linea:
+                    r["codigo"] = linea.split(":")[1].strip()
+            lineas3 = _lineas(celdas[2])
+            if lineas3:
+                r["institucion"] = lineas3[0]
+            if r["titulo"]:
+                break
+        if r["titulo"]:
+            break
+
+    if not r["titulo"]:
+        return None
+    return {
+        "nombre_completo": r["nombres"],
+        "titulo": r["titulo"],
+        "institucion": r["institucion"],
+        "nivel": r["nivel"],
+        "fecha_expedicion": r["fecha"],
+        "codigo_dre": r["codigo"],
+        "fecha_consulta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def _contenedor_resultado(soup):
+    """#divResultado si la respuesta es la página; si es el parcial suelto, el parcial mismo."""
+    div = soup.select_one("#divResultado")
+    if div is not None:
+        return div if len(div.decode_contents().strip()) > 50 else None
+    if soup.select_one(_SELECTOR_TABLA) or _SIN_REGISTROS.search(soup.get_text(" ", strip=True)):
+        return soup
+    return None
+
+
+def _error_captcha(soup) -> str:
+    """Mismo criterio que MineduScraper._detectar_error_captcha, sobre el HTML."""
+    val = soup.select_one('span[data-valmsg-for="CaptchaCodeText"]')
+    if val and val.get_text(strip=True):
+        return val.get_text(strip=True)
+    toast = soup.select_one(".toast-message")
+    if toast and toast.get_text(strip=True):
+        return toast.get_text(strip=True)
+    for alerta in soup.select(".alert-danger, .alert-warning"):
+        txt = alerta.get_text(" ", strip=True)
+        if any(p in txt.lower() for p in _PALABRAS_CAPTCHA):
+            return txt
+    return ""
+
+
+def _html_en_json(cuerpo: Any) -> Optional[str]:
+    """Algunos endpoints MVC devuelven el parcial HTML dentro de un JSON."""
+    if isinstance(cuerpo, str) and "<" in cuerpo:
+        return cuerpo
+    if isinstance(cuerpo, dict):
+        for valor in cuerpo.values():
+            if isinstance(valor, str) and "<table" in valor.lower():
+                return valor
+    return None
+
+
+def _mensaje_en_json(cuerpo: Any) -> str:
+    if isinstance(cuerpo, dict):
+        for clave in ("mensaje", "message", "error", "msg"):
+            if isinstance(cuerpo.get(clave), str):
+                return cuerpo[clave]
+    return ""
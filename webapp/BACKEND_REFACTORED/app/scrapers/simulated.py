@@ -0,0 +1,120 @@
+"""
+Backend simulado (SCRAPER_BACKEND="simulated") — scrapers sin navegador.
+
+Mismo contrato que SuneduScraper / MineduScraper: `procesar_dni(driver, dni)` retorna
+{"encontrado", "datos", "motivo"} o lanza excepción (el loop lo marca ERROR_*). El
+resultado sale de SIMULATED[fuente]:
+  - encontrado: determinista por hash del DNI (tasa_encontrado) → reintentos y caché coherentes
+  - error:      al azar en cada consulta (tasa_error)
+  - latencia:   muestra de la distribución configurada; el worker duerme ese tiempo
+Así se empujan 100k+ DNIs por los worker loops, el Orchestrator y DniRepository sin
+Chrome (benchmarks/pipeline_simulation.py).
+"""
+
+import hashlib
+import math
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import SIMULATED
+from app.core.metrics import metrics
+from app.scrapers.sunedu import Motivo as MotivoSunedu
+from app.scrapers.minedu import Motivo as MotivoMinedu
+
+
+class Distribucion:
+    """Latencia por DNI (segundos) a partir de "tipo:param[:param]"."""
+
+    # tipo → cantidad de parámetros
+    TIPOS = {"const": 1, "uniform": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, spec: str):
+        tipo, *params = spec.split(":")
+        if self.TIPOS.get(tipo) != len(params):
+            raise ValueError(f"Distribución de latencia inválida: {spec!r} "
+                             f"(const:s, uniform:min:max, lognormal:mediana:sigma, exp:media)")
+        self.spec = spec
+        self.tipo = tipo
+        self.params = [float(p) for p in params]
+
+    def muestra(self, rng: random.Random) -> float:
+        a = self.params[0]
+        if self.tipo == "const":
+            return a
+        if self.tipo == "uniform":
+            return rng.uniform(a, self.params[1])
+        if self.tipo == "lognormal":
+            return a * math.exp(rng.gauss(0.0, self.params[1]))  # mediana · e^(σZ)
+        return rng.expovariate(1.0 / a) if a > 0 else 0.0
+
+    def __repr__(self):
+        return f"<Distribucion {self.spec}>"
+
+
+def encontrado(fuente: str, dni: str, tasa: float) -> bool:
+    """Si el DNI "existe" en la fuente simulada (mismo resultado en cada consulta)."""
+    h = int(hashlib.sha1(f"{fuente}:{dni}".encode()).hexdigest()[:8], 16)
+    return h % 10000 < tasa * 10000
+
+
+class SimulatedScraper:
+    """Scraper de una fuente con resultados y latencias programables; `driver` no se usa."""
+
+    MOTOR = "simulated"
+
+    def __init__(self, fuente: str, config: Optional[Dict[str, dict]] = None,
+                 rng: Optional[random.Random] = None):
+        cfg = (config or SIMULATED)[fuente]
+        self.fuente = fuente
+        self.tasa_encontrado = cfg["tasa_encontrado"]
+        self.tasa_error = cfg["tasa_error"]
+        self.latencia = Distribucion(cfg["latencia"])
+        self.rng = rng or random.Random()
+        self.intentos = 0
+
+    def procesar_dni(self, driver, dni: str) -> Dict[str, Any]:
+        self.intentos = 1
+        time.sleep(max(self.latencia.muestra(self.rng), 0.0))
+        metrics.observe(f"{self.fuente}.intentos_por_dni", self.intentos)
+
+        if self.rng.random() < self.tasa_error:
+            maximo = MotivoSunedu.MAX_REINTENTOS if self.fuente == "sunedu" else MotivoMinedu.MINEDU_MAX_REINTENTOS
+            raise RuntimeError(f"{maximo} (simulado)")
+        if not encontrado(self.fuente, dni, self.tasa_encontrado):
+            motivo = MotivoSunedu.NO_ENCONTRADO if self.fuente == "sunedu" else MotivoMinedu.MINEDU_NO_ENCONTRADO
+            return {"encontrado": False, "datos": None, "motivo": motivo}
+        if self.fuente == "sunedu":
+            return {"encontrado": True, "datos": [_registro_sunedu(dni)], "motivo": "Encontrado en SUNEDU"}
+        return {"encontrado": True, "datos": _registro_minedu(dni), "motivo": "Encontrado en MINEDU"}
+
+    def close(self):
+        """Sin recursos que liberar (el loop sin driver lo llama igual que en MineduHttpScraper)."""
+
+
+def _ahora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _registro_sunedu(dni: str) -> Dict[str, Any]:
+    return {
+        "dni": dni,
+        "nombres": f"SIMULADO {dni}, PERSONA",
+        "grado_o_titulo": "BACHILLER EN INGENIERIA (SIMULADO)",
+        "institucion": "UNIVERSIDAD SIMULADA",
+        "fecha_diploma": "01/01/2020",
+        "fecha_consulta": _ahora(),
+    }
+
+
+def _registro_minedu(dni: str) -> Dict[str, Any]:
+    return {
+        "nombre_completo": f"SIMULADO {dni} PERSONA",
+        "titulo": "PROFESIONAL TÉCNICO (SIMULADO)",
+        "institucion": "INSTITUTO SIMULADO",
+        "nivel": "Técnico",
+        "fecha_expedicion": "01/01/2020",
+        "codigo_dre": "0000",
+        "fecha_consulta": _ahora(),
+    }
@@ -3,10 +3,17 @@ import time
 import re
 import logging
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from botasaurus.browser import Driver
-from app.core.config import SUNEDU_URL, SUNEDU_MAX_RETRIES
+from app.core.config import SUNEDU_URL, SUNEDU_MAX_RETRIES, SUNEDU_CAPTURE_MODE, MONITOR_MODE
+from app.scrapers.sunedu_network import SuneduNetworkCapture
+from app.scrapers.cdp_bridge import send_cdp
+from app.scrapers.dom_probe import DomProbe, DriverMedido
+from app.scrapers.cdp_monitor import CdpMonitor
+from app.core.metrics import metrics
+from app.services.pacing import pacing
+from app.services.circuit_breaker import circuit_breakers
 
 log = logging.getLogger("SUNEDU")
 
@@ -93,6 +100,206 @@ MONITOR_INIT_SCRIPT = """
 """
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# DOM PROBE — Librería `window.__scgt` (una llamada run_js por acción)
+# Mismos selectores y criterios que el bot original; ver dom_probe.py
+# ═══════════════════════════════════════════════════════════════════════
+PROBE_SCRIPT = """
+(function() {
+    if (window.__scgt) return;
+    function dormir(ms) { return new Promise(function(r) { setTimeout(r, ms); }); }
+    function inputDni() {
+        return document.querySelector('input[formcontrolname="dni"]') ||
+               document.querySelector('input[type="text"]');
+    }
+    function botonBuscar() {
+        var spans = document.querySelectorAll('span.p-button-label');
+        for (var i = 0; i < spans.length; i++) {
+            if (spans[i].textContent.trim() === 'Buscar') {
+                var btn = spans[i].closest('button');
+                if (btn) return btn;
+            }
+        }
+        var btns = document.querySelectorAll('button');
+        for (var i = 0; i < btns.length; i++) {
+            if (btns[i].textContent.trim().includes('Buscar')) return btns[i];
+        }
+        return null;
+    }
+    function escribir(input, valor) {
+        var setter = Object.getOwnPropertyDescriptor(window.HTMLInputElement.prototype, 'value').set;
+        setter.call(input, valor);
+        input.dispatchEvent(new Event('input', { bubbles: true }));
+        input.dispatchEvent(new Event('change', { bubbles: true }));
+    }
+
+    var P = window.__scgt = {
+        // ── Simples ──
+        estado: function() {
+            var tabla = document.querySelector('table.custom-table');
+            if (tabla && tabla.querySelectorAll('tbody tr.ng-star-inserted').length > 0)
+                return 'tabla';
+            var swal = document.querySelector('.swal2-html-container');
+            if (swal) {
+                var txt = (swal.innerText || '').toLowerCase();
+                if (txt.includes('no se encontraron')) return 'no_encontrado';
+                if (txt.includes('verificaci') && txt.includes('fallid')) return 'verificacion_fallida';
+                if (txt.includes('verificaci') || txt.includes('seguridad')) return 'verificacion';
+            }
+            var cbs = document.querySelectorAll('input[type="checkbox"]');
+            for (var i = 0; i < cbs.length; i++) {
+                if (!cbs[i].checked) {
+                    var r = cbs[i].getBoundingClientRect();
+                    var p = (cbs[i].closest('label') || cbs[i].parentElement);
+                    var pr = p ? p.getBoundingClientRect() : r;
+                    if (r.width > 0 || r.height > 0 || pr.width > 0 || pr.height > 0)
+                        return 'verificacion';
+                }
+            }
+            var iframes = document.querySelectorAll('iframe');
+            for (var i = 0; i < iframes.length; i++) {
+                var src = iframes[i].src || '';
+                if (src.includes('turnstile') || src.includes('challenges')) {
+                    var r = iframes[i].getBoundingClientRect();
+                    if (r.width > 0 && r.height > 0) return 'verificacion';
+                }
+            }
+            if (inputDni()) {
+                var spinner = document.querySelector('.p-progress-spinner, .loading, .spinner');
+                if (!spinner) return 'nada';
+            }
+            return 'cargando';
+        },
+        cerrarSwal: function() {
+            var btn = document.querySelector('button.swal2-close') ||
+                      document.querySelector('button[aria-label="Close this dialog"]');
+            if (btn) btn.click();
+            return !!btn;
+        },
+        eventos: function() {
+            var evts = window.__capturedEvents || [];
+            window.__capturedEvents = [];
+            return evts;
+        },
+        clickCheckbox: function() {
+            var cbs = document.querySelectorAll('input[type="checkbox"]');
+            for (var i = 0; i < cbs.length; i++) {
+                if (!cbs[i].checked) {
+                    cbs[i].click();
+                    if (cbs[i].checked) return 'directo';
+                    var parent = cbs[i].closest('label') || cbs[i].parentElement;
+                    if (parent) { parent.click(); return 'parent'; }
+                }
+            }
+            var w = document.querySelector('.cf-turnstile') || document.querySelector('[data-sitekey]');
+            if (w) { w.click(); return 'widget'; }
+            return false;
+        },
+        extraer: function() {
+            var res = [];
+            var tabla = document.querySelector('table.custom-table');
+            if (!tabla) return res;
+            var filas = tabla.querySelectorAll('tbody tr.ng-star-inserted');
+            filas.forEach(function(fila) {
+                var celdas = fila.querySelectorAll('td');
+                if (celdas.length < 3) return;
+                var ps1 = celdas[0].querySelectorAll('p');
+                var nombre = '', dniT = '';
+                for (var i = 0; i < ps1.length; i++) {
+                    var t = ps1[i].textContent.trim();
+                    if (t.includes('DNI')) dniT = t;
+                    else if (t.length > 3 && t.includes(',')) nombre = t;
+                }
+                var ps2 = celdas[1].querySelectorAll('p');
+                var grado = '', fDip = '';
+                for (var i = 0; i < ps2.length; i++) {
+                    var t = ps2[i].textContent.trim(), tl = t.toLowerCase();
+                    if (tl.includes('fecha de diploma:')) fDip = t.split(':').slice(1).join(':').trim();
+                    else if (t.length > 5 && !tl.startsWith('grado') && !tl.startsWith('fecha') && !grado) grado = t;
+                }
+                var ps3 = celdas[2].querySelectorAll('p');
+                var inst = '';
+                for (var i = 0; i < ps3.length; i++) {
+                    var tu = ps3[i].textContent.trim().toUpperCase();
+                    if (tu.includes('UNIVERSIDAD') || tu.includes('INSTITUTO') || tu.includes('ESCUELA'))
+                        inst = ps3[i].textContent.trim();
+                }
+                res.push({n: nombre, d: dniT, g: grado, i: inst, fd: fDip});
+            });
+            return res;
+        },
+
+        // ── Compuestas ──
+        // Estado + eventos pendientes (cerrar=true: antes cierra el swal y espera ms)
+        reporte: function(cerrar, ms) {
+            if (cerrar) P.cerrarSwal();
+            return dormir(ms || 0).then(function() {
+                return {estado: P.estado(), eventos: P.eventos()};
+            });
+        },
+        // Cerrar swal → ms → click checkbox → msPost → estado
+        verificar: function(ms, msPost) {
+            P.cerrarSwal();
+            return dormir(ms).then(function() {
+                var click = P.clickCheckbox();
+                if (!click) return {click: false, estado: null};
+                return dormir(msPost).then(function() { return {click: click, estado: P.estado()}; });
+            });
+        },
+        // Llenar DNI → click Buscar → estado post-click (reintenta input y click como el bot)
+        buscar: function(dni) {
+            var r = {valor: null, reintentoInput: false, boton: null, reclick: false, estado: null};
+            var input = inputDni();
+            if (!input) { r.valor = 'NO_INPUT'; return r; }
+            escribir(input, dni);
+            r.valor = input.value;
+            var pausa = 500;
+            if (String(r.valor) !== String(dni)) {
+                r.reintentoInput = true;
+                input.focus();
+                input.value = '';
+                escribir(input, dni);
+                pausa = 800;
+            }
+            return dormir(pausa).then(function() {
+                var btn = botonBuscar();
+                if (!btn) { r.boton = 'NOT_FOUND'; return r; }
+                if (btn.disabled) { r.boton = 'DISABLED'; return r; }
+                btn.click();
+                r.boton = 'OK';
+                return dormir(1500).then(function() {
+                    r.estado = P.estado();
+                    if (r.estado !== 'nada') return r;
+                    r.reclick = true;
+                    var b = botonBuscar();
+                    if (b && !b.disabled) b.click();
+                    return dormir(1000).then(function() { r.estado = P.estado(); return r; });
+                });
+            });
+        },
+        // Sondea el estado dentro de la página hasta un resultado; retorna estado + eventos + filas
+        resultado: function(timeoutMs, nadaMs, intervaloMs) {
+            var inicio = Date.now();
+            return new Promise(function(resolve) {
+                (function sondear() {
+                    var t = Date.now() - inicio, e = 'timeout';
+                    if (t < timeoutMs) {
+                        e = P.estado();
+                        if (e === 'cargando' || (e === 'nada' && t <= nadaMs)) {
+                            setTimeout(sondear, intervaloMs);
+                            return;
+                        }
+                    }
+                    var r = {estado: e, eventos: P.eventos(), filas: e === 'tabla' ? P.extraer() : null};
+                    if (e === 'no_encontrado') P.cerrarSwal();
+                    resolve(r);
+                })();
+            });
+        }
+    };
+})();
+"""
+
 class Motivo:
     NO_ENCONTRADO = "No se encontró en SUNEDU - derivado a MINEDU"
     CAPTCHA_FALLO = "Falló la verificación de seguridad/captcha en SUNEDU"
@@ -116,155 +323,133 @@ class SuneduScraper:
 
     URL = SUNEDU_URL
 
-    def __init__(self):
+    def __init__(self, modo_captura: str = SUNEDU_CAPTURE_MODE):
         self._primera_carga = True
+        self._verificaciones = 0  # Desafíos Turnstile vistos en el DNI actual
+        self.intentos = 0         # Intentos (1 + reintentos con F5) usados en el último DNI
         self._cdp_configured = False
+        # Modo "network": el resultado se lee de la respuesta del backend (CDP)
+        self._modo_red = modo_captura == "network"
+        self._red: Optional[SuneduNetworkCapture] = None
+        # Pausa entre DNIs y señales de bloqueo → ritmo AIMD compartido (la pausa la hace el loop)
+        self.ritmo = pacing.get("sunedu")
+        self.circuito = circuit_breakers.get("sunedu")
+        # Librería JS por documento: una llamada run_js por acción
+        self._probe = DomProbe(PROBE_SCRIPT)
+        # MONITOR_MODE="cdp": eventos nativos en un ring buffer (sin script espía ni run_js)
+        self._monitor: Optional[CdpMonitor] = None
 
     # ═══════════════════════════════════════════════════════════════════
-    # MONITOREO CDP
+    # MONITOREO CDP + DOM PROBE
     # ═══════════════════════════════════════════════════════════════════
 
+    @property
+    def _eventos_por_cdp(self) -> bool:
+        return bool(self._monitor and self._monitor.activo)
+
+    def _scripts_documento(self) -> str:
+        """Script espía (si no hay monitoreo CDP) + librería `__scgt`."""
+        return ("" if self._eventos_por_cdp else MONITOR_INIT_SCRIPT) + PROBE_SCRIPT
+
     def _setup_cdp_monitoring(self, driver: Driver):
+        """Registra monitor + librería `__scgt` para cada documento nuevo (un solo comando CDP)."""
         if self._cdp_configured:
             return
+        if MONITOR_MODE == "cdp" and self._monitor is None:
+            self._monitor = CdpMonitor.para(driver)
         try:
-            selenium_driver = getattr(driver, '_driver', None) or getattr(driver, 'driver', None)
-            if selenium_driver and hasattr(selenium_driver, 'execute_cdp_cmd'):
-                selenium_driver.execute_cdp_cmd(
-                    'Page.addScriptToEvaluateOnNewDocument',
-                    {'source': MONITOR_INIT_SCRIPT}
-                )
-                self._cdp_configured = True
-                log.info("[MONITOR] ✅ CDP monitoring activo")
-                return
+            send_cdp(driver, 'Page.addScriptToEvaluateOnNewDocument',
+                     {'source': self._scripts_documento()})
+            self._cdp_configured = True
+            log.info("[MONITOR] ✅ CDP monitoring + DOM probe activos")
+            return
         except Exception as e:
             log.warning(f"[MONITOR] CDP no disponible ({e}), usando fallback")
         self._inject_monitor_fallback(driver)
 
     def _inject_monitor_fallback(self, driver: Driver):
         try:
-            driver.run_js(MONITOR_INIT_SCRIPT)
+            driver.run_js(self._scripts_documento())
         except Exception:
             pass
 
     def _collect_events(self, driver: Driver, context: str = ""):
+        if self._eventos_por_cdp:
+            self._registrar_eventos([], context)  # Solo el ring buffer: sin round trip
+            return
         try:
-            events = driver.run_js("""
-                var evts = window.__capturedEvents || [];
-                window.__capturedEvents = [];
-                return evts;
-            """)
-            if not events:
-                return
-            for evt in events:
-                tipo = evt.get("type", "UNKNOWN")
-                level = evt.get("level", "")
-                if tipo == "CONSOLE":
-                    msg = f"[BROWSER][CONSOLE.{level.upper()}] {evt.get('message', '')}"
-                elif tipo == "JS_ERROR":
-                    msg = f"[BROWSER][JS_ERROR] {evt.get('message', '')} @ {evt.get('source', '')}:{evt.get('line', '')}"
-                elif tipo == "HTTP_ERROR":
-                    msg = f"[BROWSER][HTTP_{evt.get('status', '???')}] {evt.get('method', '')} {evt.get('url', '')}"
-                elif tipo == "NETWORK_ERROR":
-                    msg = f"[BROWSER][NET_FAIL] {evt.get('method', '')} {evt.get('url', '')} — {evt.get('message', '')}"
-                else:
-                    msg = f"[BROWSER][{tipo}] {evt}"
-                if context:
-                    msg = f"[{context}] {msg}"
-                if tipo in ("JS_ERROR", "NETWORK_ERROR", "PROMISE_ERROR") or (tipo == "HTTP_ERROR" and evt.get("status", 0) >= 500):
-                    log.error(msg)
-                elif tipo == "HTTP_ERROR" or (tipo == "CONSOLE" and level == "warn"):
-                    log.warning(msg)
-                else:
-                    log.debug(msg)
+            self._registrar_eventos(self._probe.llamar(driver, "eventos"), context)
         except Exception:
             pass
 
+    def _registrar_eventos(self, events, context: str = ""):
+        """Vuelca al log los eventos capturados por el monitor (ya leídos del navegador)."""
+        if self._eventos_por_cdp:
+            events = list(events or []) + self._monitor.drenar()
+        for evt in events or []:
+            tipo = evt.get("type", "UNKNOWN")
+            level = evt.get("level", "")
+            if tipo == "CONSOLE":
+                msg = f"[BROWSER][CONSOLE.{level.upper()}] {evt.get('message', '')}"
+            elif tipo == "JS_ERROR":
+                msg = f"[BROWSER][JS_ERROR] {evt.get('message', '')} @ {evt.get('source', '')}:{evt.get('line', '')}"
+            elif tipo == "HTTP_ERROR":
+                msg = f"[BROWSER][HTTP_{evt.get('status', '???')}] {evt.get('method', '')} {evt.get('url', '')}"
+            elif tipo == "NETWORK_ERROR":
+                msg = f"[BROWSER][NET_FAIL] {evt.get('method', '')} {evt.get('url', '')} — {evt.get('message', '')}"
+            elif tipo == "LOG":
+                msg = f"[BROWSER][LOG.{level.upper()}] {evt.get('message', '')} {evt.get('source', '')}".rstrip()
+            else:
+                msg = f"[BROWSER][{tipo}] {evt}"
+            if context:
+                msg = f"[{context}] {msg}"
+            if tipo in ("JS_ERROR", "NETWORK_ERROR", "PROMISE_ERROR") or (tipo == "HTTP_ERROR" and evt.get("status", 0) >= 500):
+                log.error(msg)
+            elif tipo == "HTTP_ERROR" or (tipo in ("CONSOLE", "LOG") and level in ("warn", "warning", "error")):
+                log.warning(msg)
+            else:
+                log.debug(msg)
+
     # ═══════════════════════════════════════════════════════════════════
-    # DETECCIÓN DE ESTADO — Idéntico al bot original
+    # DETECCIÓN DE ESTADO — Mismo criterio que el bot original (PROBE_SCRIPT)
     # ═══════════════════════════════════════════════════════════════════
 
     def detectar_estado(self, driver: Driver) -> str:
         """Retorna: 'tabla', 'no_encontrado', 'verificacion_fallida', 'verificacion', 'nada', 'cargando'"""
         try:
-            return driver.run_js("""
-                var tabla = document.querySelector('table.custom-table');
-                if (tabla && tabla.querySelectorAll('tbody tr.ng-star-inserted').length > 0)
-                    return 'tabla';
-                var swal = document.querySelector('.swal2-html-container');
-                if (swal) {
-                    var txt = (swal.innerText || '').toLowerCase();
-                    if (txt.includes('no se encontraron')) return 'no_encontrado';
-                    if (txt.includes('verificaci') && txt.includes('fallid')) return 'verificacion_fallida';
-                    if (txt.includes('verificaci') || txt.includes('seguridad')) return 'verificacion';
-                }
-                var cbs = document.querySelectorAll('input[type="checkbox"]');
-                for (var i = 0; i < cbs.length; i++) {
-                    if (!cbs[i].checked) {
-                        var r = cbs[i].getBoundingClientRect();
-                        var p = (cbs[i].closest('label') || cbs[i].parentElement);
-                        var pr = p ? p.getBoundingClientRect() : r;
-                        if (r.width > 0 || r.height > 0 || pr.width > 0 || pr.height > 0)
-                            return 'verificacion';
-                    }
-                }
-                var iframes = document.querySelectorAll('iframe');
-                for (var i = 0; i < iframes.length; i++) {
-                    var src = iframes[i].src || '';
-                    if (src.includes('turnstile') || src.includes('challenges')) {
-                        var r = iframes[i].getBoundingClientRect();
-                        if (r.width > 0 && r.height > 0) return 'verificacion';
-                    }
-                }
-                var input = document.querySelector('input[formcontrolname="dni"]') ||
-                            document.querySelector('input[type="text"]');
-                if (input) {
-                    var spinner = document.querySelector('.p-progress-spinner, .loading, .spinner');
-                    if (!spinner) return 'nada';
-                }
-                return 'cargando';
-            """)
+            return self._probe.llamar(driver, "estado") or 'cargando'
         except Exception:
             return 'cargando'
 
+    def _reporte(self, driver: Driver, cerrar: bool = False, ms: int = 0) -> Dict[str, Any]:
+        """(Cerrar swal + esperar ms) + estado + eventos pendientes, en un round trip."""
+        try:
+            return self._probe.llamar(driver, "reporte", cerrar, ms) or {"estado": "cargando", "eventos": []}
+        except Exception:
+            return {"estado": "cargando", "eventos": []}
+
     # ═══════════════════════════════════════════════════════════════════
-    # ACCIONES — Idénticas al bot original
+    # ACCIONES — Mismos pasos que el bot original (PROBE_SCRIPT)
     # ═══════════════════════════════════════════════════════════════════
 
     def cerrar_swal(self, driver: Driver):
         try:
-            driver.run_js("""
-                var btn = document.querySelector('button.swal2-close') ||
-                          document.querySelector('button[aria-label="Close this dialog"]');
-                if (btn) btn.click();
-            """)
+            self._probe.llamar(driver, "cerrarSwal")
         except Exception:
             pass
 
     def click_checkbox(self, driver: Driver) -> bool:
         """Intenta clickear el checkbox de verificación."""
         try:
-            clicked = driver.run_js("""
-                var cbs = document.querySelectorAll('input[type="checkbox"]');
-                for (var i = 0; i < cbs.length; i++) {
-                    if (!cbs[i].checked) {
-                        cbs[i].click();
-                        if (cbs[i].checked) return 'directo';
-                        var parent = cbs[i].closest('label') || cbs[i].parentElement;
-                        if (parent) { parent.click(); return 'parent'; }
-                    }
-                }
-                var w = document.querySelector('.cf-turnstile') || document.querySelector('[data-sitekey]');
-                if (w) { w.click(); return 'widget'; }
-                return false;
-            """)
+            clicked = self._probe.llamar(driver, "clickCheckbox")
             if clicked:
                 log.info(f"[CHECK] Click: {clicked}")
                 return True
         except Exception:
             pass
+        return self._click_checkbox_selenium(driver)
 
-        # Fallback: Selenium click
+    def _click_checkbox_selenium(self, driver: Driver) -> bool:
         try:
             cb = driver.select('input[type="checkbox"]', wait=2)
             if cb:
@@ -273,191 +458,157 @@ class SuneduScraper:
                 return True
         except Exception:
             pass
-
         return False
 
+    def _clic_verificacion(self, driver: Driver) -> str:
+        """
+        Cerrar swal → 0.5s → click checkbox → 3s → estado. Un round trip si el
+        click JS funciona; si no, fallback Selenium como antes.
+        """
+        try:
+            r = self._probe.llamar(driver, "verificar", 500, 3000, timeout=15)
+        except Exception:
+            r = None
+        if r and r.get("click"):
+            log.info(f"[CHECK] Click: {r['click']}")
+            return r.get("estado") or 'cargando'
+        if r is None:
+            self.cerrar_swal(driver)
+            time.sleep(0.5)
+            self.click_checkbox(driver)
+        else:
+            self._click_checkbox_selenium(driver)
+        time.sleep(3)
+        return self.detectar_estado(driver)
+
     def buscar_dni(self, driver: Driver, dni: str) -> bool:
-        """Ingresa DNI y click en Buscar. Retorna True si la búsqueda fue disparada."""
-        # ── 1. Ingresar DNI en el campo ──
-        dni_ok = driver.run_js(f"""
-            var input = document.querySelector('input[formcontrolname="dni"]') ||
-                        document.querySelector('input[type="text"]');
-            if (!input) return 'NO_INPUT';
-            var setter = Object.getOwnPropertyDescriptor(
-                window.HTMLInputElement.prototype, 'value').set;
-            setter.call(input, '{dni}');
-            input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-            input.dispatchEvent(new Event('change', {{ bubbles: true }}));
-            return input.value;
-        """)
-        if dni_ok == 'NO_INPUT':
+        """
+        Ingresa DNI, click en Buscar y verifica que la búsqueda se disparó.
+        Todo ocurre dentro de la página (PROBE_SCRIPT.buscar) en un round trip.
+        """
+        r = self._probe.llamar(driver, "buscar", str(dni), timeout=20) or {}
+
+        if r.get("valor") == 'NO_INPUT':
             log.error("[DNI] Campo de entrada no encontrado")
             return False
-        if str(dni_ok) != str(dni):
-            log.warning(f"[DNI] Valor del campo='{dni_ok}' != DNI esperado='{dni}'. Reintentando input...")
-            # Segundo intento con focus + clear
-            driver.run_js(f"""
-                var input = document.querySelector('input[formcontrolname="dni"]') ||
-                            document.querySelector('input[type="text"]');
-                if (input) {{
-                    input.focus();
-                    input.value = '';
-                    var setter = Object.getOwnPropertyDescriptor(
-                        window.HTMLInputElement.prototype, 'value').set;
-                    setter.call(input, '{dni}');
-                    input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    input.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                }}
-            """)
-            time.sleep(0.3)
-
-        time.sleep(0.5)
-
-        # ── 2. Encontrar y clickear botón Buscar ──
-        btn_result = driver.run_js("""
-            var spans = document.querySelectorAll('span.p-button-label');
-            for (var i = 0; i < spans.length; i++) {
-                if (spans[i].textContent.trim() === 'Buscar') {
-                    var btn = spans[i].closest('button');
-                    if (btn) {
-                        if (btn.disabled) return 'DISABLED';
-                        btn.click();
-                        return 'OK';
-                    }
-                }
-            }
-            var btns = document.querySelectorAll('button');
-            for (var i = 0; i < btns.length; i++) {
-                if (btns[i].textContent.trim().includes('Buscar')) {
-                    if (btns[i].disabled) return 'DISABLED';
-                    btns[i].click();
-                    return 'OK';
-                }
-            }
-            return 'NOT_FOUND';
-        """)
-
-        if btn_result == 'NOT_FOUND':
+        if r.get("reintentoInput"):
+            log.warning(f"[DNI] Valor del campo='{r.get('valor')}' != DNI esperado='{dni}'. Se reintentó el input")
+        if r.get("boton") == 'NOT_FOUND':
             log.error("[BUSCAR] Botón no encontrado en el DOM")
             return False
-        if btn_result == 'DISABLED':
+        if r.get("boton") == 'DISABLED':
             log.error("[BUSCAR] Botón encontrado pero está DISABLED (verificación pendiente?)")
             return False
 
-        # ── 3. Verificar que la búsqueda se disparó ──
-        time.sleep(1.5)
-        post_estado = self.detectar_estado(driver)
+        post_estado = r.get("estado")
+        if r.get("reclick"):
+            log.warning("[BUSCAR] Click no disparó búsqueda (estado='nada'), se reintentó el click")
         if post_estado == 'nada':
-            # La página no reaccionó al click → intentar click de nuevo
-            log.warning("[BUSCAR] Click no disparó búsqueda (estado='nada'), reintentando click...")
-            driver.run_js("""
-                var spans = document.querySelectorAll('span.p-button-label');
-                for (var i = 0; i < spans.length; i++) {
-                    if (spans[i].textContent.trim() === 'Buscar') {
-                        var btn = spans[i].closest('button');
-                        if (btn && !btn.disabled) { btn.click(); return; }
-                    }
-                }
-            """)
-            time.sleep(1)
-            post_estado = self.detectar_estado(driver)
-            if post_estado == 'nada':
-                log.error("[BUSCAR] Segundo click tampoco disparó búsqueda → fallo")
-                return False
+            log.error("[BUSCAR] Segundo click tampoco disparó búsqueda → fallo")
+            return False
 
         log.info(f"[OK] DNI {dni} buscado → estado post-click: {post_estado}")
         return True
 
     def esperar_resultado(self, driver: Driver, timeout: int = 15) -> str:
         """Espera resultado post-búsqueda."""
+        return self._sondear_resultado(driver, timeout)["estado"]
+
+    def _sondear_resultado(self, driver: Driver, timeout: float = 15) -> Dict[str, Any]:
+        """
+        Espera el resultado sondeando dentro de la página (un round trip).
+        Retorna {"estado", "eventos", "filas"}; filas = tabla cruda si estado == 'tabla'.
+        Si la espera en la página falla (navegación, contexto destruido), sondea desde Python.
+        """
         inicio = time.time()
+        try:
+            r = self._probe.llamar(driver, "resultado", int(timeout * 1000), 12000, 250,
+                                   timeout=timeout + 10)
+            if r and r.get("estado"):
+                return r
+        except Exception as e:
+            log.debug(f"[PROBE] Espera en página falló ({e}), sondeando desde Python")
+
         while time.time() - inicio < timeout:
             estado = self.detectar_estado(driver)
             if estado not in ('cargando', 'nada'):
-                return estado
+                return {"estado": estado, "eventos": [], "filas": None}
             if estado == 'nada' and (time.time() - inicio) > 12:
-                return 'nada'
+                return {"estado": 'nada', "eventos": [], "filas": None}
             time.sleep(0.5)
-        return 'timeout'
+        return {"estado": 'timeout', "eventos": [], "filas": None}
+
+    def _esperar_resultado_red(self, driver: Driver, dni: str, timeout: int = 15):
+        """
+        Espera la respuesta del backend SUNEDU (modo "network").
+        Cada 2s revisa el DOM por si apareció la verificación (no hay respuesta de red).
+        Retorna (resultado, datos); datos=None → extraer de la tabla como en modo DOM.
+        """
+        inicio = time.time()
+        while time.time() - inicio < timeout:
+            captura = self._red.esperar(driver, dni, timeout=2)
+            if captura and captura["estado"] != "dom":
+                return captura["estado"], captura["datos"]
+            if captura:
+                break  # Llegó pero no se entiende → DOM
+            estado = self.detectar_estado(driver)
+            if estado in ('verificacion', 'verificacion_fallida'):
+                return estado, None
+        restante = max(timeout - (time.time() - inicio), 3)
+        sondeo = self._sondear_resultado(driver, timeout=restante)
+        self._registrar_eventos(sondeo.get("eventos"), f"DNI={dni} POST")
+        return sondeo["estado"], self._parsear_filas(sondeo.get("filas"), dni) or None
 
     def extraer_datos(self, driver: Driver, dni: str) -> List[Dict[str, Any]]:
         try:
-            data = driver.run_js("""
-                var res = [];
-                var tabla = document.querySelector('table.custom-table');
-                if (!tabla) return res;
-                var filas = tabla.querySelectorAll('tbody tr.ng-star-inserted');
-                filas.forEach(function(fila) {
-                    var celdas = fila.querySelectorAll('td');
-                    if (celdas.length < 3) return;
-                    var ps1 = celdas[0].querySelectorAll('p');
-                    var nombre = '', dniT = '';
-                    for (var i = 0; i < ps1.length; i++) {
-                        var t = ps1[i].textContent.trim();
-                        if (t.includes('DNI')) dniT = t;
-                        else if (t.length > 3 && t.includes(',')) nombre = t;
-                    }
-                    var ps2 = celdas[1].querySelectorAll('p');
-                    var grado = '', fDip = '';
-                    for (var i = 0; i < ps2.length; i++) {
-                        var t = ps2[i].textContent.trim(), tl = t.toLowerCase();
-                        if (tl.includes('fecha de diploma:')) fDip = t.split(':').slice(1).join(':').trim();
-                        else if (t.length > 5 && !tl.startsWith('grado') && !tl.startsWith('fecha') && !grado) grado = t;
-                    }
-                    var ps3 = celdas[2].querySelectorAll('p');
-                    var inst = '';
-                    for (var i = 0; i < ps3.length; i++) {
-                        var tu = ps3[i].textContent.trim().toUpperCase();
-                        if (tu.includes('UNIVERSIDAD') || tu.includes('INSTITUTO') || tu.includes('ESCUELA'))
-                            inst = ps3[i].textContent.trim();
-                    }
-                    res.push({n: nombre, d: dniT, g: grado, i: inst, fd: fDip});
-                });
-                return res;
-            """)
-
-            if not data:
-                return []
-
-            registros = []
-            log.info(f"[OK] {len(data)} registro(s)")
-            for idx, f in enumerate(data, 1):
-                m = re.search(r'(\d{7,8})', f.get('d', ''))
-                r = {
-                    "dni": m.group(1) if m else dni,
-                    "nombres": f.get("n", "").strip(),
-                    "grado_o_titulo": f.get("g", "").strip(),
-                    "institucion": f.get("i", "").strip(),
-                    "fecha_diploma": f.get("fd", ""),
-                    "fecha_consulta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                }
-                log.info(f"  [{idx}] {r['nombres']} | {r['grado_o_titulo'][:50]}")
-                registros.append(r)
-            return registros
+            return self._parsear_filas(self._probe.llamar(driver, "extraer"), dni)
         except Exception as e:
             log.error(f"[EXTRACT] Error: {e}")
             return []
 
+    def _parsear_filas(self, data, dni: str) -> List[Dict[str, Any]]:
+        """Filas crudas de PROBE_SCRIPT.extraer → payload SUNEDU."""
+        if not data:
+            return []
+
+        registros = []
+        log.info(f"[OK] {len(data)} registro(s)")
+        for idx, f in enumerate(data, 1):
+            m = re.search(r'(\d{7,8})', f.get('d', ''))
+            r = {
+                "dni": m.group(1) if m else dni,
+                "nombres": f.get("n", "").strip(),
+                "grado_o_titulo": f.get("g", "").strip(),
+                "institucion": f.get("i", "").strip(),
+                "fecha_diploma": f.get("fd", ""),
+                "fecha_consulta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            log.info(f"  [{idx}] {r['nombres']} | {r['grado_o_titulo'][:50]}")
+            registros.append(r)
+        return registros
+
     # ═══════════════════════════════════════════════════════════════════
     # _pasar_verificacion — COPIA EXACTA del bot original (workers.py)
     # ═══════════════════════════════════════════════════════════════════
 
-    def _pasar_verificacion(self, driver: Driver, espera_extra: bool = False) -> bool:
+    def _pasar_verificacion(self, driver: Driver, espera_extra: bool = False,
+                            estado: Optional[str] = None) -> bool:
         """
         Detecta y supera la verificación de Turnstile/checkbox.
         espera_extra: True si la página fue recién cargada/recargada.
+        estado: estado inicial ya leído por el llamador (evita otro round trip).
         Retorna True si la verificación fue superada o no era necesaria.
 
         PORTADO DIRECTAMENTE de workers.py SuneduLogic._pasar_verificacion()
         """
-        estado = self.detectar_estado(driver)
+        estado = estado or self.detectar_estado(driver)
         log.info(f"[VERIF] Estado inicial: {estado}")
 
         # Limpiar resultados viejos de un DNI anterior
         if estado in ("tabla", "no_encontrado"):
-            self.cerrar_swal(driver)
-            time.sleep(0.5)
-            estado = self.detectar_estado(driver)
+            reporte = self._reporte(driver, cerrar=True, ms=500)
+            self._registrar_eventos(reporte["eventos"], "VERIF")
+            estado = reporte["estado"]
             log.info(f"[VERIF] Estado post-limpieza: {estado}")
 
         # Si la página es fresca, dar tiempo extra para que cargue Turnstile
@@ -467,6 +618,9 @@ class SuneduScraper:
             estado = self.detectar_estado(driver)
             log.info(f"[VERIF] Estado post-espera: {estado}")
 
+        if estado in ("verificacion", "verificacion_fallida"):
+            self._verificaciones += 1
+
         # Verificación fallida explícita → no se puede superar, necesita F5
         if estado == "verificacion_fallida":
             log.warning("[VERIF] ❌ Verificación fallida explícita")
@@ -481,12 +635,7 @@ class SuneduScraper:
         # Intentar pasar la verificación (hasta 3 intentos)
         for attempt in range(3):
             log.info(f"[VERIF] Intento {attempt + 1}/3 de resolver verificación...")
-            self.cerrar_swal(driver)
-            time.sleep(0.5)
-            self.click_checkbox(driver)
-            time.sleep(3)
-
-            post = self.detectar_estado(driver)
+            post = self._clic_verificacion(driver)
             log.info(f"[VERIF] Estado post-click: {post}")
 
             if post == "verificacion_fallida":
@@ -525,6 +674,22 @@ class SuneduScraper:
     # ═══════════════════════════════════════════════════════════════════
 
     def procesar_dni(self, driver: Driver, dni: str) -> Dict[str, Any]:
+        """Procesa un DNI contando los round trips al navegador (métrica por DNI)."""
+        medido = DriverMedido(driver)
+        self._verificaciones = 0
+        self.intentos = 0
+        try:
+            return self._procesar_dni(medido, dni)
+        finally:
+            metrics.observe("sunedu.round_trips_por_dni", medido.round_trips)
+            metrics.observe("sunedu.intentos_por_dni", self.intentos)
+            # Frecuencia de Turnstile (baja con perfiles persistentes con clearance)
+            metrics.observe("sunedu.verificaciones_por_dni", self._verificaciones)
+            if self._verificaciones:
+                metrics.incr("sunedu.dnis_con_verificacion")
+            log.info(f"[PROBE] DNI {dni}: {medido.round_trips} round trips")
+
+    def _procesar_dni(self, driver: Driver, dni: str) -> Dict[str, Any]:
         """
         PORTADO DIRECTAMENTE de workers.py SuneduLogic.procesar_un_dni()
 
@@ -540,11 +705,18 @@ class SuneduScraper:
         ultimo_motivo = Motivo.MAX_REINTENTOS
 
         for intento in range(1, SUNEDU_MAX_RETRIES + 1):
+            if intento > 1 and self.circuito.cortado:
+                # Otro worker abrió el circuito: no gastar más F5 en este DNI
+                raise RuntimeError(f"{ultimo_motivo} (circuito abierto tras {intento - 1} intentos)")
+            self.intentos = intento
             log.info(f"{'='*50}")
             log.info(f"DNI: {dni} | Intento {intento}/{SUNEDU_MAX_RETRIES}")
             log.info(f"{'='*50}")
 
             try:
+                if self._modo_red and self._red is None:
+                    self._red = SuneduNetworkCapture.para(driver)
+
                 # ── Preparar página (cada reintento repite el flujo completo) ──
                 pagina_fresca = False
 
@@ -562,72 +734,77 @@ class SuneduScraper:
                     log.info(f"[REINTENTO {intento}] Repitiendo flujo completo: F5 → verificar → buscar → esperar")
                     self._recargar_pagina(driver)
                     pagina_fresca = True
-                else:
-                    # Nuevo DNI, misma sesión → limpiar estado anterior
-                    self.cerrar_swal(driver)
-                    time.sleep(0.3)
 
-                # Recoger eventos
-                self._collect_events(driver, f"DNI={dni} PRE")
+                # Nuevo DNI, misma sesión → cerrar swal + 0.3s; en todos los casos
+                # recoger eventos + estado inicial (un round trip)
+                reporte = self._reporte(driver, cerrar=not pagina_fresca, ms=0 if pagina_fresca else 300)
+                self._registrar_eventos(reporte["eventos"], f"DNI={dni} PRE")
 
                 # ── Verificación de seguridad (Turnstile) ──
-                if not self._pasar_verificacion(driver, espera_extra=pagina_fresca):
+                if not self._pasar_verificacion(driver, espera_extra=pagina_fresca, estado=reporte["estado"]):
                     log.warning("[VERIF] Verificación no superada → siguiente intento con F5")
                     ultimo_motivo = Motivo.VERIFICACION_NO_SUPERADA
+                    self.ritmo.penalizar("verificación no superada")
                     continue
 
                 # ── Buscar DNI ──
+                usar_red = bool(self._red and self._red.activo)
+                if usar_red:
+                    self._red.armar()
                 if not self.buscar_dni(driver, dni):
                     log.warning("[BUSCAR] Búsqueda no se disparó → siguiente intento con F5")
                     ultimo_motivo = Motivo.BOTON_NO_ENCONTRADO
                     continue
 
                 # Esperar resultado (buscar_dni ya verificó que se disparó la búsqueda)
-                resultado = self.esperar_resultado(driver, timeout=15)
+                if usar_red:
+                    resultado, datos = self._esperar_resultado_red(driver, dni, timeout=15)
+                    self._collect_events(driver, f"DNI={dni} POST")
+                else:
+                    # Estado + eventos post-búsqueda + filas de la tabla en un round trip
+                    sondeo = self._sondear_resultado(driver, timeout=15)
+                    resultado = sondeo["estado"]
+                    self._registrar_eventos(sondeo.get("eventos"), f"DNI={dni} POST")
+                    datos = self._parsear_filas(sondeo.get("filas"), dni) or None
                 log.info(f"[RESULTADO] {resultado}")
 
-                # Recoger eventos post-búsqueda
-                self._collect_events(driver, f"DNI={dni} POST")
-
                 if resultado == "tabla":
-                    datos = self.extraer_datos(driver, dni)
+                    datos = datos or self.extraer_datos(driver, dni)
                     if datos:
-                        time.sleep(4)  # Espera anti-ban
+                        if intento == 1:
+                            self.ritmo.exito()
                         return {"encontrado": True, "datos": datos, "motivo": "Encontrado en SUNEDU"}
                     return {"encontrado": False, "datos": None, "motivo": Motivo.ERROR_EXTRACCION}
 
                 elif resultado == "no_encontrado":
-                    self.cerrar_swal(driver)
+                    if usar_red:
+                        self.cerrar_swal(driver)  # En modo DOM lo cerró el sondeo
                     log.info(f"[--] DNI {dni}: No encontrado")
-                    time.sleep(4)  # Espera anti-ban
+                    if intento == 1:
+                        self.ritmo.exito()
                     return {"encontrado": False, "datos": None, "motivo": Motivo.NO_ENCONTRADO}
 
                 elif resultado == "verificacion_fallida":
                     log.warning("[VERIF] Verificación fallida post-búsqueda → siguiente intento con F5")
                     self.cerrar_swal(driver)
                     ultimo_motivo = Motivo.CAPTCHA_FALLO
+                    self.ritmo.penalizar("verificación fallida post-búsqueda")
                     continue
 
                 elif resultado == "verificacion":
                     log.warning("[VERIF] Verificación post-búsqueda")
-                    self.cerrar_swal(driver)
-                    time.sleep(0.5)
-                    self.click_checkbox(driver)
-                    time.sleep(3)
-
-                    post = self.detectar_estado(driver)
+                    self.ritmo.penalizar("verificación post-búsqueda")
+                    post = self._clic_verificacion(driver)
                     log.info(f"[VERIF] Post-click estado: {post}")
 
                     if post == "tabla":
                         datos = self.extraer_datos(driver, dni)
                         if datos:
-                            time.sleep(4)
                             return {"encontrado": True, "datos": datos, "motivo": "Encontrado en SUNEDU"}
                         return {"encontrado": False, "datos": None, "motivo": Motivo.ERROR_EXTRACCION}
 
                     elif post == "no_encontrado":
                         self.cerrar_swal(driver)
-                        time.sleep(4)
                         return {"encontrado": False, "datos": None, "motivo": Motivo.NO_ENCONTRADO}
 
                     else:
@@ -640,12 +817,14 @@ class SuneduScraper:
                     log.warning("[NADA] Sin resultado ni mensaje → siguiente intento con F5")
                     self._collect_events(driver, f"DNI={dni} NADA")
                     ultimo_motivo = Motivo.NADA_APARECIO
+                    self.ritmo.penalizar("sin resultado")
                     continue
 
                 elif resultado == "timeout":
                     log.warning("[TIMEOUT] Sin respuesta → siguiente intento con F5")
                     self._collect_events(driver, f"DNI={dni} TIMEOUT")
                     ultimo_motivo = Motivo.TIMEOUT
+                    self.ritmo.penalizar("timeout")
                     continue
 
             except Exception as e:
@@ -0,0 +1,217 @@
+"""
+Captura de la respuesta de búsqueda SUNEDU vía eventos CDP Network.
+
+En vez de sondear el DOM cada 0.5s (`detectar_estado`) y recorrer la tabla con
+JavaScript (`extraer_datos`), escucha la respuesta XHR/fetch del backend de
+SUNEDU y parsea el JSON directamente. Da además el instante exacto en que llegó
+la respuesta (métrica `sunedu.network.response_ms`).
+
+Si el driver no soporta eventos CDP, la respuesta no llega (ej. la búsqueda la
+bloqueó Turnstile) o el JSON no se entiende, el scraper vuelve al modo DOM.
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from botasaurus.browser import Driver
+
+from app.core.config import SUNEDU_API_URL_PATTERN
+from app.core.metrics import metrics
+from app.scrapers.cdp_bridge import send_cdp, on_cdp_event
+from app.scrapers.dom_probe import driver_real
+
+log = logging.getLogger("SUNEDU")
+
+# Claves candidatas (minúsculas) del JSON de SUNEDU → campos del payload
+_CLAVES = {
+    "nombres": ("nombrecompleto", "apellidosnombres", "nombresapellidos", "nombres", "nombre"),
+    "apellidos": ("apellidos", "apellidopaterno"),
+    "apellido_materno": ("apellidomaterno",),
+    "dni": ("dni", "numerodocumento", "nrodocumento", "documento"),
+    "grado_o_titulo": ("gradotitulo", "gradootitulo", "denominacion", "grado", "titulo"),
+    "institucion": ("universidad", "institucion", "entidad", "nombreuniversidad"),
+    "fecha_diploma": ("fechadiploma", "fecdiploma", "fechaemision"),
+}
+_CONTENEDORES = ("data", "items", "result", "resultado", "resultados", "lista", "registros", "content")
+
+
+class SuneduNetworkCapture:
+    """Escucha las respuestas del endpoint de búsqueda SUNEDU en un driver."""
+
+    def __init__(self, url_pattern: str = SUNEDU_API_URL_PATTERN):
+        self._pattern = re.compile(url_pattern, re.IGNORECASE)
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._request_id: Optional[str] = None
+        self._status: int = 0
+        self._armado_en: float = 0.0
+        self._llegada_en: float = 0.0
+        self.activo = False
+
+    # ── Suscripción ──
+    @classmethod
+    def para(cls, driver: Driver) -> "SuneduNetworkCapture":
+        """Captura del driver: se crea y suscribe una sola vez por driver (el pool los reutiliza)."""
+        real = driver_real(driver)
+        captura = getattr(real, "_captura_sunedu", None)
+        if captura is None:
+            captura = cls()
+            captura.attach(real)
+            try:
+                real._captura_sunedu = captura
+            except AttributeError:
+                pass
+        else:
+            captura.desarmar()  # Respuesta pendiente del worker anterior
+        return captura
+
+    def attach(self, driver: Driver) -> bool:
+        """Habilita Network y registra los handlers. Retorna False si no hay eventos CDP."""
+        try:
+            ok = (on_cdp_event(driver, "Network.responseReceived", self._on_response)
+                  and on_cdp_event(driver, "Network.loadingFinished", self._on_finished))
+            if ok:
+                send_cdp(driver, "Network.enable")
+        except Exception as e:
+            log.warning(f"[NET] Captura de red no disponible: {e}")
+            ok = False
+        self.activo = bool(ok)
+        if self.activo:
+            log.info("[NET] ✅ Captura de respuestas SUNEDU vía CDP Network activa")
+        return self.activo
+
+    def armar(self):
+        """Llamar justo antes de disparar la búsqueda."""
+        with self._lock:
+            self._request_id = None
+            self._status = 0
+            self._llegada_en = 0.0
+            self._armado_en = time.monotonic()
+            self._listo.clear()
+
+    def desarmar(self):
+        """Descarta una respuesta en curso: hasta el próximo `armar` no se captura nada."""
+        with self._lock:
+            self._request_id = None
+            self._armado_en = 0.0
+            self._listo.clear()
+
+    # ── Handlers (thread listener del websocket) ──
+    def _on_response(self, event):
+        response = event.response
+        if not self._pattern.search(response.url or ""):
+            return
+        if "json" not in (response.mime_type or "").lower():
+            return
+        with self._lock:
+            if not self._armado_en:
+                return
+            self._request_id = str(event.request_id)
+            self._status = int(response.status)
+
+    def _on_finished(self, event):
+        with self._lock:
+            if self._request_id and str(event.request_id) == self._request_id:
+                self._llegada_en = time.monotonic()
+                self._listo.set()
+
+    # ── Resultado ──
+    def esperar(self, driver: Driver, dni: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Espera la respuesta del backend. Retorna:
+          {"estado": "tabla", "datos": [...]} | {"estado": "no_encontrado", "datos": []}
+          {"estado": "dom"}  → llegó pero no se pudo interpretar (usar modo DOM)
+          None               → aún no llegó dentro de `timeout`
+        """
+        if not self.activo or not self._listo.wait(timeout):
+            return None
+        self._listo.clear()
+        with self._lock:
+            request_id, status = self._request_id, self._status
+            ms = (self._llegada_en - self._armado_en) * 1000
+            self._armado_en = 0.0
+        metrics.observe("sunedu.network.response_ms", ms)
+
+        if status >= 400:
+            log.warning(f"[NET] Respuesta HTTP {status} del backend SUNEDU")
+            return {"estado": "dom"}
+        try:
+            body = send_cdp(driver, "Network.getResponseBody", {"requestId": request_id})
+            texto = body.get("body", "")
+            if body.get("base64Encoded"):
+                texto = base64.b64decode(texto).decode("utf-8", errors="ignore")
+            registros = parsear_respuesta(json.loads(texto), dni)
+        except Exception as e:
+            log.warning(f"[NET] No se pudo leer/parsear la respuesta: {e}")
+            return {"estado": "dom"}
+        if registros is None:
+            return {"estado": "dom"}
+
+        log.info(f"[NET] Respuesta en {ms:.0f}ms → {len(registros)} registro(s)")
+        if registros:
+            return {"estado": "tabla", "datos": registros}
+        return {"estado": "no_encontrado", "datos": []}
+
+
+def _buscar_lista(payload: Any) -> Optional[List[dict]]:
+    """Primera lista de dicts del JSON (en la raíz o bajo un contenedor típico)."""
+    if isinstance(payload, list):
+        return [x for x in payload if isinstance(x, dict)]
+    if isinstance(payload, dict):
+        for clave, valor in payload.items():
+            if clave.lower() in _CONTENEDORES:
+                lista = _buscar_lista(valor)
+                if lista is not None:
+                    return lista
+        for valor in payload.values():
+            if isinstance(valor, (list, dict)):
+                lista = _buscar_lista(valor)
+                if lista:
+                    return lista
+    return None
+
+
+def _campo(item: dict, campo: str) -> str:
+    normalizado = {k.lower().replace("_", ""): v for k, v in item.items()}
+    for clave in _CLAVES[campo]:
+        valor = normalizado.get(clave)
+        if valor not in (None, ""):
+            return str(valor).strip()
+    return ""
+
+
+def parsear_respuesta(payload: Any, dni: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Convierte el JSON del backend al mismo formato que `SuneduScraper.extraer_datos`.
+    Retorna [] si la respuesta indica "sin resultados" y None si no se reconoce.
+    """
+    lista = _buscar_lista(payload)
+    if lista is None:
+        return None
+    registros = []
+    for item in lista:
+        nombres = _campo(item, "nombres")
+        apellidos = " ".join(filter(None, [_campo(item, "apellidos"), _campo(item, "apellido_materno")]))
+        if apellidos and nombres and "," not in nombres:
+            nombres = f"{apellidos}, {nombres}"
+        grado = _campo(item, "grado_o_titulo")
+        if not grado:
+            continue
+        m = re.search(r'(\d{7,8})', _campo(item, "dni"))
+        registros.append({
+            "dni": m.group(1) if m else dni,
+            "nombres": nombres,
+            "grado_o_titulo": grado,
+            "institucion": _campo(item, "institucion"),
+            "fecha_diploma": _campo(item, "fecha_diploma"),
+            "fecha_consulta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    if lista and not registros:
+        return None  # Había datos pero no en un formato conocido
+    return registros
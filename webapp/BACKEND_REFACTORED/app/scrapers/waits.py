@@ -0,0 +1,100 @@
+"""
+Esperas por condición para los scrapers.
+
+En vez de dormir tiempos fijos, cada paso espera a que el DOM cumpla una
+condición (captcha cargado, #divResultado con contenido, toast visible…) con:
+  - piso:   demora mínima "humana" antes de continuar (aunque la condición ya se cumpla)
+  - límite: deadline; si se alcanza se retorna el último valor de la condición
+El perfil "conservative" reproduce exactamente los sleeps fijos originales.
+"""
+
+import random
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# paso → (piso, límite, intervalo de sondeo) en segundos
+Pasos = Dict[str, Tuple[float, float, float]]
+
+
+class PerfilEspera:
+    """Conjunto de tiempos por paso del flujo de un scraper."""
+
+    def __init__(self, nombre: str, pasos: Pasos, sondear_antes_del_piso: bool, jitter: float = 0.0):
+        self.nombre = nombre
+        self.pasos = pasos
+        # False = dormir el piso completo y recién entonces evaluar (comportamiento original)
+        self.sondear_antes_del_piso = sondear_antes_del_piso
+        # Variación aleatoria del piso (0.3 = hasta +30%) para no ser perfectamente regular
+        self.jitter = jitter
+
+    def esperar(self, paso: str, condicion: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Espera según el paso. Sin condición, solo respeta el piso.
+        Con condición, retorna su primer valor truthy (o el último al vencer el límite).
+        """
+        piso, limite, intervalo = self.pasos[paso]
+        if self.jitter and piso > 0:
+            piso *= random.uniform(1.0, 1.0 + self.jitter)
+        limite = max(limite, piso)
+
+        if condicion is None:
+            time.sleep(piso)
+            return None
+
+        inicio = time.monotonic()
+        if not self.sondear_antes_del_piso:
+            time.sleep(piso)
+
+        while True:
+            resultado = _evaluar(condicion)
+            transcurrido = time.monotonic() - inicio
+            if resultado:
+                if transcurrido < piso:
+                    time.sleep(piso - transcurrido)
+                return resultado
+            if transcurrido >= limite:
+                return resultado
+            time.sleep(min(intervalo, max(limite - transcurrido, 0)))
+
+
+def _evaluar(condicion: Callable[[], Any]) -> Any:
+    try:
+        return condicion()
+    except Exception:
+        return None
+
+
+# ═══ Perfiles MINEDU ═══════════════════════════════════════════════════
+MINEDU_PERFILES = {
+    # Sleeps fijos del bot original (2 + 0.5 + 0.3 + 0.5 + 0.5 + 3 s, resultado 5 × 1 s)
+    "conservative": PerfilEspera("conservative", {
+        "carga":           (2.0, 2.0, 0.5),
+        "dni":             (0.5, 0.5, 0.5),
+        "limpiar_captcha": (0.3, 0.3, 0.3),
+        "pre_captcha":     (0.5, 0.5, 0.5),
+        "captcha":         (0.5, 0.5, 0.5),
+        "resultado":       (3.0, 8.0, 1.0),
+        "refresco_previo": (0.5, 0.5, 0.5),
+        "refresco":        (0.5, 5.0, 0.5),
+        "pausa_error":     (1.0, 1.0, 1.0),
+        "pausa_excepcion": (2.0, 2.0, 2.0),
+    }, sondear_antes_del_piso=False),
+    # Espera lo que la web realmente necesita, con un piso humano corto
+    "fast": PerfilEspera("fast", {
+        "carga":           (0.5, 10.0, 0.2),
+        "dni":             (0.1, 2.0, 0.1),
+        "limpiar_captcha": (0.05, 0.05, 0.05),
+        "pre_captcha":     (0.2, 0.2, 0.2),
+        "captcha":         (0.1, 2.0, 0.1),
+        "resultado":       (0.4, 8.0, 0.15),
+        "refresco_previo": (0.1, 0.1, 0.1),
+        "refresco":        (0.1, 5.0, 0.1),
+        "pausa_error":     (0.3, 0.3, 0.3),
+        "pausa_excepcion": (1.0, 1.0, 1.0),
+    }, sondear_antes_del_piso=True, jitter=0.3),
+}
+
+
+def perfil_minedu(nombre: str) -> PerfilEspera:
+    """Perfil MINEDU por nombre; si no existe se usa el conservador."""
+    return MINEDU_PERFILES.get(nombre, MINEDU_PERFILES["conservative"])
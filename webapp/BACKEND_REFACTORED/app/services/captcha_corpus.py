@@ -0,0 +1,76 @@
+"""
+CaptchaCorpus — Grabación opcional de captchas MINEDU para evaluar el OCR offline.
+
+Activo solo si CAPTCHA_CORPUS_DIR está definido. Por cada captcha enviado guarda:
+  <dir>/<timestamp>_<id>.png   → imagen tal cual la sirvió MINEDU
+  <dir>/index.jsonl            → {"archivo", "ocr", "veredicto", "motor", "ts"}
+veredicto = "accepted" (el servidor respondió con resultado) o "rejected"
+(toast/validación de captcha, ver `_detectar_error_captcha`). Las lecturas
+aceptadas sirven como etiqueta para `benchmarks/ocr_benchmark.py`.
+"""
+
+import json
+import threading
+import uuid
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import CAPTCHA_CORPUS_DIR
+
+log = logging.getLogger("CORPUS")
+
+INDEX_FILE = "index.jsonl"
+
+
+class CaptchaCorpus:
+    """Escritor thread-safe del corpus (varios workers graban a la vez)."""
+
+    def __init__(self, directorio: Optional[str] = CAPTCHA_CORPUS_DIR):
+        self.dir = Path(directorio) if directorio else None
+        self._lock = threading.Lock()
+        self.guardados = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.dir is not None
+
+    def registrar(self, img_bytes: bytes, lectura: str, aceptado: bool, motor: str = "browser"):
+        if not self.enabled or not img_bytes:
+            return
+        ahora = datetime.now()
+        archivo = f"{ahora:%Y%m%d-%H%M%S}_{uuid.uuid4().hex[:8]}.png"
+        entrada = {
+            "archivo": archivo,
+            "ocr": lectura,
+            "veredicto": "accepted" if aceptado else "rejected",
+            "motor": motor,
+            "ts": ahora.isoformat(timespec="seconds"),
+        }
+        try:
+            with self._lock:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                (self.dir / archivo).write_bytes(img_bytes)
+                with open(self.dir / INDEX_FILE, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+                self.guardados += 1
+        except OSError as e:
+            log.warning(f"[CORPUS] No se pudo guardar el captcha: {e}")
+
+
+def leer_corpus(directorio) -> Iterator[Dict[str, Any]]:
+    """Entradas del corpus con sus bytes (`img`). Ignora líneas o archivos rotos."""
+    base = Path(directorio)
+    with open(base / INDEX_FILE, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                entrada = json.loads(linea)
+                entrada["img"] = (base / entrada["archivo"]).read_bytes()
+            except (ValueError, KeyError, OSError):
+                continue
+            yield entrada
+
+
+# Singleton global
+captcha_corpus = CaptchaCorpus()
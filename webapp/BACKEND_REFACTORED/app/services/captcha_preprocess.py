@@ -0,0 +1,197 @@
+"""
+Preprocesamiento de captchas MINEDU + votación entre lecturas OCR.
+
+Cada lectura errónea cuesta un refresco de captcha y varios segundos, así que
+antes de enviar:
+  1. se generan variantes de la imagen (vectorizado con NumPy):
+     original · mediana 3x3 · mediana + Otsu · mediana + Otsu + enderezado
+  2. el OCR lee todas (en paralelo si el OCR es el servicio compartido)
+  3. se descartan lecturas con longitud/caracteres imposibles
+  4. gana la lectura más votada (empate → la de la variante más "cruda")
+Si ninguna lectura es válida se retorna "" y el scraper refresca el captcha
+sin gastar un envío.
+
+También registra la tasa de acierto del captcha (métricas `minedu.captcha.*`).
+"""
+
+import io
+import re
+import logging
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image
+
+from app.core.config import (
+    CAPTCHA_PREPROCESS, CAPTCHA_LONGITUD_MIN, CAPTCHA_LONGITUD_MAX, CAPTCHA_CHARSET,
+)
+from app.core.metrics import metrics
+
+log = logging.getLogger("MINEDU")
+
+# Rango de inclinación que vale la pena corregir (grados)
+_DESKEW_MIN, _DESKEW_MAX = 1.0, 15.0
+
+
+# ═══ Operaciones sobre la imagen (escala de grises uint8) ═══════════════
+
+def a_gris(img_bytes: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(img_bytes)) as im:
+        if im.mode in ("RGBA", "LA", "P"):
+            fondo = Image.new("RGBA", im.size, (255, 255, 255, 255))
+            fondo.alpha_composite(im.convert("RGBA"))
+            im = fondo
+        return np.asarray(im.convert("L"), dtype=np.uint8)
+
+
+def a_png(gris: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    Image.fromarray(gris.astype(np.uint8), mode="L").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def mediana3(gris: np.ndarray) -> np.ndarray:
+    """Filtro de mediana 3x3 (quita el ruido "sal y pimienta" del captcha)."""
+    ventanas = sliding_window_view(np.pad(gris, 1, mode="edge"), (3, 3))
+    return np.median(ventanas, axis=(-2, -1)).astype(np.uint8)
+
+
+def umbral_otsu(gris: np.ndarray) -> int:
+    hist = np.bincount(gris.ravel(), minlength=256).astype(np.float64)
+    p = hist / hist.sum()
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma_b = (mu[-1] * omega - mu) ** 2 / (omega * (1.0 - omega))
+    return int(np.nanargmax(sigma_b))
+
+
+def binarizar(gris: np.ndarray) -> np.ndarray:
+    """Otsu → texto negro sobre fondo blanco (invierte si el texto era claro)."""
+    binaria = np.where(gris > umbral_otsu(gris), 255, 0).astype(np.uint8)
+    if np.count_nonzero(binaria == 0) > binaria.size / 2:
+        binaria = 255 - binaria
+    return binaria
+
+
+def angulo_inclinacion(binaria: np.ndarray) -> float:
+    """Ángulo (grados) del eje principal de los píxeles de texto."""
+    ys, xs = np.nonzero(binaria == 0)
+    if xs.size < 20:
+        return 0.0
+    xs = xs - xs.mean()
+    ys = ys - ys.mean()
+    mu20, mu02, mu11 = (xs * xs).mean(), (ys * ys).mean(), (xs * ys).mean()
+    return float(np.degrees(0.5 * np.arctan2(2 * mu11, mu20 - mu02)))
+
+
+def enderezar(binaria: np.ndarray) -> np.ndarray:
+    angulo = angulo_inclinacion(binaria)
+    if not (_DESKEW_MIN <= abs(angulo) <= _DESKEW_MAX):
+        return binaria
+    rotada = Image.fromarray(binaria, mode="L").rotate(angulo, resample=Image.BILINEAR,
+                                                        expand=True, fillcolor=255)
+    return np.asarray(rotada, dtype=np.uint8)
+
+
+def variantes(img_bytes: bytes) -> List[Tuple[str, bytes]]:
+    """Variantes a leer, de la más cruda a la más procesada (orden = desempate)."""
+    salida = [("original", img_bytes)]
+    try:
+        limpia = mediana3(a_gris(img_bytes))
+        binaria = binarizar(limpia)
+        salida += [
+            ("mediana", a_png(limpia)),
+            ("otsu", a_png(binaria)),
+            ("otsu_enderezada", a_png(enderezar(binaria))),
+        ]
+    except Exception as e:
+        log.warning(f"[MINEDU][CAPTCHA] Preprocesamiento omitido: {e}")
+    return salida
+
+
+# ═══ Validación y votación ══════════════════════════════════════════════
+
+_PATRON_VALIDO = re.compile(f"^[{CAPTCHA_CHARSET}]{{{CAPTCHA_LONGITUD_MIN},{CAPTCHA_LONGITUD_MAX}}}$")
+
+
+def normalizar(lectura: str) -> str:
+    return re.sub(r"\s+", "", lectura or "")
+
+
+def es_valida(lectura: str) -> bool:
+    return bool(_PATRON_VALIDO.match(lectura))
+
+
+def votar(lecturas: List[str]) -> str:
+    """Lectura válida más votada; "" si ninguna pasa la validación."""
+    validas = [l for l in (normalizar(x) for x in lecturas) if es_valida(l)]
+    if not validas:
+        return ""
+    conteo = Counter(validas)
+    mejor = max(conteo.values())
+    return next(l for l in validas if conteo[l] == mejor)  # Primera en orden de variante
+
+
+def resolver(ocr, img_bytes: bytes, preprocesar: bool = CAPTCHA_PREPROCESS) -> str:
+    """
+    Lee el captcha con `ocr` (ddddocr o el servicio compartido) y retorna la
+    lectura elegida, o "" si ninguna es plausible.
+    """
+    candidatas = variantes(img_bytes) if preprocesar else [("original", img_bytes)]
+    if hasattr(ocr, "submit"):
+        futuros = [ocr.submit(img) for _, img in candidatas]
+        lecturas = [_resultado(lambda f=f: f.result(timeout=10)) for f in futuros]
+    else:
+        lecturas = [_resultado(lambda img=img: ocr.classification(img)) for _, img in candidatas]
+
+    elegida = votar(lecturas)
+    detalle = ", ".join(f"{n}={l!r}" for (n, _), l in zip(candidatas, lecturas))
+    if elegida:
+        log.info(f"[MINEDU][CAPTCHA] OCR: {elegida} ({detalle})")
+    else:
+        metrics.incr("minedu.captcha.descartado")
+        log.warning(f"[MINEDU][CAPTCHA] Lecturas descartadas por longitud/caracteres: {detalle}")
+    return elegida
+
+
+def _resultado(fn: Callable[[], str]) -> str:
+    try:
+        return fn() or ""
+    except Exception as e:
+        log.error(f"[MINEDU][CAPTCHA] Error OCR: {e}")
+        return ""
+
+
+# ═══ Tasa de acierto ════════════════════════════════════════════════════
+
+def registrar_veredicto(aceptado: bool, envio: int):
+    """
+    Registra el veredicto del servidor sobre un captcha enviado.
+    `envio` = número de envío de captcha para el DNI actual (1 = primer intento).
+    """
+    if aceptado:
+        metrics.incr("minedu.captcha.aceptado")
+        metrics.observe("minedu.captcha.envios_por_dni", envio)
+        if envio == 1:
+            metrics.incr("minedu.captcha.primer_intento")
+    else:
+        metrics.incr("minedu.captcha.rechazado")
+
+
+def get_solve_stats() -> Dict[str, Optional[float]]:
+    aceptados = metrics.counter("minedu.captcha.aceptado")
+    rechazados = metrics.counter("minedu.captcha.rechazado")
+    primer = metrics.counter("minedu.captcha.primer_intento")
+    enviados = aceptados + rechazados
+    return {
+        "preprocess": CAPTCHA_PREPROCESS,
+        "enviados": enviados,
+        "aceptados": aceptados,
+        "rechazados": rechazados,
+        "descartados": metrics.counter("minedu.captcha.descartado"),
+        "solve_rate": round(aceptados / enviados, 3) if enviados else None,
+        "first_try_rate": round(primer / aceptados, 3) if aceptados else None,
+    }
@@ -0,0 +1,189 @@
+"""
+CircuitBreaker — Corta el trabajo contra una fuente que está bloqueando.
+
+Cuando SUNEDU empieza a fallar la verificación, cada worker de cada sesión
+agotaba sus SUNEDU_MAX_RETRIES (F5 incluidos) por DNI y marcaba cientos de
+registros ERROR_SUNEDU, empeorando el bloqueo. Un breaker por fuente,
+compartido por todo el proceso, alimentado desde los loops:
+
+  closed    → normal. `umbral` DNIs fallidos seguidos → open
+  open      → nadie reclama DNIs de esa fuente durante `cooldown` s; los DNIs
+              que fallan mientras está abierto vuelven a la cola (no a ERROR)
+  half_open → un único worker (la sonda) procesa un DNI:
+              éxito → closed · fallo → open con cooldown x2 (hasta cooldown_max)
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from app.core.config import CIRCUIT_BREAKER_ENABLED, CIRCUIT_BREAKER, WORKER_POLL_INTERVAL
+
+log = logging.getLogger("BREAKER")
+
+CERRADO = "closed"
+ABIERTO = "open"
+SEMIABIERTO = "half_open"
+
+
+class CircuitBreaker:
+    """Breaker de una fuente (thread-safe)."""
+
+    def __init__(self, fuente: str, umbral: int, cooldown: float, cooldown_max: float,
+                 enabled: bool = True):
+        self.fuente = fuente
+        self.umbral = umbral
+        self.cooldown_base = cooldown
+        self.cooldown_max = cooldown_max
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._estado = CERRADO
+        self._cooldown = cooldown
+        self._abierto_hasta = 0.0
+        self._sonda: Optional[int] = None  # ident del thread que hace la prueba
+        self._sonda_desde = 0.0
+        self.fallos_seguidos = 0
+        self.aperturas = 0
+        self.sondas = 0
+        self.devueltos = 0
+        self.ultimo_motivo: Optional[str] = None
+        self.ultima_apertura: Optional[float] = None
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado
+
+    @property
+    def cortado(self) -> bool:
+        """True si el circuito no está cerrado y este thread no es la sonda."""
+        with self._lock:
+            if not self.enabled or self._estado == CERRADO:
+                return False
+            return self._sonda != threading.get_ident()
+
+    def permitir(self) -> bool:
+        """¿Puede este worker reclamar un DNI? En half_open solo el primero (la sonda)."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._estado == CERRADO:
+                return True
+            if self._estado == ABIERTO and time.time() >= self._abierto_hasta:
+                self._estado = SEMIABIERTO
+                self._sonda = None
+            if self._sonda is not None and time.time() - self._sonda_desde > self.cooldown_max:
+                self._sonda = None  # La sonda murió sin reportar: habilitar otra
+            if self._estado == SEMIABIERTO and self._sonda is None:
+                self._sonda = threading.get_ident()
+                self._sonda_desde = time.time()
+                self.sondas += 1
+                log.info(f"[BREAKER][{self.fuente.upper()}] half_open → DNI de prueba")
+                return True
+            return self._sonda == threading.get_ident()
+
+    def liberar_sonda(self):
+        """La sonda no llegó a consultar (cola vacía, caché): otro worker puede probar."""
+        with self._lock:
+            if self._sonda == threading.get_ident():
+                self._sonda = None
+
+    def registrar_exito(self):
+        with self._lock:
+            if self._estado == CERRADO:
+                self.fallos_seguidos = 0
+                return
+            if self._estado == SEMIABIERTO and self._sonda == threading.get_ident():
+                self._estado = CERRADO
+                self._sonda = None
+                self._cooldown = self.cooldown_base
+                self.fallos_seguidos = 0
+                log.info(f"[BREAKER][{self.fuente.upper()}] Prueba exitosa → closed")
+            # Éxitos tardíos de DNIs iniciados antes de abrir no cierran el circuito
+
+    def registrar_fallo(self, motivo: str) -> bool:
+        """
+        Registra un DNI fallido. Retorna True si el circuito quedó (o ya estaba)
+        abierto: el llamador debe devolver el DNI a la cola en vez de marcar ERROR.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self.ultimo_motivo = motivo
+            if self._estado == CERRADO:
+                self.fallos_seguidos += 1
+                if self.fallos_seguidos < self.umbral:
+                    return False
+                self._abrir(f"{self.fallos_seguidos} fallos seguidos")
+            elif self._estado == SEMIABIERTO and self._sonda == threading.get_ident():
+                self._cooldown = min(self.cooldown_max, self._cooldown * 2)
+                self._abrir("prueba fallida")
+            self.devueltos += 1
+            return True
+
+    def _abrir(self, razon: str):
+        """Pasa a open (llamar con el lock tomado)."""
+        self._estado = ABIERTO
+        self._sonda = None
+        self._abierto_hasta = time.time() + self._cooldown
+        self.aperturas += 1
+        self.ultima_apertura = time.time()
+        log.warning(
+            f"[BREAKER][{self.fuente.upper()}] open ({razon}: {self.ultimo_motivo}) "
+            f"→ pausa de {self._cooldown:.0f}s para todas las sesiones"
+        )
+
+    def esperar(self, stop_event: Optional[threading.Event] = None):
+        """Espera corta mientras el circuito no deja reclamar (se corta si la sesión se detiene)."""
+        with self._lock:
+            restante = self._abierto_hasta - time.time()
+        espera = min(max(restante, 0.5), WORKER_POLL_INTERVAL)
+        if stop_event is not None:
+            stop_event.wait(espera)
+        else:
+            time.sleep(espera)
+
+    def reset(self):
+        with self._lock:
+            self._estado = CERRADO
+            self._sonda = None
+            self._cooldown = self.cooldown_base
+            self.fallos_seguidos = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "estado": self._estado,
+                "fallos_seguidos": self.fallos_seguidos,
+                "umbral": self.umbral,
+                "cooldown_s": self._cooldown,
+                "reabre_en_s": round(max(self._abierto_hasta - time.time(), 0.0), 1)
+                if self._estado == ABIERTO else 0.0,
+                "aperturas": self.aperturas,
+                "sondas": self.sondas,
+                "devueltos_a_cola": self.devueltos,
+                "ultimo_motivo": self.ultimo_motivo,
+                "ultima_apertura": self.ultima_apertura,
+            }
+
+
+class CircuitBreakers:
+    """Registro de breakers por fuente."""
+
+    def __init__(self, config: Dict[str, dict] = CIRCUIT_BREAKER, enabled: bool = CIRCUIT_BREAKER_ENABLED):
+        self._breakers = {
+            fuente: CircuitBreaker(fuente, enabled=enabled, **params)
+            for fuente, params in config.items()
+        }
+
+    def get(self, fuente: str) -> CircuitBreaker:
+        return self._breakers[fuente]
+
+    def get_stats(self) -> dict:
+        return {f: b.get_stats() for f, b in self._breakers.items()}
+
+
+# Singleton global
+circuit_breakers = CircuitBreakers()
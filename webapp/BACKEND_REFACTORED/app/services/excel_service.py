@@ -1,49 +1,76 @@
 
 import re
 import pandas as pd
-from typing import List, Dict, BinaryIO, Any
+from typing import List, Dict, BinaryIO, Any, Iterator, Optional
 from io import BytesIO
 
+_DNI_RE = re.compile(r'\d{8}')
+
+
 class ExcelService:
     @staticmethod
-    def parse_uploaded_file(file: BinaryIO, filename: str) -> Dict[str, Any]:
+    def iter_entradas(file: BinaryIO, filename: str) -> Iterator[str]:
         """
-        Parsea el archivo subido y separa DNIs válidos (8 dígitos) de inválidos.
-        Retorna: {"valid": [...], "invalid": [...]}
+        Recorre las celdas/líneas crudas del archivo sin materializarlo:
+        .txt/.csv línea a línea, .xlsx con openpyxl en modo read_only (primera
+        columna o la columna "DNI"). .xls (formato viejo) se lee completo con pandas.
         """
-        raw_entries = []
-        try:
-            if filename.endswith(".xlsx") or filename.endswith(".xls"):
-                df = pd.read_excel(BytesIO(file.read()))
-                col = df.columns[0]
-                if 'DNI' in df.columns:
-                    col = 'DNI'
-                raw_entries = df[col].astype(str).tolist()
+        if filename.endswith(".txt") or filename.endswith(".csv"):
+            for linea in file:
+                yield linea.decode("utf-8", errors="ignore")
+        elif filename.endswith(".xlsx"):
+            from openpyxl import load_workbook
+            wb = load_workbook(file, read_only=True, data_only=True)
+            try:
+                filas = wb.worksheets[0].iter_rows(values_only=True)
+                encabezado = next(filas, None) or ()
+                col = list(encabezado).index("DNI") if "DNI" in encabezado else 0
+                for fila in filas:
+                    if col < len(fila) and fila[col] is not None:
+                        yield str(fila[col])
+            finally:
+                wb.close()
+        elif filename.endswith(".xls"):
+            df = pd.read_excel(BytesIO(file.read()))
+            col = 'DNI' if 'DNI' in df.columns else df.columns[0]
+            yield from df[col].astype(str)
 
-            elif filename.endswith(".txt") or filename.endswith(".csv"):
-                content = file.read().decode("utf-8", errors="ignore")
-                raw_entries = content.splitlines()
+    @staticmethod
+    def limpiar(raw: str) -> Optional[str]:
+        """Limpia una entrada cruda (espacios, "12345678.0" de Excel). None si está vacía."""
+        clean = raw.strip().split(".")[0].strip()
+        if not clean or clean.lower() == 'nan':
+            return None
+        return clean
 
-        except Exception as e:
-            raise ValueError(f"Error parseando archivo: {e}")
+    @staticmethod
+    def es_dni(clean: str) -> bool:
+        """Exactamente 8 dígitos numéricos."""
+        return _DNI_RE.fullmatch(clean) is not None
 
+    @staticmethod
+    def parse_uploaded_file(file: BinaryIO, filename: str) -> Dict[str, Any]:
+        """
+        Parsea el archivo subido y separa DNIs válidos (8 dígitos) de inválidos.
+        Retorna: {"valid": [...], "invalid": [...]}
+        (Para archivos grandes: app/services/ingest_service.py, sin listas en memoria.)
+        """
         valid_dnis = []
         invalid_dnis = []
         seen = set()
-
-        for raw in raw_entries:
-            # Limpiar: quitar espacios, manejar "12345678.0" de Excel
-            clean = raw.strip().split(".")[0].strip()
-            if not clean or clean.lower() == 'nan':
-                continue
-
-            # Validar: exactamente 8 dígitos numéricos
-            if re.fullmatch(r'\d{8}', clean):
-                if clean not in seen:
-                    seen.add(clean)
-                    valid_dnis.append(clean)
-            else:
-                invalid_dnis.append(clean)
+        try:
+            for raw in ExcelService.iter_entradas(file, filename):
+                clean = ExcelService.limpiar(raw)
+                if clean is None:
+                    continue
+                if ExcelService.es_dni(clean):
+                    if clean not in seen:
+                        seen.add(clean)
+                        valid_dnis.append(clean)
+                else:
+                    invalid_dnis.append(clean)
+        except Exception as e:
+            raise ValueError(f"Error parseando archivo: {e}")
 
         return {"valid": valid_dnis, "invalid": invalid_dnis}
 
@@ -0,0 +1,188 @@
+"""
+IngestService — Ingesta de archivos de DNIs en memoria constante.
+
+El camino original (parse_uploaded_file + crear_lote) materializaba el archivo,
+las listas de válidos/inválidos y un objeto ORM por DNI: 500k filas tardaban
+minutos. Aquí todo fluye:
+
+  archivo ─ ExcelService.iter_entradas ─ limpiar/validar ─ dedupe ─ crear_lote_bulk
+                 (línea a línea)                        (bitmap)   (INSERT por chunks)
+
+  - Dedupe con un bitmap de 10^8 bits (12.5 MB fijos: un DNI = 8 dígitos),
+    no un set que crece con el archivo.
+  - Inválidos: se cuentan todos, se guarda una muestra de INGEST_MAX_INVALIDOS.
+  - Progreso por sesión (leídos, válidos, insertados, filas/s) consultable
+    mientras corre; `iniciar()` la corre en un thread para no bloquear la API.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from app.core.config import INGEST_CHUNK, INGEST_MAX_INVALIDOS
+from app.core.metrics import metrics
+from app.db.repository import DniRepository
+from app.services.excel_service import ExcelService
+
+log = logging.getLogger("INGEST")
+
+# Un bit por DNI posible (00000000–99999999)
+_BITS_DNI = 10 ** 8
+
+
+class Ingesta:
+    """Estado y progreso de la ingesta de un archivo."""
+
+    def __init__(self, session_id: str, nombre_archivo: str):
+        self.id = str(uuid.uuid4())
+        self.session_id = session_id
+        self.nombre_archivo = nombre_archivo
+        self.estado = "procesando"      # procesando | completado | error
+        self.leidos = 0                 # Entradas no vacías
+        self.validos = 0                # DNIs únicos válidos
+        self.duplicados = 0
+        self.invalidos = 0
+        self.insertados = 0
+        self.invalidos_muestra: List[str] = []
+        self.lote_id: Optional[int] = None
+        self.error: Optional[str] = None
+        self.inicio = time.time()
+        self.fin: Optional[float] = None
+
+    @property
+    def segundos(self) -> float:
+        return (self.fin or time.time()) - self.inicio
+
+    def to_dict(self) -> dict:
+        seg = self.segundos
+        d = {
+            "id": self.id,
+            "archivo": self.nombre_archivo,
+            "estado": self.estado,
+            "leidos": self.leidos,
+            "validos": self.validos,
+            "duplicados": self.duplicados,
+            "invalidos": self.invalidos,
+            "insertados": self.insertados,
+            "lote_id": self.lote_id,
+            "segundos": round(seg, 2),
+            "filas_por_s": round(self.insertados / seg, 1) if seg > 0 else 0.0,
+            "error": self.error,
+        }
+        if self.estado != "procesando":
+            d["invalidos_muestra"] = self.invalidos_muestra
+        return d
+
+
+class _VistosDni:
+    """Conjunto de DNIs de 8 dígitos en un bitmap de tamaño fijo."""
+
+    def __init__(self):
+        self._bits = bytearray(_BITS_DNI // 8)
+
+    def agregar(self, dni: str) -> bool:
+        """Marca el DNI. Retorna False si ya estaba."""
+        n = int(dni)
+        byte, bit = n >> 3, 1 << (n & 7)
+        if self._bits[byte] & bit:
+            return False
+        self._bits[byte] |= bit
+        return True
+
+
+class IngestService:
+    """Ingestas por sesión (la última de cada sesión queda consultable)."""
+
+    def __init__(self, repo: Optional[DniRepository] = None, chunk: int = INGEST_CHUNK):
+        self.repo = repo or DniRepository()
+        self.chunk = chunk
+        self._ingestas: Dict[str, Ingesta] = {}
+        self._lock = threading.Lock()
+
+    # ── Pipeline ──
+    def _dnis_validos(self, ingesta: Ingesta, file: BinaryIO) -> Iterator[str]:
+        vistos = _VistosDni()
+        for raw in ExcelService.iter_entradas(file, ingesta.nombre_archivo):
+            clean = ExcelService.limpiar(raw)
+            if clean is None:
+                continue
+            ingesta.leidos += 1
+            if not ExcelService.es_dni(clean):
+                ingesta.invalidos += 1
+                if len(ingesta.invalidos_muestra) < INGEST_MAX_INVALIDOS:
+                    ingesta.invalidos_muestra.append(clean)
+            elif vistos.agregar(clean):
+                ingesta.validos += 1
+                yield clean
+            else:
+                ingesta.duplicados += 1
+
+    def ingerir(self, file: BinaryIO, filename: str, session_id: str,
+                ingesta: Optional[Ingesta] = None) -> Ingesta:
+        """Ingesta síncrona del archivo. Cualquier error → ValueError (lo insertado se deshace)."""
+        ingesta = ingesta or self._registrar(Ingesta(session_id, filename))
+
+        def _progreso(n: int):
+            ingesta.insertados = n
+
+        try:
+            resultado = self.repo.crear_lote_bulk(
+                session_id, filename, self._dnis_validos(ingesta, file), progreso=_progreso, chunk=self.chunk,
+            )
+            if resultado["total"] == 0:
+                # Sin DNIs válidos no queda un lote vacío
+                self.repo.eliminar_lote(resultado["lote_id"])
+            else:
+                ingesta.lote_id = resultado["lote_id"]
+            ingesta.estado = "completado"
+        except Exception as e:
+            ingesta.estado = "error"
+            ingesta.error = str(e)
+            raise ValueError(f"Error procesando archivo: {e}") from e
+        finally:
+            ingesta.fin = time.time()
+            metrics.observe("ingesta.filas_por_s", ingesta.insertados / max(ingesta.segundos, 1e-6))
+        log.info(f"[{session_id[:8]}][INGEST] {filename}: {ingesta.insertados} DNIs en "
+                 f"{ingesta.segundos:.1f}s ({ingesta.invalidos} inválidos, {ingesta.duplicados} duplicados)")
+        return ingesta
+
+    def iniciar(self, file: BinaryIO, filename: str, session_id: str) -> Ingesta:
+        """
+        Ingesta en segundo plano: copia el archivo subido a disco (el upload se
+        cierra al terminar el request) y la corre en un thread. Retorna de inmediato.
+        """
+        sufijo = os.path.splitext(filename)[1]
+        with tempfile.NamedTemporaryFile(prefix="scgt-ingest-", suffix=sufijo, delete=False) as tmp:
+            shutil.copyfileobj(file, tmp)
+        ingesta = self._registrar(Ingesta(session_id, filename))
+
+        def _run():
+            try:
+                with open(tmp.name, "rb") as f:
+                    self.ingerir(f, filename, session_id, ingesta)
+            except ValueError as e:
+                log.error(f"[{session_id[:8]}][INGEST] {filename}: {e}")
+            finally:
+                os.unlink(tmp.name)
+
+        threading.Thread(target=_run, name=f"ingest-{session_id[:8]}", daemon=True).start()
+        return ingesta
+
+    # ── Consulta ──
+    def _registrar(self, ingesta: Ingesta) -> Ingesta:
+        with self._lock:
+            self._ingestas[ingesta.session_id] = ingesta
+        return ingesta
+
+    def progreso(self, session_id: str) -> Optional[Ingesta]:
+        with self._lock:
+            return self._ingestas.get(session_id)
+
+
+# Singleton global
+ingest_service = IngestService()
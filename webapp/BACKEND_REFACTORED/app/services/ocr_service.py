@@ -0,0 +1,170 @@
+"""
+OcrService — Servicio OCR único del proceso para los captchas MINEDU.
+
+Antes cada MineduScraper cargaba su propio `ddddocr.DdddOcr` (una copia del
+modelo ONNX por worker) y resolvía en el thread del worker. Ahora:
+  - un solo modelo compartido (carga perezosa en el primer uso)
+  - cola de solicitudes atendida por OCR_SERVICE_THREADS threads
+  - micro-batching: cada thread drena hasta OCR_SERVICE_MAX_BATCH captchas
+    de la cola y los resuelve seguidos (el modelo de ddddocr tiene batch fijo
+    de 1, así que el lote se procesa secuencialmente sobre la misma sesión)
+  - resultados vía `concurrent.futures.Future`
+
+Expone `classification(img_bytes)` con la misma firma que ddddocr, así los
+scrapers lo usan como `self.ocr` sin cambios.
+"""
+
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+from app.core.config import (
+    OCR_SERVICE_THREADS, OCR_SERVICE_MAX_BATCH, OCR_SERVICE_BATCH_WAIT, OCR_SOLVE_TIMEOUT,
+)
+from app.core.metrics import metrics
+
+log = logging.getLogger("OCR")
+
+# (bytes de la imagen, future, instante de encolado)
+_Solicitud = Tuple[bytes, Future, float]
+
+
+class OcrService:
+    """Singleton con un modelo ddddocr y un pool de threads de inferencia."""
+
+    def __init__(
+        self,
+        threads: int = OCR_SERVICE_THREADS,
+        max_batch: int = OCR_SERVICE_MAX_BATCH,
+        batch_wait: float = OCR_SERVICE_BATCH_WAIT,
+    ):
+        self.threads = max(1, threads)
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait
+        self._queue: "queue.Queue[Optional[_Solicitud]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._model = None
+        self._model_error: Optional[str] = None
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self.stats = {"solved": 0, "errors": 0, "batches": 0}
+
+    # ── Modelo ──
+    def _cargar_modelo(self):
+        with self._lock:
+            if self._model is not None or self._model_error is not None:
+                return self._model
+            try:
+                import ddddocr
+                t0 = time.monotonic()
+                self._model = ddddocr.DdddOcr(show_ad=False)
+                log.info(f"[OCR] Modelo ddddocr cargado en {time.monotonic() - t0:.1f}s (compartido)")
+            except ImportError:
+                self._model_error = "ddddocr no instalado"
+                log.error("[OCR] ddddocr no instalado. pip install ddddocr")
+            return self._model
+
+    @property
+    def disponible(self) -> bool:
+        """True si el modelo está (o pudo ser) cargado."""
+        return self._cargar_modelo() is not None
+
+    # ── API ──
+    def submit(self, img_bytes: bytes) -> Future:
+        """Encola un captcha. El Future resuelve al texto leído."""
+        self._asegurar_workers()
+        future: Future = Future()
+        self._queue.put((img_bytes, future, time.monotonic()))
+        return future
+
+    def classification(self, img_bytes: bytes, timeout: float = OCR_SOLVE_TIMEOUT) -> str:
+        """Compatible con `ddddocr.DdddOcr.classification` (bloquea hasta el resultado)."""
+        return self.submit(img_bytes).result(timeout=timeout)
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        for t in workers:
+            t.join(timeout=5)
+
+    # ── Internos ──
+    def _asegurar_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            self._stop.clear()
+            for i in range(self.threads):
+                t = threading.Thread(target=self._worker_loop, name=f"ocr-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def _tomar_lote(self) -> List[_Solicitud]:
+        """Bloquea por la primera solicitud y junta las que lleguen en `batch_wait`."""
+        primera = self._queue.get()
+        if primera is None:
+            return []
+        lote = [primera]
+        limite = time.monotonic() + self.batch_wait
+        while len(lote) < self.max_batch:
+            restante = limite - time.monotonic()
+            try:
+                item = self._queue.get(timeout=restante) if restante > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Que lo reciba otro worker al terminar este lote
+                break
+            lote.append(item)
+        return lote
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            lote = self._tomar_lote()
+            if not lote:
+                return
+            model = self._cargar_modelo()
+            with self._lock:
+                self.stats["batches"] += 1
+            metrics.observe("ocr.batch_size", len(lote))
+            for img_bytes, future, encolado in lote:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                inicio = time.monotonic()
+                metrics.observe("ocr.queue_wait_ms", (inicio - encolado) * 1000)
+                try:
+                    if model is None:
+                        raise RuntimeError(self._model_error or "Modelo OCR no disponible")
+                    future.set_result(model.classification(img_bytes))
+                    with self._lock:
+                        self.stats["solved"] += 1
+                except Exception as e:
+                    with self._lock:
+                        self.stats["errors"] += 1
+                    future.set_exception(e)
+                fin = time.monotonic()
+                metrics.observe("ocr.solve_ms", (fin - inicio) * 1000)
+                metrics.observe("ocr.latency_ms", (fin - encolado) * 1000)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            base = {
+                "model_loaded": self._model is not None,
+                "threads": len(self._workers),
+                "max_batch": self.max_batch,
+                "queue_depth": self._queue.qsize(),
+                **self.stats,
+            }
+        base["latency_ms"] = metrics.summary("ocr.latency_ms")
+        base["solve_ms"] = metrics.summary("ocr.solve_ms")
+        base["queue_wait_ms"] = metrics.summary("ocr.queue_wait_ms")
+        return base
+
+
+# Singleton global
+ocr_service = OcrService()
@@ -0,0 +1,117 @@
+"""
+Pacing — Ritmo adaptativo AIMD por fuente, compartido por todas las sesiones.
+
+Reemplaza las esperas fijas "anti-ban" (sleep 4s en SUNEDU + 2s en el loop):
+cada worker pausa `60 / ritmo` segundos entre DNIs, y el ritmo (DNIs/min por
+worker) se ajusta con AIMD según lo que responde la web:
+  - resultado limpio (sin verificación, al primer intento) → ritmo += paso
+  - verificación / verificación fallida / timeout / nada   → ritmo *= factor
+Como el controlador es del proceso, un desafío visto por un worker frena a
+todos los workers de esa fuente, en todas las sesiones.
+"""
+
+import random
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from app.core.config import PACING_ENABLED, PACING
+
+log = logging.getLogger("PACING")
+
+
+class PacingController:
+    """Controlador AIMD del ritmo de una fuente."""
+
+    def __init__(self, fuente: str, ritmo_inicial: float, ritmo_min: float, ritmo_max: float,
+                 paso: float, factor: float, jitter: float = 0.15, enabled: bool = True):
+        self.fuente = fuente
+        self.ritmo_inicial = ritmo_inicial
+        self.ritmo_min = ritmo_min
+        self.ritmo_max = ritmo_max
+        self.paso = paso
+        self.factor = factor
+        self.jitter = jitter
+        self.enabled = enabled
+        self._ritmo = ritmo_inicial
+        self._lock = threading.Lock()
+        self.exitos = 0
+        self.retrocesos = 0
+        self.ultimo_motivo: Optional[str] = None
+        self.ultimo_retroceso: Optional[float] = None
+
+    @property
+    def ritmo(self) -> float:
+        """DNIs por minuto por worker."""
+        with self._lock:
+            return self._ritmo
+
+    @property
+    def intervalo(self) -> float:
+        """Pausa actual entre DNIs (segundos)."""
+        return 60.0 / self.ritmo
+
+    def exito(self):
+        """Resultado limpio: aumento aditivo."""
+        with self._lock:
+            self.exitos += 1
+            self._ritmo = min(self.ritmo_max, self._ritmo + self.paso)
+
+    def penalizar(self, motivo: str):
+        """Señal de bloqueo: reducción multiplicativa."""
+        with self._lock:
+            anterior = self._ritmo
+            self._ritmo = max(self.ritmo_min, self._ritmo * self.factor)
+            self.retrocesos += 1
+            self.ultimo_motivo = motivo
+            self.ultimo_retroceso = time.time()
+        log.warning(f"[PACING][{self.fuente.upper()}] {motivo} → ritmo {anterior:.1f} → {self._ritmo:.1f} DNIs/min")
+
+    def pausar(self, stop_event: Optional[threading.Event] = None):
+        """Pausa entre DNIs (se corta si la sesión se detiene)."""
+        if not self.enabled:
+            return
+        espera = self.intervalo * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        if stop_event is not None:
+            stop_event.wait(espera)
+        else:
+            time.sleep(espera)
+
+    def reset(self):
+        with self._lock:
+            self._ritmo = self.ritmo_inicial
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ritmo_por_min": round(self._ritmo, 2),
+                "intervalo_s": round(60.0 / self._ritmo, 2),
+                "ritmo_min": self.ritmo_min,
+                "ritmo_max": self.ritmo_max,
+                "exitos": self.exitos,
+                "retrocesos": self.retrocesos,
+                "ultimo_motivo": self.ultimo_motivo,
+                "ultimo_retroceso": self.ultimo_retroceso,
+            }
+
+
+class Pacing:
+    """Registro de controladores por fuente."""
+
+    def __init__(self, config: Dict[str, dict] = PACING, enabled: bool = PACING_ENABLED):
+        self._controladores = {
+            fuente: PacingController(fuente, enabled=enabled, **params)
+            for fuente, params in config.items()
+        }
+
+    def get(self, fuente: str) -> PacingController:
+        return self._controladores[fuente]
+
+    def get_stats(self) -> dict:
+        return {f: c.get_stats() for f, c in self._controladores.items()}
+
+
+# Singleton global
+pacing = Pacing()
@@ -0,0 +1,162 @@
+"""
+ResultCache — Caché de resultados por DNI compartida entre sesiones.
+
+Evita volver a abrir Chrome para un DNI que otra sesión (o un lote anterior)
+ya resolvió hace poco. Guarda solo estados finales:
+  - FOUND_SUNEDU / FOUND_MINEDU  → TTL positivo (RESULT_CACHE_TTL_FOUND)
+  - NOT_FOUND                    → TTL negativo (RESULT_CACHE_TTL_NOT_FOUND)
+Los errores nunca se cachean. Expulsión LRU al superar RESULT_CACHE_MAX_ENTRIES.
+"""
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable
+
+from app.core.config import (
+    Estado,
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_TTL_FOUND,
+    RESULT_CACHE_TTL_NOT_FOUND,
+    RESULT_CACHE_MAX_ENTRIES,
+)
+
+log = logging.getLogger("CACHE")
+
+
+class CacheEntry:
+    """Resultado final cacheado de un DNI."""
+    __slots__ = ("estado", "payload_sunedu", "payload_minedu", "motivo", "expires_at")
+
+    def __init__(self, estado: str, payload_sunedu=None, payload_minedu=None,
+                 motivo: Optional[str] = None, expires_at: float = 0.0):
+        self.estado = estado
+        self.payload_sunedu = payload_sunedu
+        self.payload_minedu = payload_minedu
+        self.motivo = motivo
+        self.expires_at = expires_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "payload_sunedu": self.payload_sunedu,
+            "payload_minedu": self.payload_minedu,
+            "motivo": self.motivo,
+        }
+
+
+class ResultCache:
+    """Caché LRU thread-safe con TTL positivo/negativo."""
+
+    def __init__(
+        self,
+        ttl_found: float = RESULT_CACHE_TTL_FOUND,
+        ttl_not_found: float = RESULT_CACHE_TTL_NOT_FOUND,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        enabled: bool = RESULT_CACHE_ENABLED,
+    ):
+        self.ttl_found = ttl_found
+        self.ttl_not_found = ttl_not_found
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    # ── Lectura ──
+    def get(self, dni: str, estados: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna el resultado cacheado del DNI (dict) o None.
+        `estados` limita qué resultados sirven al llamador (ej. el worker MINEDU
+        solo acepta FOUND_MINEDU / NOT_FOUND).
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(dni)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[dni]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if estados is not None and entry.estado not in estados:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(dni)
+            self.hits += 1
+            return entry.to_dict()
+
+    # ── Escritura ──
+    def _put(self, dni: str, entry: CacheEntry):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[dni] = entry
+            self._entries.move_to_end(dni)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put_found_sunedu(self, dni: str, payload):
+        self._put(dni, CacheEntry(
+            Estado.FOUND_SUNEDU, payload_sunedu=payload,
+            expires_at=time.monotonic() + self.ttl_found,
+        ))
+
+    def put_found_minedu(self, dni: str, payload):
+        self._put(dni, CacheEntry(
+            Estado.FOUND_MINEDU, payload_minedu=payload,
+            expires_at=time.monotonic() + self.ttl_found,
+        ))
+
+    def put_not_found(self, dni: str, motivo: Optional[str] = None):
+        self._put(dni, CacheEntry(
+            Estado.NOT_FOUND, motivo=motivo,
+            expires_at=time.monotonic() + self.ttl_not_found,
+        ))
+
+    # ── Invalidación ──
+    def invalidate(self, dnis: Iterable[str], solo_negativos: bool = False) -> int:
+        """Elimina DNIs de la caché. Retorna cuántos se eliminaron."""
+        eliminados = 0
+        with self._lock:
+            for dni in dnis:
+                entry = self._entries.get(dni)
+                if entry is None:
+                    continue
+                if solo_negativos and entry.estado != Estado.NOT_FOUND:
+                    continue
+                del self._entries[dni]
+                eliminados += 1
+        return eliminados
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "ttl_found": self.ttl_found,
+                "ttl_not_found": self.ttl_not_found,
+            }
+
+
+# Singleton global
+result_cache = ResultCache()
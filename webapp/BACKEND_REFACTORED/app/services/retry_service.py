@@ -1,5 +1,6 @@
 
 from app.db.repository import DniRepository
+from app.services.result_cache import result_cache
 
 class RetryService:
     def __init__(self):
@@ -9,8 +10,11 @@ class RetryService:
         """
         Re-encola registros con estado ERROR_* o NOT_FOUND de esta sesión.
         Retorna la cantidad de registros reencolados.
+        Los NOT_FOUND se invalidan en la caché para que el reintento
+        vuelva a consultar las webs en vez de reutilizar el resultado negativo.
         """
         result = self.repo.reintentar_no_encontrados(session_id)
+        result_cache.invalidate(result.get("dnis_no_encontrados", []), solo_negativos=True)
         return result.get("reencolados", 0)
 
     def recover_stuck(self, session_id: str) -> dict:
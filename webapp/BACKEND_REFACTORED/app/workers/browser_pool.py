@@ -0,0 +1,318 @@
+"""
+BrowserPool — Pool global de navegadores Chrome precalentados.
+
+Cada fuente (SUNEDU / MINEDU) mantiene drivers ya lanzados y navegados a su URL.
+Las sesiones piden prestado un driver al iniciar workers y lo devuelven al
+detenerse, así START no paga el arranque en frío de Chrome ni la primera carga
+de SUNEDU (6s + Turnstile).
+
+  - min idle por fuente: un thread de mantenimiento repone drivers listos.
+  - max por fuente: tope de Chrome (ociosos + prestados).
+  - health check periódico de los ociosos (los muertos se cierran y reponen).
+  - reciclaje: un driver se cierra tras BROWSER_POOL_RECYCLE_AFTER DNIs.
+  - perfiles: cada Chrome arranca con un slot de `profile_pool` (cookies,
+    clearance y caché de disco persisten entre reciclajes y reinicios).
+"""
+
+import itertools
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from botasaurus.browser import Driver
+
+from app.core.config import (
+    SUNEDU_URL, MINEDU_URL, HEADLESS, WINDOW_SIZE,
+    BLOCK_IMAGES_SUNEDU, BLOCK_IMAGES_MINEDU,
+    BROWSER_POOL_MIN_IDLE, BROWSER_POOL_MAX_SIZE, BROWSER_POOL_RECYCLE_AFTER,
+    BROWSER_POOL_HEALTH_INTERVAL, BROWSER_POOL_ACQUIRE_TIMEOUT,
+    SUNEDU_WARMUP_WAIT, MINEDU_WARMUP_WAIT, MINEDU_ENGINE,
+)
+
+from app.scrapers.asset_cache import optimizar_red
+from app.workers.profile_pool import profile_pool, ProfileSlot
+
+log = logging.getLogger("BROWSER_POOL")
+
+FUENTES = {
+    "sunedu": {"url": SUNEDU_URL, "block_images": BLOCK_IMAGES_SUNEDU, "warmup_wait": SUNEDU_WARMUP_WAIT},
+    "minedu": {"url": MINEDU_URL, "block_images": BLOCK_IMAGES_MINEDU, "warmup_wait": MINEDU_WARMUP_WAIT},
+}
+
+
+def usa_navegador(fuente: str) -> bool:
+    """False si los workers de la fuente no abren Chrome (MINEDU con motor HTTP)."""
+    return not (fuente == "minedu" and MINEDU_ENGINE == "http")
+
+
+def ocultar_ventana(driver: Driver):
+    """Mueve la ventana de Chrome fuera de pantalla (si el driver lo permite)."""
+    try:
+        d = getattr(driver, '_driver', None) or getattr(driver, 'driver', None)
+        if d:
+            d.set_window_position(-2400, -2400)
+    except Exception:
+        pass
+
+
+class PooledDriver:
+    """Driver prestado por el pool, con su contador de uso."""
+    _ids = itertools.count(1)
+
+    def __init__(self, fuente: str, driver: Driver, warm: bool, perfil: Optional[ProfileSlot] = None):
+        self.id = next(self._ids)
+        self.fuente = fuente
+        self.driver = driver
+        self.warm = warm              # True = ya navegado a la URL de la fuente
+        self.perfil = perfil          # Slot de perfil persistente (None = perfil temporal)
+        self.perfil_caliente = bool(perfil and perfil.prestado_caliente)  # Perfil con datos previos
+        self.uses = 0                 # DNIs procesados con este driver
+        self.created_at = time.time()
+        self.last_check = time.time()
+
+    def mark_used(self):
+        self.uses += 1
+
+    @property
+    def should_recycle(self) -> bool:
+        return BROWSER_POOL_RECYCLE_AFTER > 0 and self.uses >= BROWSER_POOL_RECYCLE_AFTER
+
+    def __repr__(self):
+        return f"<PooledDriver {self.fuente}#{self.id} uses={self.uses}>"
+
+
+class BrowserPool:
+    """Singleton con drivers precalentados por fuente."""
+
+    def __init__(
+        self,
+        min_idle: int = BROWSER_POOL_MIN_IDLE,
+        max_size: int = BROWSER_POOL_MAX_SIZE,
+        health_interval: float = BROWSER_POOL_HEALTH_INTERVAL,
+    ):
+        self.min_idle = min_idle
+        self.max_size = max_size
+        self.health_interval = health_interval
+        self._idle: Dict[str, List[PooledDriver]] = {f: [] for f in FUENTES}
+        self._leased: Dict[str, Dict[int, PooledDriver]] = {f: {} for f in FUENTES}
+        self._creating: Dict[str, int] = {f: 0 for f in FUENTES}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "created": 0, "closed": 0, "recycled": 0, "unhealthy": 0,
+            "acquired_warm": 0, "acquired_cold": 0,
+        }
+
+    # ── Ciclo de vida ──
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._maintain_loop, name="browser-pool", daemon=True)
+        self._thread.start()
+        log.info(f"[POOL] Iniciado (min_idle={self.min_idle}, max={self.max_size}/fuente)")
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            todos = [pd for f in FUENTES for pd in self._idle[f]]
+            for f in FUENTES:
+                self._idle[f] = []
+            self._cond.notify_all()
+        for pd in todos:
+            self._close(pd)
+        log.info("[POOL] Detenido — drivers ociosos cerrados")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # ── Préstamo ──
+    def acquire(self, fuente: str, stop_event: Optional[threading.Event] = None,
+                timeout: float = BROWSER_POOL_ACQUIRE_TIMEOUT) -> PooledDriver:
+        """
+        Presta un driver de la fuente. Prefiere uno precalentado; si no hay y
+        queda capacidad, lanza uno en frío. Si el pool está lleno, espera.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                if self._idle[fuente]:
+                    pd = self._idle[fuente].pop(0)
+                    self._leased[fuente][pd.id] = pd
+                    self.stats["acquired_warm"] += 1
+                    self._cond.notify_all()  # El mantenimiento repone min_idle
+                    return pd
+                if self._total(fuente) < self.max_size:
+                    self._creating[fuente] += 1
+                    break
+                restante = deadline - time.time()
+                if restante <= 0 or (stop_event and stop_event.is_set()):
+                    raise RuntimeError(f"Pool de navegadores {fuente.upper()} agotado ({self.max_size} drivers en uso)")
+                self._cond.wait(timeout=min(restante, 1.0))
+
+        # Arranque en frío fuera del lock (Chrome tarda segundos)
+        try:
+            driver, perfil = self._launch(fuente)
+            try:
+                pd = PooledDriver(fuente, driver, warm=False, perfil=perfil)
+            except Exception:
+                self._safe_quit(driver)
+                profile_pool.release(perfil, sano=False)
+                raise
+        finally:
+            with self._cond:
+                self._creating[fuente] -= 1
+        with self._cond:
+            self._leased[fuente][pd.id] = pd
+            self.stats["acquired_cold"] += 1
+        return pd
+
+    def release(self, pd: PooledDriver, discard: bool = False):
+        """Devuelve el driver. Se cierra si está reciclable, roto o el pool se detuvo."""
+        with self._cond:
+            self._leased[pd.fuente].pop(pd.id, None)
+        reciclar = pd.should_recycle
+        sano = not discard and self._is_healthy(pd)
+        if not sano or reciclar or self._stop.is_set():
+            if reciclar:
+                self.stats["recycled"] += 1
+                log.info(f"[POOL] Reciclando {pd} tras {pd.uses} DNIs")
+            self._close(pd, sano=sano)
+            with self._cond:
+                self._cond.notify_all()
+            return
+        pd.warm = True
+        with self._cond:
+            self._idle[pd.fuente].append(pd)
+            self._cond.notify_all()
+
+    # ── Internos ──
+    def _total(self, fuente: str) -> int:
+        return len(self._idle[fuente]) + len(self._leased[fuente]) + self._creating[fuente]
+
+    def _launch(self, fuente: str) -> Tuple[Driver, Optional[ProfileSlot]]:
+        cfg = FUENTES[fuente]
+        perfil = profile_pool.acquire(fuente)
+        try:
+            driver = Driver(
+                headless=HEADLESS,
+                block_images=cfg["block_images"],
+                window_size=WINDOW_SIZE,
+                profile=str(perfil.path) if perfil else None,
+            )
+        except Exception:
+            profile_pool.release(perfil, sano=False)
+            raise
+        ocultar_ventana(driver)
+        optimizar_red(driver, fuente)
+        self.stats["created"] += 1
+        return driver, perfil
+
+    def _warm(self, fuente: str) -> PooledDriver:
+        cfg = FUENTES[fuente]
+        driver, perfil = self._launch(fuente)
+        try:
+            driver.get(cfg["url"])
+            time.sleep(cfg["warmup_wait"])
+        except Exception:
+            self._safe_quit(driver)
+            profile_pool.release(perfil, sano=False)
+            raise
+        log.info(f"[POOL] Driver {fuente.upper()} precalentado")
+        return PooledDriver(fuente, driver, warm=True, perfil=perfil)
+
+    def _is_healthy(self, pd: PooledDriver) -> bool:
+        try:
+            ok = pd.driver.run_js("return document.readyState") is not None
+        except Exception:
+            ok = False
+        pd.last_check = time.time()
+        if not ok:
+            self.stats["unhealthy"] += 1
+            log.warning(f"[POOL] {pd} no responde — se descarta")
+        return ok
+
+    def _close(self, pd: PooledDriver, sano: bool = True):
+        self._safe_quit(pd.driver)
+        profile_pool.release(pd.perfil, sano=sano)  # Tras cerrar Chrome: el perfil queda consistente
+        self.stats["closed"] += 1
+
+    @staticmethod
+    def _safe_quit(driver: Driver):
+        try:
+            driver.close()
+        except Exception:
+            pass
+
+    def _maintain_loop(self):
+        while not self._stop.is_set():
+            for fuente in FUENTES:
+                if self._stop.is_set():
+                    break
+                self._refill(fuente)
+                self._health_check(fuente)
+            with self._cond:
+                self._cond.wait(timeout=5)
+
+    def _refill(self, fuente: str):
+        if not usa_navegador(fuente):
+            return  # MINEDU sin navegador: no precalentar Chrome
+        with self._cond:
+            faltan = self.min_idle - len(self._idle[fuente]) - self._creating[fuente]
+            faltan = min(faltan, self.max_size - self._total(fuente))
+            if faltan <= 0:
+                return
+            self._creating[fuente] += faltan
+        for _ in range(faltan):
+            try:
+                pd = self._warm(fuente)
+            except Exception as e:
+                log.error(f"[POOL] Error precalentando {fuente.upper()}: {e}")
+                with self._cond:
+                    self._creating[fuente] -= 1
+                continue
+            with self._cond:
+                self._creating[fuente] -= 1
+                self._idle[fuente].append(pd)
+                self._cond.notify_all()
+
+    def _health_check(self, fuente: str):
+        ahora = time.time()
+        with self._cond:
+            vencidos = [pd for pd in self._idle[fuente] if ahora - pd.last_check >= self.health_interval]
+        for pd in vencidos:
+            with self._cond:
+                if pd not in self._idle[fuente]:
+                    continue  # Lo prestaron mientras tanto
+                self._idle[fuente].remove(pd)
+            if self._is_healthy(pd):
+                with self._cond:
+                    self._idle[fuente].append(pd)
+                    self._cond.notify_all()
+            else:
+                self._close(pd, sano=False)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "enabled": self.running,
+                "min_idle": self.min_idle,
+                "max_size": self.max_size,
+                "recycle_after": BROWSER_POOL_RECYCLE_AFTER,
+                "fuentes": {
+                    f: {
+                        "idle": len(self._idle[f]),
+                        "leased": len(self._leased[f]),
+                        "creating": self._creating[f],
+                    }
+                    for f in FUENTES
+                },
+                **self.stats,
+            }
+
+
+# Singleton global
+browser_pool = BrowserPool()
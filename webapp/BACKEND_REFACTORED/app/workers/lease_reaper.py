@@ -0,0 +1,76 @@
+"""
+LeaseReaper — Recuperación continua de DNIs cuyo worker murió.
+
+Cada registro reclamado lleva `lease_expires_at`; el thread de latido del
+worker lo renueva, también durante la consulta del DNI (ColaLocal.latido). Un thread de fondo barre cada REAPER_INTERVALO s y
+reencola, con UPDATEs por conjunto sobre el índice de lease_expires_at, solo
+los leases vencidos: lo que un worker vivo está procesando no se toca.
+Reemplaza el scan completo de PROCESANDO_* que corría en cada START.
+"""
+
+import threading
+import logging
+from typing import Optional
+
+from app.core.config import REAPER_INTERVALO
+from app.core.metrics import metrics
+from app.db.repository import DniRepository
+
+log = logging.getLogger("REAPER")
+
+
+class LeaseReaper:
+    """Thread que reencola periódicamente los leases vencidos de todas las sesiones."""
+
+    def __init__(self, intervalo: float = REAPER_INTERVALO, repo: Optional[DniRepository] = None):
+        self.intervalo = intervalo
+        self.repo = repo or DniRepository()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"barridos": 0, "sunedu_recuperados": 0, "minedu_recuperados": 0, "errores": 0}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="lease-reaper", daemon=True)
+        self._thread.start()
+        log.info(f"[REAPER] Iniciado (cada {self.intervalo}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _loop(self):
+        while not self._stop.wait(self.intervalo):
+            try:
+                self.barrer()
+            except Exception as e:
+                with self._lock:
+                    self.stats["errores"] += 1
+                log.error(f"[REAPER] Error barriendo leases: {e}")
+
+    def barrer(self, session_id: Optional[str] = None) -> dict:
+        """Reencola los leases vencidos (de una sesión o de todas). Retorna los conteos."""
+        recuperados = self.repo.recuperar_leases_vencidos(session_id)
+        total = recuperados["sunedu_recuperados"] + recuperados["minedu_recuperados"]
+        with self._lock:
+            self.stats["barridos"] += 1
+            for k, v in recuperados.items():
+                self.stats[k] += v
+        if total:
+            metrics.incr("lease.vencidos", total)
+            log.warning(f"[REAPER] {total} DNIs con lease vencido vuelven a la cola: {recuperados}")
+        return recuperados
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"running": self.running, "intervalo_s": self.intervalo, **self.stats}
+
+
+# Singleton global
+lease_reaper = LeaseReaper()
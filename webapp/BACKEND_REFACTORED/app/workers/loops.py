@@ -1,21 +1,32 @@
 
 import time
+import uuid
+import threading
 import logging
 import traceback
+from collections import deque
+from typing import Optional
 from botasaurus.browser import browser, Driver
 
 from app.core.config import (
-    Estado, 
-    SUNEDU_SLEEP_MIN, SUNEDU_SLEEP_MAX, 
-    MINEDU_SLEEP_MIN, MINEDU_SLEEP_MAX,
-    WORKER_POLL_INTERVAL, HEADLESS, 
+    Estado, SubEstado, PIPELINE_MODE,
+    WORKER_POLL_INTERVAL, CLAIM_BATCH_SIZE, LEASE_HEARTBEAT_SEGUNDOS, HEADLESS, 
     BLOCK_IMAGES_SUNEDU, BLOCK_IMAGES_MINEDU,
-    WINDOW_SIZE
+    WINDOW_SIZE, BROWSER_POOL_ENABLED, MINEDU_ENGINE, SCRAPER_BACKEND,
 )
 from app.db.repository import DniRepository
 from app.scrapers.sunedu import SuneduScraper, Motivo as MotivoSunedu
 from app.scrapers.minedu import MineduScraper, Motivo as MotivoMinedu
+from app.scrapers.minedu_http import MineduHttpScraper
+from app.scrapers.simulated import SimulatedScraper
 from app.core.session_manager import session_manager
+from app.services.result_cache import result_cache
+from app.services.pacing import pacing
+from app.services.circuit_breaker import circuit_breakers
+from app.core.metrics import metrics
+from app.scrapers.asset_cache import optimizar_red
+from app.workers.browser_pool import browser_pool, ocultar_ventana, PooledDriver
+from app.workers.profile_pool import profile_pool, ProfileSlot
 
 log = logging.getLogger("WORKER")
 
@@ -26,151 +37,507 @@ def _get_session_orchestrator(session_id: str):
     return session_manager.get_orchestrator(session_id)
 
 
+def _resolver_desde_cache(cola: "ColaLocal", item: dict, estados_validos=None) -> bool:
+    """
+    Si el DNI tiene un resultado final cacheado (de cualquier sesión), lo aplica
+    directamente sin abrir el navegador. Retorna True si hubo hit.
+    """
+    hit = result_cache.get(item["dni"], estados_validos)
+    if not hit:
+        return False
+    cola.guardar(
+        item,
+        hit["estado"],
+        payload_sunedu=hit["payload_sunedu"],
+        payload_minedu=hit["payload_minedu"],
+        error_msg=hit["motivo"],
+    )
+    return True
+
+
+def _crear_scraper(fuente: str, driver: Optional[Driver]):
+    """Scraper del worker según SCRAPER_BACKEND (y motor MINEDU: sin driver = HTTP)."""
+    if SCRAPER_BACKEND == "simulated":
+        return SimulatedScraper(fuente)
+    if fuente == "sunedu":
+        return SuneduScraper()
+    return MineduHttpScraper() if driver is None else MineduScraper()
+
+
+class ColaLocal:
+    """
+    DNIs reclamados en lote (lease) por un worker. Se piden CLAIM_BATCH_SIZE de
+    una vez y se procesan desde memoria: un round trip y una transacción de
+    escritura por lote en vez de por DNI. Un thread de latido renueva cada
+    LEASE_HEARTBEAT_SEGUNDOS el lease de lo retenido, incluido el DNI en
+    consulta (`actual`): un DNI lento (reintentos, Turnstile) no deja vencer su
+    lease. Los resultados se guardan con `guardar()`, que solo escribe si el
+    worker sigue dueño del lease. Lo no procesado vuelve a la cola con
+    `liberar()` (stop, pausa, reciclaje del driver o circuito abierto).
+    """
+
+    def __init__(self, repo: DniRepository, sid: str, fuente: str, n: int = CLAIM_BATCH_SIZE):
+        self.repo = repo
+        self.sid = sid
+        self.fuente = fuente
+        self.n = max(n, 1)
+        self.worker_id = f"{fuente}-{sid[:8]}-{uuid.uuid4().hex[:6]}"
+        self.items = deque()
+        self.actual: Optional[dict] = None  # DNI en consulta: se renueva hasta pedir el siguiente
+        self._lock = threading.Lock()
+        self._cerrada = threading.Event()
+        self._latido: Optional[threading.Thread] = None
+        self._dueno = threading.current_thread()  # Thread del loop: si muere, el latido se detiene
+
+    def siguiente(self) -> Optional[dict]:
+        """Próximo DNI del lease; si se agotó, reclama otro lote según PIPELINE_MODE."""
+        with self._lock:
+            self.actual = None
+            vacia = not self.items
+        if vacia:
+            lote = self._reclamar()
+            with self._lock:
+                self.items.extend(lote)
+        with self._lock:
+            self.actual = self.items.popleft() if self.items else None
+        if self.actual and self._latido is None:
+            self._latido = threading.Thread(target=self._latir, name=f"latido-{self.worker_id}", daemon=True)
+            self._latido.start()
+        return self.actual
+
+    def _latir(self):
+        while not self._cerrada.wait(LEASE_HEARTBEAT_SEGUNDOS):
+            if not self._dueno.is_alive():
+                # El loop murió sin cerrar la cola: dejar vencer el lease para que el reaper lo reencole
+                log.warning(f"[{self.sid[:8]}][{self.fuente.upper()}] Worker terminado sin cerrar su cola: "
+                            f"se detiene el latido")
+                return
+            try:
+                self.latido()
+            except Exception as e:
+                log.warning(f"[{self.sid[:8]}][{self.fuente.upper()}] Latido fallido: {e}")
+
+    def latido(self):
+        """Renueva el lease de lo retenido; descarta de la cola local lo que el reaper ya reencoló."""
+        with self._lock:
+            ids = [i["id"] for i in self.items]
+            if self.actual:
+                ids.append(self.actual["id"])
+        if not ids:
+            return
+        perdidos = set(ids) - set(self.repo.renovar_lease(ids, self.fuente, self.worker_id))
+        if not perdidos:
+            return
+        with self._lock:
+            antes = len(self.items)
+            self.items = deque(i for i in self.items if i["id"] not in perdidos)
+            descartados = antes - len(self.items)
+        if descartados:
+            metrics.incr(f"{self.fuente}.leases_perdidos", descartados)
+            log.warning(f"[{self.sid[:8]}][{self.fuente.upper()}] {descartados} DNIs con lease vencido "
+                        f"ya reencolados: se descartan de la cola local")
+
+    def _reclamar(self):
+        t0 = time.perf_counter()
+        if PIPELINE_MODE == "fanout":
+            lote = self.repo.reclamar_fuente(self.sid, self.fuente, self.worker_id, self.n)
+        elif self.fuente == "sunedu":
+            lote = self.repo.reclamar(self.sid, Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, self.worker_id, self.n)
+        else:
+            lote = self.repo.reclamar(self.sid, Estado.CHECK_MINEDU, Estado.PROCESANDO_MINEDU, self.worker_id, self.n)
+        metrics.observe(f"{self.fuente}.tomar_s", time.perf_counter() - t0)
+        if lote:
+            metrics.observe(f"{self.fuente}.lote_reclamado", len(lote))
+        return lote
+
+    def guardar(self, item: dict, nuevo_estado: str, **campos) -> bool:
+        """`actualizar_resultado` solo si este worker sigue dueño del lease del DNI."""
+        escrito = self.repo.actualizar_resultado(
+            item["id"], nuevo_estado, fuente=self.fuente, worker_id=self.worker_id, **campos
+        )
+        if not escrito:
+            self.descartar(item)
+        return escrito
+
+    def descartar(self, item: dict):
+        """Resultado de un DNI cuyo lease ya no es de este worker: no se escribió."""
+        metrics.incr(f"{self.fuente}.resultados_descartados")
+        log.warning(f"[{self.sid[:8]}][{self.fuente.upper()}] {item['dni']} ya no es de este worker "
+                    f"(lease vencido y reencolado): se descarta su resultado")
+
+    def devolver(self, item: dict):
+        """Devuelve a la cola el DNI en curso sin consultarlo."""
+        self.repo.devolver(item["id"], self.fuente, self.worker_id)
+
+    def liberar(self):
+        """Devuelve a la cola los DNIs reclamados que este worker no llegó a procesar."""
+        with self._lock:
+            ids = [i["id"] for i in self.items]
+            self.items.clear()
+            self.actual = None
+        if not ids:
+            return
+        devueltos = self.repo.devolver_lote(ids, self.fuente, self.worker_id)
+        log.info(f"[{self.sid[:8]}][{self.fuente.upper()}] {devueltos} DNIs del lease vuelven a la cola")
+
+    def cerrar(self):
+        """Fin del loop: libera lo retenido y detiene el latido (aunque liberar falle: lo recoge el reaper)."""
+        try:
+            self.liberar()
+        finally:
+            self._cerrada.set()
+
+
+def _registrar_fanout(cola: ColaLocal, item: dict, sub_estado: str,
+                      payload=None, error_msg: Optional[str] = None):
+    """Guarda el resultado de una fuente (modo fanout) y cachea si el registro quedó final."""
+    final = cola.repo.registrar_subresultado(item["id"], cola.fuente, sub_estado, payload, error_msg,
+                                             worker_id=cola.worker_id)
+    if final is False:
+        cola.descartar(item)
+        return
+    if not final:
+        return
+    if final["estado"] == Estado.FOUND_SUNEDU:
+        result_cache.put_found_sunedu(item["dni"], final["payload_sunedu"])
+    elif final["estado"] == Estado.FOUND_MINEDU:
+        result_cache.put_found_minedu(item["dni"], final["payload_minedu"])
+    elif final["estado"] == Estado.NOT_FOUND:
+        result_cache.put_not_found(item["dni"], error_msg)
+
+
+def _consultar(cola: ColaLocal, scraper, driver, item: dict, breaker, sid: str):
+    """
+    Consulta la fuente alimentando su circuit breaker. Si el DNI falla con el
+    circuito abierto (o lo abre), vuelve a la cola y retorna None en vez de
+    propagar el error que lo marcaría ERROR_*.
+    """
+    fuente = cola.fuente
+    t0 = time.time()
+    try:
+        resultado = scraper.procesar_dni(driver, item["dni"])
+    except Exception as e:
+        metrics.observe(f"{fuente}.dni_s", time.time() - t0)
+        if not breaker.registrar_fallo(str(e)[:120]):
+            raise
+        cola.devolver(item)
+        log.warning(f"[{sid[:8]}][{fuente.upper()}] Circuito abierto: {item['dni']} vuelve a la cola")
+        return None
+    metrics.observe(f"{fuente}.dni_s", time.time() - t0)
+    breaker.registrar_exito()
+    return resultado
+
+
+# Resultado de un loop: terminó por stop, o pide un driver nuevo al pool
+LOOP_DETENIDO = "detenido"
+LOOP_RECICLAR = "reciclar"
+
+
+def _run_con_pool(fuente: str, loop_fn, session_id: str):
+    """
+    Ejecuta el loop con drivers prestados del pool global. Si el driver llega
+    a su límite de DNIs, se devuelve (el pool lo recicla) y se pide otro.
+    """
+    orch = _get_session_orchestrator(session_id)
+    while orch and not orch.stop_event.is_set():
+        try:
+            lease = browser_pool.acquire(fuente, stop_event=orch.stop_event)
+        except Exception as e:
+            log.error(f"[{session_id[:8]}][{fuente.upper()}] No se obtuvo driver del pool: {e}")
+            return
+        log.info(f"[{session_id[:8]}][{fuente.upper()}] Driver {'precalentado' if lease.warm else 'en frío'} del pool {lease}")
+        resultado = LOOP_DETENIDO
+        try:
+            resultado = loop_fn(lease.driver, session_id, lease)
+        finally:
+            browser_pool.release(lease)
+        if resultado != LOOP_RECICLAR:
+            return
+
+
+def _medir_primer_dni(fuente: str, t_inicio: float, lease: Optional[PooledDriver],
+                      perfil: Optional[ProfileSlot]):
+    """Latencia del primer DNI de un Chrome recién lanzado, separada por estado del perfil."""
+    perfil = lease.perfil if lease else perfil
+    if perfil is None:
+        tipo = "perfil_temporal"
+    else:
+        tipo = "perfil_caliente" if perfil.prestado_caliente else "perfil_nuevo"
+    dt = time.time() - t_inicio
+    metrics.observe(f"{fuente}.primer_dni_s", dt)
+    metrics.observe(f"{fuente}.primer_dni_s.{tipo}", dt)
+    log.info(f"[{fuente.upper()}] Primer DNI en {dt:.1f}s ({tipo})")
+
+
+def _despues_de_dni(lease: Optional[PooledDriver]) -> bool:
+    """Cuenta un DNI procesado por el driver. Retorna True si toca reciclarlo."""
+    if lease is None:
+        return False
+    lease.mark_used()
+    return lease.should_recycle
+
+
 def sunedu_worker_loop(session_id: str):
-    """Entry point SUNEDU — crea Chrome fresco cada vez."""
+    """Entry point SUNEDU — backend simulado, driver del pool global o Chrome fresco."""
+    if SCRAPER_BACKEND == "simulated":
+        _sunedu_loop(None, session_id)
+        return
+
+    if BROWSER_POOL_ENABLED and browser_pool.running:
+        _run_con_pool("sunedu", _sunedu_loop, session_id)
+        return
+
+    perfil = profile_pool.acquire("sunedu")
 
     @browser(
         headless=HEADLESS,
         block_images=BLOCK_IMAGES_SUNEDU,
         window_size=WINDOW_SIZE,
+        profile=str(perfil.path) if perfil else None,
         reuse_driver=False,
         output=None,
     )
     def _run(driver: Driver, data):
-        try:
-            d = getattr(driver, '_driver', None) or getattr(driver, 'driver', None)
-            if d:
-                d.set_window_position(-2400, -2400)
-        except Exception:
-            pass
-
-        sid = data
-        repo = DniRepository()
-        scraper = SuneduScraper()
-        orch = _get_session_orchestrator(sid)
-        
-        log.info(f"[{sid[:8]}] Iniciando Worker SUNEDU")
-        
+        ocultar_ventana(driver)
+        optimizar_red(driver, "sunedu")
+        _sunedu_loop(driver, data, perfil=perfil)
+
+    try:
+        _run(session_id)
+    finally:
+        profile_pool.release(perfil)
+
+
+def _sunedu_loop(driver: Optional[Driver], sid: str, lease: Optional[PooledDriver] = None,
+                 perfil: Optional[ProfileSlot] = None) -> str:
+    repo = DniRepository()
+    scraper = _crear_scraper("sunedu", driver)
+    ritmo = pacing.get("sunedu")
+    breaker = circuit_breakers.get("sunedu")
+    if lease and lease.warm:
+        # El pool ya cargó la página: saltar la primera carga de 6s
+        scraper._primera_carga = False
+        scraper._setup_cdp_monitoring(driver)
+    orch = _get_session_orchestrator(sid)
+    # Chrome recién lanzado (no precalentado por el pool): medir su primer DNI
+    t_inicio = None if driver is None or (lease and lease.warm) else time.time()
+    
+    cola = ColaLocal(repo, sid, "sunedu")
+    log.info(f"[{sid[:8]}] Iniciando Worker SUNEDU")
+    
+    try:
         while orch and not orch.stop_event.is_set():
+            if not orch.pause_event.is_set():
+                cola.liberar()  # Pausado: no retener el lease de lo que no se va a consultar
             orch.pause_event.wait()
             if orch.stop_event.is_set():
                 break
-            
+        
+            if not breaker.permitir():
+                # Fuente bloqueando: soltar el lease y no reclamar hasta que el breaker deje probar
+                cola.liberar()
+                breaker.esperar(orch.stop_event)
+                continue
+
+            # Un fallo al reclamar (p.ej. BD bloqueada) no debe marcar como error el DNI anterior
+            item = None
             try:
-                item = repo.tomar_siguiente(sid, Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU)
+                item = cola.siguiente()
                 if not item:
+                    breaker.liberar_sonda()
                     time.sleep(WORKER_POLL_INTERVAL)
                     continue
 
                 dni = item["dni"]
+                if _resolver_desde_cache(cola, item, None):
+                    log.info(f"[{sid[:8]}][SUNEDU] Caché hit {dni}")
+                    breaker.liberar_sonda()
+                    continue
+
                 log.info(f"[{sid[:8]}][SUNEDU] Procesando {dni}...")
-                
-                resultado = scraper.procesar_dni(driver, dni)
-                
+            
+                resultado = _consultar(cola, scraper, driver, item, breaker, sid)
+                if resultado is None:
+                    continue
+                if t_inicio is not None:
+                    _medir_primer_dni("sunedu", t_inicio, lease, perfil)
+                    t_inicio = None
+
                 if resultado["encontrado"]:
-                    repo.actualizar_resultado(
-                        item["id"], 
-                        Estado.FOUND_SUNEDU, 
-                        payload_sunedu=resultado["datos"],
-                        error_msg=None
-                    )
+                    if PIPELINE_MODE == "fanout":
+                        _registrar_fanout(cola, item, SubEstado.FOUND, payload=resultado["datos"])
+                    else:
+                        if cola.guardar(
+                            item,
+                            Estado.FOUND_SUNEDU,
+                            payload_sunedu=resultado["datos"],
+                            error_msg=None
+                        ):  # Lease perdido: no se escribió, tampoco se cachea
+                            result_cache.put_found_sunedu(dni, resultado["datos"])
                     log.info(f"[{sid[:8]}][SUNEDU] Encontrado {dni}")
-                    time.sleep(2)
                 else:
-                    repo.actualizar_resultado(
-                        item["id"],
-                        Estado.CHECK_MINEDU,
-                        error_msg=resultado["motivo"]
-                    )
+                    if PIPELINE_MODE == "fanout":
+                        _registrar_fanout(cola, item, SubEstado.NOT_FOUND, error_msg=resultado["motivo"])
+                    else:
+                        cola.guardar(
+                            item,
+                            Estado.CHECK_MINEDU,
+                            error_msg=resultado["motivo"]
+                        )
                     log.info(f"[{sid[:8]}][SUNEDU] No encontrado {dni} -> MINEDU")
-                    time.sleep(2)
+                ritmo.pausar(orch.stop_event)
+
+                if _despues_de_dni(lease):
+                    log.info(f"[{sid[:8]}][SUNEDU] Driver alcanzó su límite de DNIs -> reciclando")
+                    return LOOP_RECICLAR
 
             except Exception as e:
-                if "item" in locals() and item:
-                    repo.actualizar_resultado(
-                        item["id"],
-                        Estado.ERROR_SUNEDU,
-                        error_msg=f"Error Worker: {str(e)}"
-                    )
+                if item:
+                    if PIPELINE_MODE == "fanout":
+                        _registrar_fanout(cola, item, SubEstado.ERROR, error_msg=f"Error Worker: {str(e)}")
+                    else:
+                        cola.guardar(
+                            item,
+                            Estado.ERROR_SUNEDU,
+                            error_msg=f"Error Worker: {str(e)}"
+                        )
                     log.error(f"[{sid[:8]}][SUNEDU] Error procesando {dni}: {e}")
                 else:
                     log.error(f"[{sid[:8]}][SUNEDU] Loop Error: {e}")
                     time.sleep(5)
+    finally:
+        cola.cerrar()  # También si una excepción escapa del loop: suelta el lease y detiene el latido
+    log.info(f"[{sid[:8]}] Worker SUNEDU terminado")
+    return LOOP_DETENIDO
 
-        log.info(f"[{sid[:8]}] Worker SUNEDU terminado — Chrome cerrado")
 
-    _run(session_id)
+def minedu_worker_loop(session_id: str):
+    """Entry point MINEDU — backend simulado, motor HTTP sin navegador, driver del pool global o Chrome fresco."""
+    if SCRAPER_BACKEND == "simulated" or MINEDU_ENGINE == "http":
+        _minedu_loop(None, session_id)
+        return
 
+    if BROWSER_POOL_ENABLED and browser_pool.running:
+        _run_con_pool("minedu", _minedu_loop, session_id)
+        return
 
-def minedu_worker_loop(session_id: str):
-    """Entry point MINEDU — crea Chrome fresco cada vez."""
+    perfil = profile_pool.acquire("minedu")
 
     @browser(
         headless=HEADLESS,
         block_images=BLOCK_IMAGES_MINEDU,
         window_size=WINDOW_SIZE,
+        profile=str(perfil.path) if perfil else None,
         reuse_driver=False,
         output=None,
     )
     def _run(driver: Driver, data):
-        try:
-            d = getattr(driver, '_driver', None) or getattr(driver, 'driver', None)
-            if d:
-                d.set_window_position(-2400, -2400)
-        except Exception:
-            pass
-
-        sid = data
-        repo = DniRepository()
-        scraper = MineduScraper()
-        orch = _get_session_orchestrator(sid)
-        
-        log.info(f"[{sid[:8]}] Iniciando Worker MINEDU")
-        
+        ocultar_ventana(driver)
+        optimizar_red(driver, "minedu")
+        _minedu_loop(driver, data, perfil=perfil)
+
+    try:
+        _run(session_id)
+    finally:
+        profile_pool.release(perfil)
+
+
+def _minedu_loop(driver: Optional[Driver], sid: str, lease: Optional[PooledDriver] = None,
+                 perfil: Optional[ProfileSlot] = None) -> str:
+    repo = DniRepository()
+    scraper = _crear_scraper("minedu", driver)
+    ritmo = pacing.get("minedu")
+    breaker = circuit_breakers.get("minedu")
+    orch = _get_session_orchestrator(sid)
+    t_inicio = None if driver is None or (lease and lease.warm) else time.time()
+    
+    cola = ColaLocal(repo, sid, "minedu")
+    log.info(f"[{sid[:8]}] Iniciando Worker MINEDU ({getattr(scraper, 'MOTOR', 'browser')})")
+    
+    try:
         while orch and not orch.stop_event.is_set():
+            if not orch.pause_event.is_set():
+                cola.liberar()  # Pausado: no retener el lease de lo que no se va a consultar
             orch.pause_event.wait()
             if orch.stop_event.is_set():
                 break
-            
+        
+            if not breaker.permitir():
+                # Fuente bloqueando: soltar el lease y no reclamar hasta que el breaker deje probar
+                cola.liberar()
+                breaker.esperar(orch.stop_event)
+                continue
+
+            # Un fallo al reclamar (p.ej. BD bloqueada) no debe marcar como error el DNI anterior
+            item = None
             try:
-                item = repo.tomar_siguiente(sid, Estado.CHECK_MINEDU, Estado.PROCESANDO_MINEDU)
+                item = cola.siguiente()
                 if not item:
+                    breaker.liberar_sonda()
                     time.sleep(WORKER_POLL_INTERVAL)
                     continue
 
                 dni = item["dni"]
+                if _resolver_desde_cache(cola, item, (Estado.FOUND_MINEDU, Estado.NOT_FOUND)):
+                    log.info(f"[{sid[:8]}][MINEDU] Caché hit {dni}")
+                    breaker.liberar_sonda()
+                    continue
+
                 log.info(f"[{sid[:8]}][MINEDU] Procesando {dni}...")
-                
-                resultado = scraper.procesar_dni(driver, dni)
-                
+            
+                resultado = _consultar(cola, scraper, driver, item, breaker, sid)
+                if resultado is None:
+                    continue
+                if t_inicio is not None:
+                    _medir_primer_dni("minedu", t_inicio, lease, perfil)
+                    t_inicio = None
+
                 if resultado["encontrado"]:
-                    repo.actualizar_resultado(
-                        item["id"], 
-                        Estado.FOUND_MINEDU, 
-                        payload_minedu=resultado["datos"],
-                        error_msg=None
-                    )
+                    if PIPELINE_MODE == "fanout":
+                        _registrar_fanout(cola, item, SubEstado.FOUND, payload=resultado["datos"])
+                    else:
+                        if cola.guardar(
+                            item,
+                            Estado.FOUND_MINEDU,
+                            payload_minedu=resultado["datos"],
+                            error_msg=None
+                        ):  # Lease perdido: no se escribió, tampoco se cachea
+                            result_cache.put_found_minedu(dni, resultado["datos"])
                     log.info(f"[{sid[:8]}][MINEDU] Encontrado {dni}")
                 else:
-                    repo.actualizar_resultado(
-                        item["id"],
-                        Estado.NOT_FOUND,
-                        error_msg=resultado["motivo"]
-                    )
-                    log.info(f"[{sid[:8]}][MINEDU] No encontrado final {dni}")
+                    if PIPELINE_MODE == "fanout":
+                        _registrar_fanout(cola, item, SubEstado.NOT_FOUND, error_msg=resultado["motivo"])
+                    else:
+                        if cola.guardar(
+                            item,
+                            Estado.NOT_FOUND,
+                            error_msg=resultado["motivo"]
+                        ):
+                            result_cache.put_not_found(dni, resultado["motivo"])
+                    log.info(f"[{sid[:8]}][MINEDU] No encontrado {dni}")
+                ritmo.pausar(orch.stop_event)
+
+                if _despues_de_dni(lease):
+                    log.info(f"[{sid[:8]}][MINEDU] Driver alcanzó su límite de DNIs -> reciclando")
+                    return LOOP_RECICLAR
 
             except Exception as e:
-                if "item" in locals() and item:
-                    repo.actualizar_resultado(
-                        item["id"],
-                        Estado.ERROR_MINEDU,
-                        error_msg=f"Error Worker: {str(e)}"
-                    )
+                if item:
+                    if PIPELINE_MODE == "fanout":
+                        _registrar_fanout(cola, item, SubEstado.ERROR, error_msg=f"Error Worker: {str(e)}")
+                    else:
+                        cola.guardar(
+                            item,
+                            Estado.ERROR_MINEDU,
+                            error_msg=f"Error Worker: {str(e)}"
+                        )
                     log.error(f"[{sid[:8]}][MINEDU] Error procesando {dni}: {e}")
                 else:
                     log.error(f"[{sid[:8]}][MINEDU] Loop Error: {e}")
                     time.sleep(5)
-
-        log.info(f"[{sid[:8]}] Worker MINEDU terminado — Chrome cerrado")
-
-    _run(session_id)
+    finally:
+        cola.cerrar()  # También si una excepción escapa del loop: suelta el lease y detiene el latido
+        if driver is None:
+            scraper.close()
+    log.info(f"[{sid[:8]}] Worker MINEDU terminado")
+    return LOOP_DETENIDO
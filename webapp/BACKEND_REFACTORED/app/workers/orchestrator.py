@@ -26,8 +26,9 @@ class Orchestrator:
         self.pause_event.set()
         self.threads = []
 
-        for target in targets:
-            t = threading.Thread(target=target, args=(self.session_id,), daemon=True)
+        for idx, target in enumerate(targets, 1):
+            name = f"{getattr(target, '__name__', 'worker')}-{self.session_id[:8]}-{idx}"
+            t = threading.Thread(target=target, args=(self.session_id,), name=name, daemon=True)
             self.threads.append(t)
             t.start()
         
@@ -56,5 +57,9 @@ class Orchestrator:
     def is_running(self) -> bool:
         return any(t.is_alive() for t in self.threads)
 
+    def alive_count(self, prefix: str = "") -> int:
+        """Cuántos threads siguen vivos (opcionalmente filtrando por nombre de target)."""
+        return sum(1 for t in self.threads if t.is_alive() and t.name.startswith(prefix))
+
     def is_paused(self) -> bool:
         return not self.pause_event.is_set()
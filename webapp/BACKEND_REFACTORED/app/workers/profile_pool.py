@@ -0,0 +1,221 @@
+"""
+ProfilePool — Perfiles persistentes de Chrome, un slot por navegador simultáneo.
+
+Cada Chrome nuevo arrancaba con un perfil vacío: volvía a descargar todos los
+assets de la SPA de SUNEDU y enfrentaba Turnstile en frío. Ahora cada fuente
+tiene PROFILE_POOL_SLOTS directorios `<PROFILE_POOL_DIR>/<fuente>-<n>` que
+conservan cookies, tokens de clearance y la caché de disco entre corridas:
+
+  - acquire(fuente): presta un slot libre (prefiere los ya usados = calientes).
+  - release(slot, sano): lo devuelve; Chrome caído cuenta como fallo.
+  - Antes de prestar se revisa el perfil: locks huérfanos (SingletonLock de un
+    Chrome muerto) se borran, `Local State` / `Preferences` ilegibles o un
+    perfil de más de PROFILE_POOL_MAX_MB lo marcan corrupto y se reconstruye
+    vacío; lo mismo tras PROFILE_POOL_MAX_FALLOS caídas seguidas.
+Sin slot libre (o deshabilitado) acquire retorna None y Chrome usa un perfil
+temporal, como antes.
+"""
+
+import json
+import shutil
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import (
+    PROFILE_POOL_ENABLED, PROFILE_POOL_DIR, PROFILE_POOL_SLOTS,
+    PROFILE_POOL_MAX_MB, PROFILE_POOL_MAX_FALLOS,
+)
+
+log = logging.getLogger("PROFILES")
+
+# Locks que deja Chrome en el user-data-dir (si murió sin cerrar, impiden arrancar)
+_LOCKS = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile")
+# JSON que Chrome reescribe en cada cierre: si quedaron truncados, el perfil está roto
+_JSON_PERFIL = ("Local State", "Default/Preferences")
+
+
+class ProfileSlot:
+    """Directorio de perfil prestable de una fuente."""
+
+    def __init__(self, fuente: str, indice: int, path: Path):
+        self.fuente = fuente
+        self.indice = indice
+        self.path = path
+        self.en_uso = False
+        self.usos = 0
+        self.fallos = 0               # Caídas seguidas de Chrome con este perfil
+        self.reconstrucciones = 0
+        self.ultimo_uso: Optional[float] = None
+        self.prestado_caliente = False  # Tenía datos al prestarse por última vez
+
+    @property
+    def nombre(self) -> str:
+        return f"{self.fuente}-{self.indice}"
+
+    @property
+    def caliente(self) -> bool:
+        """True si el perfil ya tiene datos de una corrida anterior."""
+        return (self.path / "Local State").exists()
+
+    def __repr__(self):
+        return f"<ProfileSlot {self.nombre} usos={self.usos}>"
+
+
+class ProfilePool:
+    """Registro de slots de perfil por fuente."""
+
+    def __init__(self, base_dir: Path = PROFILE_POOL_DIR, slots: int = PROFILE_POOL_SLOTS,
+                 enabled: bool = PROFILE_POOL_ENABLED, max_mb: float = PROFILE_POOL_MAX_MB,
+                 max_fallos: int = PROFILE_POOL_MAX_FALLOS):
+        self.base_dir = Path(base_dir)
+        self.slots = slots
+        self.enabled = enabled
+        self.max_mb = max_mb
+        self.max_fallos = max_fallos
+        self._slots: Dict[str, List[ProfileSlot]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"prestados_calientes": 0, "prestados_nuevos": 0, "sin_slot": 0,
+                      "reconstruidos": 0, "locks_limpiados": 0}
+
+    def _de(self, fuente: str) -> List[ProfileSlot]:
+        if fuente not in self._slots:
+            self._slots[fuente] = [
+                ProfileSlot(fuente, i, self.base_dir / f"{fuente}-{i}") for i in range(1, self.slots + 1)
+            ]
+        return self._slots[fuente]
+
+    # ── Préstamo ──
+    def acquire(self, fuente: str) -> Optional[ProfileSlot]:
+        """Slot libre de la fuente (calientes primero, el más reciente) o None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            libres = [s for s in self._de(fuente) if not s.en_uso]
+            if not libres:
+                self.stats["sin_slot"] += 1
+                log.warning(f"[PROFILES] Sin slot libre para {fuente.upper()} → perfil temporal")
+                return None
+            libres.sort(key=lambda s: (not s.caliente, -(s.ultimo_uso or 0), s.indice))
+            slot = libres[0]
+            slot.en_uso = True
+
+        # Revisión y reparación fuera del lock (toca disco)
+        try:
+            self._preparar(slot)
+        except OSError as e:
+            log.error(f"[PROFILES] No se pudo preparar {slot.nombre}: {e} → perfil temporal")
+            with self._lock:
+                slot.en_uso = False
+            return None
+
+        caliente = slot.caliente
+        with self._lock:
+            slot.usos += 1
+            slot.ultimo_uso = time.time()
+            slot.prestado_caliente = caliente
+            self.stats["prestados_calientes" if caliente else "prestados_nuevos"] += 1
+        log.info(f"[PROFILES] {slot.nombre} prestado ({'caliente' if caliente else 'nuevo'})")
+        return slot
+
+    def release(self, slot: Optional[ProfileSlot], sano: bool = True):
+        """Devuelve el slot. `sano=False` si Chrome murió o no arrancó con este perfil."""
+        if slot is None:
+            return
+        reconstruir = False
+        with self._lock:
+            if sano:
+                slot.fallos = 0
+            else:
+                slot.fallos += 1
+                reconstruir = slot.fallos >= self.max_fallos
+        if reconstruir:
+            log.warning(f"[PROFILES] {slot.nombre}: {slot.fallos} caídas seguidas → reconstruyendo")
+            self._reconstruir(slot)
+        with self._lock:
+            slot.en_uso = False
+
+    # ── Revisión del perfil ──
+    def _preparar(self, slot: ProfileSlot):
+        slot.path.mkdir(parents=True, exist_ok=True)
+        motivo = self._corrupcion(slot)
+        if motivo:
+            log.warning(f"[PROFILES] {slot.nombre} corrupto ({motivo}) → reconstruyendo")
+            self._reconstruir(slot)
+            return
+        # El slot no está prestado: cualquier lock es de un Chrome que ya no existe
+        for nombre in _LOCKS:
+            lock = slot.path / nombre
+            if lock.is_symlink() or lock.exists():
+                lock.unlink()
+                with self._lock:
+                    self.stats["locks_limpiados"] += 1
+        self._marcar_cierre_normal(slot)
+
+    def _corrupcion(self, slot: ProfileSlot) -> Optional[str]:
+        for relativo in _JSON_PERFIL:
+            archivo = slot.path / relativo
+            if not archivo.exists():
+                continue
+            try:
+                json.loads(archivo.read_text(encoding="utf-8"))
+            except (ValueError, UnicodeDecodeError):
+                return f"{relativo} ilegible"
+        mb = _tamano_mb(slot.path)
+        if mb > self.max_mb:
+            return f"{mb:.0f} MB > {self.max_mb} MB"
+        return None
+
+    @staticmethod
+    def _marcar_cierre_normal(slot: ProfileSlot):
+        """Tras un kill, Chrome marca exit_type=Crashed y muestra "restaurar páginas"."""
+        prefs = slot.path / "Default" / "Preferences"
+        if not prefs.exists():
+            return
+        datos = json.loads(prefs.read_text(encoding="utf-8"))
+        perfil = datos.get("profile") if isinstance(datos, dict) else None
+        if isinstance(perfil, dict) and perfil.get("exit_type") not in (None, "Normal"):
+            perfil["exit_type"] = "Normal"
+            prefs.write_text(json.dumps(datos), encoding="utf-8")
+
+    def _reconstruir(self, slot: ProfileSlot):
+        shutil.rmtree(slot.path, ignore_errors=True)
+        slot.path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            slot.fallos = 0
+            slot.reconstrucciones += 1
+            self.stats["reconstruidos"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "dir": str(self.base_dir),
+                "slots_por_fuente": self.slots,
+                "fuentes": {
+                    f: {
+                        "en_uso": sum(s.en_uso for s in slots),
+                        "calientes": sum(s.caliente for s in slots),
+                        "reconstrucciones": sum(s.reconstrucciones for s in slots),
+                    }
+                    for f, slots in self._slots.items()
+                },
+                **self.stats,
+            }
+
+
+def _tamano_mb(path: Path) -> float:
+    total = 0
+    for archivo in path.rglob("*"):
+        try:
+            if archivo.is_file() and not archivo.is_symlink():
+                total += archivo.stat().st_size
+        except OSError:
+            continue
+    return total / (1024 * 1024)
+
+
+# Singleton global
+profile_pool = ProfilePool()
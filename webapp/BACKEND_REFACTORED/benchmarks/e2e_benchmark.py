@@ -0,0 +1,263 @@
+"""
+Benchmark end-to-end contra el servidor de fixtures local (benchmarks/fixture_server.py).
+
+Levanta el servidor en un puerto libre y, ANTES de importar la app, apunta SUNEDU_URL,
+MINEDU_URL y SUNEDU_API_URL_PATTERN a él, y DB_PATH / perfiles / caché de assets a un
+directorio temporal (la BD real no se toca). Dos modos:
+
+  --modo scraper    SuneduScraper / MineduScraper reales sobre un Chrome, DNI por DNI
+  --modo pipeline   lote en la BD temporal + Orchestrator con los worker loops reales
+
+    python -m benchmarks.e2e_benchmark --modo scraper --fuente minedu --motor-minedu http --dnis 30
+    python -m benchmarks.e2e_benchmark --modo pipeline --sunedu 2 --minedu 2 --dnis 100 \\
+        --tasa-verificacion 0.1 --tasa-rechazo-captcha 0.3 --sin-pacing --json
+
+Reporta DNIs/min, latencia por DNI (p50/p95), reintentos por DNI (intentos del scraper - 1
+y consultas - 1 vistas por el servidor) y aciertos contra el resultado esperado del
+escenario. Requiere Chrome, salvo MINEDU con --motor-minedu http.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.fixture_server import Escenario, FixtureServer, agregar_argumentos
+
+
+def _configurar_entorno(servidor: FixtureServer, args: argparse.Namespace, tmp: Path):
+    """Variables que lee app/core/config.py (debe correr antes de importar app.*)."""
+    os.environ.update({
+        "SUNEDU_URL": servidor.sunedu_url,
+        "MINEDU_URL": servidor.minedu_url,
+        "SUNEDU_API_URL_PATTERN": r"/sunedu/api/consulta",
+        "DB_PATH": str(tmp / "benchmark.db"),
+        "PROFILE_POOL_DIR": str(tmp / "profiles"),
+        "ASSET_CACHE_DIR": str(tmp / "asset_cache"),
+        "MINEDU_ENGINE": args.motor_minedu,
+        "HEADLESS": str(not args.con_ventana),
+        "PACING_ENABLED": str(not args.sin_pacing),
+        "BROWSER_POOL_ENABLED": str(args.pool),
+    })
+
+
+def _dnis(n: int, inicio: int) -> List[str]:
+    return [str(inicio + i) for i in range(n)]
+
+
+def _esperado(servidor: FixtureServer, dni: str) -> str:
+    """Estado final esperado del registro (SUNEDU tiene prioridad, como el pipeline)."""
+    if servidor.encontrado("sunedu", dni):
+        return "FOUND_SUNEDU"
+    if servidor.encontrado("minedu", dni):
+        return "FOUND_MINEDU"
+    return "NOT_FOUND"
+
+
+def _resumen_latencias(segundos: List[float]) -> dict:
+    if not segundos:
+        return {"p50_s": 0.0, "p95_s": 0.0, "max_s": 0.0}
+    ordenados = sorted(segundos)
+    return {
+        "p50_s": round(statistics.median(ordenados), 2),
+        "p95_s": round(ordenados[int(0.95 * (len(ordenados) - 1))], 2),
+        "max_s": round(ordenados[-1], 2),
+    }
+
+
+def _reintentos_servidor(servidor: FixtureServer, fuente: str) -> float:
+    consultas = servidor.consultas(fuente)
+    if not consultas:
+        return 0.0
+    return round(sum(c - 1 for c in consultas.values()) / len(consultas), 2)
+
+
+# ═══ Modo scraper: un scraper real, DNI por DNI ══════════════════════════
+
+def _scraper(fuente: str, motor_minedu: str):
+    if fuente == "sunedu":
+        from app.scrapers.sunedu import SuneduScraper
+        return SuneduScraper()
+    if motor_minedu == "http":
+        from app.scrapers.minedu_http import MineduHttpScraper
+        return MineduHttpScraper()
+    from app.scrapers.minedu import MineduScraper
+    return MineduScraper()
+
+
+def _driver(fuente: str):
+    from botasaurus.browser import Driver
+    from app.core.config import HEADLESS, WINDOW_SIZE, BLOCK_IMAGES_SUNEDU, BLOCK_IMAGES_MINEDU
+    from app.scrapers.asset_cache import optimizar_red
+
+    driver = Driver(
+        headless=HEADLESS,
+        block_images=BLOCK_IMAGES_SUNEDU if fuente == "sunedu" else BLOCK_IMAGES_MINEDU,
+        window_size=WINDOW_SIZE,
+    )
+    optimizar_red(driver, fuente)
+    return driver
+
+
+def correr_scraper(servidor: FixtureServer, fuente: str, dnis: List[str], motor_minedu: str) -> dict:
+    scraper = _scraper(fuente, motor_minedu)
+    driver = None if fuente == "minedu" and motor_minedu == "http" else _driver(fuente)
+    latencias, intentos = [], []
+    aciertos = errores = 0
+    t0 = time.perf_counter()
+    try:
+        for dni in dnis:
+            inicio = time.perf_counter()
+            try:
+                resultado = scraper.procesar_dni(driver, dni)
+                aciertos += resultado["encontrado"] == servidor.encontrado(fuente, dni)
+            except Exception:
+                errores += 1
+            latencias.append(time.perf_counter() - inicio)
+            intentos.append(scraper.intentos)
+    finally:
+        if driver is not None:
+            driver.close()
+    total = time.perf_counter() - t0
+    return {
+        "modo": "scraper",
+        "fuente": fuente,
+        "dnis": len(dnis),
+        "segundos": round(total, 1),
+        "dnis_por_min": round(len(dnis) / total * 60, 2) if total else 0.0,
+        **_resumen_latencias(latencias),
+        "reintentos_por_dni": round(statistics.fmean(intentos) - 1, 2) if intentos else 0.0,
+        "reintentos_servidor": _reintentos_servidor(servidor, fuente),
+        "aciertos": aciertos,
+        "errores": errores,
+    }
+
+
+# ═══ Modo pipeline: lote + worker loops reales ═══════════════════════════
+
+def correr_pipeline(servidor: FixtureServer, dnis: List[str], n_sunedu: int, n_minedu: int,
+                    timeout: float) -> dict:
+    from app.db.session import init_db, SessionFactory
+    from app.db.models import Registro
+    from app.db.repository import DniRepository
+    from app.core.config import Estado, PIPELINE_MODE, BROWSER_POOL_ENABLED
+    from app.core.metrics import metrics
+    from app.core.session_manager import session_manager
+    from app.workers.browser_pool import browser_pool
+    from app.workers.orchestrator import Orchestrator
+    from app.workers.loops import sunedu_worker_loop, minedu_worker_loop
+
+    init_db()
+    repo = DniRepository()
+    sid = str(uuid.uuid4())
+    repo.crear_lote(sid, "benchmark.xlsx", dnis)
+    if PIPELINE_MODE == "fanout":
+        repo.preparar_fanout(sid)
+
+    if BROWSER_POOL_ENABLED:
+        browser_pool.start()
+    orch = Orchestrator(sid)
+    session_manager.set_orchestrator(sid, orch)
+    t0 = time.perf_counter()
+    orch.start_workers([sunedu_worker_loop] * n_sunedu + [minedu_worker_loop] * n_minedu)
+    try:
+        while repo.hay_trabajo_pendiente(sid) and time.perf_counter() - t0 < timeout:
+            time.sleep(1)
+        total = time.perf_counter() - t0
+    finally:
+        orch.stop_workers()
+        if BROWSER_POOL_ENABLED:
+            browser_pool.stop()
+
+    session = SessionFactory()
+    try:
+        finales = dict(session.query(Registro.dni, Registro.estado).filter(Registro.session_id == sid))
+    finally:
+        session.close()
+    terminados = [d for d, e in finales.items() if e in Estado.TERMINALES]
+    fuentes = {}
+    for fuente in ("sunedu", "minedu"):
+        lat = metrics.summary(f"{fuente}.dni_s")
+        intentos = metrics.summary(f"{fuente}.intentos_por_dni")
+        fuentes[fuente] = {
+            "dnis": lat["count"],
+            "p50_s": lat["p50"],
+            "p95_s": lat["p95"],
+            "reintentos_por_dni": round(max(intentos["avg"] - 1, 0), 2) if intentos["count"] else 0.0,
+            "reintentos_servidor": _reintentos_servidor(servidor, fuente),
+        }
+    return {
+        "modo": "pipeline",
+        "pipeline": PIPELINE_MODE,
+        "workers": {"sunedu": n_sunedu, "minedu": n_minedu},
+        "dnis": len(dnis),
+        "terminados": len(terminados),
+        "segundos": round(total, 1),
+        "dnis_por_min": round(len(terminados) / total * 60, 2) if total else 0.0,
+        "aciertos": sum(finales[d] == _esperado(servidor, d) for d in terminados),
+        "conteos": repo.obtener_conteos(sid),
+        "fuentes": fuentes,
+    }
+
+
+def _imprimir(r: dict):
+    filas: List[Dict] = []
+    if r["modo"] == "scraper":
+        filas.append(r)
+    else:
+        print(f"pipeline={r['pipeline']} workers={r['workers']} terminados={r['terminados']}/{r['dnis']} "
+              f"en {r['segundos']}s → {r['dnis_por_min']} DNIs/min | aciertos={r['aciertos']} | {r['conteos']}")
+        filas.extend({"fuente": f, **v} for f, v in r["fuentes"].items())
+    columnas = ("fuente", "dnis", "dnis_por_min", "p50_s", "p95_s", "reintentos_por_dni",
+                "reintentos_servidor", "aciertos", "errores")
+    columnas = tuple(c for c in columnas if any(c in f for f in filas))
+    print(" | ".join(f"{c:>19}" for c in columnas))
+    for fila in filas:
+        print(" | ".join(f"{str(fila.get(c, '')):>19}" for c in columnas))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=("scraper", "pipeline"), default="pipeline")
+    parser.add_argument("--fuente", choices=("sunedu", "minedu"), default="sunedu", help="Solo modo scraper")
+    parser.add_argument("--dnis", type=int, default=20, help="Cantidad de DNIs sintéticos")
+    parser.add_argument("--dni-inicial", type=int, default=40000000)
+    parser.add_argument("--sunedu", type=int, default=1, help="Workers SUNEDU (modo pipeline)")
+    parser.add_argument("--minedu", type=int, default=1, help="Workers MINEDU (modo pipeline)")
+    parser.add_argument("--motor-minedu", choices=("browser", "http"), default="browser")
+    parser.add_argument("--pool", action="store_true", help="Usar el pool de navegadores precalentados")
+    parser.add_argument("--sin-pacing", action="store_true", help="Sin pausa AIMD entre DNIs")
+    parser.add_argument("--con-ventana", action="store_true", help="Chrome visible (default headless)")
+    parser.add_argument("--timeout", type=float, default=1800, help="Máx segundos del modo pipeline")
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    servidor = FixtureServer(Escenario.desde_args(args)).iniciar()
+    try:
+        with tempfile.TemporaryDirectory(prefix="scgt-bench-") as tmp:
+            _configurar_entorno(servidor, args, Path(tmp))
+            dnis = _dnis(args.dnis, args.dni_inicial)
+            if args.modo == "scraper":
+                r = correr_scraper(servidor, args.fuente, dnis, args.motor_minedu)
+            else:
+                r = correr_pipeline(servidor, dnis, args.sunedu, args.minedu, args.timeout)
+            r["servidor"] = servidor.get_stats()
+    finally:
+        servidor.detener()
+
+    if args.json:
+        print(json.dumps(r, indent=2, ensure_ascii=False))
+    else:
+        _imprimir(r)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,549 @@
+"""
+Servidor local que imita SUNEDU y MINEDU, para medir el pipeline sin tocar las webs reales.
+
+    python -m benchmarks.fixture_server --port 8765 --latencia-ms 400 \\
+        --tasa-verificacion 0.2 --tasa-rechazo-captcha 0.3
+
+Rutas (mismos selectores que leen los scrapers):
+  /sunedu/                 SPA mínima: input[formcontrolname=dni], botón "Buscar", tabla
+                           custom-table, swal2 ("No se encontraron…", verificación) y checkbox
+  /sunedu/main.<hash>.js   Script de la SPA (inmutable, lo cachea asset_cache)
+  /sunedu/api/consulta     Backend JSON de la búsqueda (latencia, 5xx, 403 = verificación)
+  /minedu/                 Formulario: token oculto, #DOCU_NUM, #imgCaptcha base64, #CapImageRefresh,
+                           #CaptchaCodeText, #btnConsultar, #divResultado, toast de error
+  /minedu/captcha          Captcha nuevo del token (lo pide #CapImageRefresh)
+  /minedu/consulta         POST: {"ok": true, "html": tabla} o {"ok": false, "mensaje": captcha incorrecto}
+  /stats                   Consultas recibidas por fuente (JSON)
+
+Si un DNI "existe" en cada fuente se decide por hash del DNI (tasa_encontrado_*), así el
+resultado esperado se conoce de antemano. Las fallas, verificaciones y rechazos de captcha
+son aleatorios (reproducibles con --semilla). Con --captcha-estricto MINEDU además compara
+el texto enviado con el del captcha (mide el OCR real); si no, acepta cualquier lectura.
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class Escenario:
+    """Comportamiento simulado de las webs (tasas entre 0 y 1)."""
+
+    def __init__(self, latencia_ms: float = 300, latencia_pagina_ms: float = 100, jitter: float = 0.3,
+                 tasa_fallo: float = 0.0, tasa_verificacion: float = 0.0,
+                 tasa_verificacion_fallida: float = 0.0, tasa_rechazo_captcha: float = 0.0,
+                 captcha_estricto: bool = False, tasa_encontrado_sunedu: float = 0.5,
+                 tasa_encontrado_minedu: float = 0.5, semilla: Optional[int] = None):
+        self.latencia_ms = latencia_ms                # Respuesta de las consultas (API SUNEDU, POST MINEDU)
+        self.latencia_pagina_ms = latencia_pagina_ms  # Carga de las páginas
+        self.jitter = jitter                          # ±fracción aleatoria de las latencias
+        self.tasa_fallo = tasa_fallo                  # Consultas que responden 500
+        self.tasa_verificacion = tasa_verificacion    # Cargas/búsquedas SUNEDU que piden Turnstile
+        self.tasa_verificacion_fallida = tasa_verificacion_fallida  # Clicks en el checkbox que fallan
+        self.tasa_rechazo_captcha = tasa_rechazo_captcha  # Captchas MINEDU rechazados al azar
+        self.captcha_estricto = captcha_estricto
+        self.tasa_encontrado_sunedu = tasa_encontrado_sunedu
+        self.tasa_encontrado_minedu = tasa_encontrado_minedu
+        self.semilla = semilla
+
+    @classmethod
+    def desde_args(cls, args: argparse.Namespace) -> "Escenario":
+        return cls(
+            latencia_ms=args.latencia_ms, latencia_pagina_ms=args.latencia_pagina_ms, jitter=args.jitter,
+            tasa_fallo=args.tasa_fallo, tasa_verificacion=args.tasa_verificacion,
+            tasa_verificacion_fallida=args.tasa_verificacion_fallida,
+            tasa_rechazo_captcha=args.tasa_rechazo_captcha, captcha_estricto=args.captcha_estricto,
+            tasa_encontrado_sunedu=args.tasa_encontrado_sunedu,
+            tasa_encontrado_minedu=args.tasa_encontrado_minedu, semilla=args.semilla,
+        )
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    """Opciones del escenario (compartidas con benchmarks/e2e_benchmark.py)."""
+    g = parser.add_argument_group("escenario del servidor de fixtures")
+    g.add_argument("--latencia-ms", type=float, default=300)
+    g.add_argument("--latencia-pagina-ms", type=float, default=100)
+    g.add_argument("--jitter", type=float, default=0.3)
+    g.add_argument("--tasa-fallo", type=float, default=0.0)
+    g.add_argument("--tasa-verificacion", type=float, default=0.0)
+    g.add_argument("--tasa-verificacion-fallida", type=float, default=0.0)
+    g.add_argument("--tasa-rechazo-captcha", type=float, default=0.0)
+    g.add_argument("--captcha-estricto", action="store_true")
+    g.add_argument("--tasa-encontrado-sunedu", type=float, default=0.5)
+    g.add_argument("--tasa-encontrado-minedu", type=float, default=0.5)
+    g.add_argument("--semilla", type=int, default=None)
+
+
+# ═══ Datos ficticios (deterministas por DNI) ════════════════════════════
+
+_APELLIDOS = ("QUISPE", "FLORES", "SANCHEZ", "RODRIGUEZ", "GARCIA", "MAMANI", "TORRES", "CHAVEZ")
+_NOMBRES = ("MARIA ELENA", "JUAN CARLOS", "ROSA", "LUIS ALBERTO", "ANA LUCIA", "JOSE", "CARMEN", "PEDRO")
+_GRADOS = ("BACHILLER EN INGENIERIA CIVIL", "TITULO PROFESIONAL DE ABOGADO",
+           "BACHILLER EN ADMINISTRACION", "TITULO DE LICENCIADO EN EDUCACION")
+_UNIVERSIDADES = ("UNIVERSIDAD NACIONAL MAYOR DE SAN MARCOS", "UNIVERSIDAD NACIONAL DE INGENIERIA",
+                  "UNIVERSIDAD NACIONAL DE SAN AGUSTIN DE AREQUIPA", "UNIVERSIDAD DE LIMA")
+_TITULOS_MINEDU = ("PROFESIONAL TÉCNICO EN ENFERMERÍA", "PROFESIONAL TÉCNICO EN COMPUTACIÓN E INFORMÁTICA",
+                   "PROFESOR DE EDUCACIÓN PRIMARIA", "TÉCNICO EN CONTABILIDAD")
+_INSTITUTOS = ("IEST CAYETANO HEREDIA", "IESTP JOSÉ PARDO", "ISEP ENRIQUE LÓPEZ ALBÚJAR", "IEST SENATI")
+_CHARSET_CAPTCHA = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+
+def _hash(*partes: str) -> int:
+    return int(hashlib.sha1(":".join(partes).encode()).hexdigest()[:12], 16)
+
+
+def _elegir(opciones, dni: str, campo: str) -> str:
+    return opciones[_hash(campo, dni) % len(opciones)]
+
+
+def _fecha(dni: str) -> str:
+    h = _hash("fecha", dni)
+    return f"{h % 28 + 1:02d}/{h // 28 % 12 + 1:02d}/{2005 + h // 336 % 19}"
+
+
+def _nombre(dni: str) -> str:
+    return f"{_elegir(_APELLIDOS, dni, 'ap1')} {_elegir(_APELLIDOS, dni, 'ap2')}, {_elegir(_NOMBRES, dni, 'nom')}"
+
+
+def registro_sunedu(dni: str) -> dict:
+    """Fila que devuelve el backend SUNEDU (claves como la API real)."""
+    return {
+        "nombreCompleto": _nombre(dni),
+        "dni": dni,
+        "gradoTitulo": _elegir(_GRADOS, dni, "grado"),
+        "universidad": _elegir(_UNIVERSIDADES, dni, "univ"),
+        "fechaDiploma": _fecha(dni),
+    }
+
+
+def registro_minedu(dni: str) -> dict:
+    return {
+        "nombres": _nombre(dni).replace(",", ""),
+        "titulo": _elegir(_TITULOS_MINEDU, dni, "titulo"),
+        "nivel": "Técnico" if _hash("nivel", dni) % 2 else "Profesional Técnico",
+        "fecha": _fecha(dni),
+        "codigo": f"{_hash('dre', dni) % 9000 + 1000}",
+        "institucion": _elegir(_INSTITUTOS, dni, "inst"),
+    }
+
+
+def _html_minedu(dni: str, encontrado: bool) -> str:
+    if not encontrado:
+        return ('<table class="gobpe-res-tabla-cuerpo"><tbody><tr><td colspan="3">'
+                'No se encontraron registros para el documento ingresado.</td></tr></tbody></table>')
+    r = registro_minedu(dni)
+    return (
+        '<table class="gobpe-res-tabla-cuerpo"><tbody><tr>'
+        f'<td>{r["nombres"]}<br>DNI {dni}</td>'
+        f'<td>{r["titulo"]}<br>Nivel: {r["nivel"]}<br>Fecha de emisión: {r["fecha"]}<br>Código DRE: {r["codigo"]}</td>'
+        f'<td>{r["institucion"]}<br>LIMA</td>'
+        '</tr></tbody></table>'
+    )
+
+
+def _imagen_captcha(texto: str, rng: random.Random) -> str:
+    """PNG del captcha como data-URI base64 (igual que #imgCaptcha en MINEDU)."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new("RGB", (160, 50), (245, 245, 240))
+    dibujo = ImageDraw.Draw(img)
+    fuente = ImageFont.load_default(size=30)
+    for i, caracter in enumerate(texto):
+        dibujo.text((10 + i * 29, 7 + rng.randint(-4, 4)), caracter, fill=(40, 40, 110), font=fuente)
+    for _ in range(4):
+        dibujo.line([(rng.randint(0, 160), rng.randint(0, 50)), (rng.randint(0, 160), rng.randint(0, 50))],
+                    fill=(130, 130, 130), width=1)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+# ═══ Páginas ════════════════════════════════════════════════════════════
+
+SUNEDU_APP_JS = r"""
+(function() {
+    var CFG = window.__FIXTURE || {};
+    var pendiente = !!CFG.verificacion;
+    function $(s) { return document.querySelector(s); }
+    function p(texto) { var e = document.createElement('p'); e.textContent = texto; return e; }
+
+    function cerrarSwal() { var c = $('.swal2-container'); if (c) c.remove(); }
+    function swal(texto) {
+        cerrarSwal();
+        var c = document.createElement('div');
+        c.className = 'swal2-container';
+        c.innerHTML = '<div class="swal2-popup"><button type="button" class="swal2-close" ' +
+                      'aria-label="Close this dialog">&times;</button><div class="swal2-html-container"></div></div>';
+        c.querySelector('.swal2-html-container').textContent = texto;
+        c.querySelector('.swal2-close').addEventListener('click', cerrarSwal);
+        document.body.appendChild(c);
+    }
+    function spinner(activo) {
+        var s = $('.p-progress-spinner');
+        if (activo && !s) {
+            s = document.createElement('div');
+            s.className = 'p-progress-spinner';
+            $('#app').appendChild(s);
+        }
+        if (!activo && s) s.remove();
+    }
+    function mostrarVerificacion() {
+        var v = $('#verificacion');
+        v.innerHTML = '<label><input type="checkbox"> Verifique que usted es humano</label>';
+        v.querySelector('input').addEventListener('change', function() {
+            var cb = this;
+            setTimeout(function() {
+                if (Math.random() < (CFG.tasaVerificacionFallida || 0)) {
+                    cb.checked = false;
+                    swal('Verificación fallida. Recargue la página e intente nuevamente.');
+                    return;
+                }
+                pendiente = false;
+                v.innerHTML = '';
+            }, CFG.demoraVerificacionMs || 300);
+        });
+    }
+    function pintar(filas) {
+        var tb = $('table.custom-table tbody');
+        filas.forEach(function(f) {
+            var tr = document.createElement('tr');
+            tr.className = 'ng-star-inserted';
+            var c1 = document.createElement('td'), c2 = document.createElement('td'), c3 = document.createElement('td');
+            c1.appendChild(p(f.nombreCompleto)); c1.appendChild(p('DNI ' + f.dni));
+            c2.appendChild(p(f.gradoTitulo)); c2.appendChild(p('Fecha de diploma: ' + f.fechaDiploma));
+            c3.appendChild(p(f.universidad));
+            tr.appendChild(c1); tr.appendChild(c2); tr.appendChild(c3);
+            tb.appendChild(tr);
+        });
+    }
+    function buscar() {
+        cerrarSwal();
+        $('table.custom-table tbody').innerHTML = '';
+        if (pendiente) { swal('Complete la verificación de seguridad para continuar.'); return; }
+        var dni = $('input[formcontrolname="dni"]').value.trim();
+        if (!/^\d{8}$/.test(dni)) { swal('Ingrese un DNI válido.'); return; }
+        spinner(true);
+        fetch('api/consulta?dni=' + encodeURIComponent(dni), {headers: {'Accept': 'application/json'}})
+            .then(function(r) { return r.json().then(function(j) { return {status: r.status, cuerpo: j}; }); })
+            .then(function(res) {
+                spinner(false);
+                if (res.status === 403) {
+                    pendiente = true;
+                    mostrarVerificacion();
+                    swal('Se requiere una verificación de seguridad.');
+                    return;
+                }
+                if (res.status !== 200) { console.error('Servicio no disponible: HTTP ' + res.status); return; }
+                var filas = (res.cuerpo && res.cuerpo.data) || [];
+                if (!filas.length) { swal('No se encontraron resultados para el DNI ingresado.'); return; }
+                pintar(filas);
+            })
+            .catch(function(e) { spinner(false); console.error(String(e)); });
+    }
+    // Arranque de la SPA: el formulario aparece tras el "bootstrap"
+    setTimeout(function() {
+        $('#app').innerHTML =
+            '<div id="verificacion"></div>' +
+            '<input type="text" formcontrolname="dni" maxlength="8" placeholder="DNI">' +
+            '<button type="button" class="p-button"><span class="p-button-label">Buscar</span></button>' +
+            '<table class="custom-table"><thead><tr><th>Graduado</th><th>Grado o título</th><th>Institución</th></tr>' +
+            '</thead><tbody></tbody></table>';
+        $('button.p-button').addEventListener('click', buscar);
+        if (pendiente) mostrarVerificacion();
+    }, CFG.arranqueMs || 0);
+})();
+"""
+SUNEDU_APP_NOMBRE = f"main.{hashlib.sha1(SUNEDU_APP_JS.encode()).hexdigest()[:12]}.js"
+
+SUNEDU_HTML = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><title>Constancias - SUNEDU (fixture)</title></head>
+<body><div id="app"></div>
+<script>window.__FIXTURE = {config};</script>
+<script src="{app}"></script>
+</body></html>"""
+
+MINEDU_HTML = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><title>Títulos de institutos - MINEDU (fixture)</title></head>
+<body>
+<form id="frmConsulta" action="consulta" method="post">
+  <input type="hidden" name="__RequestVerificationToken" value="{token}">
+  <input id="DOCU_NUM" name="DOCU_NUM" type="text" maxlength="8">
+  <img id="imgCaptcha" src="{captcha}" alt="captcha">
+  <button type="button" id="CapImageRefresh">Actualizar</button>
+  <input id="CaptchaCodeText" name="CaptchaCodeText" type="text">
+  <span class="field-validation-valid" data-valmsg-for="CaptchaCodeText"></span>
+  <button type="button" id="btnConsultar">Consultar</button>
+</form>
+<div id="divResultado"></div>
+<script>
+(function() {{
+    var form = document.getElementById('frmConsulta');
+    function $(s) {{ return document.querySelector(s); }}
+    function toast(texto) {{
+        var tc = document.createElement('div');
+        tc.id = 'toast-container';
+        tc.innerHTML = '<div class="toast toast-error"><div class="toast-message"></div></div>';
+        tc.querySelector('.toast-message').textContent = texto;
+        document.body.appendChild(tc);
+    }}
+    $('#CapImageRefresh').addEventListener('click', function() {{
+        fetch('captcha?token=' + encodeURIComponent(form.elements['__RequestVerificationToken'].value))
+            .then(function(r) {{ return r.json(); }})
+            .then(function(j) {{ $('#imgCaptcha').src = j.src; }});
+    }});
+    $('#btnConsultar').addEventListener('click', function() {{
+        var tc = $('#toast-container');
+        if (tc) tc.remove();
+        $('#divResultado').innerHTML = '';
+        fetch(form.getAttribute('action'), {{
+            method: 'POST', body: new URLSearchParams(new FormData(form)),
+            headers: {{'X-Requested-With': 'XMLHttpRequest'}}
+        }})
+            .then(function(r) {{ if (!r.ok) throw new Error('HTTP ' + r.status); return r.json(); }})
+            .then(function(j) {{ if (j.ok) $('#divResultado').innerHTML = j.html; else toast(j.mensaje); }})
+            .catch(function(e) {{ console.error(String(e)); }});
+    }});
+}})();
+</script>
+</body></html>"""
+
+MENSAJE_CAPTCHA_INCORRECTO = "El código captcha ingresado es incorrecto"
+
+
+# ═══ Servidor ════════════════════════════════════════════════════════════
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como las webs reales
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fx(self) -> "FixtureServer":
+        return self.server.fixture
+
+    def _enviar(self, status: int, cuerpo, tipo: str = "text/html; charset=utf-8", extra: Optional[dict] = None):
+        if not isinstance(cuerpo, (bytes, str)):
+            cuerpo, tipo = json.dumps(cuerpo, ensure_ascii=False), "application/json; charset=utf-8"
+        datos = cuerpo.encode("utf-8") if isinstance(cuerpo, str) else cuerpo
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(datos)))
+        for clave, valor in (extra or {}).items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path in ("/sunedu", "/sunedu/"):
+            self.fx.demorar(self.fx.escenario.latencia_pagina_ms)
+            self._enviar(200, self.fx.pagina_sunedu())
+        elif url.path == f"/sunedu/{SUNEDU_APP_NOMBRE}":
+            self._enviar(200, SUNEDU_APP_JS, "application/javascript; charset=utf-8",
+                         {"Cache-Control": "public, max-age=31536000, immutable"})
+        elif url.path == "/sunedu/api/consulta":
+            status, cuerpo = self.fx.consulta_sunedu(query.get("dni", [""])[0])
+            self._enviar(status, cuerpo)
+        elif url.path in ("/minedu", "/minedu/"):
+            self.fx.demorar(self.fx.escenario.latencia_pagina_ms)
+            token, html = self.fx.pagina_minedu()
+            self._enviar(200, html, extra={"Set-Cookie": f"__RequestVerificationToken={token}; Path=/minedu"})
+        elif url.path == "/minedu/captcha":
+            self._enviar(200, {"src": self.fx.nuevo_captcha(query.get("token", [""])[0])})
+        elif url.path == "/stats":
+            self._enviar(200, self.fx.get_stats())
+        else:
+            self._enviar(404, {"error": "no encontrado"})
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        data = parse_qs(self.rfile.read(largo).decode("utf-8"))
+        if urlparse(self.path).path != "/minedu/consulta":
+            self._enviar(404, {"error": "no encontrado"})
+            return
+        campo = lambda nombre: data.get(nombre, [""])[0]
+        status, cuerpo = self.fx.consulta_minedu(
+            campo("DOCU_NUM"), campo("CaptchaCodeText"), campo("__RequestVerificationToken"))
+        self._enviar(status, cuerpo)
+
+
+class FixtureServer:
+    """Servidor HTTP de fixtures en un thread propio (puerto 0 = libre)."""
+
+    def __init__(self, escenario: Optional[Escenario] = None, host: str = "127.0.0.1", port: int = 0):
+        self.escenario = escenario or Escenario()
+        self._rng = random.Random(self.escenario.semilla)
+        self._lock = threading.Lock()
+        self._captchas: "OrderedDict[str, str]" = OrderedDict()  # token → texto vigente
+        self._consultas: Dict[str, Counter] = {"sunedu": Counter(), "minedu": Counter()}
+        self.stats = {"fallos": 0, "verificaciones": 0, "captchas_rechazados": 0,
+                      "captchas_aceptados": 0, "paginas": 0}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fixture = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sunedu_url(self) -> str:
+        return f"{self.url}/sunedu/#/modulos/grados-y-titulos"
+
+    @property
+    def minedu_url(self) -> str:
+        return f"{self.url}/minedu/"
+
+    def iniciar(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def detener(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # ── Azar y resultado esperado ──
+    def _azar(self, tasa: float) -> bool:
+        if tasa <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < tasa
+
+    def demorar(self, ms: float):
+        if ms <= 0:
+            return
+        with self._lock:
+            factor = self._rng.uniform(1 - self.escenario.jitter, 1 + self.escenario.jitter)
+        time.sleep(max(ms * factor, 0) / 1000)
+
+    def encontrado(self, fuente: str, dni: str) -> bool:
+        """Si el DNI existe en la fuente (determinista por hash)."""
+        tasa = getattr(self.escenario, f"tasa_encontrado_{fuente}")
+        return _hash(fuente, dni) % 10000 < tasa * 10000
+
+    def _contar(self, fuente: str, dni: str, stat: Optional[str] = None):
+        with self._lock:
+            self._consultas[fuente][dni] += 1
+            if stat:
+                self.stats[stat] += 1
+
+    # ── SUNEDU ──
+    def pagina_sunedu(self) -> str:
+        verificacion = self._azar(self.escenario.tasa_verificacion)
+        with self._lock:
+            self.stats["paginas"] += 1
+            if verificacion:
+                self.stats["verificaciones"] += 1
+        config = {
+            "verificacion": verificacion,
+            "tasaVerificacionFallida": self.escenario.tasa_verificacion_fallida,
+            "demoraVerificacionMs": 300,
+            "arranqueMs": 200,
+        }
+        return SUNEDU_HTML.format(config=json.dumps(config), app=SUNEDU_APP_NOMBRE)
+
+    def consulta_sunedu(self, dni: str):
+        self.demorar(self.escenario.latencia_ms)
+        if self._azar(self.escenario.tasa_fallo):
+            self._contar("sunedu", dni, "fallos")
+            return 500, {"error": "Error interno del servidor"}
+        if self._azar(self.escenario.tasa_verificacion):
+            self._contar("sunedu", dni, "verificaciones")
+            return 403, {"error": "Se requiere verificación"}
+        self._contar("sunedu", dni)
+        return 200, {"data": [registro_sunedu(dni)] if self.encontrado("sunedu", dni) else []}
+
+    # ── MINEDU ──
+    def _texto_captcha(self) -> str:
+        with self._lock:
+            return "".join(self._rng.choice(_CHARSET_CAPTCHA) for _ in range(5))
+
+    def nuevo_captcha(self, token: str) -> str:
+        texto = self._texto_captcha()
+        with self._lock:
+            self._captchas[token] = texto
+            self._captchas.move_to_end(token)
+            while len(self._captchas) > 10000:
+                self._captchas.popitem(last=False)
+            semilla = self._rng.random()
+        return _imagen_captcha(texto, random.Random(semilla))
+
+    def pagina_minedu(self):
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.stats["paginas"] += 1
+        return token, MINEDU_HTML.format(token=token, captcha=self.nuevo_captcha(token))
+
+    def consulta_minedu(self, dni: str, captcha: str, token: str):
+        self.demorar(self.escenario.latencia_ms)
+        if self._azar(self.escenario.tasa_fallo):
+            self._contar("minedu", dni, "fallos")
+            return 500, {"ok": False, "mensaje": "Error interno del servidor"}
+        with self._lock:
+            esperado = self._captchas.get(token)
+        incorrecto = self.escenario.captcha_estricto and (
+            esperado is None or captcha.strip().upper() != esperado)
+        if incorrecto or self._azar(self.escenario.tasa_rechazo_captcha):
+            self._contar("minedu", dni, "captchas_rechazados")
+            return 200, {"ok": False, "mensaje": MENSAJE_CAPTCHA_INCORRECTO}
+        self._contar("minedu", dni, "captchas_aceptados")
+        return 200, {"ok": True, "html": _html_minedu(dni, self.encontrado("minedu", dni))}
+
+    # ── Estadísticas ──
+    def consultas(self, fuente: str) -> Dict[str, int]:
+        """Consultas recibidas por DNI (reintentos = consultas - 1)."""
+        with self._lock:
+            return dict(self._consultas[fuente])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "escenario": self.escenario.to_dict(),
+                "consultas": {f: sum(c.values()) for f, c in self._consultas.items()},
+                "dnis": {f: len(c) for f, c in self._consultas.items()},
+                **self.stats,
+            }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    servidor = FixtureServer(Escenario.desde_args(args), args.host, args.port).iniciar()
+    print(f"SUNEDU_URL={servidor.sunedu_url}")
+    print(f"MINEDU_URL={servidor.minedu_url}")
+    print("SUNEDU_API_URL_PATTERN=/sunedu/api/consulta")
+    print("Ctrl+C para detener")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark de ingesta de archivos: filas/s y memoria de IngestService sobre una BD temporal.
+
+Genera un CSV sintético por tamaño (con una fracción de duplicados e inválidos), lo
+ingiere con el camino bulk (lectura en streaming + INSERT executemany por chunks) y,
+con --comparar, con el camino anterior (parse_uploaded_file + un objeto ORM por DNI)
+hasta --max-comparar filas. DB_PATH apunta a un directorio temporal antes de importar la app.
+
+    python -m benchmarks.ingest_benchmark                       # 10k, 100k y 1M
+    python -m benchmarks.ingest_benchmark --tamanos 10000 100000 --comparar --json
+
+Memoria: pico de RSS del proceso (ru_maxrss) tras cada corrida; el camino bulk corre
+primero y de menor a mayor, así un pico que no crece con el archivo indica memoria constante.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+
+def _generar_csv(path: Path, n: int, tasa_duplicados: float, tasa_invalidos: float, semilla: int):
+    rng = random.Random(semilla)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            r = rng.random()
+            if r < tasa_invalidos:
+                f.write(f"{rng.randrange(10 ** 6)}X\n")
+            elif r < tasa_invalidos + tasa_duplicados and i:
+                f.write(f"{10000000 + rng.randrange(i)}\n")
+            else:
+                f.write(f"{10000000 + i}\n")
+
+
+def _rss_mb() -> float:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _bulk(path: Path, chunk: int) -> dict:
+    from app.services.ingest_service import IngestService
+
+    with open(path, "rb") as f:
+        ingesta = IngestService(chunk=chunk).ingerir(f, path.name, str(uuid.uuid4()))
+    return {"segundos": ingesta.segundos, "insertados": ingesta.insertados,
+            "invalidos": ingesta.invalidos, "duplicados": ingesta.duplicados}
+
+
+def _anterior(path: Path) -> dict:
+    """parse_uploaded_file + un Registro ORM por DNI en una transacción (camino previo a la ingesta bulk)."""
+    from app.core.config import Estado
+    from app.db.models import Lote, Registro
+    from app.db.session import SessionFactory
+    from app.services.excel_service import ExcelService
+
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        r = ExcelService.parse_uploaded_file(f, path.name)
+    session = SessionFactory()
+    try:
+        sid = str(uuid.uuid4())
+        lote = Lote(session_id=sid, nombre_archivo=path.name, total_dnis=len(r["valid"]))
+        session.add(lote)
+        session.flush()
+        for dni in r["valid"]:
+            session.add(Registro(lote_id=lote.id, session_id=sid, dni=dni, estado=Estado.PENDIENTE))
+        session.commit()
+    finally:
+        session.close()
+    return {"segundos": time.perf_counter() - t0, "insertados": len(r["valid"]),
+            "invalidos": len(r["invalid"]), "duplicados": None}
+
+
+def correr(tamanos: List[int], tmp: Path, args: argparse.Namespace) -> List[dict]:
+    from app.db.session import init_db
+
+    init_db()
+    filas = []
+    # Primero todo el camino bulk (de menor a mayor) para que el pico de RSS sea solo suyo
+    corridas = [("bulk", n) for n in sorted(tamanos)]
+    if args.comparar:
+        corridas += [("anterior", n) for n in sorted(tamanos) if n <= args.max_comparar]
+    for camino, n in corridas:
+        path = tmp / f"dnis_{n}.csv"
+        _generar_csv(path, n, args.tasa_duplicados, args.tasa_invalidos, args.semilla)
+        r = _bulk(path, args.chunk) if camino == "bulk" else _anterior(path)
+        path.unlink()
+        filas.append({
+            "camino": camino,
+            "filas": n,
+            **r,
+            "segundos": round(r["segundos"], 2),
+            "filas_por_s": round(n / r["segundos"]) if r["segundos"] else 0,
+            "rss_pico_mb": _rss_mb(),
+        })
+    return filas
+
+
+def _imprimir(filas: List[dict]):
+    columnas = ("camino", "filas", "insertados", "invalidos", "duplicados", "segundos", "filas_por_s", "rss_pico_mb")
+    print(" | ".join(f"{c:>12}" for c in columnas))
+    for fila in filas:
+        print(" | ".join(f"{str(fila.get(c, '')):>12}" for c in columnas))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk", type=int, default=None, help="Filas por INSERT (default INGEST_CHUNK)")
+    parser.add_argument("--tasa-duplicados", type=float, default=0.02)
+    parser.add_argument("--tasa-invalidos", type=float, default=0.01)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--comparar", action="store_true", help="Medir también el camino anterior (ORM por DNI)")
+    parser.add_argument("--max-comparar", type=int, default=100_000, help="Tamaño máximo para el camino anterior")
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="scgt-ingest-") as tmp:
+        os.environ["DB_PATH"] = str(Path(tmp) / "ingest.db")
+        if args.chunk is None:
+            from app.core.config import INGEST_CHUNK
+            args.chunk = INGEST_CHUNK
+        filas = correr(args.tamanos, Path(tmp), args)
+
+    if args.json:
+        print(json.dumps(filas, indent=2, ensure_ascii=False))
+    else:
+        _imprimir(filas)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
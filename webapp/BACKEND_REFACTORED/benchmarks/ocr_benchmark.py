@@ -0,0 +1,133 @@
+"""
+Benchmark offline del OCR de captchas MINEDU sobre un corpus grabado.
+
+Graba el corpus en producción con CAPTCHA_CORPUS_DIR=<dir> y luego:
+
+    python -m benchmarks.ocr_benchmark --corpus <dir>
+    python -m benchmarks.ocr_benchmark --corpus <dir> --backend ddddocr --backend ddddocr-beta \\
+        --preprocess off --preprocess vote --preprocess otsu
+
+Etiqueta de cada imagen: campo "etiqueta" del index.jsonl si se corrigió a mano,
+si no la lectura OCR de los captchas "accepted". Los "rejected" sin etiqueta solo
+cuentan para `repite_rechazo` (el backend repite la lectura que el servidor rechazó).
+
+Backends: los de BACKENDS o cualquier `modulo:fabrica` que retorne un objeto
+con `classification(img_bytes) -> str`.
+"""
+
+import argparse
+import importlib
+import json
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from app.services import captcha_preprocess as cp
+from app.services.captcha_corpus import leer_corpus
+
+
+def _ddddocr(**kwargs) -> Callable[[], object]:
+    def fabrica():
+        import ddddocr
+        return ddddocr.DdddOcr(show_ad=False, **kwargs)
+    return fabrica
+
+
+BACKENDS: Dict[str, Callable[[], object]] = {
+    "ddddocr": _ddddocr(),
+    "ddddocr-old": _ddddocr(old=True),
+    "ddddocr-beta": _ddddocr(beta=True),
+}
+
+# "off" = imagen original, "vote" = variantes + votación (producción), otro = una sola variante
+MODOS_VARIANTE = ("mediana", "otsu", "otsu_enderezada")
+
+
+def cargar_backend(nombre: str):
+    if nombre in BACKENDS:
+        return BACKENDS[nombre]()
+    if ":" in nombre:
+        modulo, fabrica = nombre.split(":", 1)
+        return getattr(importlib.import_module(modulo), fabrica)()
+    raise SystemExit(f"Backend desconocido: {nombre} (disponibles: {', '.join(BACKENDS)} o modulo:fabrica)")
+
+
+def leer(ocr, img: bytes, modo: str) -> str:
+    if modo == "off":
+        return cp.normalizar(ocr.classification(img))
+    if modo == "vote":
+        return cp.resolver(ocr, img, preprocesar=True)
+    variante = dict(cp.variantes(img)).get(modo, img)
+    return cp.normalizar(ocr.classification(variante))
+
+
+def evaluar(ocr, corpus: List[dict], modo: str) -> dict:
+    aciertos = etiquetadas = repite = rechazadas = validas = 0
+    latencias = []
+    for entrada in corpus:
+        t0 = time.perf_counter()
+        try:
+            lectura = leer(ocr, entrada["img"], modo)
+        except Exception:
+            lectura = ""
+        latencias.append((time.perf_counter() - t0) * 1000)
+        validas += cp.es_valida(lectura)
+
+        etiqueta = entrada.get("etiqueta") or (entrada["ocr"] if entrada["veredicto"] == "accepted" else None)
+        if etiqueta:
+            etiquetadas += 1
+            aciertos += lectura == etiqueta
+        else:
+            rechazadas += 1
+            repite += lectura == entrada["ocr"]
+
+    return {
+        "modo": modo,
+        "imagenes": len(corpus),
+        "etiquetadas": etiquetadas,
+        "accuracy": round(aciertos / etiquetadas, 3) if etiquetadas else None,
+        "validas": round(validas / len(corpus), 3) if corpus else None,
+        "repite_rechazo": round(repite / rechazadas, 3) if rechazadas else None,
+        "ms_avg": round(statistics.fmean(latencias), 1) if latencias else 0.0,
+        "ms_p50": round(statistics.median(latencias), 1) if latencias else 0.0,
+        "ms_p95": round(sorted(latencias)[int(0.95 * (len(latencias) - 1))], 1) if latencias else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark OCR sobre el corpus de captchas MINEDU")
+    parser.add_argument("--corpus", required=True, help="Directorio grabado con CAPTCHA_CORPUS_DIR")
+    parser.add_argument("--backend", action="append", help="Backend OCR (repetible). Default: ddddocr")
+    parser.add_argument("--preprocess", action="append", choices=("off", "vote") + MODOS_VARIANTE,
+                        help="Preprocesamiento (repetible). Default: off y vote")
+    parser.add_argument("--limit", type=int, default=0, help="Máx imágenes a evaluar")
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    args = parser.parse_args(argv)
+
+    corpus = list(leer_corpus(args.corpus))
+    if args.limit:
+        corpus = corpus[:args.limit]
+    if not corpus:
+        print(f"Corpus vacío: {args.corpus}", file=sys.stderr)
+        return 1
+
+    filas = []
+    for nombre in args.backend or ["ddddocr"]:
+        ocr = cargar_backend(nombre)
+        for modo in args.preprocess or ["off", "vote"]:
+            filas.append({"backend": nombre, **evaluar(ocr, corpus, modo)})
+
+    if args.json:
+        print(json.dumps(filas, indent=2))
+        return 0
+    columnas = ("backend", "modo", "imagenes", "etiquetadas", "accuracy", "validas",
+                "repite_rechazo", "ms_avg", "ms_p50", "ms_p95")
+    print(" | ".join(f"{c:>14}" for c in columnas))
+    for fila in filas:
+        print(" | ".join(f"{str(fila[c]):>14}" for c in columnas))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Simulación del pipeline a escala: muchas sesiones concurrentes contra la API real, sin Chrome.
+
+ANTES de importar la app fija SCRAPER_BACKEND=simulated (app/scrapers/simulated.py), una BD
+SQLite temporal (la real no se toca) y apaga pacing y pools de navegadores/perfiles. Luego
+levanta main:app con uvicorn en un thread y cada sesión simulada, en paralelo:
+
+  1. POST /api/upload con sus DNIs (CSV)
+  2. POST /api/workers/start?sunedu=N&minedu=M
+  3. GET /api/status cada --intervalo-status s hasta terminar (se cronometra cada llamada)
+
+    python -m benchmarks.pipeline_simulation --sesiones 20 --dnis 5000 --sunedu 2 --minedu 2 \\
+        --latencia-sunedu lognormal:0.05:0.5 --latencia-minedu exp:0.02 --json
+
+Reporta DNIs/min, latencia del reclamo de la cola (<fuente>.tomar_s), duración de las
+escrituras SQLite (db.escritura_s: incluye la espera del lock dentro de busy_timeout),
+escrituras lentas, "database is locked", DNIs por reclamo, el escritor único (commit
+y operaciones por commit; --sin-writer para comparar) y la latencia de /api/status bajo carga. Lo que queda es costo de orquestación: los scrapers solo duermen.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.e2e_benchmark import _dnis, _resumen_latencias
+
+
+def _configurar_entorno(args: argparse.Namespace, tmp: Path):
+    """Variables que lee app/core/config.py (debe correr antes de importar app.*)."""
+    os.environ.update({
+        "SCRAPER_BACKEND": "simulated",
+        "SIM_SUNEDU_ENCONTRADO": str(args.encontrado_sunedu),
+        "SIM_SUNEDU_ERROR": str(args.error_sunedu),
+        "SIM_SUNEDU_LATENCIA": args.latencia_sunedu,
+        "SIM_MINEDU_ENCONTRADO": str(args.encontrado_minedu),
+        "SIM_MINEDU_ERROR": str(args.error_minedu),
+        "SIM_MINEDU_LATENCIA": args.latencia_minedu,
+        "PIPELINE_MODE": args.pipeline,
+        "DB_WRITER_ENABLED": str(not args.sin_writer),
+        "DB_PATH": str(tmp / "simulacion.db"),
+        "PACING_ENABLED": "False",
+        "BROWSER_POOL_ENABLED": "False",
+        "PROFILE_POOL_ENABLED": "False",
+        "MAX_WORKERS_PER_SOURCE": str(max(args.sunedu, args.minedu, 1)),
+        "MAX_GLOBAL_WORKERS": str(args.sesiones * (args.sunedu + args.minedu)),
+        # Ventana de métricas suficiente para que los percentiles cubran toda la corrida
+        "METRICS_WINDOW": str(max(args.sesiones * args.dnis * 4, 1000)),
+    })
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _arrancar_api(port: int):
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    hilo = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    hilo.start()
+    while not server.started:
+        if not hilo.is_alive():
+            raise RuntimeError("uvicorn no arrancó")
+        time.sleep(0.05)
+    return server, hilo
+
+
+def _sesion(base: str, idx: int, dnis: List[str], args: argparse.Namespace, res: Dict[str, list]):
+    import httpx
+
+    headers = {"X-Session-ID": str(uuid.uuid4())}
+    with httpx.Client(base_url=base, headers=headers, timeout=60) as http:
+        t0 = time.perf_counter()
+        http.post("/api/upload", files={"file": (f"sesion{idx}.csv", "\n".join(dnis).encode())}).raise_for_status()
+        res["upload_s"].append(time.perf_counter() - t0)
+
+        http.post("/api/workers/start", params={"sunedu": args.sunedu, "minedu": args.minedu}).raise_for_status()
+        inicio = time.perf_counter()
+        st = {}
+        while time.perf_counter() - inicio < args.timeout:
+            t = time.perf_counter()
+            r = http.get("/api/status")
+            res["status_s"].append(time.perf_counter() - t)
+            r.raise_for_status()
+            st = r.json()
+            # Los workers salen solos al vaciarse la cola de la sesión
+            if st["terminados"] >= st["total"] or not st["workers"]["sunedu"]["running"]:
+                break
+            time.sleep(args.intervalo_status)
+        res["sesion_s"].append(time.perf_counter() - inicio)
+        res["terminados"].append(st.get("terminados", 0))
+        http.post("/api/workers/stop")
+
+
+def correr(args: argparse.Namespace) -> dict:
+    port = _puerto_libre()
+    server, hilo = _arrancar_api(port)
+    base = f"http://127.0.0.1:{port}"
+    res: Dict[str, list] = {"upload_s": [], "status_s": [], "sesion_s": [], "terminados": []}
+    try:
+        hilos = []
+        for i in range(args.sesiones):
+            inicio = args.dni_inicial if args.dnis_compartidos else args.dni_inicial + i * args.dnis
+            hilos.append(threading.Thread(target=_sesion, args=(base, i, _dnis(args.dnis, inicio), args, res),
+                                          name=f"sesion-{i}", daemon=True))
+        t0 = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        total = time.perf_counter() - t0
+
+        import httpx
+        stats = httpx.get(f"{base}/api/server/stats", timeout=60).json()
+    finally:
+        server.should_exit = True
+        hilo.join(timeout=10)
+
+    timings = stats["metrics"]["timings"]
+    counters = stats["metrics"]["counters"]
+    vacio = {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    terminados = sum(res["terminados"])
+    return {
+        "sesiones": args.sesiones,
+        "dnis_por_sesion": args.dnis,
+        "workers_por_sesion": {"sunedu": args.sunedu, "minedu": args.minedu},
+        "pipeline": args.pipeline,
+        "terminados": terminados,
+        "segundos": round(total, 1),
+        "dnis_por_min": round(terminados / total * 60, 2) if total else 0.0,
+        "latencias": {
+            "sunedu.tomar_s": timings.get("sunedu.tomar_s", vacio),
+            "minedu.tomar_s": timings.get("minedu.tomar_s", vacio),
+            "db.escritura_s": timings.get("db.escritura_s", vacio),
+            "db_writer.commit_s": timings.get("db_writer.commit_s", vacio),
+            "db_writer.espera_s": timings.get("db_writer.espera_s", vacio),
+            "sunedu.dni_s": timings.get("sunedu.dni_s", vacio),
+            "minedu.dni_s": timings.get("minedu.dni_s", vacio),
+        },
+        "db": {
+            **{n: counters.get(n, 0) for n in ("db.escrituras_lentas", "db.bloqueos")},
+            # DNIs por reclamo (lease): cuántas transacciones de reclamo se ahorraron
+            **{f"{f}.lote_reclamado": timings.get(f"{f}.lote_reclamado", vacio)["avg"] for f in ("sunedu", "minedu")},
+            # Operaciones por commit del escritor único (group commit)
+            "db_writer.lote": timings.get("db_writer.lote", vacio)["avg"],
+        },
+        "api": {
+            "status": {"llamadas": len(res["status_s"]), **_resumen_latencias(res["status_s"])},
+            "upload": _resumen_latencias(res["upload_s"]),
+        },
+        "sesion": _resumen_latencias(res["sesion_s"]),
+    }
+
+
+def _imprimir(r: dict):
+    print(f"{r['sesiones']} sesiones × {r['dnis_por_sesion']} DNIs, workers/sesión={r['workers_por_sesion']} "
+          f"pipeline={r['pipeline']}: {r['terminados']} terminados en {r['segundos']}s → {r['dnis_por_min']} DNIs/min")
+    print(f"{'métrica':>20} | {'n':>8} | {'p50_ms':>8} | {'p95_ms':>8} | {'max_ms':>8}")
+    for nombre, s in r["latencias"].items():
+        print(f"{nombre:>20} | {s['count']:>8} | {s['p50'] * 1000:>8.2f} | {s['p95'] * 1000:>8.2f} | {s['max'] * 1000:>8.2f}")
+    for nombre, s in r["api"].items():
+        n = s.get("llamadas", r["sesiones"])
+        print(f"{'/api/' + nombre:>20} | {n:>8} | {s['p50_s'] * 1000:>8.0f} | {s['p95_s'] * 1000:>8.0f} | {s['max_s'] * 1000:>8.0f}")
+    print(" | ".join(f"{k}={v}" for k, v in r["db"].items()))
+    print(f"duración por sesión: p50={r['sesion']['p50_s']}s p95={r['sesion']['p95_s']}s max={r['sesion']['max_s']}s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sesiones", type=int, default=10, help="Sesiones concurrentes")
+    parser.add_argument("--dnis", type=int, default=1000, help="DNIs por sesión")
+    parser.add_argument("--dni-inicial", type=int, default=50000000)
+    parser.add_argument("--dnis-compartidos", action="store_true",
+                        help="Todas las sesiones suben los mismos DNIs (ejercita la caché de resultados)")
+    parser.add_argument("--sunedu", type=int, default=2, help="Workers SUNEDU por sesión")
+    parser.add_argument("--minedu", type=int, default=2, help="Workers MINEDU por sesión")
+    parser.add_argument("--pipeline", choices=("sequential", "fanout"), default="sequential")
+    parser.add_argument("--sin-writer", action="store_true",
+                        help="DB_WRITER_ENABLED=False: cada worker escribe en su propia transacción")
+    parser.add_argument("--latencia-sunedu", default="lognormal:0.05:0.5",
+                        help="const:s | uniform:min:max | lognormal:mediana:sigma | exp:media")
+    parser.add_argument("--latencia-minedu", default="lognormal:0.03:0.5")
+    parser.add_argument("--encontrado-sunedu", type=float, default=0.4)
+    parser.add_argument("--encontrado-minedu", type=float, default=0.3)
+    parser.add_argument("--error-sunedu", type=float, default=0.01)
+    parser.add_argument("--error-minedu", type=float, default=0.02)
+    parser.add_argument("--intervalo-status", type=float, default=1.0, help="Segundos entre GET /api/status")
+    parser.add_argument("--timeout", type=float, default=3600, help="Máx segundos por sesión")
+    parser.add_argument("--verbose", action="store_true", help="Logs INFO de la app")
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="scgt-sim-") as tmp:
+        _configurar_entorno(args, Path(tmp))
+        r = correr(args)
+
+    if args.json:
+        print(json.dumps(r, indent=2, ensure_ascii=False))
+    else:
+        _imprimir(r)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
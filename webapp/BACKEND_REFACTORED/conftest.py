@@ -0,0 +1,52 @@
+"""Fixtures compartidas: DniRepository sobre una BD SQLite temporal."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.repository import DniRepository
+from app.db.session import Base
+from app.db.writer import DbWriter
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "repo(connect_args=None, writer=False, espera_ms=20): opciones de los fixtures `engine` / `repo`",
+    )
+
+
+def _opciones(request) -> dict:
+    """kwargs de las marcas `repo` (la más cercana al test gana: función > módulo)."""
+    opciones = {}
+    for marca in request.node.iter_markers("repo"):
+        for clave, valor in marca.kwargs.items():
+            opciones.setdefault(clave, valor)
+    return opciones
+
+
+@pytest.fixture
+def engine(request, tmp_path):
+    """Engine sobre una BD temporal con el esquema (tablas, índices y triggers) ya creado."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args=_opciones(request).get("connect_args") or {})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def repo(request, engine):
+    """
+    DniRepository sobre `engine`. Sin writer escribe en transacciones propias;
+    con `@pytest.mark.repo(writer=True, espera_ms=...)` trae un DbWriter propio
+    corriendo, que se detiene al terminar el test.
+    """
+    opciones = _opciones(request)
+    repo = DniRepository()
+    repo.session_factory = sessionmaker(bind=engine)
+    repo.writer = None
+    if opciones.get("writer"):
+        repo.writer = DbWriter(repo.session_factory, max_lote=50, espera_ms=opciones.get("espera_ms", 20))
+        repo.writer.start()
+    yield repo
+    if repo.writer is not None:
+        repo.writer.stop()
@@ -5,7 +5,12 @@ from app.api.endpoints import router
 from app.db.session import init_db
 from app.db.repository import DniRepository
 from app.core.config import API_PORT, API_HOST
+from app.core.config import BROWSER_POOL_ENABLED, SCRAPER_BACKEND, DB_WRITER_ENABLED
 from app.core.session_manager import session_manager
+from app.workers.browser_pool import browser_pool
+from app.workers.lease_reaper import lease_reaper
+from app.db.writer import db_writer
+from app.services.ocr_service import ocr_service
 import logging
 import asyncio
 
@@ -45,6 +50,7 @@ def on_startup():
         log.warning(f"[STARTUP] Migración legacy omitida (columna ya existe o DB vacía): {e}")
     
     # Auto-recuperar DNIs atascados en PROCESANDO_* de TODAS las sesiones
+    # (al arrancar no hay workers vivos: todo lo que está en proceso quedó huérfano)
     recovered = repo.recuperar_procesando()  # session_id=None → todas
     total = recovered.get("sunedu_recuperados", 0) + recovered.get("minedu_recuperados", 0)
     if total > 0:
@@ -52,9 +58,30 @@ def on_startup():
     else:
         log.info("[STARTUP] No hay DNIs atascados en PROCESANDO")
 
+    # Desde acá las escrituras del repositorio van por un solo thread con group commit
+    if DB_WRITER_ENABLED:
+        db_writer.start()
+
+    # En marcha, solo los leases vencidos vuelven a la cola (worker muerto o colgado)
+    lease_reaper.start()
+
+    # Pool global de navegadores precalentados (se llena en segundo plano; no con el backend simulado)
+    if BROWSER_POOL_ENABLED and SCRAPER_BACKEND != "simulated":
+        browser_pool.start()
+
+    if SCRAPER_BACKEND == "simulated":
+        log.warning("[STARTUP] SCRAPER_BACKEND=simulated: los workers NO consultan SUNEDU/MINEDU")
     log.info("[STARTUP] SICGT Backend listo — Multi-sesión activo")
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    lease_reaper.stop()
+    browser_pool.stop()
+    ocr_service.stop()
+    db_writer.stop()  # Último: escribe lo que quedó encolado
+
+
 async def cleanup_loop():
     """Limpia sesiones idle cada 5 minutos."""
     while True:
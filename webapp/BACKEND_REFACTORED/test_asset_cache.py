@@ -0,0 +1,56 @@
+import base64
+from types import SimpleNamespace as NS
+
+from app.scrapers.asset_cache import AssetCache, EstadisticasRed, RedNavegador
+
+BUNDLE = "https://constanciasweb.sunedu.gob.pe/main.3f9a1c2e4b5d6e7f.js"
+
+
+class _Tab:
+    def __init__(self):
+        self.enviados = []
+
+    def send(self, cmd, _is_update=False, wait_for_response=True):
+        assert wait_for_response is False  # Desde el listener nunca se espera
+        self.enviados.append(next(cmd))
+
+
+def _pausa(url, origen=None):
+    headers = {"User-Agent": "UA", "Cookie": "x=1"}
+    if origen:
+        headers["Origin"] = origen
+    return NS(request_id="r1", resource_type=NS(value="Script"),
+              request=NS(url=url, method="GET", headers=headers))
+
+
+def test_sirve_desde_disco_y_cuenta_bytes(tmp_path):
+    cache = AssetCache(directorio=tmp_path, max_mb=1, enabled=True)
+    assert cache.guardar(BUNDLE, b"console.log(1)", "application/javascript", "")
+    assert not cache.guardar("https://a/app.js", b"x", "application/javascript", "no-cache")
+
+    red = RedNavegador("sunedu", cache, EstadisticasRed())
+    red.driver = NS(_tab=_Tab())
+    descargas = []
+    cache.descargar_en_fondo = lambda url, headers, stats: descargas.append((url, headers))
+
+    red._on_paused(_pausa(BUNDLE, origen="https://constanciasweb.sunedu.gob.pe"))
+    red._on_paused(_pausa("https://a/app.js"))
+
+    hit, miss = red.driver._tab.enviados
+    assert hit["method"] == "Fetch.fulfillRequest"
+    assert base64.b64decode(hit["params"]["body"]) == b"console.log(1)"
+    assert {"name": "Access-Control-Allow-Origin", "value": "https://constanciasweb.sunedu.gob.pe"} in hit["params"]["responseHeaders"]
+    assert miss == {"method": "Fetch.continueRequest", "params": {"requestId": "r1"}}
+    assert descargas == [("https://a/app.js", {"User-Agent": "UA"})]  # Sin cookies
+    stats = red.stats.snapshot()
+    assert stats["servidas_cache"] == 1 and stats["bytes_ahorrados"] == 14 and stats["pasadas_red"] == 1
+
+
+def test_recorta_los_menos_usados(tmp_path):
+    cache = AssetCache(directorio=tmp_path, max_mb=0.001, enabled=True)  # ~1 KB
+    viejo = "https://a/viejo.1111aaaa.js"
+    cache.guardar(viejo, b"v" * 600, "text/javascript", "")
+    cache.guardar("https://a/nuevo.2222bbbb.js", b"n" * 600, "text/javascript", "")
+    assert cache.get(viejo) is None
+    assert cache.get_stats()["assets"] == 1
+    assert len(list(tmp_path.iterdir())) == 2  # Cuerpo + .json del que quedó
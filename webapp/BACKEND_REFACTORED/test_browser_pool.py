@@ -0,0 +1,45 @@
+"""BrowserPool: préstamo en frío (sin drivers precalentados), devolución y fuentes sin navegador."""
+import pytest
+
+from app.workers import browser_pool as bp
+from app.workers.browser_pool import BrowserPool, usa_navegador
+from app.workers.profile_pool import ProfilePool
+
+
+class _DriverFalso:
+    def __init__(self):
+        self.cerrado = False
+
+    def run_js(self, js):
+        return "complete"
+
+    def close(self):
+        self.cerrado = True
+
+
+def test_prestamo_en_frio_conserva_perfil(tmp_path, monkeypatch):
+    perfiles = ProfilePool(base_dir=tmp_path, slots=1, enabled=True)
+    monkeypatch.setattr(bp, "profile_pool", perfiles)
+    pool = BrowserPool(min_idle=0, max_size=1)
+    driver = _DriverFalso()
+    monkeypatch.setattr(pool, "_launch", lambda fuente: (driver, perfiles.acquire(fuente)))
+
+    pd = pool.acquire("sunedu", timeout=0)
+    assert pd.driver is driver and not pd.warm and pd.perfil is not None
+    assert pool.stats["acquired_cold"] == 1 and pool._total("sunedu") == 1
+
+    pool.release(pd, discard=True)
+    assert driver.cerrado and pool._total("sunedu") == 0
+    assert perfiles.acquire("sunedu") is pd.perfil  # El slot vuelve al pool de perfiles
+
+
+def test_minedu_http_no_usa_navegador(monkeypatch):
+    monkeypatch.setattr(bp, "MINEDU_ENGINE", "http")
+    assert usa_navegador("sunedu") and not usa_navegador("minedu")
+    pool = BrowserPool(min_idle=1, max_size=1)
+    monkeypatch.setattr(pool, "_warm", lambda fuente: pytest.fail("no debe lanzar Chrome para MINEDU HTTP"))
+    pool._refill("minedu")
+    assert pool._total("minedu") == 0
+
+    monkeypatch.setattr(bp, "MINEDU_ENGINE", "browser")
+    assert usa_navegador("minedu")
@@ -0,0 +1,27 @@
+from app.services.captcha_corpus import CaptchaCorpus, leer_corpus
+from benchmarks.ocr_benchmark import evaluar
+
+
+class _OcrFijo:
+    def classification(self, img_bytes):
+        return "AB12"
+
+
+def test_graba_corpus_y_benchmark_lo_evalua(tmp_path):
+    corpus = CaptchaCorpus(str(tmp_path))
+    corpus.registrar(b"img-1", "AB12", True)
+    corpus.registrar(b"img-2", "XY99", True, motor="http")
+    corpus.registrar(b"img-3", "AB12", False)
+    entradas = list(leer_corpus(tmp_path))
+    assert [e["veredicto"] for e in entradas] == ["accepted", "accepted", "rejected"]
+    assert entradas[1]["img"] == b"img-2" and entradas[1]["motor"] == "http"
+
+    fila = evaluar(_OcrFijo(), entradas, "off")
+    assert fila["etiquetadas"] == 2 and fila["accuracy"] == 0.5
+    assert fila["repite_rechazo"] == 1.0
+
+
+def test_desactivado_sin_directorio(tmp_path):
+    corpus = CaptchaCorpus("")
+    corpus.registrar(b"img", "AB12", True)
+    assert not corpus.enabled and corpus.guardados == 0
@@ -0,0 +1,46 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.services import captcha_preprocess as cp
+
+
+def _captcha_ruidoso() -> bytes:
+    rng = np.random.default_rng(0)
+    im = Image.new("L", (120, 40), 230)
+    ImageDraw.Draw(im).text((15, 12), "AB12", fill=20)
+    arr = np.asarray(im).copy()
+    ruido = rng.random(arr.shape) < 0.05
+    arr[ruido] = rng.choice([0, 255], size=ruido.sum())
+    buf = io.BytesIO()
+    Image.fromarray(arr).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_variantes_quitan_ruido_y_binarizan():
+    nombres = [n for n, _ in cp.variantes(_captcha_ruidoso())]
+    assert nombres == ["original", "mediana", "otsu", "otsu_enderezada"]
+    binaria = cp.binarizar(cp.mediana3(cp.a_gris(_captcha_ruidoso())))
+    assert set(np.unique(binaria)) <= {0, 255}
+    assert np.count_nonzero(binaria == 0) < binaria.size / 2  # Texto negro sobre blanco
+
+
+def test_votacion_y_validacion():
+    assert cp.votar(["ab1", "AB12", "AB12", "XY99"]) == "AB12"
+    assert cp.votar(["AB12", "XY99"]) == "AB12"           # Empate → variante más cruda
+    assert cp.votar(["", "a", "ab-12", "ABCDEFGH"]) == ""  # Ninguna plausible
+
+
+class _OcrFijo:
+    def __init__(self, *lecturas):
+        self.lecturas = list(lecturas)
+
+    def classification(self, img_bytes):
+        return self.lecturas.pop(0)
+
+
+def test_resolver_descarta_lecturas_imposibles():
+    img = _captcha_ruidoso()
+    assert cp.resolver(_OcrFijo("A8", "AB12", "AB12", "AB1"), img) == "AB12"
+    assert cp.resolver(_OcrFijo("", "x", "?", "toolongread"), img) == ""
@@ -0,0 +1,36 @@
+from types import SimpleNamespace as NS
+
+from app.scrapers import cdp_monitor
+from app.scrapers.cdp_monitor import CdpMonitor
+
+
+def test_normaliza_eventos_al_formato_del_script_espia():
+    m = CdpMonitor(capacidad=10)
+    m._on_console(NS(type_="warning", args=[NS(value="hola", description=None, type_="string"),
+                                            NS(value=None, description="Object", type_="object")]))
+    m._on_exception(NS(exception_details=NS(exception=NS(description="TypeError: x"), text="Uncaught",
+                                            url="https://a/app.js", line_number=7)))
+    m._on_request(NS(request_id="r1", request=NS(method="POST", url="https://a/api")))
+    m._on_response(NS(request_id="r1", response=NS(status=200, url="https://a/api")))
+    m._on_response(NS(request_id="r1", response=NS(status=503, url="https://a/api")))
+    m._on_failed(NS(request_id="r1", canceled=False, blocked_reason=None, error_text="net::ERR_FAILED"))
+    m._on_failed(NS(request_id="r2", canceled=True, blocked_reason=None, error_text="net::ERR_ABORTED"))
+
+    assert m.drenar() == [
+        {"type": "CONSOLE", "level": "warn", "message": "hola Object"},
+        {"type": "JS_ERROR", "message": "TypeError: x", "source": "https://a/app.js", "line": 7},
+        {"type": "HTTP_ERROR", "url": "https://a/api", "status": 503, "method": "POST"},
+        {"type": "NETWORK_ERROR", "url": "https://a/api", "method": "POST", "message": "net::ERR_FAILED"},
+    ]
+    assert m.drenar() == []
+
+
+def test_ring_buffer_acotado_cuenta_descartes():
+    m = CdpMonitor(capacidad=3)
+    m.activo = True
+    for i in range(5):
+        m._on_log(NS(entry=NS(level="error", text=f"e{i}", url="")))
+    assert [e["message"] for e in m.drenar()] == ["e2", "e3", "e4"]
+    assert m.descartados == 2 and m.recibidos == 5
+    stats = cdp_monitor.get_stats()
+    assert stats["monitores"] >= 1 and stats["descartados"] >= 2
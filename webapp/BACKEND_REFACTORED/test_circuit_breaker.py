@@ -0,0 +1,60 @@
+import threading
+
+from app.core.config import Estado
+from app.services import circuit_breaker as cb
+from app.services.circuit_breaker import CircuitBreaker
+
+
+def _en_otro_thread(fn):
+    salida = []
+    t = threading.Thread(target=lambda: salida.append(fn()))
+    t.start()
+    t.join()
+    return salida[0]
+
+
+def test_abre_prueba_una_vez_y_cierra(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(cb.time, "time", lambda: reloj[0])
+    b = CircuitBreaker("sunedu", umbral=2, cooldown=60, cooldown_max=200)
+
+    assert b.registrar_fallo("verificación") is False
+    assert b.registrar_fallo("verificación") is True  # Abre: el DNI vuelve a la cola
+    assert b.estado == cb.ABIERTO and not b.permitir()
+
+    # Cooldown cumplido: una sola sonda, el resto sigue esperando
+    reloj[0] += 61
+    assert b.permitir() and b.estado == cb.SEMIABIERTO
+    assert _en_otro_thread(b.permitir) is False
+    assert _en_otro_thread(lambda: b.cortado) is True and not b.cortado
+
+    # Sonda fallida → reabre con cooldown doble
+    assert b.registrar_fallo("timeout") is True
+    assert b.get_stats()["cooldown_s"] == 120 and b.aperturas == 2
+    reloj[0] += 61
+    assert not b.permitir()
+
+    reloj[0] += 60
+    assert b.permitir()
+    b.registrar_exito()
+    assert b.estado == cb.CERRADO and b.get_stats()["cooldown_s"] == 60
+    assert _en_otro_thread(b.permitir) is True
+
+
+def test_sonda_liberada_si_no_consulta(monkeypatch):
+    reloj = [0.0]
+    monkeypatch.setattr(cb.time, "time", lambda: reloj[0])
+    b = CircuitBreaker("minedu", umbral=1, cooldown=10, cooldown_max=100)
+    b.registrar_fallo("error")
+    reloj[0] = 11
+    assert b.permitir()
+    b.liberar_sonda()  # Cola vacía: otro worker puede ser la sonda
+    assert _en_otro_thread(b.permitir) is True
+
+
+def test_devolver_restaura_estado_previo(repo):
+    repo.crear_lote("s1", "lote.xlsx", ["11111111"])
+
+    item = repo.tomar_siguiente("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU)
+    repo.devolver(item["id"], "sunedu")
+    assert repo.obtener_conteos("s1").get(Estado.PENDIENTE) == 1
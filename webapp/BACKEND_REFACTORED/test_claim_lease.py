@@ -0,0 +1,251 @@
+"""Reclamo por lease en lote, latidos y reaper de leases vencidos (DniRepository)."""
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import Estado, SubEstado as S
+from app.db import repository
+from app.db.models import Registro
+from app.services.circuit_breaker import CircuitBreakers
+from app.services.result_cache import ResultCache
+from app.workers import loops
+from app.workers.lease_reaper import LeaseReaper
+from app.workers.loops import ColaLocal
+
+pytestmark = pytest.mark.repo(connect_args={"timeout": 10})
+
+
+def test_reclamar_lote_con_lease_y_devolver_resto(repo):
+    repo.crear_lote("s1", "lote.xlsx", [str(10000000 + i) for i in range(7)])
+
+    lote = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "sunedu-w1", n=5)
+    assert [i["dni"] for i in lote] == [str(10000000 + i) for i in range(5)]
+    with repo.session_factory() as s:
+        reg = s.get(Registro, lote[0]["id"])
+        assert reg.lease_owner == "sunedu-w1" and reg.lease_expires_at > reg.updated_at
+
+    # El segundo worker recibe lo que queda, sin repetir
+    assert [i["dni"] for i in repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w2", n=5)] == \
+        ["10000005", "10000006"]
+
+    # Procesa uno y se detiene: el resto del lease vuelve a la cola sin lease
+    repo.actualizar_resultado(lote[0]["id"], Estado.CHECK_MINEDU)
+    assert repo.devolver_lote([i["id"] for i in lote], "sunedu") == 4
+    conteos = repo.obtener_conteos("s1")
+    assert conteos[Estado.PENDIENTE] == 4 and conteos[Estado.CHECK_MINEDU] == 1
+    with repo.session_factory() as s:
+        assert s.get(Registro, lote[1]["id"]).lease_owner is None
+
+
+def test_reclamos_concurrentes_no_se_solapan(repo):
+    repo.crear_lote("s1", "lote.xlsx", [str(20000000 + i) for i in range(200)])
+    tomados, lock = [], threading.Lock()
+
+    def worker(n):
+        while True:
+            lote = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, f"w{n}", n=7)
+            if not lote:
+                return
+            with lock:
+                tomados.extend(i["id"] for i in lote)
+
+    hilos = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert len(tomados) == len(set(tomados)) == 200
+
+
+def test_reclamar_fuente_fusiona_estado(repo, monkeypatch):
+    monkeypatch.setattr(repository, "PIPELINE_MODE", "fanout")
+    repo.crear_lote("s1", "lote.xlsx", ["11111111", "22222222", "33333333"])
+
+    sunedu = repo.reclamar_fuente("s1", "sunedu", "sunedu-w1", n=2)
+    minedu = repo.reclamar_fuente("s1", "minedu", "minedu-w1", n=5)
+    assert len(sunedu) == 2 and len(minedu) == 3
+    assert repo.obtener_conteos("s1") == {Estado.PROCESANDO_SUNEDU: 2, Estado.PROCESANDO_MINEDU: 1}
+
+    repo.devolver_lote([i["id"] for i in sunedu], "sunedu")
+    with repo.session_factory() as s:
+        reg = s.get(Registro, sunedu[0]["id"])
+        assert (reg.estado_sunedu, reg.estado_minedu, reg.estado) == (S.PENDIENTE, S.PROCESANDO, Estado.PROCESANDO_MINEDU)
+
+
+def _vencer(repo, ids):
+    with repo.session_factory() as s:
+        s.query(Registro).filter(Registro.id.in_(ids)).update(
+            {Registro.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False
+        )
+        s.commit()
+
+
+def test_reaper_solo_reencola_leases_vencidos(repo):
+    repo.crear_lote("s1", "lote.xlsx", [str(30000000 + i) for i in range(4)])
+    muerto = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w-muerto", n=2)
+    vivo = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w-vivo", n=2)
+    _vencer(repo, [i["id"] for i in muerto])
+
+    recuperados = LeaseReaper(repo=repo).barrer()
+    assert recuperados == {"sunedu_recuperados": 2, "minedu_recuperados": 0}
+    conteos = repo.obtener_conteos("s1")
+    assert conteos == {Estado.PENDIENTE: 2, Estado.PROCESANDO_SUNEDU: 2}
+
+    # El worker vivo renueva; el muerto (si despierta) ya no retiene nada
+    assert sorted(repo.renovar_lease([i["id"] for i in vivo], "sunedu", "w-vivo")) == [i["id"] for i in vivo]
+    assert repo.renovar_lease([i["id"] for i in muerto], "sunedu", "w-muerto") == []
+
+
+def test_lease_reencolado_y_reclamado_rechaza_al_primer_worker(repo, monkeypatch):
+    repo.crear_lote("s1", "lote.xlsx", ["11111111"])
+    item = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w-lento", n=1)[0]
+    _vencer(repo, [item["id"]])
+    LeaseReaper(repo=repo).barrer()
+    assert repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w-nuevo", n=1)[0]["id"] == item["id"]
+
+    # El worker lento despierta: ni su latido ni su resultado valen ya
+    assert repo.renovar_lease([item["id"]], "sunedu", "w-lento") == []
+    assert not repo.actualizar_resultado(item["id"], Estado.FOUND_SUNEDU, fuente="sunedu", worker_id="w-lento")
+    assert repo.devolver_lote([item["id"]], "sunedu", "w-lento") == 0
+    assert repo.obtener_conteos("s1") == {Estado.PROCESANDO_SUNEDU: 1}
+    assert repo.actualizar_resultado(item["id"], Estado.CHECK_MINEDU, fuente="sunedu", worker_id="w-nuevo")
+
+    # Fanout: cada fuente tiene su dueño; el de MINEDU no se pisa con el de SUNEDU
+    monkeypatch.setattr(repository, "PIPELINE_MODE", "fanout")
+    repo.crear_lote("s2", "lote.xlsx", ["22222222"])
+    repo.preparar_fanout("s2")
+    otro = repo.reclamar_fuente("s2", "sunedu", "sunedu-lento", n=1)[0]
+    repo.reclamar_fuente("s2", "minedu", "minedu-w1", n=1)
+    _vencer(repo, [otro["id"]])
+    repo.recuperar_leases_vencidos()
+    repo.reclamar_fuente("s2", "sunedu", "sunedu-nuevo", n=1)
+    repo.reclamar_fuente("s2", "minedu", "minedu-w2", n=1)
+    assert repo.registrar_subresultado(otro["id"], "sunedu", S.FOUND, worker_id="sunedu-lento") is False
+    assert repo.registrar_subresultado(otro["id"], "minedu", S.NOT_FOUND, worker_id="minedu-w1") is False
+    assert repo.registrar_subresultado(otro["id"], "minedu", S.NOT_FOUND, worker_id="minedu-w2") is None
+    assert repo.renovar_lease([otro["id"]], "sunedu", "sunedu-nuevo") == [otro["id"]]
+    with repo.session_factory() as s:
+        reg = s.get(Registro, otro["id"])
+        assert (reg.estado_sunedu, reg.estado_minedu) == (S.PROCESANDO, S.NOT_FOUND)
+        assert (reg.lease_owner, reg.lease_owner_minedu) == ("sunedu-nuevo", None)
+
+
+def test_latido_renueva_el_dni_en_consulta(repo):
+    repo.crear_lote("s1", "lote.xlsx", ["11111111", "22222222"])
+    cola = ColaLocal(repo, "s1", "sunedu", n=1)
+    try:
+        item = cola.siguiente()
+        _vencer(repo, [item["id"]])
+        cola.latido()  # En plena consulta: el lease del DNI en curso también se renueva
+        assert LeaseReaper(repo=repo).barrer() == {"sunedu_recuperados": 0, "minedu_recuperados": 0}
+        assert cola.guardar(item, Estado.CHECK_MINEDU)
+
+        # Reencolado y tomado por otro: el resultado tardío se descarta
+        otro = cola.siguiente()
+        _vencer(repo, [otro["id"]])
+        LeaseReaper(repo=repo).barrer()
+        repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w-nuevo", n=1)
+        assert not cola.guardar(otro, Estado.CHECK_MINEDU)
+        assert repo.obtener_conteos("s1") == {Estado.CHECK_MINEDU: 1, Estado.PROCESANDO_SUNEDU: 1}
+    finally:
+        cola.cerrar()
+
+
+def test_reaper_fanout_fusiona_estado(repo, monkeypatch):
+    monkeypatch.setattr(repository, "PIPELINE_MODE", "fanout")
+    repo.crear_lote("s1", "lote.xlsx", ["11111111"])
+    item = repo.reclamar_fuente("s1", "sunedu", "sunedu-w1", n=1)[0]
+    repo.reclamar_fuente("s1", "minedu", "minedu-w1", n=1)
+    repo.registrar_subresultado(item["id"], "minedu", S.NOT_FOUND, error_msg="No")
+    _vencer(repo, [item["id"]])
+
+    assert repo.recuperar_leases_vencidos()["sunedu_recuperados"] == 1
+    with repo.session_factory() as s:
+        reg = s.get(Registro, item["id"])
+        assert (reg.estado_sunedu, reg.estado_minedu, reg.estado) == (S.PENDIENTE, S.NOT_FOUND, Estado.PENDIENTE)
+        assert reg.lease_expires_at is None
+
+
+def _latido_rapido(monkeypatch):
+    monkeypatch.setattr(loops, "LEASE_HEARTBEAT_SEGUNDOS", 0.02)
+
+
+def _loop_de_prueba(repo, monkeypatch, scraper):
+    """Orquestador falso y dependencias del loop SUNEDU apuntando al repo del test."""
+    orch = SimpleNamespace(stop_event=threading.Event(), pause_event=threading.Event())
+    orch.pause_event.set()
+    monkeypatch.setattr(loops, "PIPELINE_MODE", "sequential")
+    monkeypatch.setattr(loops, "DniRepository", lambda: repo)
+    monkeypatch.setattr(loops, "_get_session_orchestrator", lambda sid: orch)
+    monkeypatch.setattr(loops, "_crear_scraper", lambda fuente, driver: scraper)
+    monkeypatch.setattr(loops, "circuit_breakers", CircuitBreakers(enabled=False))
+    monkeypatch.setattr(loops, "result_cache", ResultCache(enabled=True))
+    return orch
+
+
+def test_excepcion_fuera_del_loop_deja_vencer_el_lease(repo, monkeypatch):
+    _latido_rapido(monkeypatch)
+
+    class _ScraperRoto:
+        def procesar_dni(self, driver, dni):
+            raise RuntimeError("timeout")
+
+    def _guardar_roto(self, item, nuevo_estado, **campos):
+        raise RuntimeError("database is locked")  # El error del writer escapa del except del loop
+
+    _loop_de_prueba(repo, monkeypatch, _ScraperRoto())
+    monkeypatch.setattr(ColaLocal, "guardar", _guardar_roto)
+    repo.crear_lote("s1", "lote.xlsx", ["41111111", "42222222", "43333333"])
+
+    with pytest.raises(RuntimeError, match="database is locked"):
+        loops._sunedu_loop(None, "s1")
+
+    # El resto del lote volvió a la cola; el DNI en curso queda con su lease, que ya nadie renueva
+    assert repo.obtener_conteos("s1") == {Estado.PENDIENTE: 2, Estado.PROCESANDO_SUNEDU: 1}
+    with repo.session_factory() as s:
+        ids = [r.id for r in s.query(Registro).filter(Registro.estado == Estado.PROCESANDO_SUNEDU)]
+    _vencer(repo, ids)
+    time.sleep(0.1)
+    assert LeaseReaper(repo=repo).barrer()["sunedu_recuperados"] == 1
+    assert repo.obtener_conteos("s1") == {Estado.PENDIENTE: 3}
+
+
+def test_resultado_descartado_no_se_cachea(repo, monkeypatch):
+    repo.crear_lote("s1", "lote.xlsx", ["11111111"])
+
+    class _ScraperLento:
+        def procesar_dni(self, driver, dni):
+            # Mientras consulta, el lease vence y otro worker toma el DNI
+            with repo.session_factory() as s:
+                _vencer(repo, [r.id for r in s.query(Registro)])
+            LeaseReaper(repo=repo).barrer()
+            repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w-nuevo", n=1)
+            orch.stop_event.set()
+            return {"encontrado": True, "datos": [{"grado_o_titulo": "BACHILLER"}]}
+
+    orch = _loop_de_prueba(repo, monkeypatch, _ScraperLento())
+    assert loops._sunedu_loop(None, "s1") == loops.LOOP_DETENIDO
+    assert repo.obtener_conteos("s1") == {Estado.PROCESANDO_SUNEDU: 1}
+    assert loops.result_cache.get("11111111") is None
+
+
+def test_latido_se_detiene_si_muere_el_worker(repo, monkeypatch):
+    _latido_rapido(monkeypatch)
+    repo.crear_lote("s1", "lote.xlsx", ["11111111"])
+    colas = []
+
+    def worker():
+        cola = ColaLocal(repo, "s1", "sunedu", n=1)
+        cola.siguiente()
+        colas.append(cola)  # Termina sin cerrar la cola
+
+    hilo = threading.Thread(target=worker)
+    hilo.start()
+    hilo.join()
+    _vencer(repo, [colas[0].actual["id"]])
+    colas[0]._latido.join(1)
+    assert not colas[0]._latido.is_alive()
+    assert LeaseReaper(repo=repo).barrer()["sunedu_recuperados"] == 1
@@ -0,0 +1,70 @@
+"""Escritor único (DbWriter): group commit, aislamiento de errores y errores de reclamo que llegan al worker."""
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import Estado
+from app.db.models import Registro
+
+pytestmark = pytest.mark.repo(writer=True)
+
+
+def test_escrituras_concurrentes_comparten_commit(repo):
+    repo.crear_lote("s1", "a.xlsx", [str(10000000 + i) for i in range(20)])
+    items = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w1", n=20)
+    hilos = [
+        threading.Thread(target=repo.actualizar_resultado, args=(i["id"], Estado.FOUND_SUNEDU))
+        for i in items
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert repo.obtener_conteos("s1") == {Estado.FOUND_SUNEDU: 20}
+    stats = repo.writer.get_stats()
+    assert stats["errores"] == 0 and stats["lote_max"] > 1
+    assert stats["lotes"] < stats["operaciones"]
+
+
+@pytest.mark.repo(espera_ms=50)
+def test_error_llega_solo_a_quien_lo_causo(repo):
+    repo.crear_lote("s1", "a.xlsx", ["11111111"])
+
+    def mala(session):
+        session.query(Registro).update({Registro.dni: None})  # NOT NULL
+
+    def buena(session):
+        session.query(Registro).update({Registro.error_msg: "ok"})
+        return "hecho"
+
+    f_mala, f_buena = repo.writer.submit(mala), repo.writer.submit(buena)
+    assert f_buena.result(5) == "hecho"
+    with pytest.raises(Exception):
+        f_mala.result(5)
+    assert repo.writer.get_stats()["lotes_divididos"] == 1
+    assert repo.obtener_registros("s1")[0]["error_msg"] == "ok"
+
+
+def test_reclamar_propaga_errores_de_bd(repo):
+    repo.writer.stop()
+    repo.crear_lote("s1", "a.xlsx", ["11111111"])
+    with repo.session_factory() as s:
+        s.connection().exec_driver_sql("DROP TABLE registros")
+        s.commit()
+    # Antes se devolvía [] y el worker lo tomaba por cola vacía
+    with pytest.raises(OperationalError):
+        repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w1", n=1)
+
+
+@pytest.mark.repo(espera_ms=200)
+def test_stop_escribe_lo_encolado(repo):
+    repo.crear_lote("s1", "a.xlsx", ["11111111", "22222222"])
+    futuros = [
+        repo.writer.submit(lambda s, dni=dni: s.query(Registro).filter(Registro.dni == dni).update(
+            {Registro.error_msg: "tarde"}))
+        for dni in ("11111111", "22222222")
+    ]
+    repo.writer.stop()
+    assert all(f.done() for f in futuros) and repo.writer.submit(lambda s: None) is None
+    assert {r["error_msg"] for r in repo.obtener_registros("s1")} == {"tarde"}
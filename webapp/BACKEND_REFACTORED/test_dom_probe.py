@@ -0,0 +1,44 @@
+import shutil
+import subprocess
+
+import pytest
+
+from app.scrapers import minedu, sunedu
+from app.scrapers.dom_probe import DomProbe, DriverMedido
+
+
+class _DriverFalso:
+    """run_js mínimo: la librería existe solo después de inyectarla."""
+
+    def __init__(self):
+        self.instalada = False
+        self.scripts = []
+
+    def run_js(self, script, args=None):
+        self.scripts.append(script)
+        if args is None:
+            self.instalada = True
+            return None
+        if not self.instalada:
+            return {"__sinProbe": True}
+        return {"f": args["f"], "a": args["a"]}
+
+
+def test_llamada_reinyecta_si_el_documento_no_tiene_libreria():
+    driver = DriverMedido(_DriverFalso())
+    probe = DomProbe("window.__scgt = {};")
+
+    assert probe.llamar(driver, "buscar", "12345678") == {"f": "buscar", "a": ["12345678"]}
+    assert probe.reinyecciones == 1 and driver.round_trips == 3  # llamada + inyección + llamada
+
+    probe.llamar(driver, "estado")
+    assert probe.reinyecciones == 1 and driver.round_trips == 4  # Ya instalada: un round trip
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node no disponible")
+@pytest.mark.parametrize("script", [sunedu.PROBE_SCRIPT, minedu.PROBE_SCRIPT], ids=["sunedu", "minedu"])
+def test_probe_script_es_js_valido(tmp_path, script):
+    archivo = tmp_path / "probe.js"
+    archivo.write_text(script, encoding="utf-8")
+    res = subprocess.run(["node", "--check", str(archivo)], capture_output=True, text=True)
+    assert res.returncode == 0, res.stderr
@@ -0,0 +1,51 @@
+"""Servidor de fixtures SUNEDU/MINEDU (benchmarks/fixture_server.py) con los parsers reales."""
+import pytest
+import requests
+
+from app.scrapers.minedu_http import MineduHttpScraper
+from benchmarks.fixture_server import Escenario, FixtureServer, registro_minedu, registro_sunedu
+
+
+class _OcrFijo:
+    def classification(self, img_bytes):
+        return "AB3CD"
+
+
+@pytest.fixture
+def servidor():
+    fx = FixtureServer(Escenario(latencia_ms=0, latencia_pagina_ms=0, semilla=1)).iniciar()
+    yield fx
+    fx.detener()
+
+
+def test_minedu_http_contra_fixture(servidor):
+    scraper = MineduHttpScraper(base_url=servidor.minedu_url, perfil_espera="fast")
+    scraper.ocr = _OcrFijo()
+    for dni in ("40000000", "40000001", "40000002", "40000003"):
+        resultado = scraper.procesar_dni(None, dni)
+        assert resultado["encontrado"] == servidor.encontrado("minedu", dni)
+        if resultado["encontrado"]:
+            esperado = registro_minedu(dni)
+            assert resultado["datos"]["titulo"] == esperado["titulo"]
+            assert resultado["datos"]["codigo_dre"] == esperado["codigo"]
+            assert resultado["datos"]["institucion"] == esperado["institucion"]
+        assert scraper.intentos == 1
+    assert servidor.get_stats()["captchas_aceptados"] == 4
+
+
+def test_tasas_del_escenario(servidor):
+    api = f"{servidor.url}/sunedu/api/consulta?dni=40000000"
+    assert requests.get(api).json()["data"] == ([registro_sunedu("40000000")]
+                                                if servidor.encontrado("sunedu", "40000000") else [])
+    servidor.escenario.tasa_verificacion = 1.0
+    assert requests.get(api).status_code == 403
+    servidor.escenario.tasa_fallo = 1.0
+    assert requests.get(api).status_code == 500
+    assert servidor.consultas("sunedu") == {"40000000": 3}
+
+    servidor.escenario.tasa_fallo = 0.0
+    servidor.escenario.captcha_estricto = True
+    rechazo = requests.post(f"{servidor.url}/minedu/consulta",
+                            data={"DOCU_NUM": "40000000", "CaptchaCodeText": "XXXXX",
+                                  "__RequestVerificationToken": "desconocido"}).json()
+    assert rechazo["ok"] is False and "captcha" in rechazo["mensaje"]
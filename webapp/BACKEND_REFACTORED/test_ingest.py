@@ -0,0 +1,33 @@
+"""Ingesta en streaming (IngestService + DniRepository.crear_lote_bulk)."""
+from io import BytesIO
+
+from app.db.models import Lote, Registro
+from app.services.ingest_service import IngestService
+
+
+def test_ingesta_por_chunks_con_progreso(repo):
+    svc = IngestService(repo=repo, chunk=3)
+    lineas = ["10000001", "10000002", "10000001", "abc", "", "10000003.0", "1234", "10000004", "10000005"]
+    ingesta = svc.ingerir(BytesIO("\n".join(lineas).encode()), "dnis.csv", "s1")
+
+    assert (ingesta.validos, ingesta.duplicados, ingesta.invalidos) == (5, 1, 2)
+    assert ingesta.insertados == 5 and ingesta.invalidos_muestra == ["abc", "1234"]
+    assert svc.progreso("s1").to_dict()["estado"] == "completado"
+    with repo.session_factory() as s:
+        assert s.get(Lote, ingesta.lote_id).total_dnis == 5
+        dnis = [d for (d,) in s.query(Registro.dni).filter(Registro.lote_id == ingesta.lote_id).order_by(Registro.id)]
+    assert dnis == ["10000001", "10000002", "10000003", "10000004", "10000005"]
+
+
+def test_ingesta_fallida_no_deja_lote_a_medias(repo):
+
+    def dnis():
+        yield from ("10000001", "10000002", "10000003")
+        raise RuntimeError("archivo cortado")
+
+    try:
+        repo.crear_lote_bulk("s1", "dnis.csv", dnis(), chunk=2)
+    except RuntimeError:
+        pass
+    with repo.session_factory() as s:
+        assert s.query(Registro).count() == 0 and s.query(Lote).count() == 0
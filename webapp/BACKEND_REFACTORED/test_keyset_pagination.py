@@ -0,0 +1,49 @@
+"""Paginación keyset de registros (after_id / next_cursor) y filtros dni_prefix / updated_since."""
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import Estado
+from app.db.models import Registro
+
+
+def test_paginas_encadenadas_por_cursor(repo):
+    lote = repo.crear_lote("s1", "a.xlsx", [str(10000000 + i) for i in range(25)])
+    repo.crear_lote("s2", "b.xlsx", ["99999999"])
+
+    vistos, cursor, totales = [], None, []
+    while True:
+        pagina = repo.obtener_pagina("s1", limit=10, after_id=cursor)
+        vistos += [i["dni"] for i in pagina["items"]]
+        totales.append(pagina["total"])
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            break
+    assert vistos == [str(10000000 + i) for i in range(25)]
+    assert totales == [25, 25, 25]
+
+    # Página exacta: sin cursor colgando hacia una página vacía
+    assert repo.obtener_pagina("s1", limit=25)["next_cursor"] is None
+    assert len(list(repo.iter_registros("s1", pagina=7, lote_id=lote.id))) == 25
+
+
+def test_filtros_estado_prefijo_y_actualizados(repo):
+    repo.crear_lote("s1", "a.xlsx", ["10000001", "10000002", "10000011", "20000001"])
+    items = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w1", n=2)
+    repo.actualizar_resultado(items[0]["id"], Estado.ERROR_SUNEDU)
+    repo.actualizar_resultado(items[1]["id"], Estado.NOT_FOUND)
+
+    errores = repo.obtener_pagina("s1", estado=[Estado.ERROR_SUNEDU, Estado.NOT_FOUND])
+    assert [i["dni"] for i in errores["items"]] == ["10000001", "10000002"] and errores["total"] == 2
+
+    pagina = repo.obtener_pagina("s1", dni_prefix="100000", limit=1)
+    assert [i["dni"] for i in pagina["items"]] == ["10000001"] and pagina["total"] == 3
+    siguiente = repo.obtener_pagina("s1", dni_prefix="100000", limit=1, after_id=pagina["next_cursor"])
+    assert [i["dni"] for i in siguiente["items"]] == ["10000002"] and siguiente["total"] is None
+
+    # updated_since: solo lo tocado después del corte (acepta fechas con zona horaria)
+    corte = datetime.utcnow() - timedelta(minutes=5)
+    with repo.session_factory() as s:
+        s.query(Registro).update({Registro.updated_at: corte - timedelta(hours=1)})
+        s.query(Registro).filter(Registro.dni == "20000001").update({Registro.updated_at: datetime.utcnow()})
+        s.commit()
+    recientes = repo.obtener_pagina("s1", updated_since=corte.replace(tzinfo=timezone.utc))
+    assert [i["dni"] for i in recientes["items"]] == ["20000001"] and recientes["total"] == 1
@@ -0,0 +1,127 @@
+"""Motor MINEDU HTTP contra un formulario local que imita titulosinstitutos.minedu.gob.pe."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from app.scrapers import minedu_http
+from app.scrapers.minedu_http import MineduHttpScraper
+
+TOKEN = "tok-123"
+CAPTCHA = "AB12"
+FORM = """<html><body>
+<form action="/Home/Consultar" method="post">
+  <input type="hidden" name="__RequestVerificationToken" value="{token}">
+  <input id="DOCU_NUM" name="DOCU_NUM" type="text">
+  <img id="imgCaptcha" src="data:image/png;base64,iVBORw0KGgo=">
+  <input id="CaptchaCodeText" name="CaptchaCodeText" type="text">
+  <button id="btnConsultar" type="button">Consultar</button>
+</form><div id="divResultado"></div></body></html>"""
+RESULTADO = """<div id="divResultado"><table class="gobpe-res-tabla-cuerpo"><tbody>
+<tr><td colspan="3">Resultados</td></tr>
+<tr><td>PEREZ GOMEZ JUAN<br>DNI 12345678</td>
+<td>PROFESIONAL TÉCNICO EN ENFERMERÍA<br>Nivel: Técnico<br>Fecha de emisión: 10/02/2019<br>Código DRE: 0345</td>
+<td>IEST CAYETANO HEREDIA<br>LIMA</td></tr></tbody></table></div>"""
+SIN_REGISTROS = '<div id="divResultado"><p class="alert alert-info">No se encontraron registros para el documento ingresado.</p></div>'
+# Parciales sueltos: lo que la acción MVC responde al POST XHR (sin el div contenedor)
+PARCIAL_RESULTADO = RESULTADO.replace('<div id="divResultado">', "").replace("</table></div>", "</table>")
+PARCIAL_SIN_REGISTROS = "No se encontraron registros"
+# Página ajena al formulario (mantenimiento, WAF, layout nuevo): no es "sin registros"
+MANTENIMIENTO = """<html><body><h1>Sitio en mantenimiento</h1>
+<p>Estamos realizando mejoras en el servicio. Por favor, intente nuevamente más tarde.</p></body></html>"""
+ERROR_CAPTCHA = '<span data-valmsg-for="CaptchaCodeText">El código de verificación es incorrecto</span>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, html, cookie=False):
+        body = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if cookie:
+            self.send_header("Set-Cookie", f"__RequestVerificationToken={TOKEN}; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._responder(FORM.format(token=TOKEN), cookie=True)
+
+    def do_POST(self):
+        data = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        if TOKEN not in self.headers.get("Cookie", "") or data["__RequestVerificationToken"] != [TOKEN]:
+            self.send_response(400)
+            self.end_headers()
+            return
+        if data.get("CaptchaCodeText") != [CAPTCHA]:
+            self._responder(ERROR_CAPTCHA)
+        elif data["DOCU_NUM"] == ["99999999"]:
+            self._responder(MANTENIMIENTO)
+        elif data["DOCU_NUM"] == ["11223344"]:
+            self._responder(PARCIAL_RESULTADO)
+        elif data["DOCU_NUM"] == ["55667788"]:
+            self._responder(PARCIAL_SIN_REGISTROS)
+        elif data["DOCU_NUM"] == ["12345678"]:
+            self._responder(RESULTADO)
+        else:
+            self._responder(SIN_REGISTROS)
+
+
+class _OcrSecuencia:
+    """OCR de prueba: devuelve las respuestas en orden y luego repite la última."""
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+
+    def classification(self, img_bytes):
+        return self.respuestas.pop(0) if len(self.respuestas) > 1 else self.respuestas[0]
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+
+
+def _scraper(url, *ocr):
+    scraper = MineduHttpScraper(base_url=url, perfil_espera="fast")
+    scraper.ocr = _OcrSecuencia(*ocr)
+    return scraper
+
+
+def test_encontrado_tras_captcha_incorrecto(servidor):
+    resultado = _scraper(servidor, "ZZZZ", CAPTCHA).procesar_dni(None, "12345678")
+    assert resultado["encontrado"]
+    datos = resultado["datos"]
+    assert datos["nombre_completo"] == "PEREZ GOMEZ JUAN"
+    assert datos["titulo"] == "PROFESIONAL TÉCNICO EN ENFERMERÍA"
+    assert datos["nivel"] == "Técnico"
+    assert datos["fecha_expedicion"] == "10/02/2019"
+    assert datos["codigo_dre"] == "0345"
+    assert datos["institucion"] == "IEST CAYETANO HEREDIA"
+
+
+def test_no_encontrado(servidor):
+    resultado = _scraper(servidor, CAPTCHA).procesar_dni(None, "87654321")
+    assert not resultado["encontrado"]
+    assert resultado["datos"] is None
+
+
+def test_pagina_ajena_se_reintenta_y_no_es_no_encontrado(servidor, monkeypatch):
+    monkeypatch.setattr(minedu_http, "MINEDU_MAX_RETRIES", 2)
+    scraper = _scraper(servidor, CAPTCHA)
+    with pytest.raises(RuntimeError, match="Último motivo"):
+        scraper.procesar_dni(None, "99999999")
+    assert scraper.intentos == 2
+
+
+def test_parcial_suelto_sin_div_resultado(servidor):
+    encontrado = _scraper(servidor, CAPTCHA).procesar_dni(None, "11223344")
+    assert encontrado["encontrado"] and encontrado["datos"]["titulo"] == "PROFESIONAL TÉCNICO EN ENFERMERÍA"
+    scraper = _scraper(servidor, CAPTCHA)
+    assert not scraper.procesar_dni(None, "55667788")["encontrado"]
+    assert scraper.intentos == 1
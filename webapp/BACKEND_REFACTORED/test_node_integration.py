@@ -1,19 +1,38 @@
+"""SuneduScraper real (Chrome) contra el servidor de fixtures local; se omite sin Chrome."""
 import logging
-import sys
+
+import pytest
+
 from app.scrapers.sunedu import SuneduScraper
+from benchmarks.fixture_server import Escenario, FixtureServer
 
-# Configure logging to stdout
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-def test_integration():
-    scraper = SuneduScraper()
-    dni = "12345678" # Dummy DNI
-    print(f"Testing SuneduScraper with DNI {dni}...")
+
+@pytest.fixture
+def driver():
+    from botasaurus.browser import Driver
     try:
-        result = scraper.procesar_dni(None, dni)
-        print("Result:", result)
+        d = Driver(headless=True)
     except Exception as e:
-        print("Scraper raised exception:", e)
+        pytest.skip(f"Chrome no disponible: {e}")
+    yield d
+    d.close()
+
+
+def test_integration(driver):
+    fx = FixtureServer(Escenario(latencia_ms=200, tasa_verificacion=0.5, semilla=7)).iniciar()
+    try:
+        scraper = SuneduScraper()
+        scraper.URL = fx.sunedu_url
+        for dni in ("40000000", "40000001", "40000002"):
+            resultado = scraper.procesar_dni(driver, dni)
+            assert resultado["encontrado"] == fx.encontrado("sunedu", dni)
+            if resultado["encontrado"]:
+                assert resultado["datos"][0]["dni"] == dni
+    finally:
+        fx.detener()
+
 
 if __name__ == "__main__":
-    test_integration()
+    pytest.main([__file__, "-s"])
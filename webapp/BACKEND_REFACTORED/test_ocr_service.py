@@ -0,0 +1,31 @@
+import threading
+import time
+
+from app.services.ocr_service import OcrService
+
+
+class _ModeloLento:
+    """Modelo de prueba: devuelve el texto de la imagen tras una pausa fija."""
+    def __init__(self):
+        self.hilos = set()
+
+    def classification(self, img_bytes):
+        self.hilos.add(threading.current_thread().name)
+        time.sleep(0.01)
+        return img_bytes.decode()
+
+
+def test_resuelve_en_paralelo_con_un_solo_modelo():
+    servicio = OcrService(threads=2, max_batch=4, batch_wait=0.01)
+    modelo = _ModeloLento()
+    servicio._model = modelo
+    try:
+        futuros = [servicio.submit(f"C{i:03d}".encode()) for i in range(20)]
+        assert [f.result(timeout=5) for f in futuros] == [f"C{i:03d}" for i in range(20)]
+        stats = servicio.get_stats()
+        assert stats["solved"] == 20 and stats["errors"] == 0
+        assert stats["batches"] < 20  # Hubo micro-batching
+        assert stats["queue_depth"] == 0
+        assert servicio.classification(b"ZZ99") == "ZZ99"
+    finally:
+        servicio.stop()
@@ -0,0 +1,26 @@
+import threading
+
+from app.services.pacing import PacingController
+
+
+def test_aimd_sube_aditivo_y_baja_multiplicativo():
+    c = PacingController("sunedu", ritmo_inicial=10, ritmo_min=1, ritmo_max=12, paso=0.5, factor=0.5)
+    for _ in range(3):
+        c.exito()
+    assert c.ritmo == 11.5
+    c.exito(); c.exito()
+    assert c.ritmo == 12  # Tope
+    c.penalizar("verificacion")
+    assert c.ritmo == 6 and c.intervalo == 10
+    for _ in range(10):
+        c.penalizar("timeout")
+    assert c.ritmo == 1  # Piso
+    stats = c.get_stats()
+    assert stats["retrocesos"] == 11 and stats["ultimo_motivo"] == "timeout"
+
+
+def test_pausa_se_corta_al_detener():
+    c = PacingController("minedu", ritmo_inicial=1, ritmo_min=1, ritmo_max=1, paso=0, factor=0.5)
+    stop = threading.Event()
+    stop.set()
+    c.pausar(stop)  # 60s de pausa, pero la sesión ya se detuvo
@@ -0,0 +1,40 @@
+from app.core.config import Estado, SubEstado as S
+from app.db import repository
+from app.db.models import Registro
+from app.db.repository import fusionar_subestados
+
+
+def test_fusion_prioriza_sunedu():
+    assert fusionar_subestados(S.FOUND, S.PROCESANDO) == Estado.FOUND_SUNEDU
+    assert fusionar_subestados(S.PROCESANDO, S.FOUND) == Estado.PROCESANDO_SUNEDU  # Espera a SUNEDU
+    assert fusionar_subestados(S.NOT_FOUND, S.FOUND) == Estado.FOUND_MINEDU
+    assert fusionar_subestados(S.NOT_FOUND, S.PENDIENTE) == Estado.CHECK_MINEDU
+    assert fusionar_subestados(S.NOT_FOUND, S.NOT_FOUND) == Estado.NOT_FOUND
+    assert fusionar_subestados(S.ERROR, S.NOT_FOUND) == Estado.ERROR_SUNEDU
+    assert fusionar_subestados(S.NOT_FOUND, S.ERROR) == Estado.ERROR_MINEDU
+
+
+def test_fanout_ambas_fuentes_a_la_vez(repo, monkeypatch):
+    monkeypatch.setattr(repository, "PIPELINE_MODE", "fanout")
+    repo.crear_lote("s1", "lote.xlsx", ["11111111", "22222222"])
+
+    # Ambas fuentes toman el primer DNI sin esperar a la otra
+    a_sunedu = repo.tomar_siguiente_fuente("s1", "sunedu")
+    a_minedu = repo.tomar_siguiente_fuente("s1", "minedu")
+    assert a_sunedu["dni"] == a_minedu["dni"] == "11111111"
+
+    # MINEDU encuentra primero: no es final hasta que SUNEDU responda
+    assert repo.registrar_subresultado(a_minedu["id"], "minedu", S.FOUND, {"titulo": "X"}) is None
+    final = repo.registrar_subresultado(a_sunedu["id"], "sunedu", S.NOT_FOUND, error_msg="No")
+    assert final["estado"] == Estado.FOUND_MINEDU and final["payload_minedu"] == {"titulo": "X"}
+
+    # SUNEDU encuentra el segundo antes que MINEDU lo tome → MINEDU se omite
+    b = repo.tomar_siguiente_fuente("s1", "sunedu")
+    final = repo.registrar_subresultado(b["id"], "sunedu", S.FOUND, [{"grado_o_titulo": "B"}])
+    assert final["estado"] == Estado.FOUND_SUNEDU
+    assert repo.tomar_siguiente_fuente("s1", "minedu") is None
+
+    with repo.session_factory() as s:
+        reg = s.get(Registro, b["id"])
+        assert (reg.estado_sunedu, reg.estado_minedu) == (S.FOUND, S.OMITIDO)
+    assert not repo.hay_trabajo_pendiente("s1")
@@ -0,0 +1,45 @@
+import json
+
+from app.workers.profile_pool import ProfilePool
+
+
+def _usar(slot, prefs=None):
+    """Simula un Chrome que escribió su perfil."""
+    (slot.path / "Local State").write_text("{}", encoding="utf-8")
+    (slot.path / "Default").mkdir(exist_ok=True)
+    (slot.path / "Default" / "Preferences").write_text(json.dumps(prefs or {}), encoding="utf-8")
+
+
+def test_prefiere_perfil_caliente_y_limpia_locks(tmp_path):
+    pool = ProfilePool(base_dir=tmp_path, slots=2, enabled=True)
+    a = pool.acquire("sunedu")
+    b = pool.acquire("sunedu")
+    assert a.nombre != b.nombre and not a.prestado_caliente
+    assert pool.acquire("sunedu") is None  # Sin slot → perfil temporal
+
+    _usar(b, {"profile": {"exit_type": "Crashed"}})
+    (b.path / "SingletonLock").symlink_to("host-1234")  # Chrome muerto sin cerrar
+    pool.release(a)
+    pool.release(b)
+
+    otra = pool.acquire("sunedu")
+    assert otra is b and b.prestado_caliente
+    assert not (b.path / "SingletonLock").is_symlink()
+    assert json.loads((b.path / "Default" / "Preferences").read_text())["profile"]["exit_type"] == "Normal"
+    assert pool.get_stats()["locks_limpiados"] == 1
+
+
+def test_reconstruye_perfil_corrupto_o_que_cae(tmp_path):
+    pool = ProfilePool(base_dir=tmp_path, slots=1, enabled=True, max_fallos=2)
+    slot = pool.acquire("minedu")
+    _usar(slot)
+    (slot.path / "Local State").write_text('{"trunca', encoding="utf-8")
+    pool.release(slot)
+
+    slot = pool.acquire("minedu")
+    assert not slot.prestado_caliente and not any(slot.path.iterdir())
+    _usar(slot)
+    pool.release(slot, sano=False)
+    assert pool.acquire("minedu").prestado_caliente  # Una caída: se conserva
+    pool.release(slot, sano=False)
+    assert not slot.caliente and pool.get_stats()["reconstruidos"] == 2
@@ -0,0 +1,37 @@
+import time
+from app.core.config import Estado
+from app.services.result_cache import ResultCache
+
+
+def test_hit_miss_y_filtro_por_estado():
+    cache = ResultCache(ttl_found=60, ttl_not_found=60, max_entries=10, enabled=True)
+    assert cache.get("12345678") is None
+    cache.put_found_sunedu("12345678", [{"nombres": "PEREZ, JUAN"}])
+    hit = cache.get("12345678")
+    assert hit["estado"] == Estado.FOUND_SUNEDU
+    # El worker MINEDU no acepta resultados SUNEDU
+    assert cache.get("12345678", (Estado.FOUND_MINEDU, Estado.NOT_FOUND)) is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_ttl_negativo_y_lru():
+    cache = ResultCache(ttl_found=60, ttl_not_found=0.01, max_entries=2, enabled=True)
+    cache.put_not_found("11111111", "No encontrado")
+    time.sleep(0.02)
+    assert cache.get("11111111") is None
+    assert cache.get_stats()["expirations"] == 1
+
+    cache.put_found_minedu("22222222", {"titulo": "X"})
+    cache.put_found_minedu("33333333", {"titulo": "Y"})
+    cache.put_found_minedu("44444444", {"titulo": "Z"})
+    assert cache.get("22222222") is None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_invalidar_solo_negativos():
+    cache = ResultCache(ttl_found=60, ttl_not_found=60, max_entries=10, enabled=True)
+    cache.put_not_found("11111111")
+    cache.put_found_sunedu("22222222", [])
+    assert cache.invalidate(["11111111", "22222222"], solo_negativos=True) == 1
+    assert cache.get("22222222") is not None
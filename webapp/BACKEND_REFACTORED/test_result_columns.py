@@ -0,0 +1,55 @@
+"""Columnas de display denormalizadas (sunedu_* / minedu_*) y payload JSON bajo demanda."""
+import json
+
+from app.core.config import Estado, SubEstado as S
+from app.db import repository
+from app.db.models import Registro
+
+SUNEDU = [{"nombres": "PEREZ, ANA", "grado_o_titulo": "BACHILLER", "institucion": "UNI", "fecha_diploma": "01/02/2020"}]
+MINEDU = {"nombre_completo": "ANA PEREZ", "titulo": "PROFESORA", "institucion": "ISP", "fecha_expedicion": "2019"}
+
+
+def test_columnas_al_guardar_y_payload_bajo_demanda(repo, monkeypatch):
+    repo.crear_lote("s1", "a.xlsx", ["11111111", "22222222", "33333333"])
+    a, b, c = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w1", n=3)
+    repo.actualizar_resultado(a["id"], Estado.FOUND_SUNEDU, payload_sunedu=SUNEDU)
+    repo.actualizar_resultado(b["id"], Estado.NOT_FOUND, error_msg="Sin registros")
+
+    listado = {r["dni"]: r for r in repo.obtener_registros("s1")}
+    assert listado["11111111"]["sunedu_nombres"] == "PEREZ, ANA"
+    assert listado["11111111"]["sunedu_fecha_diploma"] == "01/02/2020"
+    assert "minedu_nombres" not in listado["11111111"] and "sunedu_nombres" not in listado["22222222"]
+    assert not any("payload_sunedu" in r for r in listado.values())
+
+    assert repo.obtener_payload("s1", a["id"])["payload_sunedu"] == SUNEDU
+    assert repo.obtener_payload("s2", a["id"]) is None
+
+    # Reintento: vuelve sin datos de display
+    repo.actualizar_resultado(c["id"], Estado.ERROR_SUNEDU, payload_sunedu=SUNEDU)
+    repo.reintentar_no_encontrados("s1")
+    assert "sunedu_nombres" not in {r["dni"]: r for r in repo.obtener_registros("s1")}["33333333"]
+
+    # Fanout: el subresultado escribe las columnas con el payload
+    monkeypatch.setattr(repository, "PIPELINE_MODE", "fanout")
+    repo.preparar_fanout("s1")
+    item = repo.reclamar_fuente("s1", "minedu", "m1", n=1)[0]
+    repo.registrar_subresultado(item["id"], "minedu", S.FOUND, payload=MINEDU)
+    fila = {r["id"]: r for r in repo.obtener_registros("s1")}[item["id"]]
+    assert (fila["minedu_nombres"], fila["minedu_titulo"], fila["minedu_fecha"]) == ("ANA PEREZ", "PROFESORA", "2019")
+
+
+def test_rellenar_registros_anteriores(repo):
+    repo.crear_lote("s1", "a.xlsx", ["11111111", "22222222"])
+    # Registros guardados antes de las columnas: solo el JSON
+    with repo.session_factory() as s:
+        uno, dos = s.query(Registro).order_by(Registro.id).all()
+        uno.payload_sunedu = json.dumps(SUNEDU)
+        dos.payload_minedu = json.dumps(MINEDU)
+        s.commit()
+        antes = {r.id: r.updated_at for r in s.query(Registro)}
+
+    assert repo.rellenar_campos_resultado(lote=1) == 2
+    filas = repo.obtener_registros("s1")
+    assert filas[0]["sunedu_institucion"] == "UNI" and filas[1]["minedu_institucion"] == "ISP"
+    with repo.session_factory() as s:
+        assert {r.id: r.updated_at for r in s.query(Registro)} == antes
@@ -0,0 +1,79 @@
+"""Contadores por sesión/lote/estado mantenidos por triggers (session_counters) y su verificación."""
+from sqlalchemy import text
+
+from app.core.config import Estado
+from app.db import repository, session
+from app.db.models import TRIGGERS_CONTADORES
+
+
+def _consistente(repo, sid=None):
+    r = repo.verificar_contadores(sid)
+    assert r["consistente"], r["diferencias"]
+
+
+def test_transiciones_mantienen_contadores(repo, monkeypatch):
+    lote = repo.crear_lote("s1", "a.xlsx", [str(10000000 + i) for i in range(6)])
+    repo.crear_lote("s2", "b.xlsx", ["20000000"])
+    assert repo.obtener_conteos("s1") == {Estado.PENDIENTE: 6}
+
+    items = repo.reclamar("s1", Estado.PENDIENTE, Estado.PROCESANDO_SUNEDU, "w1", n=4)
+    repo.actualizar_resultado(items[0]["id"], Estado.FOUND_SUNEDU)
+    repo.actualizar_resultado(items[1]["id"], Estado.NOT_FOUND)
+    repo.actualizar_resultado(items[2]["id"], Estado.ERROR_SUNEDU)
+    assert repo.obtener_conteos("s1") == {
+        Estado.PENDIENTE: 2, Estado.PROCESANDO_SUNEDU: 1, Estado.FOUND_SUNEDU: 1,
+        Estado.NOT_FOUND: 1, Estado.ERROR_SUNEDU: 1,
+    }
+    assert repo.contar_retryables("s1") == 2 and repo.obtener_total("s1") == 6
+
+    # UPDATEs por conjunto (recuperación y reintento) también pasan por los triggers
+    assert repo.recuperar_procesando("s1")["sunedu_recuperados"] == 1
+    assert repo.reintentar_no_encontrados("s1")["reencolados"] == 2
+    assert repo.obtener_conteos("s1") == {Estado.PENDIENTE: 5, Estado.FOUND_SUNEDU: 1}
+    assert repo.obtener_conteos("s1", lote_id=lote.id) == repo.obtener_conteos("s1")
+
+    # Fanout: estado fusionado al reclamar
+    monkeypatch.setattr(repository, "PIPELINE_MODE", "fanout")
+    repo.preparar_fanout("s1")
+    repo.reclamar_fuente("s1", "minedu", "m1", n=2)
+    _consistente(repo)
+
+    repo.eliminar_lote(lote.id)
+    assert repo.obtener_conteos("s1") == {}
+    assert repo.obtener_conteos("s2") == {Estado.PENDIENTE: 1}
+    repo.limpiar_todo("s2")
+    _consistente(repo)
+
+
+def test_verificar_detecta_y_reconstruye(repo, engine):
+    repo.crear_lote("s1", "a.xlsx", ["11111111", "22222222", "33333333"])
+
+    # Un contador desfasado (p.ej. una escritura por fuera de los triggers)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE session_counters SET total = 7 WHERE session_id = 's1'"))
+        conn.execute(text("INSERT INTO session_counters VALUES ('s1', 99, 'FOUND_SUNEDU', 2)"))
+
+    r = repo.verificar_contadores("s1")
+    assert not r["consistente"] and not r["reparado"]
+    assert {(d["estado"], d["contador"], d["real"]) for d in r["diferencias"]} == {
+        (Estado.PENDIENTE, 7, 3), (Estado.FOUND_SUNEDU, 2, 0),
+    }
+
+    assert repo.verificar_contadores("s1", reparar=True)["reparado"]
+    _consistente(repo, "s1")
+    assert repo.obtener_conteos("s1") == {Estado.PENDIENTE: 3}
+
+
+def test_auto_migrate_crea_triggers_faltantes(repo, engine, monkeypatch):
+    # BD existente sin triggers: create_all no vuelve a crear tablas, _auto_migrate los agrega
+    with engine.begin() as conn:
+        for nombre in TRIGGERS_CONTADORES:
+            conn.execute(text(f"DROP TRIGGER {nombre}"))
+    monkeypatch.setattr(session, "engine", engine)
+    session._auto_migrate()
+
+    with engine.connect() as conn:
+        triggers = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+    assert set(TRIGGERS_CONTADORES) <= set(triggers)
+    repo.crear_lote("s1", "a.xlsx", ["11111111"])
+    assert repo.obtener_conteos("s1") == {Estado.PENDIENTE: 1}
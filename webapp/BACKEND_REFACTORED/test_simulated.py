@@ -0,0 +1,32 @@
+"""Backend simulado (app/scrapers/simulated.py): distribuciones y contrato de procesar_dni."""
+import random
+
+import pytest
+
+from app.scrapers.simulated import Distribucion, SimulatedScraper, encontrado
+
+
+def test_distribuciones():
+    rng = random.Random(1)
+    assert Distribucion("const:0.5").muestra(rng) == 0.5
+    assert all(0.1 <= Distribucion("uniform:0.1:0.2").muestra(rng) <= 0.2 for _ in range(50))
+    assert Distribucion("lognormal:1:0").muestra(rng) == 1.0
+    for spec in ("normal:1", "const", "uniform:1", "lognormal:1:2:3"):
+        with pytest.raises(ValueError):
+            Distribucion(spec)
+
+
+def test_scraper_simulado_contrato():
+    config = {"sunedu": {"tasa_encontrado": 0.5, "tasa_error": 0.0, "latencia": "const:0"}}
+    scraper = SimulatedScraper("sunedu", config=config, rng=random.Random(1))
+    dnis = [str(40000000 + i) for i in range(40)]
+    for dni in dnis:
+        resultado = scraper.procesar_dni(None, dni)
+        assert resultado["encontrado"] == encontrado("sunedu", dni, 0.5)
+        if resultado["encontrado"]:
+            assert resultado["datos"][0]["dni"] == dni
+    assert 0 < sum(encontrado("sunedu", d, 0.5) for d in dnis) < len(dnis)
+
+    config["sunedu"]["tasa_error"] = 1.0
+    with pytest.raises(RuntimeError):
+        SimulatedScraper("sunedu", config=config).procesar_dni(None, dnis[0])
@@ -0,0 +1,51 @@
+from app.scrapers.sunedu_network import SuneduNetworkCapture, parsear_respuesta
+
+
+def test_parsea_lista_bajo_contenedor():
+    payload = {"data": [{
+        "nombreCompleto": "PEREZ GOMEZ, JUAN", "numeroDocumento": "DNI 12345678",
+        "gradoTitulo": "BACHILLER EN DERECHO", "universidad": "UNMSM", "fechaDiploma": "01/01/2020",
+    }]}
+    registros = parsear_respuesta(payload, "12345678")
+    assert len(registros) == 1
+    assert registros[0]["dni"] == "12345678"
+    assert registros[0]["grado_o_titulo"] == "BACHILLER EN DERECHO"
+    assert registros[0]["institucion"] == "UNMSM"
+
+
+def test_sin_resultados_y_formato_desconocido():
+    assert parsear_respuesta({"data": []}, "12345678") == []
+    assert parsear_respuesta({"ok": True}, "12345678") is None
+    assert parsear_respuesta([{"foo": "bar"}], "12345678") is None
+
+
+class _TabFalsa:
+    def __init__(self):
+        self.handlers = []
+
+    def add_handler(self, event_cls, handler):
+        self.handlers.append(handler)
+
+
+class _DriverFalso:
+    def __init__(self):
+        self._tab = _TabFalsa()
+        self.comandos = []
+
+    def run_cdp_command(self, comando):
+        self.comandos.append(comando)
+        return {}
+
+
+def test_captura_se_suscribe_una_vez_por_driver():
+    driver = _DriverFalso()
+    primera = SuneduNetworkCapture.para(driver)
+    assert primera.activo and len(driver._tab.handlers) == 2
+
+    # Otro scraper sobre el mismo driver prestado: misma captura, sin handlers nuevos
+    primera.armar()
+    primera._listo.set()
+    segunda = SuneduNetworkCapture.para(driver)
+    assert segunda is primera and len(driver._tab.handlers) == 2
+    assert not segunda._listo.is_set()  # La respuesta del worker anterior no se hereda
+    assert SuneduNetworkCapture.para(_DriverFalso()) is not primera
@@ -1,4 +1,4 @@
-import React, { useCallback, useRef, useState } from 'react'
+import React, { useCallback, useEffect, useRef, useState } from 'react'
 import { DashboardProvider, useDashboard } from './context/DashboardContext'
 import usePolling from './hooks/usePolling'
 import { fetchStatus, fetchWorkersStatus, fetchRegistros } from './api/client'
@@ -17,9 +17,11 @@ const TAB_FILTERS = {
   sunedu: { estado: 'FOUND_SUNEDU' },
   minedu: { estado: 'FOUND_MINEDU' },
   notfound: { estado: 'NOT_FOUND' },
-  errors: null, // special handling
+  errors: { estado: ['ERROR_SUNEDU', 'ERROR_MINEDU'] },
 }
 
+const PAGE_SIZE = 200
+
 function DashboardContent() {
   const { state, dispatch, addLog } = useDashboard()
   const [isSidebarOpen, setSidebarOpen] = useState(false)
@@ -32,6 +34,21 @@ function DashboardContent() {
     enProceso: 0,
   })
 
+  // Refresca la página abierta (mismo cursor): el costo no depende de qué tan profunda sea
+  const afterId = state.cursors[state.cursors.length - 1]
+  const fetchRecordsForTab = useCallback(async () => {
+    try {
+      const filter = TAB_FILTERS[state.currentTab] || {}
+      const page = await fetchRegistros({
+        ...filter,
+        after_id: afterId,
+        dni_prefix: state.dniPrefix,
+        limit: PAGE_SIZE,
+      })
+      dispatch({ type: 'SET_RECORDS', payload: page })
+    } catch { /* ignore */ }
+  }, [dispatch, state.currentTab, state.dniPrefix, afterId])
+
   const poll = useCallback(async () => {
     try {
       const [status, workers] = await Promise.all([
@@ -54,11 +71,11 @@ function DashboardContent() {
 
       dispatch({ type: 'SET_WORKERS', payload: workers })
       buildLogs(status, workers)
-      await fetchRecordsForTab(state.currentTab)
+      await fetchRecordsForTab()
     } catch {
       // silently ignore poll failures
     }
-  }, [state.currentTab])
+  }, [fetchRecordsForTab])
 
   const buildLogs = useCallback((status, workers) => {
     const p = prev.current
@@ -99,25 +116,11 @@ function DashboardContent() {
     prev.current = { sRun, mRun, total, foundSunedu, derivMinedu, foundMinedu, notFound, enProceso }
   }, [addLog])
 
-  const fetchRecordsForTab = useCallback(async (tab) => {
-    try {
-      let records = []
-      if (tab === 'errors') {
-        const [se, me] = await Promise.all([
-          fetchRegistros({ estado: 'ERROR_SUNEDU', limit: 200 }),
-          fetchRegistros({ estado: 'ERROR_MINEDU', limit: 200 }),
-        ])
-        records = [...se, ...me]
-      } else {
-        const filter = TAB_FILTERS[tab] || {}
-        records = await fetchRegistros({ ...filter, limit: 200 })
-      }
-      dispatch({ type: 'SET_RECORDS', payload: records })
-    } catch { /* ignore */ }
-  }, [dispatch])
-
   usePolling(poll, 2000)
 
+  // Cambio de pestaña, página o búsqueda: no esperar al siguiente poll
+  useEffect(() => { fetchRecordsForTab() }, [fetchRecordsForTab])
+
   return (
     <div className="flex w-full min-h-screen md:h-screen bg-gray-50">
       <Sidebar
@@ -68,12 +68,18 @@ export async function fetchWorkersStatus() {
   return json('/api/workers/status')
 }
 
+/**
+ * Página keyset de registros → { items, next_cursor, total }.
+ * Para la página siguiente se pasa `after_id: next_cursor`.
+ */
 export async function fetchRegistros(params = {}) {
   const q = new URLSearchParams()
-  if (params.estado) q.set('estado', params.estado)
+  for (const e of [].concat(params.estado || [])) q.append('estado', e)
   if (params.lote_id) q.set('lote_id', params.lote_id)
+  if (params.dni_prefix) q.set('dni_prefix', params.dni_prefix)
+  if (params.updated_since) q.set('updated_since', params.updated_since)
+  if (params.after_id) q.set('after_id', String(params.after_id))
   q.set('limit', String(params.limit || 200))
-  q.set('offset', String(params.offset || 0))
   return json(`/api/registros?${q}`)
 }
 
@@ -81,15 +87,43 @@ export async function fetchLotes() {
   return json('/api/lotes')
 }
 
-export async function uploadFile(file) {
+// Archivos grandes: ingesta en segundo plano en el backend + sondeo del progreso
+const BULK_UPLOAD_BYTES = 5 * 1024 * 1024
+
+export async function uploadFile(file, onProgress) {
   const fd = new FormData()
   fd.append('file', file)
   // FormData sets its own Content-Type, don't override
-  return json('/api/upload', { method: 'POST', body: fd })
+  if (file.size < BULK_UPLOAD_BYTES) {
+    return json('/api/upload', { method: 'POST', body: fd })
+  }
+
+  await json('/api/upload?bulk=true', { method: 'POST', body: fd })
+  for (;;) {
+    await new Promise(r => setTimeout(r, 1000))
+    const p = await json('/api/upload/progress')
+    if (onProgress) onProgress(p)
+    if (p.estado === 'error') throw new Error(p.error || 'Error en la ingesta')
+    if (p.estado === 'completado') {
+      if (p.validos === 0 && p.invalidos === 0) throw new Error('No se encontraron DNIs en el archivo')
+      // Misma forma que la respuesta síncrona de /api/upload
+      return {
+        message: 'Archivo procesado',
+        lote_id: p.lote_id,
+        total_dnis: p.insertados,
+        invalid_dnis: p.invalidos_muestra || [],
+        total_invalid: p.invalidos,
+      }
+    }
+  }
 }
 
-export async function startWorkers() {
-  return json('/api/workers/start', { method: 'POST' })
+export async function startWorkers(workers = {}) {
+  const q = new URLSearchParams()
+  if (workers.sunedu) q.set('sunedu', String(workers.sunedu))
+  if (workers.minedu) q.set('minedu', String(workers.minedu))
+  const qs = q.toString()
+  return json(`/api/workers/start${qs ? `?${qs}` : ''}`, { method: 'POST' })
 }
 
 export async function stopWorkers() {
@@ -152,8 +152,8 @@ function MobileCard({ r, cols, RowComp }) {
 }
 
 function DataTable() {
-  const { state, showToast } = useDashboard()
-  const { records, currentTab, total } = state
+  const { state, dispatch, showToast } = useDashboard()
+  const { records, currentTab, recordsTotal, nextCursor, cursors, dniPrefix } = state
   const cols = COLUMNS[currentTab]
   const RowComponent = ROW_MAP[currentTab]
 
@@ -212,7 +212,33 @@ function DataTable() {
 
       {/* Footer */}
       <div className="p-3 border-t border-gray-200 bg-gray-50 flex justify-between items-center text-xs text-gray-500 shrink-0">
-        <span>Mostrando {records.length} de {total} registros</span>
+        <div className="flex items-center gap-3">
+          <span>Mostrando {records.length} de {recordsTotal} registros</span>
+          <button
+            onClick={() => dispatch({ type: 'PREV_PAGE' })}
+            disabled={cursors.length === 0}
+            className="material-icons-round text-base text-gray-500 hover:text-primary disabled:text-gray-300"
+            title="Página anterior"
+          >
+            chevron_left
+          </button>
+          <span className="font-mono">{cursors.length + 1}</span>
+          <button
+            onClick={() => dispatch({ type: 'NEXT_PAGE' })}
+            disabled={!nextCursor}
+            className="material-icons-round text-base text-gray-500 hover:text-primary disabled:text-gray-300"
+            title="Página siguiente"
+          >
+            chevron_right
+          </button>
+          <input
+            value={dniPrefix}
+            onChange={e => dispatch({ type: 'SET_DNI_PREFIX', payload: e.target.value.replace(/\D/g, '').slice(0, 8) })}
+            placeholder="Buscar DNI..."
+            inputMode="numeric"
+            className="w-28 px-2 py-1 border border-gray-200 rounded bg-white text-gray-700 font-mono"
+          />
+        </div>
         <button
           onClick={handleDownload}
           className="flex items-center gap-1 text-primary hover:text-primary-dark font-medium transition-colors"
@@ -13,7 +13,9 @@ function Controls() {
 
       if (state.selectedFile) {
         addLog(`Subiendo ${state.selectedFile.name}...`, 'text-blue-600')
-        const uploadRes = await api.uploadFile(state.selectedFile)
+        const uploadRes = await api.uploadFile(state.selectedFile, (p) =>
+          addLog(`  … ${p.insertados.toLocaleString()} DNIs insertados (${Math.round(p.filas_por_s)} filas/s)`, 'text-blue-500')
+        )
 
         if (uploadRes.total_dnis > 0) {
           addLog(`✓ ${uploadRes.total_dnis} DNIs válidos cargados`, 'text-green-600')
@@ -15,8 +15,12 @@ const initialState = {
   retry: { retryables: 0, pipeline_idle: false, can_retry: false },
   // Workers
   workers: { sunedu: { running: false }, minedu: { running: false } },
-  // Records
+  // Records (página keyset actual)
   records: [],
+  recordsTotal: 0,
+  nextCursor: null,
+  cursors: [],      // after_id de cada página abierta (vacío = primera página)
+  dniPrefix: '',
   // Terminal
   logs: [{ time: ts(), msg: 'Initializing dashboard...', color: 'text-slate-500' }],
   // UI
@@ -35,10 +39,19 @@ function reducer(state, action) {
       return { ...state, ...action.payload }
     case 'SET_WORKERS':
       return { ...state, workers: action.payload }
-    case 'SET_RECORDS':
-      return { ...state, records: action.payload }
+    case 'SET_RECORDS': {
+      const { items, next_cursor, total } = action.payload
+      // total es null en páginas siguientes de una búsqueda: se conserva el de la primera
+      return { ...state, records: items, nextCursor: next_cursor, recordsTotal: total ?? state.recordsTotal }
+    }
+    case 'NEXT_PAGE':
+      return state.nextCursor ? { ...state, cursors: [...state.cursors, state.nextCursor] } : state
+    case 'PREV_PAGE':
+      return { ...state, cursors: state.cursors.slice(0, -1) }
+    case 'SET_DNI_PREFIX':
+      return { ...state, dniPrefix: action.payload, cursors: [] }
     case 'SET_TAB':
-      return { ...state, currentTab: action.payload }
+      return { ...state, currentTab: action.payload, cursors: [] }
     case 'SET_FILE':
       return { ...state, selectedFile: action.payload }
     case 'SET_LOADING':